@@ -0,0 +1,296 @@
+"""
+Account State Writer - write-behind for EA account snapshots
+
+Redis (account:state:<id>) is the authority for live account values.
+/api/ticks, /api/heartbeat and /api/profit_update (and CoreCommunication
+heartbeats) hand their balance/equity/margin/profit values to update(), which
+stores them in Redis and marks the account dirty - no UPDATE + COMMIT per
+request. A background thread writes the newest values of each dirty account
+to PostgreSQL with one UPDATE every flush_interval seconds, or right away on
+a significant change (balance moved = deal closed, equity moved by more than
+SIGNIFICANT_EQUITY_CHANGE_PCT).
+
+Readers use get_account_snapshot(), which prefers the Redis snapshot and
+falls back to the accounts row for fields Redis doesn't have (EA offline,
+snapshot expired).
+
+Usage:
+    from account_state import get_account_state_writer, get_account_snapshot
+
+    get_account_state_writer().update(account_id, {'balance': 1000.0, 'equity': 1012.5})
+
+    snapshot = get_account_snapshot(account_id, db)
+    balance = snapshot['balance']
+"""
+
+import logging
+import time
+from datetime import datetime
+from threading import Event, Thread, Lock
+from typing import Dict, Optional
+
+from database import ScopedSession
+from models import Account
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# EA payload fields mirrored to the accounts table
+ACCOUNT_STATE_FIELDS = (
+    'balance', 'equity', 'margin', 'free_margin',
+    'profit_today', 'profit_week', 'profit_month', 'profit_year',
+    'deposits_today', 'deposits_week', 'deposits_month', 'deposits_year'
+)
+
+
+class AccountStateWriter:
+    CACHE_TTL = 60  # Seconds the Redis snapshot stays valid without new ticks
+    SIGNIFICANT_EQUITY_CHANGE_PCT = 1.0  # Equity move (vs. last flush) that triggers an early flush
+
+    def __init__(self, flush_interval=5):
+        """
+        Initialize Account State Writer
+
+        Args:
+            flush_interval: Seconds between PostgreSQL flushes (default: 5)
+        """
+        self.flush_interval = flush_interval
+        self.pending: Dict[int, Dict] = {}  # account_id -> newest unflushed fields
+        self.latest: Dict[int, Dict] = {}   # account_id -> full snapshot mirrored to Redis
+        self.flushed: Dict[int, Dict] = {}  # account_id -> values last written to PostgreSQL
+        self.lock = Lock()
+        self.wake = Event()
+
+        self.running = False
+        self.thread = None
+        self.updates = 0
+        self.rows_flushed = 0
+        self.flushes = 0
+        self.early_flushes = 0
+        self.last_flush_ms = 0.0
+
+    # ========================================================================
+    # LIFECYCLE
+    # ========================================================================
+
+    def start(self):
+        """Start the background flush thread"""
+        if self.running:
+            logger.warning("Account state writer already running")
+            return
+
+        self.running = True
+        self.thread = Thread(target=self._worker_loop, daemon=True, name='AccountStateWriter')
+        self.thread.start()
+        logger.info(f"Account state writer started (flush every {self.flush_interval}s)")
+
+    def stop(self):
+        """Stop the flush thread and write pending snapshots"""
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=10)
+        self.flush()
+        logger.info(f"Account state writer stopped ({self.rows_flushed} rows flushed)")
+
+    # ========================================================================
+    # WRITE (hot path - Redis + memory)
+    # ========================================================================
+
+    def update(self, account_id: int, fields: Dict, heartbeat: bool = False) -> Dict:
+        """
+        Record a new account snapshot
+
+        Args:
+            account_id: Account ID
+            fields: Any of ACCOUNT_STATE_FIELDS (None values are ignored)
+            heartbeat: Also set accounts.last_heartbeat (EA heartbeat)
+
+        Returns:
+            The fields that were applied (as floats)
+        """
+        values = {
+            key: float(fields[key])
+            for key in ACCOUNT_STATE_FIELDS
+            if fields.get(key) is not None
+        }
+        if not values and not heartbeat:
+            return values
+
+        # First update of this process: keep fields other writers already cached
+        seed = {}
+        if account_id not in self.latest:
+            try:
+                seed = get_redis().get_account_state(account_id) or {}
+            except Exception:
+                pass
+
+        now = datetime.utcnow()
+        with self.lock:
+            pending = self.pending.setdefault(account_id, {})
+            pending.update(values)
+            state = self.latest.setdefault(account_id, seed)
+            state.update(values)
+            state['last_update'] = now.isoformat()
+            if heartbeat:
+                pending['last_heartbeat'] = now
+                state['last_heartbeat'] = now.isoformat()
+            snapshot = dict(state)
+            significant = self._is_significant(self.flushed.get(account_id), values)
+            self.updates += 1
+
+        if significant:
+            self.wake.set()
+
+        try:
+            get_redis().cache_account_state(account_id, snapshot, ttl=self.CACHE_TTL)
+        except Exception as e:
+            logger.error(f"Failed to cache account state in Redis: {e}")
+
+        return values
+
+    def _is_significant(self, flushed: Optional[Dict], values: Dict) -> bool:
+        """Balance changed (deal closed) or equity moved enough since the last flush"""
+        if flushed is None:
+            return True  # PostgreSQL never saw this account from this process
+        if 'balance' in values and values['balance'] != flushed.get('balance'):
+            return True
+        equity, last_equity = values.get('equity'), flushed.get('equity')
+        if equity is not None and last_equity:
+            return abs(equity - last_equity) / abs(last_equity) * 100 >= self.SIGNIFICANT_EQUITY_CHANGE_PCT
+        return False
+
+    # ========================================================================
+    # BACKGROUND FLUSH
+    # ========================================================================
+
+    def _worker_loop(self):
+        while self.running:
+            if self.wake.wait(self.flush_interval) and self.running:
+                self.early_flushes += 1
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Account state flush error: {e}", exc_info=True)
+
+    def flush(self) -> int:
+        """Write the newest snapshot of every dirty account (one UPDATE per account)"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        if not pending:
+            return 0
+
+        start = time.perf_counter()
+        db = ScopedSession()
+        try:
+            for account_id, values in pending.items():
+                db.query(Account).filter_by(id=account_id).update(values, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Account state flush failed, {len(pending)} accounts re-queued: {e}")
+            db.rollback()
+            with self.lock:
+                # Newer values that arrived meanwhile win
+                for account_id, values in pending.items():
+                    self.pending[account_id] = {**values, **self.pending.get(account_id, {})}
+            return 0
+        finally:
+            db.close()
+
+        with self.lock:
+            for account_id, values in pending.items():
+                self.flushed.setdefault(account_id, {}).update(values)
+
+        self.flushes += 1
+        self.rows_flushed += len(pending)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        logger.debug(f"Account state flush: {len(pending)} accounts in {self.last_flush_ms:.1f}ms")
+        return len(pending)
+
+    def get_stats(self) -> Dict:
+        """Writer statistics"""
+        return {
+            'running': self.running,
+            'flush_interval': self.flush_interval,
+            'pending_accounts': len(self.pending),
+            'updates': self.updates,
+            'rows_flushed': self.rows_flushed,
+            'flushes': self.flushes,
+            'early_flushes': self.early_flushes,
+            'last_flush_ms': round(self.last_flush_ms, 2)
+        }
+
+
+# Global instance
+_account_state_writer = None
+
+def get_account_state_writer() -> AccountStateWriter:
+    """Get global account state writer instance"""
+    global _account_state_writer
+    if _account_state_writer is None:
+        _account_state_writer = AccountStateWriter()
+    return _account_state_writer
+
+def start_account_state_writer(flush_interval=5):
+    """Start the global account state writer"""
+    writer = get_account_state_writer()
+    writer.flush_interval = flush_interval
+    writer.start()
+    return writer
+
+
+# ============================================================================
+# READ (Redis first, accounts row as fallback)
+# ============================================================================
+
+def get_account_snapshot(account_id: int, db=None, fields=ACCOUNT_STATE_FIELDS) -> Dict:
+    """
+    Live account values for an account
+
+    Args:
+        account_id: Account ID
+        db: Database session for the fallback (a short-lived one is opened if None)
+        fields: Fields to return (ACCOUNT_STATE_FIELDS and/or 'last_heartbeat');
+                only these are looked up in PostgreSQL when Redis lacks them
+
+    Returns:
+        Dict field -> float (ISO string for last_heartbeat) or None, plus
+        'source' ('cache', 'cache+db' or 'db'); empty dict if the account
+        does not exist
+    """
+    try:
+        cached = get_redis().get_account_state(account_id) or {}
+    except Exception as e:
+        logger.warning(f"Account state cache unavailable, reading accounts row: {e}")
+        cached = {}
+
+    snapshot = {}
+    for key in fields:
+        value = cached.get(key)
+        snapshot[key] = value if value is None or key == 'last_heartbeat' else float(value)
+
+    missing = [key for key in fields if snapshot[key] is None]
+    if not missing:
+        snapshot['source'] = 'cache'
+        return snapshot
+
+    session = db or ScopedSession()
+    try:
+        row = session.query(*[getattr(Account, key) for key in missing]).filter(
+            Account.id == account_id
+        ).first()
+    finally:
+        if db is None:
+            session.close()
+
+    if row is None:
+        return dict(snapshot, source='cache') if cached else {}
+
+    for key, value in zip(missing, row):
+        if value is not None:
+            snapshot[key] = value.isoformat() if key == 'last_heartbeat' else float(value)
+
+    snapshot['source'] = 'cache+db' if cached else 'db'
+    return snapshot
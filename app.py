@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import text
 import logging
 import os
+import time
 from threading import Thread
 import pytz
 
@@ -18,8 +19,14 @@ from models import Account, SubscribedSymbol, Log, Tick, OHLCData, BrokerSymbol,
 from auth import require_api_key, get_or_create_account
 from backup_scheduler import start_backup_scheduler, get_scheduler
 from redis_client import init_redis, get_redis
+from quote_book import get_quote_book
 from tick_batch_writer import start_batch_writer, get_batch_writer
-from command_helper import create_command
+from candle_builder import start_candle_builder, get_candle_builder
+from spread_stats import start_spread_tracker, get_spread_tracker
+from account_state import start_account_state_writer, get_account_state_writer, get_account_snapshot
+from tick_block import TickBlock
+from ea_payload import EARequest, negotiate as negotiate_payload
+from command_helper import create_command, response_ticket
 from worker_status_api import worker_status_bp
 
 # Configure logging
@@ -35,6 +42,11 @@ app_ticks = Flask('ticks')  # Port 9901
 app_trades = Flask('trades')  # Port 9902
 app_logs = Flask('logs')  # Port 9903
 app_webui = Flask('webui', template_folder='templates')  # Port 9905
+
+# EA endpoints also accept gzip/deflate, MessagePack and columnar tick bodies
+app_ticks.request_class = EARequest
+app_trades.request_class = EARequest
+
 socketio = SocketIO(app_webui, cors_allowed_origins="*")
 
 # Register worker status API blueprint
@@ -268,13 +280,17 @@ def connect():
 
             logger.info(f"{'New' if is_new else 'Existing'} account connected: {account_number} ({broker})")
 
+            # Payload format / compression the EA should use on the tick and trade ports
+            payload = negotiate_payload(data.get('payload_formats'), data.get('content_encodings'))
+
             return jsonify({
                 'status': 'success',
                 'message': 'Connected successfully',
                 'api_key': api_key,
                 'is_new': is_new,
                 'subscribed_symbols': symbol_list,
-                'server_time': datetime.utcnow().isoformat()
+                'server_time': datetime.utcnow().isoformat(),
+                'payload': payload
             }), 200
 
         finally:
@@ -320,28 +336,23 @@ def heartbeat(account, db):
         actual_deposits_month = deposits_month if deposits_month is not None else 0.0
         actual_deposits_year = deposits_year if deposits_year is not None else 0.0
         # The initial balance is not a withdrawal, it's starting capital
-        # Update last heartbeat and account data
-        account.last_heartbeat = datetime.utcnow()
-        if balance is not None:
-            account.balance = balance
-        if equity is not None:
-            account.equity = equity
-        if margin is not None:
-            account.margin = margin
-        if free_margin is not None:
-            account.free_margin = free_margin
-
-        # Use profits and deposits from MT5 EA
-        account.profit_today = actual_profit_today
-        account.profit_week = actual_profit_week
-        account.profit_month = actual_profit_month
-        account.profit_year = actual_profit_year
-        account.deposits_today = actual_deposits_today
-        account.deposits_week = actual_deposits_week
-        account.deposits_month = actual_deposits_month
-        account.deposits_year = actual_deposits_year
-        
-        db.commit()
+        # Update last heartbeat and account data: Redis now, PostgreSQL via
+        # background flush (no accounts row lock + commit per heartbeat)
+        get_account_state_writer().update(account.id, {
+            'balance': balance,
+            'equity': equity,
+            'margin': margin,
+            'free_margin': free_margin,
+            # Use profits and deposits from MT5 EA
+            'profit_today': actual_profit_today,
+            'profit_week': actual_profit_week,
+            'profit_month': actual_profit_month,
+            'profit_year': actual_profit_year,
+            'deposits_today': actual_deposits_today,
+            'deposits_week': actual_deposits_week,
+            'deposits_month': actual_deposits_month,
+            'deposits_year': actual_deposits_year
+        }, heartbeat=True)
 
         logger.info(f"Heartbeat from {account.mt5_account_number} - Balance: {balance}, Equity: {equity}, Profit: Today={actual_profit_today} Month={actual_profit_month}, Deposits: Month={actual_deposits_month}")
 
@@ -402,29 +413,27 @@ def profit_update(account, db):
         actual_profit_month = profit_month if profit_month is not None else 0.0
         actual_profit_year = profit_year if profit_year is not None else 0.0
 
-        # Update account data
-        if balance is not None:
-            account.balance = balance
-        if equity is not None:
-            account.equity = equity
-
+        # Update account data (balance change flushes to PostgreSQL right away)
         # Use EA profits directly
-        account.profit_today = actual_profit_today
-        account.profit_week = actual_profit_week
-        account.profit_month = actual_profit_month
-        account.profit_year = actual_profit_year
-
-        db.commit()
+        get_account_state_writer().update(account.id, {
+            'balance': balance,
+            'equity': equity,
+            'profit_today': actual_profit_today,
+            'profit_week': actual_profit_week,
+            'profit_month': actual_profit_month,
+            'profit_year': actual_profit_year
+        })
 
         logger.info(f"Instant profit update from {account.mt5_account_number} - Profit Today: {actual_profit_today}")
 
         # Broadcast account update via WebSocket
+        live = get_account_snapshot(account.id, db, fields=('margin', 'free_margin'))
         socketio.emit('account_update', {
             'number': account.mt5_account_number,
             'balance': float(balance) if balance else 0.0,
             'equity': float(equity) if equity else 0.0,
-            'margin': float(account.margin) if account.margin else 0.0,
-            'free_margin': float(account.free_margin) if account.free_margin else 0.0
+            'margin': live.get('margin') or 0.0,
+            'free_margin': live.get('free_margin') or 0.0
         })
 
         # Broadcast profit update via WebSocket (with EA values)
@@ -442,92 +451,167 @@ def profit_update(account, db):
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+# Command delivery (long-poll)
+COMMAND_BATCH_SIZE = 10           # Commands per response
+COMMAND_LONG_POLL_MAX_MS = 25000  # Upper bound for wait_ms (below EA/HTTP timeouts)
+COMMAND_LONG_POLL_SLICE = 0.5     # Seconds per BLPOP before re-checking PostgreSQL
+
+
+def queue_pending_db_commands(db, redis, account_id):
+    """
+    Push commands created directly in PostgreSQL (status='pending') to the
+    account's Redis queue and mark them 'executing' with one UPDATE
+
+    Returns:
+        Number of commands queued
+    """
+    pending_commands = db.query(Command.id, Command.command_type, Command.payload).filter_by(
+        account_id=account_id,
+        status='pending'
+    ).order_by(Command.created_at).limit(50).all()  # Oldest first -> newest MODIFY per ticket wins
+
+    if not pending_commands:
+        return 0
+
+    superseded = {}
+    for cmd_id, command_type, payload in pending_commands:
+        # Flatten the command structure for easier EA parsing
+        cmd_dict = {
+            'id': cmd_id,
+            'type': command_type
+        }
+        # Add payload fields directly (not nested)
+        if payload:
+            for key, value in payload.items():
+                cmd_dict[key] = value
+
+        # Push to Redis queue for instant delivery (priority lane; MODIFY_TRADE
+        # replaces an undelivered one for the same ticket)
+        superseded_id = redis.push_command(account_id, cmd_dict)
+        if superseded_id:
+            superseded[superseded_id] = cmd_id
+
+    # Mark as executing (retrieved from DB)
+    db.query(Command).filter(
+        Command.id.in_([c[0] for c in pending_commands]),
+        Command.status == 'pending'
+    ).update({'status': 'executing'}, synchronize_session=False)
+    db.commit()
+
+    if superseded:
+        from command_helper import cancel_superseded_commands
+        cancel_superseded_commands(db, list(superseded), 'newer MODIFY_TRADE for the same ticket')
+
+    logger.info(f"Pushed {len(pending_commands)} pending commands to Redis queue for account {account_id}")
+    return len(pending_commands)
+
+
+def claim_commands_for_delivery(db, popped):
+    """
+    Filter popped queue entries down to deliverable commands and mark them
+    'processing' (one SELECT + one UPDATE for the whole batch)
+
+    Commands already completed/failed, or seen twice in the batch, are dropped.
+    """
+    ids = list(dict.fromkeys(cmd['id'] for cmd in popped if cmd.get('id')))
+    statuses = dict(db.query(Command.id, Command.status).filter(Command.id.in_(ids)).all()) if ids else {}
+
+    commands_data = []
+    claimed_ids = set()
+    for cmd in popped:
+        cmd_id = cmd.get('id')
+        if not cmd_id or cmd_id not in statuses:
+            # No ID / not in DB (shouldn't happen, but send it anyway)
+            commands_data.append(cmd)
+        elif cmd_id in claimed_ids:
+            logger.warning(f"⚠️ Skipping duplicate command {cmd_id} in same batch")
+        elif statuses[cmd_id] in ('pending', 'executing'):
+            claimed_ids.add(cmd_id)
+            commands_data.append(cmd)
+        else:
+            logger.warning(f"⚠️ Skipping already {statuses[cmd_id]} command {cmd_id}")
+
+    if claimed_ids:
+        # ✅ CRITICAL: Mark commands as 'processing' to prevent duplicate execution
+        db.query(Command).filter(
+            Command.id.in_(claimed_ids),
+            Command.status.in_(['pending', 'executing'])
+        ).update({'status': 'processing'}, synchronize_session=False)
+        db.commit()
+        logger.info(f"✅ Delivering {len(claimed_ids)} command(s) to EA (status: processing): {', '.join(claimed_ids)}")
+
+    return commands_data
+
+
 @app_command.route('/api/get_commands', methods=['POST'])
 @require_api_key
 def get_commands(account, db):
     """
     Get pending commands for EA (Redis-based instant delivery)
-    OPTIMIZED: Always check PostgreSQL first and push to Redis for instant delivery
+
+    Body may contain "wait_ms" (long-poll): if no command is queued the request
+    blocks on the account's Redis queue (BLPOP) and returns as soon as one
+    arrives, or with an empty list after wait_ms. Commands created directly in
+    PostgreSQL are picked up every COMMAND_LONG_POLL_SLICE seconds while waiting.
+
+    Timing headers (milliseconds):
+        X-Server-Received-Ms     epoch time the request arrived
+        X-Server-Wait-Ms         time spent blocked waiting for a command
+        X-Server-Processing-Ms   total time in the handler
+        X-Command-Queue-Ms       age of the oldest delivered command in the queue
     """
+    received = time.time()
     try:
+        data = request.get_json(silent=True) or {}
+        try:
+            wait_ms = min(max(int(data.get('wait_ms') or 0), 0), COMMAND_LONG_POLL_MAX_MS)
+        except (TypeError, ValueError):
+            wait_ms = 0
+
         redis = get_redis()
+        account_id = account.id
 
-        # STEP 1: Check PostgreSQL for NEW pending commands and push to Redis
-        # Only process commands with status='pending' (not 'executing')
+        # STEP 1: PostgreSQL-only commands -> Redis queue
         # Commands created via /api/create_command are already in Redis with status='executing'
-        pending_commands = db.query(Command).filter_by(
-            account_id=account.id,
-            status='pending'
-        ).limit(50).all()
-
-        for cmd in pending_commands:
-            # Flatten the command structure for easier EA parsing
-            cmd_dict = {
-                'id': cmd.id,
-                'type': cmd.command_type
-            }
-            # Add payload fields directly (not nested)
-            if cmd.payload:
-                for key, value in cmd.payload.items():
-                    cmd_dict[key] = value
-
-            # Push to Redis queue for instant delivery
-            redis.push_command(account.id, cmd_dict)
-
-            # Mark as executing (retrieved from DB)
-            cmd.status = 'executing'
+        queue_pending_db_commands(db, redis, account_id)
+
+        # STEP 2: Pop up to COMMAND_BATCH_SIZE commands (block if long-polling)
+        popped = redis.pop_commands(account_id, COMMAND_BATCH_SIZE)
+        wait_start = time.time()
+        deadline = received + wait_ms / 1000.0
+
+        while not popped and time.time() < deadline:
+            db.commit()  # Don't sit idle in a transaction while blocked
+            popped = redis.pop_commands(
+                account_id, COMMAND_BATCH_SIZE,
+                timeout=min(COMMAND_LONG_POLL_SLICE, max(deadline - time.time(), 0.01))
+            )
+            if not popped and queue_pending_db_commands(db, redis, account_id):
+                popped = redis.pop_commands(account_id, COMMAND_BATCH_SIZE)
 
-        if pending_commands:
-            db.commit()
-            logger.info(f"Pushed {len(pending_commands)} pending commands to Redis queue for account {account.id}")
+        waited_ms = (time.time() - wait_start) * 1000 if wait_ms else 0.0
 
-        # STEP 2: Pop up to 10 commands from Redis queue for delivery
-        commands_data = []
-        processed_command_ids = set()  # Track which commands we're sending
-        
-        for _ in range(10):
-            cmd = redis.pop_command(account.id)
-            if not cmd:
-                break
-            
-            cmd_id = cmd.get('id')
-            
-            # ✅ CRITICAL: Mark command as 'processing' in database to prevent duplicate execution
-            if cmd_id:
-                try:
-                    db_command = db.query(Command).filter_by(id=cmd_id).first()
-                    if db_command:
-                        # Only send if not already completed or failed
-                        if db_command.status in ['pending', 'executing']:
-                            # Check if we already sent this command in this batch
-                            if cmd_id not in processed_command_ids:
-                                db_command.status = 'processing'
-                                db.commit()
-                                commands_data.append(cmd)
-                                processed_command_ids.add(cmd_id)
-                                logger.info(f"✅ Delivering command {cmd_id} to EA (status: processing)")
-                            else:
-                                logger.warning(f"⚠️ Skipping duplicate command {cmd_id} in same batch")
-                        else:
-                            logger.warning(f"⚠️ Skipping already {db_command.status} command {cmd_id}")
-                    else:
-                        # Command not in DB (shouldn't happen, but send it anyway)
-                        commands_data.append(cmd)
-                except Exception as e:
-                    logger.error(f"Error checking command {cmd_id} status: {e}")
-                    # Send it anyway to avoid blocking
-                    commands_data.append(cmd)
-            else:
-                # No ID (shouldn't happen)
-                commands_data.append(cmd)
+        # STEP 3: One status SELECT + one UPDATE for the batch
+        commands_data = claim_commands_for_delivery(db, popped) if popped else []
 
-        return jsonify({
+        response = jsonify({
             'status': 'success',
             'commands': commands_data
-        }), 200
+        })
+
+        now = time.time()
+        response.headers['X-Server-Received-Ms'] = str(int(received * 1000))
+        response.headers['X-Server-Wait-Ms'] = f"{waited_ms:.1f}"
+        response.headers['X-Server-Processing-Ms'] = f"{(now - received) * 1000:.1f}"
+        queued = [cmd['queued_at'] for cmd in commands_data if cmd.get('queued_at')]
+        if queued:
+            response.headers['X-Command-Queue-Ms'] = str(int(now * 1000) - min(queued))
+
+        return response, 200
 
     except Exception as e:
         logger.error(f"Get commands error: {str(e)}")
+        db.rollback()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -585,11 +669,15 @@ def command_response(account, db):
         if command:
             command.status = status
             command.response = response_data
+            command.ticket = response_ticket(response_data)
             command.executed_at = datetime.utcnow()
             db.commit()
 
             logger.info(f"Command {command_id} {status}: {response_data}")
 
+            if command.command_type == 'OPEN_TRADE':
+                publish_portfolio_event(account.id, 'command_response', command_id=command_id, status=status)
+
             # Publish to Redis Pub/Sub for instant WebSocket notification
             try:
                 redis = get_redis()
@@ -816,10 +904,10 @@ def manual_cleanup(account, db):
         from database import cleanup_old_data
 
         data = request.get_json() or {}
-        tick_days = data.get('tick_days', 30)
-        ohlc_days = data.get('ohlc_days', 730)
+        tick_days = data.get('tick_days', 7)
+        pattern_days = data.get('pattern_days', 30)
 
-        result = cleanup_old_data(db, tick_days=tick_days, ohlc_days=ohlc_days)
+        result = cleanup_old_data(db, tick_days=tick_days, pattern_days=pattern_days)
 
         logger.info(f"Manual cleanup by account {account.mt5_account_number}: {result}")
 
@@ -1007,7 +1095,7 @@ def auto_trade_status():
         'daily_loss_override': getattr(trader, 'daily_loss_override', False),  # ✅ NEW
         'max_daily_loss_percent': trader.max_daily_loss_percent,
         'max_total_drawdown_percent': trader.max_total_drawdown_percent,
-        'processed_signals': len(trader.processed_signal_hashes)
+        'processed_signals': trader.redis.count_processed_signals()
     }), 200
 
 
@@ -1820,36 +1908,25 @@ def receive_ticks(account, db):
     """
     Receive batched tick data from EA
 
-    IMPORTANT: Account from decorator may be detached - reload from db session
+    Hot path: the batch is parsed into a TickBlock (numpy columns) once and
+    handed as a whole to the tick stream (one XADD), quote book, candle
+    builder and spread tracker. Account values are written behind: Redis
+    immediately, PostgreSQL by the account state writer every few seconds.
     """
     try:
-        from models import Tick, Account
-
-        # CRITICAL FIX: Reload account from db session to prevent detachment errors
-        account_id = account.id  # Get ID before any session operations
-        account = db.query(Account).filter_by(id=account_id).first()
+        from models import Tick
 
-        if not account:
-            return jsonify({'status': 'error', 'message': 'Account not found'}), 404
+        account_id = account.id
 
         data = request.get_json()
-        ticks = data.get('ticks', [])
-
-        # CRITICAL DEBUG: Log what we're receiving
-        logger.info(f"🔍 /api/ticks called: ticks_count={len(ticks)}, has_positions={bool(data.get('positions'))}")
-
-        # DEBUG: Log first tick timestamp
-        if ticks and len(ticks) > 0:
-            first_tick = ticks[0]
-            tick_ts = first_tick.get('timestamp')
-            current_ts = datetime.utcnow().timestamp()
-            age = current_ts - tick_ts if tick_ts else 0
-            logger.info(f"🕒 TICK BATCH: {len(ticks)} ticks, first_ts={tick_ts}, age={age:.0f}s")
+        ticks = data.get('ticks', [])  # List of tick dicts, or a TickBlock for columnar bodies
         positions_from_ea = data.get('positions', [])  # Get MT5 profit values from EA
 
         if not ticks:
             return jsonify({'status': 'error', 'message': 'No ticks provided'}), 400
 
+        logger.debug(f"/api/ticks: {len(ticks)} ticks, {len(positions_from_ea)} positions")
+
         # Extract account data if provided
         balance = data.get('balance')
         equity = data.get('equity')
@@ -1871,138 +1948,66 @@ def receive_ticks(account, db):
                         'swap': pos.get('swap', 0.0)
                     }
 
-        # Store account_id before commit (to prevent session detachment issues)
-        account_id = account.id
+        # Account values: Redis now, PostgreSQL via background flush (no commit per batch)
+        get_account_state_writer().update(account_id, data)
 
-        # Update account data if provided
-        if balance is not None:
-            account.balance = balance
-        if equity is not None:
-            account.equity = equity
-        if margin is not None:
-            account.margin = margin
-        if free_margin is not None:
-            account.free_margin = free_margin
-        if profit_today is not None:
-            account.profit_today = profit_today
-        if profit_week is not None:
-            account.profit_week = profit_week
-        if profit_month is not None:
-            account.profit_month = profit_month
-        if profit_year is not None:
-            account.profit_year = profit_year
-
-        # Commit account updates to database immediately
-        db.commit()
+        # TIMEZONE OFFSET FIX: EA sends TimeCurrent() (broker local time) + TimeGMTOffset().
+        # MT5's TimeGMTOffset() is NEGATIVE for positive UTC zones, and this broker
+        # (GMT+2) reports GMT+1 -> UTC = timestamp + tz_offset - 3600 (applied vectorized)
+        block = ticks if isinstance(ticks, TickBlock) else TickBlock.from_ea_ticks(ticks)
 
-        # Cache account state in Redis for fast access
-        try:
-            redis = get_redis()
-            redis.cache_account_state(account_id, {
-                'balance': float(balance) if balance is not None else None,
-                'equity': float(equity) if equity is not None else None,
-                'margin': float(margin) if margin is not None else None,
-                'free_margin': float(free_margin) if free_margin is not None else None,
-                'profit_today': float(profit_today) if profit_today is not None else None,
-                'profit_week': float(profit_week) if profit_week is not None else None,
-                'profit_month': float(profit_month) if profit_month is not None else None,
-                'profit_year': float(profit_year) if profit_year is not None else None,
-                'last_update': datetime.utcnow().isoformat()
-            }, ttl=60)  # 60 seconds TTL
-        except Exception as e:
-            logger.error(f"Failed to cache account state in Redis: {e}")
+        if len(block):
+            logger.debug(
+                f"Tick batch: {len(block)} ticks, {len(block.symbols)} symbols, "
+                f"first UTC {datetime.utcfromtimestamp(float(block.timestamp[0]))}"
+            )
 
-        # Buffer ticks in Redis instead of immediate PostgreSQL write
-        latest_prices = {}  # Track latest price per symbol for WebSocket broadcast
+        # Latest price per symbol for WebSocket broadcast
+        latest_prices = {}
+        for symbol, i in block.latest_per_symbol().items():
+            spread = float(block.spread[i])
+            latest_prices[symbol] = {
+                'symbol': symbol,
+                'bid': float(block.bid[i]),
+                'ask': float(block.ask[i]),
+                'spread': spread if spread else None,
+                'timestamp': float(block.timestamp[i])
+            }
 
+        # Buffer the whole batch in the Redis tick stream instead of writing to PostgreSQL
         try:
-            redis = get_redis()
-
-            # Prepare ticks for buffering
-            buffered_ticks = []
-            for tick_data in ticks:
-                # Calculate spread if not provided
-                bid = tick_data.get('bid', 0)
-                ask = tick_data.get('ask', 0)
-                spread = tick_data.get('spread', ask - bid if ask and bid else None)
-
-                # TIMEZONE OFFSET FIX: Convert EA's local time to UTC using broker's timezone offset
-                # EA sends: TimeCurrent() (broker local time) + TimeGMTOffset() (seconds from GMT)
-                # NOTE: MT5's TimeGMTOffset() returns NEGATIVE values for positive UTC offsets!
-                #   CET (UTC+1): TimeGMTOffset() = -3600
-                #   CEST (UTC+2): TimeGMTOffset() = -7200
-                # We calculate: UTC = local_time + tz_offset (because MT5 uses negative convention)
-                ea_local_timestamp = tick_data.get('timestamp')
-                tz_offset = tick_data.get('tz_offset', 0)  # Offset in seconds (NEGATIVE for positive UTC zones)
-
-                # BROKER-SPECIFIC CORRECTION: This broker uses GMT+2 but TimeGMTOffset() reports GMT+1
-                # Apply -3600 correction to account for broker's incorrect offset reporting
-                tz_offset_corrected = tz_offset - 3600  # Subtract 1 hour (broker is GMT+2, not GMT+1)
-
-                # Convert to UTC by adding the corrected offset
-                tick_timestamp = ea_local_timestamp + tz_offset_corrected
-
-                # ALWAYS log timezone conversion for first tick of each batch
-                if len(buffered_ticks) == 0:
-                    logger.info(
-                        f"🕒 TIMEZONE CONVERSION: {tick_data.get('symbol')} | "
-                        f"EA Local: {ea_local_timestamp} ({datetime.fromtimestamp(ea_local_timestamp)}) | "
-                        f"TZ Offset: {tz_offset}s ({tz_offset/3600:.1f}h) → Corrected: {tz_offset_corrected}s ({tz_offset_corrected/3600:.1f}h) | "
-                        f"UTC: {tick_timestamp} ({datetime.fromtimestamp(tick_timestamp)})"
-                    )
-
-                # Prepare tick data for buffering (Ticks are global - no account_id)
-                tick_buffer_data = {
-                    'symbol': tick_data.get('symbol'),
-                    'bid': bid,
-                    'ask': ask,
-                    'spread': spread,
-                    'volume': tick_data.get('volume', 0),
-                    'timestamp': tick_timestamp
-                }
-                buffered_ticks.append(tick_buffer_data)
-
-                # Keep only the latest price per symbol for WebSocket
-                symbol = tick_data.get('symbol')
-                latest_prices[symbol] = {
-                    'symbol': symbol,
-                    'bid': float(bid),
-                    'ask': float(ask),
-                    'spread': float(spread) if spread else None,
-                    'timestamp': tick_timestamp
-                }
-
-            # Buffer all ticks in Redis at once (fast!)
-            redis.buffer_ticks_batch(account_id, buffered_ticks)
-
-            logger.debug(f"Buffered {len(buffered_ticks)} ticks in Redis for account {account_id}")
-
+            get_redis().buffer_tick_block(block)
         except Exception as e:
             logger.error(f"Failed to buffer ticks in Redis: {e}")
             # Fallback: Write directly to PostgreSQL (Ticks are global - no account_id)
-            tick_objects = []
-            for tick_data in ticks:
-                # FIX: MT5 EA sends local time (GMT+3), convert to UTC
-                tick_timestamp = tick_data.get('timestamp')
-                if tick_timestamp:
-                    # Subtract 3 hours to convert from GMT+3 to UTC
-                    tick_dt = datetime.fromtimestamp(tick_timestamp - (3 * 3600))
-                else:
-                    tick_dt = datetime.utcnow()
-                
-                tick = Tick(
-                    symbol=tick_data.get('symbol'),
-                    bid=tick_data.get('bid'),
-                    ask=tick_data.get('ask'),
-                    volume=tick_data.get('volume', 0),
-                    timestamp=tick_dt
+            tick_objects = [
+                Tick(
+                    symbol=tick['symbol'],
+                    bid=tick['bid'],
+                    ask=tick['ask'],
+                    spread=tick['spread'],
+                    volume=tick['volume'],
+                    timestamp=datetime.fromtimestamp(tick['timestamp']),  # Same convention as TickBatchWriter
+                    tradeable=tick['tradeable']
                 )
-                tick_objects.append(tick)
-
+                for tick in block.to_dicts()
+            ]
             db.bulk_save_objects(tick_objects)
             db.commit()
             logger.warning(f"Redis buffer failed, wrote {len(tick_objects)} ticks directly to PostgreSQL")
 
+        try:
+            # Latest quote per symbol for workers (no Postgres reads for current prices)
+            get_quote_book().update_block(block)
+
+            # Update open M1...W1 bars in memory (closed bars are flushed in the background)
+            get_candle_builder().on_block(block)
+
+            # Streaming spread statistics (baselines, 24h window, recent average)
+            get_spread_tracker().on_block(block)
+        except Exception as e:
+            logger.error(f"Failed to update quotes/candles/spread statistics: {e}")
+
         # Broadcast latest prices via WebSocket
         for symbol, price_data in latest_prices.items():
             socketio.emit('price_update', price_data)
@@ -2029,11 +2034,10 @@ def receive_ticks(account, db):
         # Update shadow trades with current prices
         try:
             from shadow_trading_engine import update_shadow_trades_for_tick
-            for tick_data in ticks:
-                symbol = tick_data.get('symbol')
-                bid = tick_data.get('bid')
-                if symbol and bid:
-                    update_shadow_trades_for_tick(symbol, bid)
+            # Per symbol only the batch low/high bid (in time order) can hit SL/TP
+            for symbol, indexes in block.extremes_per_symbol('bid').items():
+                for i in indexes:
+                    update_shadow_trades_for_tick(symbol, float(block.bid[i]))
         except Exception as e:
             logger.error(f"Error updating shadow trades: {e}")
 
@@ -2042,9 +2046,6 @@ def receive_ticks(account, db):
             from models import Trade, Tick as TickModel
             from trade_monitor import get_trade_monitor
 
-            # Get symbols from received ticks
-            tick_symbols = set(tick_data.get('symbol') for tick_data in ticks)
-
             # Check ALL open trades (not just from tick_symbols) to ensure all positions update in real-time
             # GLOBAL query - trades are shared across accounts for ML learning
             open_trades = db.query(Trade).filter(
@@ -2193,8 +2194,8 @@ def receive_historical_ohlc(account, db):
     Receive historical OHLC data from EA
     """
     try:
-        from models import OHLCData
         from datetime import datetime, timezone
+        from ohlc_writer import bulk_insert_ohlc, candle_rows
 
         data = request.get_json()
         symbol = data.get('symbol')
@@ -2208,41 +2209,20 @@ def receive_historical_ohlc(account, db):
 
         # Process candles - MT5 sends timestamps in broker timezone (usually UTC or UTC+2/+3)
         # We store everything in UTC
-        imported_count = 0
-        skipped_count = 0
-
-        for candle in candles:
-            # Convert MT5 timestamp (seconds since 1970-01-01) to datetime
-            # MT5 timestamps are in broker timezone, treat as UTC for consistency
-            timestamp = datetime.fromtimestamp(candle['timestamp'], tz=timezone.utc).replace(tzinfo=None)
-
-            # Check if candle already exists (GLOBAL - no account_id)
-            existing = db.query(OHLCData).filter_by(
-                symbol=symbol,
-                timeframe=timeframe,
-                timestamp=timestamp
-            ).first()
-
-            if existing:
-                skipped_count += 1
-                continue
-
-            # Create new OHLC entry (GLOBAL - no account_id)
-            ohlc = OHLCData(
-                symbol=symbol,
-                timeframe=timeframe,
-                timestamp=timestamp,
-                open=float(candle['open']),
-                high=float(candle['high']),
-                low=float(candle['low']),
-                close=float(candle['close']),
-                volume=int(candle.get('volume', 0))
-            )
-            db.add(ohlc)
-            imported_count += 1
+        # Convert MT5 timestamp (seconds since 1970-01-01) to datetime
+        # MT5 timestamps are in broker timezone, treat as UTC for consistency
+        timestamps = [
+            datetime.fromtimestamp(candle['timestamp'], tz=timezone.utc).replace(tzinfo=None)
+            for candle in candles
+        ]
 
+        # Multi-row INSERT ... ON CONFLICT DO NOTHING (GLOBAL - no account_id)
+        result = bulk_insert_ohlc(db, candle_rows(symbol, timeframe, candles, timestamps))
         db.commit()
 
+        imported_count = result['imported']
+        skipped_count = result['skipped']
+
         logger.info(f"Historical OHLC import for {symbol} {timeframe}: {imported_count} imported, {skipped_count} skipped (duplicates)")
 
         return jsonify({
@@ -2452,375 +2432,55 @@ def request_historical_data():
 # PORT 9902 - TRADE UPDATES
 # ============================================================================
 
+def publish_portfolio_event(account_id, event, **data):
+    """Tell AutoTrader's PortfolioState that positions/closed trades changed"""
+    try:
+        get_redis().publish_portfolio_event(account_id, event, data)
+    except Exception as e:
+        logger.warning(f"Failed to publish portfolio event '{event}': {e}")
+
+
+def publish_portfolio_events(account_id, events):
+    """Publish trade_opened/trade_closed events of one sync (single version bump)"""
+    try:
+        get_redis().publish_portfolio_events(account_id, events)
+    except Exception as e:
+        logger.warning(f"Failed to publish {len(events)} portfolio events: {e}")
+
+
 @app_trades.route('/api/trades/sync', methods=['POST'])
 @require_api_key
 def sync_trades(account, db):
     """
     Sync all trades from MT5 EA (open positions and closed trades)
     Called periodically by EA to keep server in sync with MT5 terminal
+
+    Set-based: a fixed number of queries per sync (see trade_sync.reconcile_trades)
     """
     try:
-        from models import Trade
+        from trade_sync import reconcile_trades
         data = request.get_json()
         trades = data.get('trades', [])
 
-        synced_count = 0
-        updated_count = 0
-
-        for trade_data in trades:
-            ticket = trade_data.get('ticket')
-            if not ticket:
-                continue
-
-            # Check if trade exists - GLOBAL (not filtered by account_id for ML learning across all accounts)
-            existing_trade = db.query(Trade).filter_by(
-                ticket=ticket
-            ).first()
-
-            if existing_trade:
-                # Update existing trade
-                old_status = existing_trade.status
-                new_status = trade_data.get('status', 'open')
-                existing_trade.status = new_status
-                existing_trade.close_price = trade_data.get('close_price')
-                existing_trade.close_time = datetime.fromisoformat(trade_data['close_time']) if trade_data.get('close_time') else None
-                existing_trade.profit = trade_data.get('profit')
-                existing_trade.commission = trade_data.get('commission')
-                existing_trade.swap = trade_data.get('swap')
-
-                # ✅ FIX: Preserve SL/TP on close - don't overwrite with 0!
-                # When trade closes, EA sends sl=0, tp=0 (position doesn't exist anymore)
-                # But we need to keep the last known SL/TP for analysis
-                incoming_sl = trade_data.get('sl')
-                incoming_tp = trade_data.get('tp')
-
-                # ✅ CRITICAL FIX 2025-11-05: Set initial_sl/initial_tp from Command if not set
-                # This fixes trades that were created before this fix was implemented
-                if (existing_trade.initial_sl is None or existing_trade.initial_tp is None or
-                    existing_trade.initial_sl == 0 or existing_trade.initial_tp == 0):
-                    # Try to get original values from the Command that opened this trade
-                    from models import Command
-                    original_command = db.query(Command).filter(
-                        Command.account_id == account.id,
-                        Command.command_type == 'OPEN_TRADE',
-                        Command.status == 'completed',
-                        Command.response['ticket'].astext == str(ticket)
-                    ).order_by(Command.created_at.desc()).first()
-
-                    if original_command:
-                        cmd_sl = original_command.response.get('sl') if original_command.response else None
-                        cmd_tp = original_command.response.get('tp') if original_command.response else None
-
-                        # Fallback to payload if response doesn't have it
-                        if not cmd_sl and original_command.payload:
-                            cmd_sl = original_command.payload.get('sl')
-                        if not cmd_tp and original_command.payload:
-                            cmd_tp = original_command.payload.get('tp')
-
-                        if cmd_sl and (existing_trade.initial_sl is None or existing_trade.initial_sl == 0):
-                            existing_trade.initial_sl = cmd_sl
-                            logger.info(f"🔧 Fixed initial_sl for trade #{ticket}: {cmd_sl}")
-
-                        if cmd_tp and (existing_trade.initial_tp is None or existing_trade.initial_tp == 0):
-                            existing_trade.initial_tp = cmd_tp
-                            logger.info(f"🔧 Fixed initial_tp for trade #{ticket}: {cmd_tp}")
-
-                # Only update SL/TP if trade is still OPEN
-                # When closing, preserve the last known values
-                if new_status == 'open':
-                    # Trade is open - update SL/TP from EA heartbeat
-                    if incoming_sl is not None:
-                        existing_trade.sl = incoming_sl
-                    if incoming_tp is not None:
-                        existing_trade.tp = incoming_tp
-                else:
-                    # Trade is closing/closed - PRESERVE existing SL/TP, don't overwrite with 0
-                    # Keep existing_trade.sl and existing_trade.tp unchanged
-                    logger.debug(
-                        f"Trade {existing_trade.ticket} closing - preserving SL={existing_trade.sl}, "
-                        f"TP={existing_trade.tp} (EA sent: sl={incoming_sl}, tp={incoming_tp})"
-                    )
-
-                existing_trade.updated_at = datetime.utcnow()
-                
-                # ✅ PHASE 7: Exit Enhancement - Calculate metrics when trade closes
-                if old_status == 'open' and new_status == 'closed' and existing_trade.close_price:
-                    from models import Tick
-                    from market_context_helper import (
-                        calculate_pips, 
-                        calculate_risk_reward, 
-                        get_current_trading_session
-                    )
-                    
-                    # Calculate pips_captured
-                    existing_trade.pips_captured = calculate_pips(
-                        existing_trade.open_price,
-                        existing_trade.close_price,
-                        existing_trade.direction,
-                        existing_trade.symbol
-                    )
-                    
-                    # Calculate risk_reward_realized (if initial_sl exists)
-                    if existing_trade.initial_sl:
-                        existing_trade.risk_reward_realized = calculate_risk_reward(
-                            existing_trade.open_price,
-                            existing_trade.close_price,
-                            existing_trade.initial_sl,
-                            existing_trade.direction
-                        )
-                    
-                    # Calculate hold_duration_minutes
-                    if existing_trade.open_time and existing_trade.close_time:
-                        duration = (existing_trade.close_time - existing_trade.open_time)
-                        existing_trade.hold_duration_minutes = int(duration.total_seconds() / 60)
-                    
-                    # Capture exit price action snapshot
-                    current_tick = db.query(Tick).filter_by(
-                        symbol=existing_trade.symbol
-                    ).order_by(Tick.timestamp.desc()).first()
-                    
-                    if current_tick:
-                        existing_trade.exit_bid = float(current_tick.bid)
-                        existing_trade.exit_ask = float(current_tick.ask)
-                        existing_trade.exit_spread = float(current_tick.spread) if current_tick.spread else None
-                    
-                    # Get exit session
-                    existing_trade.session = get_current_trading_session()
-                    
-                    logger.info(
-                        f"📊 Exit Metrics for #{ticket}: "
-                        f"Pips={existing_trade.pips_captured:.2f if existing_trade.pips_captured else 0:.2f}, "
-                        f"R:R={existing_trade.risk_reward_realized:.2f if existing_trade.risk_reward_realized else 0:.2f}, "
-                        f"Duration={existing_trade.hold_duration_minutes}min, "
-                        f"Session={existing_trade.session}"
-                    )
-                
-                updated_count += 1
-                logger.info(f"🔄 Trade sync update: {existing_trade.symbol} #{ticket} profit={existing_trade.profit} SL={existing_trade.sl} TP={existing_trade.tp}")
-            else:
-                # Create new trade record
-                # ✅ FIX: Find command_id by matching ticket in command responses
-                entry_reason = None
-                command_id = trade_data.get('command_id')  # MT5 might send it
-                signal_id_from_command = None
-                source = 'MT5'  # Default to MT5
-                
-                # If no command_id from MT5, try to find it via ticket match
-                if not command_id:
-                    from models import Command, TradingSignal
-                    # ✅ IMPROVED: Direct JSONB query for ticket (much faster & more reliable)
-                    matching_command = db.query(Command).filter(
-                        Command.account_id == account.id,
-                        Command.command_type == 'OPEN_TRADE',
-                        Command.status == 'completed',
-                        Command.response['ticket'].astext == str(ticket)  # Direct JSONB query
-                    ).order_by(Command.created_at.desc()).first()
-
-                    if matching_command:
-                        command_id = matching_command.id
-                        signal_id_from_command = matching_command.payload.get('signal_id') if matching_command.payload else None
-                        source = 'autotrade' if signal_id_from_command else 'ea_command'
-                        logger.info(f"🔗 Linked trade #{ticket} to command {matching_command.id[:12]}... (signal #{signal_id_from_command})")
-                    else:
-                        # ✅ Fallback: Check if trade was opened before server started tracking it
-                        logger.warning(f"⚠️ No command found for trade #{ticket} - marking as MT5 manual trade")
-                        matching_command = None
-
-                # ✅ CRITICAL FIX 2025-11-05: Extract initial SL/TP from Command response
-                # This ensures we always have the ORIGINAL SL/TP values for strategy evaluation
-                # even if trailing stop has modified them to 0 or changed them
-                initial_sl_from_command = None
-                initial_tp_from_command = None
-
-                if matching_command and matching_command.response:
-                    # EA sends back actual SL/TP values in response: {"sl": 1.23, "tp": 1.45, "ticket": 123}
-                    initial_sl_from_command = matching_command.response.get('sl')
-                    initial_tp_from_command = matching_command.response.get('tp')
-
-                    if initial_sl_from_command or initial_tp_from_command:
-                        logger.info(f"📊 Retrieved initial SL/TP from command response: SL={initial_sl_from_command}, TP={initial_tp_from_command}")
-
-                # Fallback: If no command response, use payload values (what we SENT to EA)
-                if not initial_sl_from_command and matching_command and matching_command.payload:
-                    initial_sl_from_command = matching_command.payload.get('sl')
-                    initial_tp_from_command = matching_command.payload.get('tp')
-
-                    if initial_sl_from_command or initial_tp_from_command:
-                        logger.info(f"📊 Retrieved initial SL/TP from command payload: SL={initial_sl_from_command}, TP={initial_tp_from_command}")
-
-                # Try to find linked signal to generate entry_reason and extract metadata
-                timeframe_from_signal = None
-                entry_confidence_from_signal = None  # ✅ NEW: Extract confidence
-                if signal_id_from_command:
-                    from models import TradingSignal
-                    signal = db.query(TradingSignal).filter_by(id=signal_id_from_command).first()
-                    if signal:
-                        # Extract timeframe from signal
-                        timeframe_from_signal = signal.timeframe
-
-                        # ✅ NEW: Extract confidence as numeric value (already in percentage format!)
-                        if signal.confidence:
-                            entry_confidence_from_signal = float(signal.confidence)  # Already percentage (60.0 = 60%)
-
-                        # Build entry reason from signal data
-                        patterns = []
-                        if signal.pattern_data:
-                            patterns = [p.get('name', 'Pattern') for p in signal.pattern_data if isinstance(signal.pattern_data, list)]
-                            patterns = patterns[:2]  # Limit to 2 patterns
-
-                        reason_parts = []
-                        if patterns:
-                            reason_parts.append(f"Patterns: {', '.join(patterns)}")
-                        if signal.confidence:
-                            reason_parts.append(f"{float(signal.confidence)*100:.0f}% confidence")
-                        if signal.timeframe:
-                            reason_parts.append(f"{signal.timeframe} timeframe")
-
-                        entry_reason = " | ".join(reason_parts) if reason_parts else "Auto-traded signal"
-
-                # Fallback entry reasons based on source
-                if not entry_reason:
-                    if source == 'autotrade':
-                        entry_reason = "Auto-trade (signal details unavailable)"
-                    elif source == 'MT5':
-                        entry_reason = "Manual trade (MT5)"
-                    else:
-                        entry_reason = f"Trade from {source}"
-
-                # ✅ COMPREHENSIVE TRACKING: Get current market prices for entry snapshot
-                from models import Tick
-                from market_context_helper import get_current_trading_session
-                
-                symbol_for_tick = trade_data.get('symbol')
-                current_tick = None
-                entry_bid = None
-                entry_ask = None
-                entry_spread = None
-                
-                if symbol_for_tick:
-                    # Get latest tick for this symbol (ticks are global - no account_id)
-                    current_tick = db.query(Tick).filter_by(
-                        symbol=symbol_for_tick
-                    ).order_by(Tick.timestamp.desc()).first()
-                    
-                    if current_tick:
-                        entry_bid = float(current_tick.bid)
-                        entry_ask = float(current_tick.ask)
-                        entry_spread = float(current_tick.spread) if current_tick.spread else (entry_ask - entry_bid if entry_ask and entry_bid else None)
-                
-                # ✅ COMPREHENSIVE TRACKING: Get current session
-                session = get_current_trading_session()
-                
-                new_trade = Trade(
-                    account_id=account.id,
-                    ticket=ticket,
-                    symbol=trade_data.get('symbol'),
-                    type=trade_data.get('type', 'MARKET'),
-                    direction=trade_data.get('direction'),
-                    volume=trade_data.get('volume'),
-                    open_price=trade_data.get('open_price'),
-                    open_time=datetime.fromisoformat(trade_data['open_time']) if trade_data.get('open_time') else datetime.utcnow(),
-                    close_price=trade_data.get('close_price'),
-                    close_time=datetime.fromisoformat(trade_data['close_time']) if trade_data.get('close_time') else None,
-                    sl=trade_data.get('sl'),  # Current SL (may be modified by trailing stop)
-                    tp=trade_data.get('tp'),  # Current TP (may be modified)
-                    original_tp=initial_tp_from_command if initial_tp_from_command is not None else trade_data.get('tp'),  # ORIGINAL TP for extension tracking
-                    tp_extended_count=0,  # Initialize extension counter
-
-                    # ✅ COMPREHENSIVE TRACKING - Initial TP/SL Snapshot
-                    # Use values from Command response/payload (ORIGINAL values before any modifications)
-                    # Fallback to current position values if command not found
-                    initial_tp=initial_tp_from_command if initial_tp_from_command is not None else trade_data.get('tp'),
-                    initial_sl=initial_sl_from_command if initial_sl_from_command is not None else trade_data.get('sl'),
-                    
-                    # ✅ COMPREHENSIVE TRACKING - Entry Price Action
-                    entry_bid=entry_bid,
-                    entry_ask=entry_ask,
-                    entry_spread=entry_spread,
-                    
-                    # ✅ COMPREHENSIVE TRACKING - Initialize MFE/MAE
-                    max_favorable_excursion=0,
-                    max_adverse_excursion=0,
-                    trailing_stop_active=False,
-                    trailing_stop_moves=0,
-                    
-                    # ✅ COMPREHENSIVE TRACKING - Market Context
-                    session=session,
-                    
-                    profit=trade_data.get('profit'),
-                    commission=trade_data.get('commission'),
-                    swap=trade_data.get('swap'),
-                    source=source,  # Now correctly set based on command lookup
-                    command_id=command_id,
-                    signal_id=signal_id_from_command,  # Store signal_id!
-                    timeframe=timeframe_from_signal,  # Store timeframe from signal!
-                    entry_confidence=entry_confidence_from_signal,  # Store confidence!
-                    entry_reason=entry_reason,
-                    response_data=trade_data.get('response_data'),
-                    status=trade_data.get('status', 'open'),
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                db.add(new_trade)
-                synced_count += 1
-
-        # ✅ CRITICAL FIX: Close trades that are open in DB but not in MT5's list (MT5 is source of truth!)
-        closed_count = 0
-        if trades:  # Only reconcile if MT5 sent a trade list
-            synced_tickets = set(t.get('ticket') for t in trades if t.get('ticket'))
-            
-            # Find all trades marked as 'open' in DB for this account
-            db_open_trades = db.query(Trade).filter_by(
-                account_id=account.id,
-                status='open'
-            ).all()
-            
-            for db_trade in db_open_trades:
-                # If trade is open in DB but NOT in MT5's list, it must have been closed
-                if db_trade.ticket not in synced_tickets:
-                    db_trade.status = 'closed'
-                    db_trade.close_time = datetime.utcnow()
-                    db_trade.close_reason = 'SYNC_RECONCILIATION'
-                    # Keep the last known profit/swap/commission
-                    db_trade.updated_at = datetime.utcnow()
-                    
-                    # ✅ PHASE 7: Calculate exit metrics for reconciled trades
-                    if db_trade.close_price and db_trade.open_price:
-                        from market_context_helper import calculate_pips, calculate_risk_reward, get_current_trading_session
-                        
-                        db_trade.pips_captured = calculate_pips(
-                            db_trade.open_price,
-                            db_trade.close_price,
-                            db_trade.direction,
-                            db_trade.symbol
-                        )
-                        
-                        if db_trade.initial_sl:
-                            db_trade.risk_reward_realized = calculate_risk_reward(
-                                db_trade.open_price,
-                                db_trade.close_price,
-                                db_trade.initial_sl,
-                                db_trade.direction
-                            )
-                        
-                        if db_trade.open_time:
-                            duration = (db_trade.close_time - db_trade.open_time)
-                            db_trade.hold_duration_minutes = int(duration.total_seconds() / 60)
-                        
-                        db_trade.session = get_current_trading_session()
-                    
-                    closed_count += 1
-                    logger.warning(f"🔄 Reconciliation: Closed trade #{db_trade.ticket} (not in MT5 position list)")
-
+        result = reconcile_trades(db, account, trades)
         db.commit()
 
-        logger.info(f"Trade sync for account {account.mt5_account_number}: {synced_count} new, {updated_count} updated, {closed_count} reconciled/closed")
+        logger.info(
+            f"Trade sync for account {account.mt5_account_number}: {result['synced']} new, "
+            f"{result['updated']} updated, {result['reconciled']} reconciled/closed"
+        )
+
+        # Profit-only updates don't change what the risk gate sees
+        if result['events'] or result['status_changes']:
+            publish_portfolio_events(account.id, result['events'] or [
+                {'event': 'trades_synced', 'status_changes': result['status_changes']}
+            ])
 
         return jsonify({
             'status': 'success',
-            'synced': synced_count,
-            'updated': updated_count,
-            'reconciled': closed_count
+            'synced': result['synced'],
+            'updated': result['updated'],
+            'reconciled': result['reconciled']
         }), 200
 
     except Exception as e:
@@ -2872,6 +2532,7 @@ def update_trade(account, db):
             trade.updated_at = datetime.utcnow()
 
             db.commit()
+            publish_portfolio_event(account.id, 'trade_updated', ticket=ticket, status=trade.status)
             logger.info(f"🔄 Trade #{ticket} updated from EA: profit={trade.profit}, swap={trade.swap}, commission={trade.commission}, total={float(trade.profit or 0) + float(trade.swap or 0) + float(trade.commission or 0):.2f}")
 
             # Send Telegram notification for closed trades
@@ -2902,7 +2563,7 @@ def update_trade(account, db):
                             'close_reason': trade.close_reason or 'Unknown',
                             'duration': duration
                         },
-                        account_balance=float(account.balance) if account.balance else 0.0
+                        account_balance=get_account_snapshot(account.id, db, fields=('balance',)).get('balance') or 0.0
                     )
                     logger.info(f"📱 Telegram notification sent for closed trade #{ticket}")
                 except Exception as tg_error:
@@ -3025,7 +2686,7 @@ def update_trade(account, db):
                     Command.account_id == account.id,
                     Command.command_type == 'OPEN_TRADE',
                     Command.status.in_(['completed', 'processing']),  # ✅ FIXED: Also check processing commands
-                    Command.response['ticket'].astext == str(ticket)
+                    Command.ticket == ticket
                 ).order_by(Command.created_at.desc()).first()
 
                 # ✅ NEW: If no match by ticket, try to match by symbol/volume/time window
@@ -3046,7 +2707,7 @@ def update_trade(account, db):
                             Command.payload['symbol'].astext == trade_symbol,
                             Command.payload['volume'].astext == str(float(trade_volume)),
                             Command.payload['order_type'].astext == trade_direction,
-                            Command.response['ticket'].astext.is_(None)  # No ticket assigned yet
+                            Command.ticket.is_(None)  # No ticket assigned yet
                         ).order_by(Command.created_at.desc()).first()
                         
                         if matching_command:
@@ -3153,6 +2814,7 @@ def update_trade(account, db):
             )
             db.add(new_trade)
             db.commit()
+            publish_portfolio_event(account.id, 'trade_opened', ticket=ticket, symbol=new_trade.symbol)
             logger.info(f"✅ Trade #{ticket} created from MT5: source={source}, signal_id={signal_id}, timeframe={timeframe}")
 
         # EMIT WEBSOCKET UPDATE: Send position update after trade change
@@ -3256,31 +2918,25 @@ def log_message(account, db):
 # ============================================================================
 
 def cleanup_ticks_job():
-    """Background job to aggregate ticks to OHLC and cleanup old ticks"""
+    """Background job to cleanup old ticks (candles are built on ingest by the candle builder)"""
     import time
     from ohlc_aggregator import cleanup_ticks_with_aggregation
-    from models import Account
+    from partition_manager import is_partitioned
 
     while True:
         try:
             time.sleep(60)  # Run every minute
             db = ScopedSession()
             try:
-                # Get all accounts
-                accounts = db.query(Account).all()
-
-                for account in accounts:
-                    # Aggregate and cleanup for each account
-                    # Keep ticks for 5 minutes (sufficient for M5/M15 aggregation)
-                    aggregated, deleted = cleanup_ticks_with_aggregation(
-                        db, account.id, minutes=5
-                    )
+                # Partitioned ticks are expired by dropping daily partitions (retention_cleanup_job)
+                if is_partitioned(db, 'ticks'):
+                    continue
 
-                    if aggregated > 0 or deleted > 0:
-                        logger.info(
-                            f"Account {account.mt5_account_number}: "
-                            f"Aggregated {aggregated} M1 candles, deleted {deleted} ticks"
-                        )
+                # Ticks are global - one cleanup for all accounts
+                _, deleted = cleanup_ticks_with_aggregation(db, minutes=5, aggregate=False)
+
+                if deleted > 0:
+                    logger.info(f"Deleted {deleted} old ticks (candle builder: {get_candle_builder().get_stats()['bars_written']} bars written)")
             finally:
                 db.close()
         except Exception as e:
@@ -3311,29 +2967,37 @@ def ohlc_cleanup_job():
 
 
 def retention_cleanup_job():
-    """Background job for long-term data retention cleanup (daily)"""
+    """Background job for partition maintenance and long-term data retention cleanup (daily)"""
     import time
     from database import cleanup_old_data
+    from partition_manager import maintain_partitions
+    from tick_archive import get_tick_archive
 
     while True:
         try:
-            # Run once per day (86400 seconds)
-            time.sleep(86400)
             db = ScopedSession()
             try:
-                result = cleanup_old_data(
-                    db,
-                    tick_days=30,      # Keep ticks for 30 days
-                    ohlc_days=730      # Keep OHLC for 2 years
-                )
+                # Copy closed tick days to the archive before any tick partition is dropped
+                get_tick_archive().archive_closed_days(db)
+
+                result = cleanup_old_data(db, tick_days=7)
                 logger.info(
-                    f"Retention cleanup: {result['deleted_ticks']} ticks (>30d), "
-                    f"{result['deleted_ohlc']} OHLC records (>2y) deleted"
+                    f"Retention cleanup: {result['deleted_ticks']} ticks (>7d), "
+                    f"{result['deleted_ohlc']} OHLC records deleted, "
+                    f"{len(result['dropped_partitions'])} partitions dropped"
                 )
+
+                # Create upcoming partitions, apply retention of the remaining tables
+                maintain_partitions(db)
             finally:
                 db.close()
+
+            # Run once per day (86400 seconds)
+            time.sleep(86400)
         except Exception as e:
             logger.error(f"Retention cleanup error: {e}")
+            # Retry in 1 hour on error
+            time.sleep(3600)
 
 
 # ============================================================================
@@ -3402,21 +3066,26 @@ def dashboard_status():
                 cast(Trade.close_time, Date) >= year_start_date
             ).scalar() or 0.0
 
+            # Live values: Redis snapshot (EA), accounts row as fallback
+            live = get_account_snapshot(
+                account.id, db, fields=('balance', 'equity', 'margin', 'free_margin', 'last_heartbeat')
+            )
+
             return jsonify({
                 'status': 'success',
                 'account': {
                     'id': account.id,  # Add account ID for monitoring endpoint
                     'number': account.mt5_account_number,
                     'broker': account.broker,
-                    'balance': float(account.balance) if account.balance else 0.0,
-                    'equity': float(account.equity) if account.equity else 0.0,
-                    'margin': float(account.margin) if account.margin else 0.0,
-                    'free_margin': float(account.free_margin) if account.free_margin else 0.0,
+                    'balance': live.get('balance') or 0.0,
+                    'equity': live.get('equity') or 0.0,
+                    'margin': live.get('margin') or 0.0,
+                    'free_margin': live.get('free_margin') or 0.0,
                     'profit_today': float(profit_today),
                     'profit_week': float(profit_week),
                     'profit_month': float(profit_month),
                     'profit_year': float(profit_year),
-                    'last_heartbeat': account.last_heartbeat.isoformat() if account.last_heartbeat else None
+                    'last_heartbeat': live.get('last_heartbeat')
                 }
             }), 200
 
@@ -3539,17 +3208,17 @@ def dashboard_symbols():
                     'market_hours': market_hours_str
                 })
 
-            # Add account data with profit values
+            # Add account data with profit values (Redis snapshot, accounts row as fallback)
+            live = get_account_snapshot(account.id, db, fields=(
+                'balance', 'equity', 'margin', 'free_margin',
+                'profit_today', 'profit_week', 'profit_month', 'profit_year'
+            ))
             account_data = {
                 'number': account.mt5_account_number,
-                'balance': float(account.balance) if account.balance else 0.0,
-                'equity': float(account.equity) if account.equity else 0.0,
-                'margin': float(account.margin) if account.margin else 0.0,
-                'free_margin': float(account.free_margin) if account.free_margin else 0.0,
-                'profit_today': float(account.profit_today) if account.profit_today else 0.0,
-                'profit_week': float(account.profit_week) if account.profit_week else 0.0,
-                'profit_month': float(account.profit_month) if account.profit_month else 0.0,
-                'profit_year': float(account.profit_year) if account.profit_year else 0.0
+                **{key: live.get(key) or 0.0 for key in (
+                    'balance', 'equity', 'margin', 'free_margin',
+                    'profit_today', 'profit_week', 'profit_month', 'profit_year'
+                )}
             }
 
             return jsonify({
@@ -3990,9 +3659,10 @@ def tick_writer_stats():
         # Add Redis buffer stats
         try:
             redis = get_redis()
-            # Get buffer sizes for all accounts (simplified - just check account 1)
-            buffer_size = redis.get_total_buffer_size(1)
-            stats['redis_buffer_size'] = buffer_size
+            # Ticks not yet written: pending (unacked) + not yet delivered
+            stream_stats = redis.get_tick_stream_stats()
+            stats.update(stream_stats)
+            stats['redis_buffer_size'] = stream_stats['pending'] + (stream_stats['lag'] or 0)
         except Exception as e:
             logger.debug(f"Redis buffer size check failed: {e}")
             stats['redis_buffer_size'] = 0
@@ -5491,59 +5161,36 @@ def get_all_indicator_scores(account):
 
 @app_webui.route('/api/spread/stats', methods=['GET'])
 def get_spread_stats():
-    """Get spread statistics for all symbols or a specific symbol"""
+    """Get spread statistics for all symbols or a specific symbol (streaming, max 48h)"""
     try:
-        from models import Tick
-        from sqlalchemy import func
-
         symbol = request.args.get('symbol')
         hours = request.args.get('hours', 24, type=int)
 
-        db = ScopedSession()
-
-        try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-
-            query = db.query(
-                Tick.symbol,
-                func.count(Tick.id).label('tick_count'),
-                func.avg(Tick.spread).label('avg_spread'),
-                func.min(Tick.spread).label('min_spread'),
-                func.max(Tick.spread).label('max_spread'),
-                func.min(Tick.timestamp).label('first_tick'),
-                func.max(Tick.timestamp).label('last_tick')
-            ).filter(
-                Tick.spread.isnot(None),
-                Tick.timestamp >= cutoff_time
-            )
-
-            if symbol:
-                query = query.filter(Tick.symbol == symbol)
+        tracker = get_spread_tracker()
+        symbols = [symbol] if symbol else tracker.symbols()
 
-            stats = query.group_by(Tick.symbol).all()
-
-            result = []
-            for stat in stats:
-                result.append({
-                    'symbol': stat.symbol,
-                    'tick_count': stat.tick_count,
-                    'avg_spread': float(stat.avg_spread) if stat.avg_spread else 0,
-                    'min_spread': float(stat.min_spread) if stat.min_spread else 0,
-                    'max_spread': float(stat.max_spread) if stat.max_spread else 0,
-                    'first_tick': stat.first_tick.isoformat() if stat.first_tick else None,
-                    'last_tick': stat.last_tick.isoformat() if stat.last_tick else None,
-                    'spread_volatility': float(stat.max_spread - stat.min_spread) if stat.max_spread and stat.min_spread else 0
-                })
-
-            return jsonify({
-                'status': 'success',
-                'hours': hours,
-                'symbol_count': len(result),
-                'stats': result
-            }), 200
+        result = []
+        for sym in symbols:
+            stat = tracker.get_window(sym, hours=hours)
+            if not stat:
+                continue
+            result.append({
+                'symbol': sym,
+                'tick_count': stat['sample_count'],
+                'avg_spread': stat['avg_spread'],
+                'min_spread': stat['min_spread'],
+                'max_spread': stat['max_spread'],
+                'first_tick': stat['first_tick'].isoformat(),
+                'last_tick': stat['last_tick'].isoformat(),
+                'spread_volatility': stat['max_spread'] - stat['min_spread']
+            })
 
-        finally:
-            db.close()
+        return jsonify({
+            'status': 'success',
+            'hours': min(hours, tracker.HOURLY_WINDOW),
+            'symbol_count': len(result),
+            'stats': result
+        }), 200
 
     except Exception as e:
         logger.error(f"Error getting spread stats: {e}", exc_info=True)
@@ -6775,6 +6422,15 @@ if __name__ == '__main__':
     # Start tick batch writer (writes buffered ticks from Redis to PostgreSQL)
     start_batch_writer(interval=5, batch_size=1000)
 
+    # Start candle builder (writes OHLC bars closed by incoming ticks)
+    start_candle_builder(flush_interval=2)
+
+    # Start spread statistics tracker (publishes spread summaries to Redis for workers)
+    start_spread_tracker(flush_interval=5, persist_interval=300)
+
+    # Start account state writer (flushes EA balance/equity snapshots to PostgreSQL)
+    start_account_state_writer(flush_interval=5)
+
     # Clear all old signals on startup to force fresh generation
     from models import TradingSignal
     startup_db = ScopedSession()
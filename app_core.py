@@ -53,7 +53,9 @@ from database import init_db
 from redis_client import init_redis
 from core_communication import init_core_communication, get_core_comm
 from tick_batch_writer import start_batch_writer
+from account_state import start_account_state_writer
 from backup_scheduler import start_backup_scheduler
+from ea_payload import EARequest
 
 # Import API endpoint registrations
 from core_api import (
@@ -104,6 +106,7 @@ def create_command_app():
 def create_ticks_app():
     """Create Flask app for Tick Data (Port 9901)"""
     app = Flask('ticks')
+    app.request_class = EARequest  # gzip/deflate, MessagePack, columnar ticks
     
     @app.after_request
     def add_cors_headers(response):
@@ -119,6 +122,7 @@ def create_ticks_app():
 def create_trades_app():
     """Create Flask app for Trade Sync (Port 9902)"""
     app = Flask('trades')
+    app.request_class = EARequest  # gzip/deflate, MessagePack, columnar ticks
     
     @app.after_request
     def add_cors_headers(response):
@@ -445,6 +449,15 @@ def main():
         logger.error(f"❌ Tick batch writer failed to start: {e}", exc_info=True)
         # Non-critical, continue
     
+    # Start account state writer (flushes EA heartbeat snapshots to PostgreSQL)
+    logger.info("💰 Starting account state writer...")
+    try:
+        start_account_state_writer(flush_interval=5)
+        logger.info("✅ Account state writer started")
+    except Exception as e:
+        logger.error(f"❌ Account state writer failed to start: {e}", exc_info=True)
+        # Non-critical, continue
+
     # Start backup scheduler
     logger.info("💾 Starting backup scheduler...")
     try:
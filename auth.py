@@ -1,21 +1,184 @@
 """
 Authentication utilities
+
+require_api_key verifies (account number, api_key) against an in-process LRU
+cache before touching PostgreSQL. Credentials almost never change, so every
+tick batch, heartbeat and command poll after the first one per TTL skips the
+Account query. Routes receive a lightweight AccountIdentity (id, account
+number, broker) instead of an ORM instance; load the Account row through
+`db` if a route really needs more.
+
+Cache entries expire after AuthCache.TTL seconds, which also bounds how long
+other processes keep accepting a changed key; in this process
+invalidate_api_key_cache() drops them right away.
 """
 
+import hashlib
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from functools import wraps
+from threading import Lock
+from typing import Dict, Optional
+
 from flask import request, jsonify
 from models import Account
 from database import ScopedSession
-import logging
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class AccountIdentity:
+    """Authenticated EA account (what routes get instead of the ORM Account)"""
+    id: int
+    mt5_account_number: int
+    broker: Optional[str] = None
+
+
+class AuthCache:
+    """LRU + TTL cache of verified credentials: (account number, key hash) -> AccountIdentity"""
+
+    TTL = 60          # Seconds a verified key is trusted without a DB check
+    MAX_SIZE = 1024   # Entries (one per account/key pair)
+
+    def __init__(self, ttl: float = TTL, max_size: int = MAX_SIZE):
+        """
+        Initialize Auth Cache
+
+        Args:
+            ttl: Seconds an entry stays valid
+            max_size: Maximum number of entries (least recently used are evicted)
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()  # key -> (identity, expires_at)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(account_number, api_key: str) -> tuple:
+        # Only a hash of the key is kept in memory
+        return str(account_number), hashlib.sha256(api_key.encode()).hexdigest()
+
+    def get(self, account_number, api_key: str) -> Optional[AccountIdentity]:
+        """Cached identity for valid credentials (None on miss/expiry)"""
+        key = self._key(account_number, api_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, account_number, api_key: str, identity: AccountIdentity):
+        """Remember verified credentials"""
+        key = self._key(account_number, api_key)
+        with self._lock:
+            self._entries[key] = (identity, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, account_number=None) -> int:
+        """
+        Drop cached credentials
+
+        Args:
+            account_number: MT5 account number (None = everything)
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if account_number is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key in self._entries if key[0] == str(account_number)]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self.invalidations += removed
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'ttl': self.ttl,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / total * 100, 1) if total > 0 else 0
+        }
+
+
+# Global instance
+_auth_cache = None
+
+def get_auth_cache() -> AuthCache:
+    """Get global auth cache instance"""
+    global _auth_cache
+    if _auth_cache is None:
+        _auth_cache = AuthCache()
+    return _auth_cache
+
+
+def invalidate_api_key_cache(account_number=None) -> int:
+    """Forget cached credentials of an account (call when its API key changes)"""
+    return get_auth_cache().invalidate(account_number)
+
+
+def authenticate(account_number, api_key: str) -> Optional[AccountIdentity]:
+    """
+    Verify EA credentials (cache first, PostgreSQL on miss)
+
+    Returns:
+        AccountIdentity, or None if the credentials are invalid
+    """
+    cache = get_auth_cache()
+    identity = cache.get(account_number, api_key)
+    if identity is not None:
+        return identity
+
+    db = ScopedSession()
+    try:
+        row = db.query(Account.id, Account.mt5_account_number, Account.broker).filter_by(
+            mt5_account_number=account_number,
+            api_key=api_key
+        ).first()
+    finally:
+        db.close()
+
+    if row is None:
+        return None  # Failed attempts are not cached
+
+    identity = AccountIdentity(id=row.id, mt5_account_number=row.mt5_account_number, broker=row.broker)
+    cache.put(account_number, api_key, identity)
+    return identity
+
+
 def require_api_key(f):
     """
     Decorator to require API key authentication
     Expects: account (int) and api_key (string) in request JSON OR X-API-Key header
+
+    Passes `account` (AccountIdentity) and - if the route takes it - `db`
+    (a ScopedSession closed after the request) to the route.
     """
+    wants_db = 'db' in inspect.signature(f).parameters
+
     @wraps(f)
     def decorated_function(*args, **kwargs):
         data = request.get_json()
@@ -34,21 +197,19 @@ def require_api_key(f):
             return jsonify({'status': 'error', 'message': 'Missing account or api_key'}), 401
 
         # Verify API key
-        db = ScopedSession()
-        try:
-            account = db.query(Account).filter_by(
-                mt5_account_number=account_number,
-                api_key=api_key
-            ).first()
+        account = authenticate(account_number, str(api_key))
+        if account is None:
+            logger.warning(f"Invalid API key attempt for account {account_number}")
+            return jsonify({'status': 'error', 'message': 'Invalid credentials'}), 403
 
-            if not account:
-                logger.warning(f"Invalid API key attempt for account {account_number}")
-                return jsonify({'status': 'error', 'message': 'Invalid credentials'}), 403
+        # Pass account identity to the route
+        kwargs['account'] = account
+        if not wants_db:
+            return f(*args, **kwargs)
 
-            # Pass account object to the route
-            kwargs['account'] = account
+        db = ScopedSession()
+        try:
             kwargs['db'] = db
-
             return f(*args, **kwargs)
         finally:
             db.close()
@@ -79,6 +240,7 @@ def get_or_create_account(db, mt5_account_number, broker):
         db.add(account)
         db.commit()
         db.refresh(account)
+        invalidate_api_key_cache(mt5_account_number)
 
         logger.info(f"New account created: {mt5_account_number} ({broker})")
 
@@ -11,17 +11,22 @@ TIMEZONE HANDLING:
 - Logging shows both UTC and Broker time for clarity
 """
 
+import json
 import logging
 import time
 import uuid
 from datetime import datetime, timedelta
-from threading import Thread
+from threading import Thread, Lock
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from database import ScopedSession
 from models import TradingSignal, Trade, Account, Command, SymbolTradingConfig, BrokerSymbol
 from redis_client import get_redis
+from quote_book import get_quote_book
+from spread_stats import get_spread_tracker
+from portfolio_state import get_portfolio_state
+from account_state import get_account_snapshot
 from timezone_manager import tz, log_with_timezone
 
 logging.basicConfig(
@@ -63,9 +68,9 @@ class AutoTrader:
         self.redis = get_redis()
         self.check_interval = 10  # Check for new signals every 10 seconds
 
-        # Track processed signals by hash (symbol+timeframe+type+entry_price)
-        # This allows detecting when signals are updated with new values
-        self.processed_signal_hashes = {}
+        # Processed signals are tracked by hash (symbol+timeframe+type+entry_price)
+        # in a Redis sorted set shared by all auto-trader processes (survives restarts)
+        self.processed_signal_ttl = 3600  # Seconds a signal version stays registered
 
         # Cooldown tracking after SL hits: symbol -> cooldown_until_time
         self.symbol_cooldowns = {}
@@ -74,6 +79,13 @@ class AutoTrader:
         self.pending_commands = {}
         self.failed_command_count = 0
 
+        # Event-driven wake-up (SignalGenerator publishes on signals:events);
+        # sweep and listener share the portfolio state -> one at a time
+        self.processing_lock = Lock()
+        self.signal_listener_thread = None
+        self.signal_events_received = 0
+        self.signal_event_batches = 0
+
         # ✅ UNIFIED PROTECTION: Load from database (single source of truth)
         # These will be loaded from daily_drawdown_limits table in _load_protection_settings()
         self.circuit_breaker_enabled = True  # Default fallback
@@ -305,7 +317,12 @@ class AutoTrader:
             return False  # Already tripped
 
         try:
-            account = db.query(Account).filter_by(id=account_id).first()
+            # In-memory snapshot (PortfolioState), accounts row until the state is loaded
+            portfolio = get_portfolio_state(account_id)
+            if portfolio.loaded:
+                account = portfolio.account
+            else:
+                account = db.query(Account).filter_by(id=account_id).first()
             if not account:
                 logger.error("Account not found for circuit breaker check")
                 return False
@@ -390,9 +407,8 @@ class AutoTrader:
             return False
 
     def get_account_balance(self, db: Session, account_id: int) -> float:
-        """Get current account balance"""
-        account = db.query(Account).filter_by(id=account_id).first()
-        return account.balance if account else 0.0
+        """Get current account balance (Redis account snapshot, accounts row as fallback)"""
+        return get_account_snapshot(account_id, db, fields=('balance',)).get('balance') or 0.0
 
     def get_open_positions_count(self, db: Session, account_id: int) -> int:
         """Get number of open positions"""
@@ -429,22 +445,18 @@ class AutoTrader:
                 # Symbol not in any correlation group - allow
                 return {'allowed': True}
 
+            portfolio = get_portfolio_state(account_id)
+            if not portfolio.loaded:
+                portfolio.sync(db, auto_trading_enabled=self.enabled)
+
             # Check each group the symbol belongs to
             for currency, correlated_symbols in symbol_groups:
                 # Count existing open positions in this currency group
-                open_positions = db.query(Trade).filter(
-                    and_(
-                        Trade.account_id == account_id,
-                        Trade.status == 'open',
-                        Trade.symbol.in_(correlated_symbols)
-                    )
-                ).all()
-
-                existing_count = len(open_positions)
+                existing_symbols = portfolio.open_symbols(correlated_symbols)
+                existing_count = len(existing_symbols)
 
                 if existing_count >= self.max_correlated_positions:
                     # Already at/over correlation limit
-                    existing_symbols = [p.symbol for p in open_positions]
                     return {
                         'allowed': False,
                         'reason': (
@@ -477,10 +489,10 @@ class AutoTrader:
         """
         try:
             # Count current open positions
-            open_count = db.query(Trade).filter(
-                Trade.account_id == account_id,
-                Trade.status == 'open'
-            ).count()
+            portfolio = get_portfolio_state(account_id)
+            if not portfolio.loaded:
+                portfolio.sync(db, auto_trading_enabled=self.enabled)
+            open_count = portfolio.open_count()
             
             if open_count >= self.max_open_positions:
                 logger.warning(
@@ -560,12 +572,12 @@ class AutoTrader:
         """Check if risk limits are exceeded"""
         try:
             settings = self._load_settings(db)
-            account = db.query(Account).filter_by(id=account_id).first()
-            if not account:
+            live = get_account_snapshot(account_id, db, fields=('balance', 'equity'))
+            if not live:
                 return {'allowed': False, 'reason': 'Account not found'}
 
-            balance = account.balance
-            equity = account.equity
+            balance = live['balance']
+            equity = live['equity']
 
             # Check max positions
             open_positions = self.get_open_positions_count(db, account_id)
@@ -621,10 +633,16 @@ class AutoTrader:
                     'reason': f'Market closed for {signal.symbol} (session: {session})'
                 }
 
+            # ✅ Portfolio state (positions, pending opens, recent closes, drawdown)
+            # is synced once per batch in process_new_signals - all portfolio
+            # checks below run in memory
+            portfolio = get_portfolio_state(account_id)
+            if not portfolio.loaded:
+                portfolio.sync(db, auto_trading_enabled=self.enabled)
+
             # Check DAILY DRAWDOWN PROTECTION SECOND (most critical check)
-            from daily_drawdown_protection import get_drawdown_protection
-            dd_protection = get_drawdown_protection(account_id)
-            dd_check = dd_protection.check_and_update(auto_trading_enabled=self.enabled)
+            # (DailyDrawdownProtection.check_and_update result from the last state refresh)
+            dd_check = portfolio.dd_check
 
             if not dd_check['allowed']:
                 return {
@@ -669,24 +687,10 @@ class AutoTrader:
             # ✅ SIMPLIFIED: Check per-symbol position limit (prevent duplicate positions)
             # REMOVED: timeframe check - now checks ONLY symbol level
             # REASON: Prevent ANY duplicate on same symbol (even different timeframes)
-            existing_positions = db.query(Trade).filter(
-                and_(
-                    Trade.account_id == account_id,
-                    Trade.symbol == signal.symbol,  # ✅ Symbol only, no timeframe
-                    Trade.status == 'open'
-                )
-            ).count()
+            existing_positions = len(portfolio.open_tickets(signal.symbol))  # ✅ Symbol only, no timeframe
 
             # ✅ CRITICAL: Also count pending/processing commands to prevent race conditions
-            from models import Command
-            pending_commands = db.query(Command).filter(
-                and_(
-                    Command.account_id == account_id,
-                    Command.command_type == 'OPEN_TRADE',
-                    Command.status.in_(['pending', 'processing']),
-                    Command.payload['symbol'].astext == signal.symbol  # ✅ Symbol only, no timeframe
-                )
-            ).count()
+            pending_commands = portfolio.pending_count(signal.symbol)
 
             total_exposure = existing_positions + pending_commands
 
@@ -709,7 +713,8 @@ class AutoTrader:
             # ✅ ENHANCED: Check SL-Hit Protection (automatic pause after multiple SL hits)
             from sl_hit_protection import get_sl_hit_protection
             sl_protection = get_sl_hit_protection()
-            sl_check = sl_protection.check_sl_hits(db, account_id, signal.symbol, max_hits=2, timeframe_hours=4)
+            sl_hits = portfolio.sl_hits_since(signal.symbol, datetime.utcnow() - timedelta(hours=4))
+            sl_check = sl_protection.evaluate(signal.symbol, sl_hits, max_hits=2, timeframe_hours=4)
 
             if sl_check['should_pause']:
                 logger.warning(f"🚨 {signal.symbol} auto-trade BLOCKED: {sl_check['reason']}")
@@ -1349,8 +1354,18 @@ class AutoTrader:
         )
         return hashlib.md5(hash_string.encode()).hexdigest()
 
-    def process_new_signals(self, db: Session):
-        """Process new trading signals"""
+    def process_new_signals(self, db: Session, signal_ids: Optional[List[int]] = None):
+        """
+        Process new trading signals
+
+        Args:
+            db: Database session
+            signal_ids: Only these signals (event-driven wake-up); None = full sweep
+        """
+        with self.processing_lock:
+            self._process_new_signals(db, signal_ids)
+
+    def _process_new_signals(self, db: Session, signal_ids: Optional[List[int]] = None):
         try:
             # ✅ FIX: Get account_id since signals are now GLOBAL (no account_id field)
             from models import Account
@@ -1360,11 +1375,15 @@ class AutoTrader:
                 return
             account_id = account.id
 
+            # ✅ Rebuild the in-memory portfolio state only if trades/commands changed
+            portfolio = get_portfolio_state(account_id)
+            portfolio.sync(db, auto_trading_enabled=self.enabled)
+
             # Get recent signals (last 10 minutes OR status='active')
             # This catches both new and updated signals
             cutoff_time = datetime.utcnow() - timedelta(minutes=10)
 
-            signals = db.query(TradingSignal).filter(
+            query = db.query(TradingSignal).filter(
                 and_(
                     TradingSignal.signal_type.in_(['BUY', 'SELL']),
                     # Get signals that are either recent OR still active
@@ -1373,62 +1392,71 @@ class AutoTrader:
                         TradingSignal.status == 'active'
                     )
                 )
-            ).order_by(TradingSignal.created_at.desc()).all()
+            )
+            if signal_ids is not None:
+                query = query.filter(TradingSignal.id.in_(signal_ids))
+
+            signals = query.order_by(TradingSignal.created_at.desc()).all()
 
             # Count how many are truly new (not seen before)
             new_count = 0
             signals_to_process = []
-            
+
+            # Registry lookup for the whole batch (one Redis round-trip)
+            signal_hashes = {signal.id: self._get_signal_hash(signal) for signal in signals}
+            try:
+                registered = self.redis.get_processed_signals(account_id, list(signal_hashes.values()))
+            except Exception as e:
+                logger.warning(f"Processed-signal registry unavailable: {e}")
+                registered = None
+            already_open = []
+
             for signal in signals:
-                # Generate hash based on signal properties
-                signal_hash = self._get_signal_hash(signal)
+                signal_hash = signal_hashes[signal.id]
 
                 # ✅ CRITICAL FIX: ALWAYS check if position exists for this signal
-                # This prevents duplicates on container restart when processed_signal_hashes is empty
                 # IMPORTANT: Check by symbol ONLY, not timeframe! Multiple timeframes can signal same symbol
                 # but we only want ONE position per symbol at a time
-                existing_position = db.query(Trade).filter(
-                    and_(
-                        Trade.account_id == account_id,
-                        Trade.symbol == signal.symbol,
-                        Trade.status == 'open'
-                    )
-                ).first()
+                open_tickets = portfolio.open_tickets(signal.symbol)
+                existing_ticket = open_tickets[0] if open_tickets else None
 
-                logger.debug(f"🔍 Position check for {signal.symbol} {signal.timeframe}: existing_position={existing_position is not None} (ticket={existing_position.ticket if existing_position else 'None'})")
+                logger.debug(f"🔍 Position check for {signal.symbol} {signal.timeframe}: existing_position={existing_ticket is not None} (ticket={existing_ticket})")
 
-                if existing_position:
+                if existing_ticket is not None:
                     # Position exists - skip signal and mark as processed
-                    logger.info(f"⏭️  SKIPPING {signal.symbol} {signal.timeframe} signal - position #{existing_position.ticket} already open")
-                    if signal_hash not in self.processed_signal_hashes:
-                        # After restart, repopulate hash to prevent reprocessing
-                        self.processed_signal_hashes[signal_hash] = {
-                            'signal_id': signal.id,
-                            'processed_at': datetime.utcnow(),
-                            'symbol': signal.symbol,
-                            'timeframe': signal.timeframe
-                        }
+                    logger.info(f"⏭️  SKIPPING {signal.symbol} {signal.timeframe} signal - position #{existing_ticket} already open")
+                    already_open.append(signal_hash)
                     continue
 
-                # Check if we've already processed this signal hash
-                if signal_hash in self.processed_signal_hashes:
-                    # Position was closed - remove hash and re-evaluate signal
-                    logger.info(f"♻️  Signal {signal.symbol} {signal.timeframe}: Position closed, re-evaluating signal")
-                    del self.processed_signal_hashes[signal_hash]
+                # New/updated signal version OR position was closed - claim this
+                # evaluation (compare-and-set on the registry entry, so only one
+                # auto-trader process evaluates it)
+                if registered is not None:
+                    previous = registered.get(signal_hash)
+                    if previous is not None:
+                        logger.info(f"♻️  Signal {signal.symbol} {signal.timeframe}: Position closed, re-evaluating signal")
+                    try:
+                        if not self.redis.claim_signal(account_id, signal_hash, previous):
+                            logger.info(f"⏭️  Skipping signal #{signal.id} ({signal.symbol} {signal.timeframe}): Claimed by another auto-trader")
+                            continue
+                    except Exception as e:
+                        logger.warning(f"Signal claim failed for #{signal.id}, evaluating anyway: {e}")
 
-                # This is a new/updated signal version OR position was closed
                 new_count += 1
                 signals_to_process.append(signal)
-                
-                # Mark this version as processed
-                self.processed_signal_hashes[signal_hash] = {
-                    'signal_id': signal.id,
-                    'processed_at': datetime.utcnow(),
-                    'symbol': signal.symbol,
-                    'timeframe': signal.timeframe
-                }
 
-            logger.info(f"🔍 Auto-trader found {len(signals)} signals ({new_count} new/updated), {len(self.processed_signal_hashes)} tracked hashes")
+            if already_open and registered is not None:
+                try:
+                    self.redis.mark_signals_processed(account_id, already_open)
+                except Exception as e:
+                    logger.warning(f"Could not register skipped signals: {e}")
+
+            if signal_ids is None:
+                tracked = len(registered) if registered is not None else 'n/a'
+                logger.info(f"🔍 Auto-trader found {len(signals)} signals ({new_count} new/updated), {tracked} already registered")
+                self.cleanup_processed_signals()
+            else:
+                logger.info(f"⚡ Auto-trader woken for signals {sorted(signal_ids)}: {new_count} new/updated")
 
             # Process new/updated signals
             for signal in signals_to_process:
@@ -1587,14 +1615,7 @@ class AutoTrader:
                 # Check for existing open position for same symbol+timeframe
                 # (After potential replacement - there might still be positions we don't want to replace)
                 # ✅ DYNAMIC LIMIT: Count existing trades and compare against confidence-based limit
-                existing_trades_count = db.query(Trade).filter(
-                    and_(
-                        Trade.account_id == account_id,
-                        Trade.symbol == signal.symbol,
-                        Trade.timeframe == signal.timeframe,
-                        Trade.status == 'open'
-                    )
-                ).count()
+                existing_trades_count = len(portfolio.open_tickets(signal.symbol, signal.timeframe))
 
                 # Calculate max allowed trades based on confidence
                 signal_confidence = float(signal.confidence) if signal.confidence else 50.0
@@ -1664,6 +1685,7 @@ class AutoTrader:
 
                 if command:
                     logger.info(f"🚀 Auto-Trade executed: Signal #{signal.id} → Command {command.id}")
+                    portfolio.on_command_created(command.id, signal.symbol)
 
                     # Log successful trade command to AI Decision Log
                     from ai_decision_log import AIDecisionLogger
@@ -1697,25 +1719,19 @@ class AutoTrader:
 
     def cleanup_processed_signals(self):
         """
-        Clean up old processed signal hashes to prevent unbounded memory growth.
+        Clean up old processed signal hashes (Redis registry).
 
-        Keeps only hashes from the last hour to allow signal re-processing.
-        Runs every auto-trade iteration (every 10 seconds).
+        Keeps only hashes evaluated within processed_signal_ttl (last hour);
+        a single ZREMRANGEBYSCORE, run after every full sweep.
         """
-        if len(self.processed_signal_hashes) > 100:
-            cutoff_time = datetime.utcnow() - timedelta(hours=1)
-            
-            # Remove old hashes
-            hashes_to_remove = []
-            for hash_key, hash_data in self.processed_signal_hashes.items():
-                if hash_data['processed_at'] < cutoff_time:
-                    hashes_to_remove.append(hash_key)
-            
-            for hash_key in hashes_to_remove:
-                del self.processed_signal_hashes[hash_key]
-            
-            if hashes_to_remove:
-                logger.debug(f"🧹 Cleaned up {len(hashes_to_remove)} old signal hashes (keeping last hour)")
+        try:
+            removed = self.redis.cleanup_processed_signals(self.processed_signal_ttl)
+        except Exception as e:
+            logger.warning(f"Processed-signal cleanup failed: {e}")
+            return
+
+        if removed:
+            logger.debug(f"🧹 Cleaned up {removed} old signal hashes (keeping last hour)")
 
     def cleanup_expired_cooldowns(self):
         """
@@ -1934,40 +1950,35 @@ class AutoTrader:
             Dict with 'allowed' (bool) and 'reason' (str if rejected)
         """
         try:
-            from models import Tick
+            # Latest quote and spread statistics are kept in memory/Redis by
+            # the tick ingest path - no tick queries here (NOTE: Ticks are GLOBAL)
+            quote = get_quote_book().get_quote(signal.symbol)
 
-            # Get latest tick for spread (NOTE: Ticks are now GLOBAL)
-            latest_tick = db.query(Tick).filter_by(
-                symbol=signal.symbol
-            ).order_by(Tick.timestamp.desc()).first()
-
-            if not latest_tick:
+            if not quote:
                 logger.warning(f"No tick data for {signal.symbol} - allowing trade (risky)")
                 return {'allowed': True}
 
             # Check tick age (if tick is too old, market may be closed)
             # Increased to 12 hours (43200s) as temporary fix while EA tick subscription is fixed
-            tick_age = datetime.utcnow() - latest_tick.timestamp
+            tick_age = datetime.utcnow() - quote['timestamp']
             if tick_age.total_seconds() > 43200:  # 12 hours instead of 60 seconds
                 return {
                     'allowed': False,
-                    'reason': f'Tick data too old ({tick_age.seconds}s) - market may be closed'
+                    'reason': f'Tick data too old ({tick_age.seconds}s) - market may be closed',
+                    'tick_age': tick_age.total_seconds()
                 }
 
             # Calculate current spread
-            current_spread = abs(float(latest_tick.ask) - float(latest_tick.bid))
+            current_spread = abs(quote['ask'] - quote['bid'])
 
-            # Get average spread from recent ticks
-            recent_ticks = db.query(Tick).filter_by(
-                symbol=signal.symbol
-            ).order_by(Tick.timestamp.desc()).limit(100).all()
+            # Average spread over the recent ticks (EWMA, ~last 100 ticks)
+            recent = get_spread_tracker().get_recent(signal.symbol)
 
-            if len(recent_ticks) < 10:
+            if not recent or recent['recent_ticks'] < 10:
                 logger.warning(f"Insufficient tick history for {signal.symbol} spread check")
                 return {'allowed': True}
 
-            spreads = [abs(float(t.ask) - float(t.bid)) for t in recent_ticks]
-            avg_spread = sum(spreads) / len(spreads)
+            avg_spread = recent['recent_avg']
 
             # Reject if spread is abnormally high (> 3x average for forex, 5x for metals)
             # Silver/Gold can have wider spreads than forex pairs
@@ -1978,7 +1989,12 @@ class AutoTrader:
                     'reason': (
                         f'Spread too high: {current_spread:.5f} '
                         f'(avg: {avg_spread:.5f}, max: {avg_spread * MAX_SPREAD_MULTIPLIER:.5f})'
-                    )
+                    ),
+                    'current_spread': current_spread,
+                    'average_spread': avg_spread,
+                    'max_spread': avg_spread * MAX_SPREAD_MULTIPLIER,
+                    'spread_multiple': current_spread / avg_spread if avg_spread else None,
+                    'tick_age': tick_age.total_seconds()
                 }
 
             # Also check absolute spread limit (per symbol type)
@@ -1986,7 +2002,10 @@ class AutoTrader:
             if current_spread > max_absolute_spread:
                 return {
                     'allowed': False,
-                    'reason': f'Spread exceeds absolute limit: {current_spread:.5f} > {max_absolute_spread:.5f}'
+                    'reason': f'Spread exceeds absolute limit: {current_spread:.5f} > {max_absolute_spread:.5f}',
+                    'current_spread': current_spread,
+                    'average_spread': avg_spread,
+                    'max_spread': max_absolute_spread
                 }
 
             logger.debug(
@@ -2100,6 +2119,70 @@ class AutoTrader:
         # Apply risk profile multiplier
         return base_spread * multiplier
 
+    # ========================================================================
+    # SIGNAL EVENTS (event-driven wake-up)
+    # ========================================================================
+
+    SIGNAL_EVENT_DEBOUNCE = 0.05  # Seconds to collect a burst of events into one batch
+
+    def start_signal_listener(self):
+        """Process signals as soon as SignalGenerator publishes them"""
+        if self.signal_listener_thread and self.signal_listener_thread.is_alive():
+            return
+
+        self.signal_listener_thread = Thread(
+            target=self._signal_listener_loop, daemon=True, name='AutoTraderSignalListener'
+        )
+        self.signal_listener_thread.start()
+        logger.info("⚡ Auto-Trader signal listener started")
+
+    def _signal_listener_loop(self):
+        from redis_client import RedisClient
+
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.redis.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(RedisClient.SIGNAL_EVENTS_CHANNEL)
+                logger.info(f"📡 Subscribed to {RedisClient.SIGNAL_EVENTS_CHANNEL}")
+
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message:
+                        continue
+
+                    # Signal generator saves many signals per cycle - batch the burst
+                    signal_ids = set()
+                    deadline = time.monotonic() + self.SIGNAL_EVENT_DEBOUNCE
+                    while message:
+                        try:
+                            signal_ids.add(int(json.loads(message['data'])['signal_id']))
+                        except (ValueError, KeyError, TypeError):
+                            logger.warning(f"Ignoring malformed signal event: {message.get('data')}")
+                        remaining = deadline - time.monotonic()
+                        message = pubsub.get_message(timeout=remaining) if remaining > 0 else None
+
+                    self.signal_events_received += len(signal_ids)
+                    if not signal_ids or not self.enabled:
+                        continue
+
+                    self.signal_event_batches += 1
+                    db = ScopedSession()
+                    try:
+                        self.process_new_signals(db, signal_ids=list(signal_ids))
+                    finally:
+                        db.close()
+
+            except Exception as e:
+                logger.error(f"Signal listener error (reconnecting in 5s): {e}")
+                time.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
     def auto_trade_loop(self):
         """Main auto-trading loop"""
         logger.info(f"Auto-Trader loop started (interval: {self.check_interval}s)")
@@ -2166,6 +2249,8 @@ def start_auto_trader(enabled=False):
     if enabled:
         trader.enable()
 
+    trader.start_signal_listener()
+
     thread = Thread(target=trader.auto_trade_loop, daemon=True)
     thread.start()
     logger.info("Auto-Trader thread started")
@@ -0,0 +1,427 @@
+"""
+Candle Builder - incremental tick-to-OHLC aggregation
+
+Fed directly from the tick ingest path (/api/ticks). Keeps one open bar per
+(symbol, timeframe) for M1...W1 and updates it in memory on every tick. When a
+tick falls into the next period (or the period ends without new ticks) the bar
+is closed; closed bars are written by a background thread with one multi-row
+INSERT ... ON CONFLICT DO NOTHING and announced as bar-close events:
+- Redis pub/sub channel 'ohlc:bar_closed' (other processes)
+- In-process listeners registered with add_listener()
+
+Work per flush scales with the number of closed bars, not with tick history.
+
+Higher-timeframe bars that were already running when the process started are
+completed from stored M1 candles (once per symbol), otherwise they would only
+contain the ticks seen since startup.
+
+Usage:
+    from candle_builder import get_candle_builder
+
+    builder = get_candle_builder()
+    builder.start()
+    builder.on_ticks(ticks)   # tick dicts: symbol, bid, ask, volume, timestamp (epoch)
+    builder.on_block(block)   # TickBlock from /api/ticks (pre-aggregated per minute)
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from threading import Thread, Lock
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from database import ScopedSession
+from models import OHLCData
+from ohlc_writer import bulk_insert_ohlc
+
+logger = logging.getLogger(__name__)
+
+# Timeframe -> minutes per bar
+TIMEFRAME_MINUTES = {
+    'M1': 1,
+    'M5': 5,
+    'M15': 15,
+    'M30': 30,
+    'H1': 60,
+    'H4': 240,
+    'D1': 1440,
+    'W1': 10080
+}
+
+
+def period_start(timestamp: datetime, timeframe: str) -> datetime:
+    """Start of the bar containing timestamp (weeks start on Monday)"""
+    if timeframe == 'W1':
+        monday = timestamp - timedelta(days=timestamp.weekday())
+        return monday.replace(hour=0, minute=0, second=0, microsecond=0)
+    if timeframe == 'D1':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if timeframe == 'H4':
+        return timestamp.replace(hour=(timestamp.hour // 4) * 4, minute=0, second=0, microsecond=0)
+    if timeframe == 'H1':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+
+    minutes = TIMEFRAME_MINUTES[timeframe]
+    return timestamp.replace(minute=(timestamp.minute // minutes) * minutes, second=0, microsecond=0)
+
+
+class CandleBuilder:
+    BAR_CLOSED_CHANNEL = 'ohlc:bar_closed'
+
+    def __init__(self, flush_interval=2, close_grace_seconds=5, timeframes=None):
+        """
+        Initialize Candle Builder
+
+        Args:
+            flush_interval: Seconds between flushes of closed bars (default: 2)
+            close_grace_seconds: Wait this long after a period ends before closing
+                                 an idle bar, so late ticks still land in it (default: 5)
+            timeframes: Timeframes to build (default: all of TIMEFRAME_MINUTES)
+        """
+        self.flush_interval = flush_interval
+        self.close_grace = timedelta(seconds=close_grace_seconds)
+        self.timeframes = list(timeframes or TIMEFRAME_MINUTES)
+
+        # symbol -> timeframe -> bar dict
+        self.open_bars: Dict[str, Dict[str, Dict]] = {}
+        self.closed_bars: List[Dict] = []
+        self.unseeded_symbols = set()
+        self.listeners: List[Callable[[Dict], None]] = []
+        self.lock = Lock()
+
+        self.running = False
+        self.thread = None
+
+        # Metrics
+        self.ticks_processed = 0
+        self.late_ticks = 0
+        self.bars_written = 0
+        self.bars_skipped_partial = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    # ========================================================================
+    # LIFECYCLE
+    # ========================================================================
+
+    def start(self):
+        """Start the background flush thread"""
+        if self.running:
+            logger.warning("Candle builder already running")
+            return
+
+        self.running = True
+        self.thread = Thread(target=self._worker_loop, daemon=True, name='CandleBuilder')
+        self.thread.start()
+        logger.info(f"Candle builder started ({', '.join(self.timeframes)}, flush every {self.flush_interval}s)")
+
+    def stop(self):
+        """Stop the flush thread and write bars that are already closed"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=10)
+        self.flush()
+        logger.info(f"Candle builder stopped (wrote {self.bars_written} bars)")
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """Register an in-process callback, called with each closed bar after it is stored"""
+        self.listeners.append(callback)
+
+    # ========================================================================
+    # INGEST (hot path - memory only)
+    # ========================================================================
+
+    def on_ticks(self, ticks: List[Dict]):
+        """
+        Apply a batch of ticks to the open bars
+
+        Args:
+            ticks: Tick dicts with symbol, bid, ask, volume and timestamp
+                   (UTC epoch seconds, same convention as the tick writer)
+        """
+        with self.lock:
+            for tick in ticks:
+                symbol = tick.get('symbol')
+                bid = tick.get('bid')
+                ask = tick.get('ask')
+                timestamp = tick.get('timestamp')
+                if not symbol or not bid or not ask or timestamp is None:
+                    continue
+
+                # Same mid price and timestamp convention as the stored ticks
+                self._apply(
+                    symbol,
+                    (float(bid) + float(ask)) / 2,
+                    int(tick.get('volume') or 0),
+                    datetime.fromtimestamp(timestamp)
+                )
+                self.ticks_processed += 1
+
+    def on_block(self, block):
+        """
+        Apply a TickBlock to the open bars
+
+        Ticks are pre-aggregated with numpy into OHLC runs of one symbol and
+        minute in arrival order, so bars are touched once per run instead of
+        once per tick (same result as on_ticks, late ticks included).
+        """
+        if not len(block):
+            return
+
+        mid = (block.bid + block.ask) / 2
+        order, starts, codes, minutes = block.runs(60)
+        ends = np.append(starts[1:], len(order)) - 1
+        sorted_mid = mid[order]
+
+        opens = sorted_mid[starts].tolist()
+        highs = np.maximum.reduceat(sorted_mid, starts).tolist()
+        lows = np.minimum.reduceat(sorted_mid, starts).tolist()
+        closes = sorted_mid[ends].tolist()
+        volumes = np.add.reduceat(block.volume[order], starts).tolist()
+        counts = (ends - starts + 1).tolist()
+
+        with self.lock:
+            for i, code in enumerate(codes.tolist()):
+                # Same naive-datetime convention as the stored ticks
+                self._apply(
+                    block.symbols[code], opens[i], int(volumes[i]),
+                    datetime.fromtimestamp(int(minutes[i]) * 60),
+                    high=highs[i], low=lows[i], close=closes[i], ticks=counts[i]
+                )
+            self.ticks_processed += len(block)
+
+    def _apply(self, symbol: str, price: float, volume: int, timestamp: datetime,
+               high: float = None, low: float = None, close: float = None, ticks: int = 1):
+        """Apply one tick (price) or one pre-aggregated run (price = open, high/low/close)"""
+        high = price if high is None else high
+        low = price if low is None else low
+        close = price if close is None else close
+
+        bars = self.open_bars.get(symbol)
+        if bars is None:
+            bars = self.open_bars[symbol] = {}
+            self.unseeded_symbols.add(symbol)
+
+        # Same minute as the open M1 bar -> every open bar already covers it
+        m1_bar = bars.get('M1')
+        if m1_bar is not None and len(bars) == len(self.timeframes) and \
+                timestamp.replace(second=0, microsecond=0) == m1_bar['timestamp'] and \
+                all(bar is not None for bar in bars.values()):
+            for bar in bars.values():
+                if high > bar['high']:
+                    bar['high'] = high
+                if low < bar['low']:
+                    bar['low'] = low
+                bar['close'] = close
+                bar['volume'] += volume
+            return
+
+        for timeframe in self.timeframes:
+            start = period_start(timestamp, timeframe)
+            bar = bars.get(timeframe)
+
+            if bar is not None and start < bar['timestamp']:
+                # Tick belongs to an already closed bar - drop it
+                if timeframe == 'M1':
+                    self.late_ticks += ticks
+                continue
+
+            if bar is not None and start > bar['timestamp']:
+                self.closed_bars.append(bar)
+                # Rolled over from a previous bar -> this bar is seen from its start
+                bars[timeframe] = bar = self._new_bar(symbol, timeframe, start, price, complete=True)
+            elif bar is None:
+                # First bar after startup may have started before we saw ticks;
+                # after an idle close (key kept as None) nothing was missed
+                bars[timeframe] = bar = self._new_bar(
+                    symbol, timeframe, start, price,
+                    complete=(timeframe == 'M1' or timeframe in bars)
+                )
+
+            if high > bar['high']:
+                bar['high'] = high
+            if low < bar['low']:
+                bar['low'] = low
+            bar['close'] = close
+            bar['volume'] += volume
+
+    @staticmethod
+    def _new_bar(symbol, timeframe, start, price, complete):
+        return {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'timestamp': start,
+            'open': price,
+            'high': price,
+            'low': price,
+            'close': price,
+            'volume': 0,
+            'complete': complete
+        }
+
+    # ========================================================================
+    # BACKGROUND FLUSH
+    # ========================================================================
+
+    def _worker_loop(self):
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self._seed_new_symbols()
+                self.close_expired_bars()
+                self.flush()
+            except Exception as e:
+                logger.error(f"Candle builder error: {e}", exc_info=True)
+
+    def close_expired_bars(self, now: datetime = None):
+        """Close bars whose period ended (plus grace) without a newer tick"""
+        now = now or datetime.now()  # Naive local time, like datetime.fromtimestamp()
+
+        with self.lock:
+            for bars in self.open_bars.values():
+                for timeframe, bar in bars.items():
+                    if bar is None:
+                        continue
+                    next_start = period_start(
+                        bar['timestamp'] + timedelta(minutes=TIMEFRAME_MINUTES[timeframe]), timeframe
+                    )
+                    if now >= next_start + self.close_grace:
+                        self.closed_bars.append(bar)
+                        bars[timeframe] = None
+
+    def _seed_new_symbols(self):
+        """Complete running higher-timeframe bars of newly seen symbols from stored M1 candles"""
+        with self.lock:
+            symbols = list(self.unseeded_symbols)
+            self.unseeded_symbols.clear()
+
+        if not symbols:
+            return
+
+        db = ScopedSession()
+        try:
+            for symbol in symbols:
+                with self.lock:
+                    bars = dict(self.open_bars.get(symbol, {}))
+                m1_bar = bars.get('M1')
+                pending = [b for tf, b in bars.items() if b and tf != 'M1' and not b['complete']]
+                if not m1_bar or not pending:
+                    continue
+
+                # M1 candles of the longest running period, before the first live minute
+                earliest = min(b['timestamp'] for b in pending)
+                candles = db.query(
+                    OHLCData.timestamp, OHLCData.open, OHLCData.high,
+                    OHLCData.low, OHLCData.close, OHLCData.volume
+                ).filter(
+                    OHLCData.symbol == symbol,
+                    OHLCData.timeframe == 'M1',
+                    OHLCData.timestamp >= earliest,
+                    OHLCData.timestamp < m1_bar['timestamp']
+                ).order_by(OHLCData.timestamp.asc()).all()
+
+                with self.lock:
+                    for bar in pending:
+                        history = [c for c in candles if c.timestamp >= bar['timestamp']]
+                        if history:
+                            bar['open'] = float(history[0].open)
+                            bar['high'] = max(bar['high'], max(float(c.high) for c in history))
+                            bar['low'] = min(bar['low'], min(float(c.low) for c in history))
+                            bar['volume'] += sum(int(c.volume or 0) for c in history)
+                        # Without history the bar really starts with the live ticks
+                        bar['complete'] = bool(history) or bar['timestamp'] == m1_bar['timestamp']
+
+        finally:
+            db.close()
+
+    def flush(self):
+        """Write closed bars with one multi-row upsert, then publish bar-close events"""
+        with self.lock:
+            closed, self.closed_bars = self.closed_bars, []
+
+        if not closed:
+            return 0
+
+        rows = []
+        for bar in closed:
+            if not bar['complete']:
+                self.bars_skipped_partial += 1
+                continue
+            rows.append({k: bar[k] for k in ('symbol', 'timeframe', 'timestamp', 'open', 'high', 'low', 'close', 'volume')})
+
+        if not rows:
+            return 0
+
+        start = time.perf_counter()
+        db = ScopedSession()
+        try:
+            bulk_insert_ohlc(db, rows)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Candle flush failed, {len(rows)} bars re-queued: {e}")
+            db.rollback()
+            with self.lock:
+                self.closed_bars = closed + self.closed_bars
+            return 0
+        finally:
+            db.close()
+
+        self.flushes += 1
+        self.bars_written += len(rows)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        logger.debug(f"Candle flush: {len(rows)} bars in {self.last_flush_ms:.1f}ms")
+
+        self._publish(rows)
+        return len(rows)
+
+    def _publish(self, bars: List[Dict]):
+        try:
+            from redis_client import get_redis
+            get_redis().publish_bars_closed(self.BAR_CLOSED_CHANNEL, bars)
+        except Exception as e:
+            logger.warning(f"Could not publish bar-close events: {e}")
+
+        for bar in bars:
+            for callback in self.listeners:
+                try:
+                    callback(bar)
+                except Exception as e:
+                    logger.error(f"Bar-close listener error: {e}")
+
+    def get_stats(self) -> Dict:
+        """Get candle builder statistics"""
+        with self.lock:
+            open_bars = sum(1 for bars in self.open_bars.values() for bar in bars.values() if bar)
+            pending = len(self.closed_bars)
+        return {
+            'running': self.running,
+            'symbols': len(self.open_bars),
+            'open_bars': open_bars,
+            'pending_closed_bars': pending,
+            'ticks_processed': self.ticks_processed,
+            'late_ticks': self.late_ticks,
+            'bars_written': self.bars_written,
+            'bars_skipped_partial': self.bars_skipped_partial,
+            'flushes': self.flushes,
+            'last_flush_ms': round(self.last_flush_ms, 2)
+        }
+
+
+# Global instance
+_candle_builder = None
+
+def get_candle_builder() -> CandleBuilder:
+    """Get global candle builder instance"""
+    global _candle_builder
+    if _candle_builder is None:
+        _candle_builder = CandleBuilder()
+    return _candle_builder
+
+def start_candle_builder(flush_interval=2):
+    """Start the global candle builder"""
+    builder = get_candle_builder()
+    builder.flush_interval = flush_interval
+    builder.start()
+    return builder
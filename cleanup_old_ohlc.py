@@ -8,6 +8,7 @@ import logging
 from datetime import datetime, timedelta
 from database import ScopedSession
 from models import OHLCData
+from partition_manager import drop_expired_partitions, is_partitioned
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,12 +22,25 @@ def cleanup_old_ohlc_data(days_to_keep: int = 365):
     Delete OHLC data older than specified days
     M1 data is cleaned more aggressively (7 days) since it's only used for tick aggregation
 
+    If ohlc_data is partitioned, whole daily (M1) / monthly partitions are
+    dropped instead of deleting rows in batches.
+
     Args:
         days_to_keep: Number of days of data to keep for higher timeframes (default: 365 = 1 year)
     """
     db = ScopedSession()
 
     try:
+        if is_partitioned(db, 'ohlc_data'):
+            m1 = drop_expired_partitions(db, 'ohlc_data_m1', 7)
+            hist = drop_expired_partitions(db, 'ohlc_data_hist', days_to_keep)
+            logger.info(
+                f"✅ Cleanup complete: dropped {len(m1['dropped'])} M1 and "
+                f"{len(hist['dropped'])} M5+ partitions, "
+                f"{m1['default_rows_deleted'] + hist['default_rows_deleted']:,} rows from default partitions"
+            )
+            return
+
         # STEP 1: M1 cleanup - Keep only 7 days (used for tick aggregation only)
         m1_cutoff = datetime.utcnow() - timedelta(days=7)
         m1_count = db.query(OHLCData).filter(
@@ -25,51 +25,124 @@ def create_command(db, account_id, command_type, payload, push_to_redis=True):
     Returns:
         Command object
     """
-    # Generate UUID
-    command_id = str(uuid.uuid4())
+    return create_commands(db, [(account_id, command_type, payload)], push_to_redis)[0]
+
+
+def create_commands(db, commands, push_to_redis=True):
+    """
+    Create several commands with one commit and push them to the Redis queues
+
+    Args:
+        db: Database session
+        commands: List of (account_id, command_type, payload) tuples
+        push_to_redis: If True, also push to Redis for instant delivery
+
+    Returns:
+        List of Command objects (same order as commands)
+    """
+    if not commands:
+        return []
 
-    # Create command in PostgreSQL
     # If pushing to Redis, set status to 'executing' immediately to avoid double-push
     initial_status = 'executing' if push_to_redis else 'pending'
-
-    command = Command(
-        id=command_id,
-        account_id=account_id,
-        command_type=command_type,
-        status=initial_status,
-        payload=payload,
-        created_at=datetime.utcnow()
-    )
-    db.add(command)
+    now = datetime.utcnow()
+
+    created = [
+        Command(
+            id=str(uuid.uuid4()),
+            account_id=account_id,
+            command_type=command_type,
+            status=initial_status,
+            payload=payload,
+            created_at=now
+        )
+        for account_id, command_type, payload in commands
+    ]
+    db.add_all(created)
     db.commit()
 
-    logger.info(f"Created command {command_id} type={command_type} for account {account_id}")
+    for command in created:
+        logger.info(f"Created command {command.id} type={command.command_type} for account {command.account_id}")
+
+    if not push_to_redis:
+        return created
 
     # Push to Redis for instant delivery
-    if push_to_redis:
-        try:
-            redis = get_redis()
+    try:
+        redis = get_redis()
+        superseded = {}
 
+        for command in created:
             # Flatten command for EA parsing
             cmd_dict = {
-                'id': command_id,
-                'type': command_type
+                'id': command.id,
+                'type': command.command_type
             }
 
             # Add payload fields directly
-            if payload:
-                for key, value in payload.items():
+            if command.payload:
+                for key, value in command.payload.items():
                     cmd_dict[key] = value
 
-            # Push to Redis queue
-            redis.push_command(account_id, cmd_dict)
+            # Push to Redis queue (MODIFY_TRADE replaces an undelivered one for the same ticket)
+            superseded_id = redis.push_command(command.account_id, cmd_dict)
+            if superseded_id:
+                superseded[superseded_id] = command.id
+
+            logger.info(f"Pushed command {command.id} to Redis queue for instant delivery")
+
+        for superseded_id, command_id in superseded.items():
+            cancel_superseded_commands(db, [superseded_id], command_id)
+    except Exception as e:
+        logger.error(f"Failed to push command to Redis: {e}")
+        # Continue - commands are still in PostgreSQL as fallback
+
+    return created
+
+
+def cancel_superseded_commands(db, command_ids, superseded_by):
+    """
+    Mark queued commands that were coalesced away as cancelled
+
+    Args:
+        db: Database session
+        command_ids: IDs of the superseded commands
+        superseded_by: ID (or description) of the command that replaced them
+    """
+    if not command_ids:
+        return 0
+
+    count = db.query(Command).filter(
+        Command.id.in_(command_ids),
+        Command.status.in_(['pending', 'executing'])
+    ).update({
+        'status': 'cancelled',
+        'response': {'superseded_by': superseded_by},
+        'executed_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
 
-            logger.info(f"Pushed command {command_id} to Redis queue for instant delivery")
-        except Exception as e:
-            logger.error(f"Failed to push command to Redis: {e}")
-            # Continue - command is still in PostgreSQL as fallback
+    logger.info(f"Cancelled {count} superseded command(s) (replaced by {superseded_by})")
+    return count
 
-    return command
+
+def response_ticket(response):
+    """
+    Position ticket reported in an EA command response
+
+    Args:
+        response: Response dict from the EA (may be None)
+
+    Returns:
+        Ticket as int, or None if the response carries no (valid) ticket
+    """
+    if not isinstance(response, dict):
+        return None
+    try:
+        ticket = int(response.get('ticket') or 0)
+    except (TypeError, ValueError):
+        return None
+    return ticket if ticket > 0 else None
 
 
 def update_command_status(db, command_id, status, response=None):
@@ -91,6 +164,7 @@ def update_command_status(db, command_id, status, response=None):
     command.status = status
     if response:
         command.response = response
+        command.ticket = response_ticket(response)
     command.updated_at = datetime.utcnow()
 
     db.commit()
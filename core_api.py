@@ -33,12 +33,13 @@ from trade_utils import enrich_trade_metadata
 
 from flask import request, jsonify
 import logging
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 
 from database import ScopedSession
-from models import Account, BrokerSymbol, SubscribedSymbol, Log, Trade
-from auth import require_api_key, get_or_create_account
+from models import BrokerSymbol, SubscribedSymbol, Log, Trade
+from auth import AccountIdentity, require_api_key, get_or_create_account
 from core_communication import (
     get_core_comm,
     CommandPriority,
@@ -47,6 +48,8 @@ from core_communication import (
     is_ea_connected
 )
 from tick_batch_writer import get_batch_writer
+from tick_block import TickBlock
+from ea_payload import negotiate
 
 logging.basicConfig(
     level=logging.INFO,
@@ -64,7 +67,7 @@ def register_command_endpoints(app):
     
     @app.route('/api/connect', methods=['POST'])
     @require_api_key
-    def connect(account: Account):
+    def connect(account: AccountIdentity):
         """
         Initial EA connection
         
@@ -76,7 +79,9 @@ def register_command_endpoints(app):
             "broker": "Pepperstone",
             "platform": "MT5",
             "timestamp": 1234567890,
-            "available_symbols": ["EURUSD", "XAUUSD", ...]
+            "available_symbols": ["EURUSD", "XAUUSD", ...],
+            "payload_formats": ["columnar", "msgpack", "json"],   (optional, preferred first)
+            "content_encodings": ["gzip", "deflate"]               (optional)
         }
         
         Response:
@@ -84,7 +89,9 @@ def register_command_endpoints(app):
             "status": "success",
             "session_id": "session_12345678_1234567890",
             "subscribed_symbols": ["EURUSD", "XAUUSD"],
-            "server_time": "2025-10-17T12:00:00"
+            "server_time": "2025-10-17T12:00:00",
+            "payload": {"format": "columnar", "content_type": "application/x-ngtb-ticks",
+                        "content_encoding": "gzip", ...}
         }
         """
         try:
@@ -164,7 +171,8 @@ def register_command_endpoints(app):
                 'session_id': f"session_{account_number}_{int(datetime.utcnow().timestamp())}",
                 'subscribed_symbols': subscribed_symbols,
                 'server_time': datetime.utcnow().isoformat(),
-                'health_status': conn.get_status_dict()
+                'health_status': conn.get_status_dict(),
+                'payload': negotiate(data.get('payload_formats'), data.get('content_encodings'))
             }), 200
         
         except Exception as e:
@@ -176,7 +184,7 @@ def register_command_endpoints(app):
     
     @app.route('/api/heartbeat', methods=['POST'])
     @require_api_key
-    def heartbeat(account: Account):
+    def heartbeat(account: AccountIdentity):
         """
         EA heartbeat - status updates every 30 seconds
         
@@ -232,13 +240,14 @@ def register_command_endpoints(app):
     
     @app.route('/api/get_commands', methods=['POST'])
     @require_api_key
-    def get_commands(account: Account):
+    def get_commands(account: AccountIdentity):
         """
         EA polls for pending commands (every 1 second)
         
         Request:
         {
-            "account": 12345678
+            "account": 12345678,
+            "wait_ms": 20000        # optional long-poll (max 25000)
         }
         
         Response:
@@ -257,12 +266,22 @@ def register_command_endpoints(app):
         }
         """
         try:
+            received = time.time()
+            data = request.get_json(silent=True) or {}
+            try:
+                wait_ms = min(max(int(data.get('wait_ms') or 0), 0), 25000)
+            except (TypeError, ValueError):
+                wait_ms = 0
+
             core_comm = get_core_comm()
-            commands = core_comm.get_pending_commands(account.id, limit=10)
+            commands = core_comm.get_pending_commands(account.id, limit=10, wait_seconds=wait_ms / 1000.0)
             
-            return jsonify({
+            response = jsonify({
                 'commands': commands
-            }), 200
+            })
+            response.headers['X-Server-Received-Ms'] = str(int(received * 1000))
+            response.headers['X-Server-Processing-Ms'] = f"{(time.time() - received) * 1000:.1f}"
+            return response, 200
         
         except Exception as e:
             logger.error(f"❌ Get commands error: {e}", exc_info=True)
@@ -274,7 +293,7 @@ def register_command_endpoints(app):
     
     @app.route('/api/command_response', methods=['POST'])
     @require_api_key
-    def command_response(account: Account):
+    def command_response(account: AccountIdentity):
         """
         EA sends command execution result
         
@@ -332,7 +351,7 @@ def register_command_endpoints(app):
     
     @app.route('/api/disconnect', methods=['POST'])
     @require_api_key
-    def disconnect(account: Account):
+    def disconnect(account: AccountIdentity):
         """
         EA disconnection notification
         
@@ -405,7 +424,7 @@ def register_tick_endpoints(app):
     
     @app.route('/api/ticks/batch', methods=['POST'])
     @require_api_key
-    def ticks_batch(account: Account):
+    def ticks_batch(account: AccountIdentity):
         """
         Receive batch of ticks from EA
         
@@ -441,6 +460,10 @@ def register_tick_endpoints(app):
             if not ticks:
                 return jsonify({'status': 'success', 'processed': 0}), 200
             
+            # Columnar bodies arrive as a TickBlock (timestamps already UTC)
+            if isinstance(ticks, TickBlock):
+                ticks = ticks.to_dicts()
+            
             # Process ticks through core communication manager
             core_comm = get_core_comm()
             result = core_comm.process_tick_batch(account.id, ticks)
@@ -469,7 +492,7 @@ def register_trade_endpoints(app):
     
     @app.route('/api/trades/sync', methods=['POST'])
     @require_api_key
-    def trades_sync(account: Account):
+    def trades_sync(account: AccountIdentity):
         """
         Sync all open trades from EA (EA is source of truth)
         
@@ -529,7 +552,7 @@ def register_trade_endpoints(app):
     
     @app.route('/api/trades/opened', methods=['POST'])
     @require_api_key
-    def trade_opened(account: Account):
+    def trade_opened(account: AccountIdentity):
         """
         EA notifies server that a trade was opened
         
@@ -619,7 +642,7 @@ def register_trade_endpoints(app):
     
     @app.route('/api/trades/closed', methods=['POST'])
     @require_api_key
-    def trade_closed(account: Account):
+    def trade_closed(account: AccountIdentity):
         """
         EA notifies server that a trade was closed
         
@@ -698,7 +721,7 @@ def register_trade_endpoints(app):
     
     @app.route('/api/trades/modified', methods=['POST'])
     @require_api_key
-    def trade_modified(account: Account):
+    def trade_modified(account: AccountIdentity):
         """
         EA notifies server that a trade was modified
         
@@ -773,7 +796,7 @@ def register_log_endpoints(app):
     
     @app.route('/api/log', methods=['POST'])
     @require_api_key
-    def log_event(account: Account):
+    def log_event(account: AccountIdentity):
         """
         Receive log message from EA
         
@@ -39,6 +39,8 @@ from sqlalchemy import func
 from database import ScopedSession
 from models import Account, Command, Trade, Tick, Log, AccountTransaction
 from redis_client import get_redis
+from command_helper import cancel_superseded_commands, response_ticket
+from account_state import get_account_state_writer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -363,16 +365,13 @@ class CoreCommunicationManager:
                 (1 - alpha) * conn.avg_heartbeat_latency
             )
         
-        # Update database
-        with ScopedSession() as db:
-            account = db.query(Account).filter_by(id=account_id).first()
-            if account:
-                account.balance = balance
-                account.equity = equity
-                account.margin = margin
-                account.free_margin = free_margin
-                account.last_heartbeat = datetime.utcnow()
-                db.commit()
+        # Account state: Redis now, PostgreSQL via the write-behind flush
+        get_account_state_writer().update(account_id, {
+            'balance': balance,
+            'equity': equity,
+            'margin': margin,
+            'free_margin': free_margin
+        }, heartbeat=True)
         
         # Get pending commands for this account
         commands = self.get_pending_commands(account_id, limit=10)
@@ -647,12 +646,18 @@ class CoreCommunicationManager:
         with self.lock:
             self.active_commands[command_id] = cmd_exec
         
-        # Push to Redis queue for instant delivery
-        self.redis.push_command(account_id, {
+        # Push to Redis queue for instant delivery (CRITICAL jumps to the close lane)
+        superseded_id = self.redis.push_command(account_id, {
             'id': command_id,
             'type': command_type,
             **payload
-        })
+        }, lane='close' if priority == CommandPriority.CRITICAL else None)
+        if superseded_id:
+            # Replaced an undelivered MODIFY_TRADE for the same ticket
+            with ScopedSession() as db:
+                cancel_superseded_commands(db, [superseded_id], command_id)
+            with self.lock:
+                self.active_commands.pop(superseded_id, None)
         
         # Update connection metrics
         conn = self.get_connection(account_id)
@@ -673,7 +678,8 @@ class CoreCommunicationManager:
     def get_pending_commands(
         self,
         account_id: int,
-        limit: int = 10
+        limit: int = 10,
+        wait_seconds: float = 0
     ) -> List[Dict]:
         """
         Get pending commands for account from Redis queue
@@ -681,20 +687,15 @@ class CoreCommunicationManager:
         Args:
             account_id: Account ID
             limit: Maximum number of commands to return
+            wait_seconds: Block (BLPOP) up to this long if the queue is empty (long-poll)
         
         Returns:
             List of command dictionaries
         """
-        commands = []
+        # Pop commands from Redis queue (one round-trip, optionally blocking)
+        commands = self.redis.pop_commands(account_id, limit, timeout=wait_seconds)
         
-        # Pop commands from Redis queue
-        for _ in range(limit):
-            cmd = self.redis.pop_command(account_id)
-            if not cmd:
-                break
-            
-            commands.append(cmd)
-            
+        for cmd in commands:
             # Mark as executing
             cmd_id = cmd.get('id')
             if cmd_id and cmd_id in self.active_commands:
@@ -731,6 +732,7 @@ class CoreCommunicationManager:
             
             cmd.status = status
             cmd.response = response_data or {}
+            cmd.ticket = response_ticket(cmd.response)
             cmd.executed_at = datetime.utcnow()
             
             db.commit()
@@ -50,95 +50,6 @@ def get_db():
         db.close()
 
 
-def aggregate_spread_statistics(session, cutoff_time):
-    """
-    Aggregate spread statistics from ticks before deletion.
-
-    Calculates hourly spread stats (avg, min, max) grouped by symbol, hour, and day of week.
-    Stores in spread_statistics table for long-term analysis.
-
-    Args:
-        session: Database session
-        cutoff_time: Only aggregate ticks older than this time
-
-    Returns:
-        Number of aggregated records
-    """
-    from models import Tick
-    from sqlalchemy import func
-    from datetime import datetime
-
-    try:
-        # Query ticks to be deleted, grouped by symbol, hour, and day of week
-        stats_query = session.query(
-            Tick.symbol,
-            func.extract('hour', Tick.timestamp).label('hour_utc'),
-            func.extract('dow', Tick.timestamp).label('day_of_week'),
-            func.avg(Tick.spread).label('avg_spread'),
-            func.min(Tick.spread).label('min_spread'),
-            func.max(Tick.spread).label('max_spread'),
-            func.count(Tick.id).label('sample_count'),
-            func.min(Tick.timestamp).label('first_recorded'),
-            func.max(Tick.timestamp).label('last_updated')
-        ).filter(
-            Tick.timestamp < cutoff_time,
-            Tick.spread.isnot(None)
-        ).group_by(
-            Tick.symbol,
-            func.extract('hour', Tick.timestamp),
-            func.extract('dow', Tick.timestamp)
-        ).all()
-
-        aggregated_count = 0
-
-        for stat in stats_query:
-            # Insert or update spread_statistics
-            from sqlalchemy import text
-
-            upsert_sql = text("""
-                INSERT INTO spread_statistics
-                    (symbol, hour_utc, day_of_week, avg_spread, min_spread, max_spread,
-                     sample_count, first_recorded, last_updated)
-                VALUES
-                    (:symbol, :hour_utc, :day_of_week, :avg_spread, :min_spread, :max_spread,
-                     :sample_count, :first_recorded, :last_updated)
-                ON CONFLICT (symbol, hour_utc, day_of_week)
-                DO UPDATE SET
-                    avg_spread = (spread_statistics.avg_spread * spread_statistics.sample_count +
-                                 :avg_spread * :sample_count) /
-                                (spread_statistics.sample_count + :sample_count),
-                    min_spread = LEAST(spread_statistics.min_spread, :min_spread),
-                    max_spread = GREATEST(spread_statistics.max_spread, :max_spread),
-                    sample_count = spread_statistics.sample_count + :sample_count,
-                    last_updated = :last_updated
-            """)
-
-            session.execute(upsert_sql, {
-                'symbol': stat.symbol,
-                'hour_utc': int(stat.hour_utc),
-                'day_of_week': int(stat.day_of_week),
-                'avg_spread': float(stat.avg_spread),
-                'min_spread': float(stat.min_spread),
-                'max_spread': float(stat.max_spread),
-                'sample_count': stat.sample_count,
-                'first_recorded': stat.first_recorded,
-                'last_updated': stat.last_updated
-            })
-            aggregated_count += 1
-
-        session.commit()
-
-        if aggregated_count > 0:
-            logger.info(f"Aggregated {aggregated_count} spread statistics records")
-
-        return aggregated_count
-
-    except Exception as e:
-        logger.error(f"Error aggregating spread statistics: {e}", exc_info=True)
-        session.rollback()
-        return 0
-
-
 def cleanup_old_ticks(session, minutes=1):
     """Delete ticks older than specified minutes (legacy function)"""
     from models import Tick
@@ -161,6 +72,10 @@ def cleanup_old_data(session, tick_days=7, pattern_days=30):
     - H4: 14 days (weekly trends)
     - D1: 30 days (monthly trends)
 
+    When ticks/ohlc_data are partitioned (migrations/partition_time_series_tables.sql)
+    expired data is removed by dropping whole partitions (partition_manager):
+    ticks by day, M1 candles by day, other timeframes by month (365 days).
+
     Args:
         session: Database session
         tick_days: Days to keep tick data (default: 7 days)
@@ -171,15 +86,22 @@ def cleanup_old_data(session, tick_days=7, pattern_days=30):
     """
     from models import Tick, OHLCData, PatternDetection
     from datetime import datetime, timedelta
+    from partition_manager import PARTITIONED_TABLES, drop_expired_partitions, is_partitioned
+
+    ticks_partitioned = is_partitioned(session, 'ticks')
+    ohlc_partitioned = is_partitioned(session, 'ohlc_data')
 
     tick_cutoff = datetime.utcnow() - timedelta(days=tick_days)
     pattern_cutoff = datetime.utcnow() - timedelta(days=pattern_days)
 
-    # Aggregate spread statistics BEFORE deleting ticks
-    aggregated_spreads = aggregate_spread_statistics(session, tick_cutoff)
-
-    # Delete old ticks
-    deleted_ticks = session.query(Tick).filter(Tick.timestamp < tick_cutoff).delete()
+    # Delete old ticks (spread statistics are maintained on ingest, see spread_stats)
+    dropped_partitions = []
+    if ticks_partitioned:
+        result = drop_expired_partitions(session, 'ticks', tick_days)
+        dropped_partitions += result['dropped']
+        deleted_ticks = result['default_rows_deleted']
+    else:
+        deleted_ticks = session.query(Tick).filter(Tick.timestamp < tick_cutoff).delete()
 
     # Delete old OHLC data - timeframe-specific retention
     # EXTENDED for ML Training: Need 90-365 days for LSTM models
@@ -193,26 +115,37 @@ def cleanup_old_data(session, tick_days=7, pattern_days=30):
     }
 
     deleted_ohlc = 0
-    for timeframe, days in ohlc_retention.items():
-        cutoff = datetime.utcnow() - timedelta(days=days)
-        count = session.query(OHLCData).filter(
-            OHLCData.timeframe == timeframe,
-            OHLCData.timestamp < cutoff
-        ).delete(synchronize_session=False)
-        deleted_ohlc += count
+    if ohlc_partitioned:
+        # Monthly partitions hold all timeframes above M1 - one retention for all
+        ohlc_retention = {
+            'M1': ohlc_retention['M1'],
+            'M5+': PARTITIONED_TABLES['ohlc_data_hist']['retention_days']
+        }
+        for parent, days in (('ohlc_data_m1', ohlc_retention['M1']), ('ohlc_data_hist', ohlc_retention['M5+'])):
+            result = drop_expired_partitions(session, parent, days)
+            dropped_partitions += result['dropped']
+            deleted_ohlc += result['default_rows_deleted']
+    else:
+        for timeframe, days in ohlc_retention.items():
+            cutoff = datetime.utcnow() - timedelta(days=days)
+            count = session.query(OHLCData).filter(
+                OHLCData.timeframe == timeframe,
+                OHLCData.timestamp < cutoff
+            ).delete(synchronize_session=False)
+            deleted_ohlc += count
 
     # Delete old pattern detections
     deleted_patterns = session.query(PatternDetection).filter(PatternDetection.detected_at < pattern_cutoff).delete()
 
     session.commit()
 
-    logger.info(f"Cleanup completed: {deleted_ticks} ticks (>{tick_days}d), {deleted_ohlc} OHLC (timeframe-specific), {deleted_patterns} patterns (>{pattern_days}d), {aggregated_spreads} spread stats aggregated")
+    logger.info(f"Cleanup completed: {deleted_ticks} ticks (>{tick_days}d), {deleted_ohlc} OHLC (timeframe-specific), {len(dropped_partitions)} partitions dropped, {deleted_patterns} patterns (>{pattern_days}d)")
 
     return {
         'deleted_ticks': deleted_ticks,
         'deleted_ohlc': deleted_ohlc,
         'deleted_patterns': deleted_patterns,
-        'aggregated_spreads': aggregated_spreads,
+        'dropped_partitions': dropped_partitions,
         'tick_retention_days': tick_days,
         'ohlc_retention': ohlc_retention,
         'pattern_retention_days': pattern_days
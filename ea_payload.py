@@ -0,0 +1,324 @@
+"""
+EA Payload Decoding - compressed and compact request bodies from the MT5 EA
+
+The EA may send its tick batches, positions and trade syncs as:
+- JSON (default)                         Content-Type: application/json
+- MessagePack (same structure as JSON)   Content-Type: application/msgpack
+- Columnar ticks (TICK_COLUMNS_TYPE)     Content-Type: application/x-ngtb-ticks
+each optionally compressed with Content-Encoding: gzip or deflate.
+
+Which format the EA uses is negotiated in /api/connect (negotiate()); the
+server decodes whatever the request headers say, so the negotiation is only
+a hint and old EAs keep sending plain JSON.
+
+Columnar tick layout (little-endian):
+    header   '<4sBBHIi'   magic b'NGTK', version 1, flags 0,
+                          symbol count, tick count, tz_offset (seconds)
+    symbols  per symbol:  u8 length + ASCII name
+    columns  codes u16[n], bid f8[n], ask f8[n], spread f8[n] (NaN = not sent),
+             volume u32[n], timestamp f8[n] (broker local time, seconds),
+             tradeable u1[n]
+    meta     u32 length + UTF-8 JSON object (balance, equity, positions, ...)
+
+A columnar body decodes to the meta dict with 'ticks' set to a TickBlock
+(timezone correction already applied - see tick_block.py).
+
+Usage:
+    app = Flask('ticks')
+    app.request_class = EARequest     # request.get_json() decodes all formats
+"""
+
+import gzip
+import json
+import logging
+import struct
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from flask import Request
+from werkzeug.exceptions import BadRequest
+
+from tick_block import TickBlock, BROKER_OFFSET_CORRECTION
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+TICK_COLUMNS_TYPE = 'application/x-ngtb-ticks'
+
+# Format names used in the /api/connect negotiation -> Content-Type
+PAYLOAD_FORMATS = {
+    'columnar': TICK_COLUMNS_TYPE,
+    'msgpack': MSGPACK_TYPES[0],
+    'json': JSON_TYPE,
+}
+CONTENT_ENCODINGS = ('gzip', 'deflate')
+
+# Upper bound for a decompressed body (protects against compression bombs)
+MAX_DECODED_SIZE = 64 * 1024 * 1024
+
+TICK_MAGIC = b'NGTK'
+TICK_VERSION = 1
+TICK_HEADER = struct.Struct('<4sBBHIi')
+TICK_META_LENGTH = struct.Struct('<I')
+TICK_COLUMNS = (
+    ('codes', '<u2'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('spread', '<f8'),
+    ('volume', '<u4'),
+    ('timestamp', '<f8'),
+    ('tradeable', 'u1'),
+)
+
+
+class PayloadError(ValueError):
+    """Request body could not be decoded"""
+
+
+# ============================================================================
+# DECOMPRESSION
+# ============================================================================
+
+def decompress_body(body: bytes, content_encoding: Optional[str], max_size: int = MAX_DECODED_SIZE) -> bytes:
+    """
+    Undo Content-Encoding (gzip, deflate or identity)
+
+    deflate accepts both zlib-wrapped (RFC 1950) and raw (RFC 1951) streams,
+    since clients disagree on what 'deflate' means.
+    """
+    encoding = (content_encoding or 'identity').strip().lower()
+    if encoding in ('', 'identity'):
+        return body
+
+    if encoding in ('gzip', 'x-gzip'):
+        wbits_options = (16 + zlib.MAX_WBITS,)
+    elif encoding == 'deflate':
+        wbits_options = (zlib.MAX_WBITS, -zlib.MAX_WBITS)
+    else:
+        raise PayloadError(f"Unsupported Content-Encoding: {content_encoding}")
+
+    for wbits in wbits_options:
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            data = decompressor.decompress(body, max_size)
+        except zlib.error:
+            continue
+        if decompressor.unconsumed_tail:
+            raise PayloadError(f"Decoded body exceeds {max_size} bytes")
+        if not decompressor.eof:
+            raise PayloadError("Truncated compressed body")
+        return data
+
+    raise PayloadError(f"Invalid {encoding} body")
+
+
+def compress_body(body: bytes, content_encoding: str) -> bytes:
+    """Apply Content-Encoding (reference for the EA side and tests)"""
+    if content_encoding == 'gzip':
+        return gzip.compress(body)
+    if content_encoding == 'deflate':
+        return zlib.compress(body)
+    return body
+
+
+# ============================================================================
+# COLUMNAR TICKS
+# ============================================================================
+
+def encode_tick_columns(ticks: List[Dict], tz_offset: int = 0, meta: Optional[Dict] = None) -> bytes:
+    """
+    Encode EA tick dicts in the columnar layout (reference encoder for the EA)
+
+    Args:
+        ticks: Tick dicts (symbol, bid, ask, optional spread/volume/tradeable,
+               timestamp in broker local time)
+        tz_offset: TimeGMTOffset() of the batch (seconds)
+        meta: Remaining payload fields (balance, positions, ...)
+    """
+    symbol_codes: Dict[str, int] = {}
+    codes = [symbol_codes.setdefault(t['symbol'], len(symbol_codes)) for t in ticks]
+
+    columns = {
+        'codes': codes,
+        'bid': [t['bid'] for t in ticks],
+        'ask': [t['ask'] for t in ticks],
+        'spread': [np.nan if t.get('spread') is None else t['spread'] for t in ticks],
+        'volume': [t.get('volume') or 0 for t in ticks],
+        'timestamp': [t['timestamp'] for t in ticks],
+        'tradeable': [t.get('tradeable', True) is not False for t in ticks],
+    }
+
+    parts = [TICK_HEADER.pack(TICK_MAGIC, TICK_VERSION, 0, len(symbol_codes), len(ticks), tz_offset)]
+    for symbol in symbol_codes:
+        name = symbol.encode('ascii')
+        parts.append(struct.pack('<B', len(name)) + name)
+    for name, dtype in TICK_COLUMNS:
+        parts.append(np.asarray(columns[name]).astype(dtype).tobytes())
+
+    meta_bytes = json.dumps(meta or {}).encode('utf-8')
+    parts.append(TICK_META_LENGTH.pack(len(meta_bytes)) + meta_bytes)
+    return b''.join(parts)
+
+
+def decode_tick_columns(body: bytes, offset_correction: int = BROKER_OFFSET_CORRECTION) -> Dict:
+    """
+    Decode a columnar tick body
+
+    Returns:
+        Meta dict with 'ticks' set to a TickBlock (UTC timestamps)
+    """
+    if len(body) < TICK_HEADER.size:
+        raise PayloadError("Columnar body shorter than header")
+
+    magic, version, _flags, symbol_count, count, tz_offset = TICK_HEADER.unpack_from(body, 0)
+    if magic != TICK_MAGIC:
+        raise PayloadError("Not a columnar tick body (bad magic)")
+    if version != TICK_VERSION:
+        raise PayloadError(f"Unsupported columnar tick version {version}")
+
+    try:
+        pos = TICK_HEADER.size
+        symbols = []
+        for _ in range(symbol_count):
+            length = body[pos]
+            symbols.append(body[pos + 1:pos + 1 + length].decode('ascii'))
+            pos += 1 + length
+
+        columns = {}
+        for name, dtype in TICK_COLUMNS:
+            size = np.dtype(dtype).itemsize * count
+            if pos + size > len(body):
+                raise PayloadError(f"Columnar body truncated in column '{name}'")
+            columns[name] = np.frombuffer(body, dtype=dtype, count=count, offset=pos)
+            pos += size
+
+        (meta_length,) = TICK_META_LENGTH.unpack_from(body, pos)
+        pos += TICK_META_LENGTH.size
+        meta = json.loads(body[pos:pos + meta_length].decode('utf-8')) if meta_length else {}
+    except (IndexError, struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise PayloadError(f"Malformed columnar tick body: {e}")
+
+    codes = columns['codes'].astype(np.int64)
+    if count and codes.max() >= len(symbols):
+        raise PayloadError("Columnar tick body references unknown symbol")
+
+    bid = columns['bid']
+    ask = columns['ask']
+    spread = columns['spread']
+    block = TickBlock(
+        symbols,
+        codes,
+        bid,
+        ask,
+        np.where(np.isnan(spread), ask - bid, spread),
+        columns['volume'].astype(np.int64),
+        columns['timestamp'] + tz_offset + offset_correction,
+        columns['tradeable'].astype(bool)
+    )
+
+    valid = (bid > 0) & (ask > 0) & (columns['timestamp'] > 0)
+    if not valid.all():
+        block = block.take(np.flatnonzero(valid))
+
+    if not isinstance(meta, dict):
+        raise PayloadError("Columnar tick meta must be a JSON object")
+    meta['ticks'] = block
+    return meta
+
+
+# ============================================================================
+# DISPATCH
+# ============================================================================
+
+def decode_payload(body: bytes, content_type: Optional[str], content_encoding: Optional[str] = None):
+    """
+    Decode a request body according to its Content-Type / Content-Encoding
+
+    Returns:
+        Decoded payload (dict for all EA requests)
+    """
+    data = decompress_body(body, content_encoding)
+    mimetype = (content_type or JSON_TYPE).split(';')[0].strip().lower()
+
+    if mimetype == TICK_COLUMNS_TYPE:
+        return decode_tick_columns(data)
+
+    if mimetype in MSGPACK_TYPES:
+        if msgpack is None:
+            raise PayloadError("MessagePack body received but msgpack is not installed")
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise PayloadError(f"Invalid MessagePack body: {e}")
+
+    try:
+        return json.loads(data)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise PayloadError(f"Invalid JSON body: {e}")
+
+
+def supported_formats() -> List[str]:
+    """Payload formats this server can decode (preferred first)"""
+    return [name for name in PAYLOAD_FORMATS if name != 'msgpack' or msgpack is not None]
+
+
+def negotiate(offered_formats: Optional[Iterable[str]] = None,
+              offered_encodings: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Choose payload format and compression for an EA connection
+
+    Args:
+        offered_formats: Formats the EA can send, in its order of preference
+        offered_encodings: Content-Encodings the EA can apply
+
+    Returns:
+        {'format', 'content_type', 'content_encoding', 'supported_formats', 'supported_encodings'}
+        (JSON without compression if nothing matches)
+    """
+    supported = supported_formats()
+    chosen_format = next((f for f in (offered_formats or []) if f in supported), 'json')
+    chosen_encoding = next((e for e in (offered_encodings or []) if e in CONTENT_ENCODINGS), 'identity')
+
+    return {
+        'format': chosen_format,
+        'content_type': PAYLOAD_FORMATS[chosen_format],
+        'content_encoding': chosen_encoding,
+        'supported_formats': supported,
+        'supported_encodings': list(CONTENT_ENCODINGS)
+    }
+
+
+class EARequest(Request):
+    """
+    Flask request whose get_json() also decodes compressed, MessagePack and
+    columnar bodies, so endpoint code stays unchanged
+    """
+
+    _ea_payload = None
+
+    def get_json(self, force=False, silent=False, cache=True):
+        encoding = (self.headers.get('Content-Encoding') or 'identity').lower()
+        if encoding == 'identity' and self.mimetype not in MSGPACK_TYPES + (TICK_COLUMNS_TYPE,):
+            return super().get_json(force=force, silent=silent, cache=cache)
+
+        if cache and self._ea_payload is not None:
+            return self._ea_payload
+
+        try:
+            payload = decode_payload(self.get_data(cache=cache), self.mimetype, encoding)
+        except PayloadError as e:
+            if silent:
+                return None
+            logger.warning(f"Could not decode {self.mimetype} ({encoding}) body on {self.path}: {e}")
+            raise BadRequest(str(e))
+
+        if cache:
+            self._ea_payload = payload
+        return payload
@@ -15,8 +15,9 @@ import logging
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, column, table as sa_table
 from database import get_db_connection
+from ohlc_writer import bulk_insert_ohlc
 import MetaTrader5 as mt5
 import requests
 from io import BytesIO
@@ -242,17 +243,18 @@ class HistoricalDataManager:
             return 0
 
         try:
-            # Use ON CONFLICT to handle duplicates
-            df.to_sql(
-                'historical_ohlc',
-                self.engine,
-                if_exists='append',
-                index=False,
-                method='multi'
-            )
-
-            logger.info(f"✅ Stored {len(df)} rows in database")
-            return len(df)
+            # Multi-row INSERT ... ON CONFLICT DO NOTHING (re-downloads skip existing bars)
+            table = sa_table('historical_ohlc', *[column(c) for c in df.columns])
+            records = df.astype(object).where(pd.notna(df), None).to_dict('records')
+
+            with self.engine.begin() as conn:
+                result = bulk_insert_ohlc(
+                    conn, records, table=table,
+                    conflict_columns=('time', 'symbol', 'timeframe')
+                )
+
+            logger.info(f"✅ Stored {result['imported']} rows in database ({result['skipped']} already present)")
+            return result['imported']
 
         except Exception as e:
             logger.error(f"Error storing data: {e}")
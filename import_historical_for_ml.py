@@ -24,7 +24,7 @@ import argparse
 from datetime import datetime, timedelta
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from models import OHLCData
+from ohlc_writer import bulk_insert_ohlc, candle_rows
 import logging
 import requests
 import time
@@ -46,6 +46,9 @@ Session = sessionmaker(bind=engine)
 # MT5 API endpoint (local Flask server)
 MT5_API_URL = os.getenv('MT5_API_URL', 'http://localhost:9905')
 
+# Candles per INSERT ... ON CONFLICT transaction
+BULK_COMMIT_ROWS = 10000
+
 
 def fetch_ohlc_from_mt5_api(symbol, timeframe, count=10000):
     """
@@ -109,9 +112,8 @@ def store_ohlc_batch(db, symbol, timeframe, ohlc_data):
     if not ohlc_data:
         return 0
 
-    stored = 0
-    skipped = 0
-
+    timestamps = []
+    candles = []
     for candle in ohlc_data:
         try:
             # Parse timestamp
@@ -123,41 +125,25 @@ def store_ohlc_batch(db, symbol, timeframe, ohlc_data):
                 timestamp = datetime.fromtimestamp(candle['time'])
             else:
                 timestamp = candle['time']
-
-            # Check if candle already exists
-            existing = db.query(OHLCData).filter(
-                OHLCData.symbol == symbol,
-                OHLCData.timeframe == timeframe,
-                OHLCData.timestamp == timestamp
-            ).first()
-
-            if not existing:
-                ohlc = OHLCData(
-                    symbol=symbol,
-                    timeframe=timeframe,
-                    timestamp=timestamp,
-                    open=float(candle['open']),
-                    high=float(candle['high']),
-                    low=float(candle['low']),
-                    close=float(candle['close']),
-                    volume=int(candle.get('volume', 0))
-                )
-                db.add(ohlc)
-                stored += 1
-
-                # Commit in batches to avoid memory issues
-                if stored % 1000 == 0:
-                    db.commit()
-                    logger.info(f"    💾 Committed {stored} candles so far...")
-            else:
-                skipped += 1
-
         except Exception as e:
-            logger.error(f"Error storing candle: {e}")
+            logger.error(f"Error parsing candle time: {e}")
             continue
 
-    # Final commit
-    db.commit()
+        timestamps.append(timestamp)
+        candles.append(candle)
+
+    # Multi-row INSERT ... ON CONFLICT DO NOTHING, committed per chunk
+    stored = 0
+    skipped = len(ohlc_data) - len(candles)
+    rows = candle_rows(symbol, timeframe, candles, timestamps)
+
+    for i in range(0, len(rows), BULK_COMMIT_ROWS):
+        result = bulk_insert_ohlc(db, rows[i:i + BULK_COMMIT_ROWS])
+        db.commit()
+        stored += result['imported']
+        skipped += result['skipped']
+        if len(rows) > BULK_COMMIT_ROWS:
+            logger.info(f"    💾 Committed {stored} candles so far...")
 
     logger.info(f"    ✅ Stored {stored} new candles, skipped {skipped} duplicates")
     return stored
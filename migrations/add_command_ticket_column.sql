@@ -0,0 +1,19 @@
+-- Migration: Indexed ticket column on commands
+-- Purpose: /api/trades/sync resolves command_id and initial SL/TP per ticket.
+--          Matching on response->>'ticket' cannot use an index; the ticket is
+--          now stored in its own column when the EA response arrives
+--          (command_response / update_command_status / CoreCommunication)
+
+ALTER TABLE commands ADD COLUMN IF NOT EXISTS ticket BIGINT;
+
+COMMENT ON COLUMN commands.ticket IS 'Position ticket from the EA response (response->>''ticket'')';
+
+-- Backfill existing responses
+UPDATE commands
+SET ticket = (response->>'ticket')::BIGINT
+WHERE ticket IS NULL
+  AND response->>'ticket' ~ '^[1-9][0-9]*$';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_commands_account_ticket
+    ON commands (account_id, ticket)
+    WHERE ticket IS NOT NULL;
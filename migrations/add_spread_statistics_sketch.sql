@@ -0,0 +1,12 @@
+-- Migration: Streaming spread statistics (spread_stats.py)
+-- Purpose: Persist the full accumulator state per (symbol, day_of_week, hour)
+--          so the web server can resume it after a restart
+
+ALTER TABLE spread_statistics ADD COLUMN IF NOT EXISTS p95_spread NUMERIC(10, 5);
+ALTER TABLE spread_statistics ADD COLUMN IF NOT EXISTS spread_sum DOUBLE PRECISION;
+ALTER TABLE spread_statistics ADD COLUMN IF NOT EXISTS spread_sum_sq DOUBLE PRECISION;
+ALTER TABLE spread_statistics ADD COLUMN IF NOT EXISTS sketch JSONB;
+
+COMMENT ON COLUMN spread_statistics.spread_sum IS 'Sum of all sampled spreads (exact average = spread_sum / sample_count)';
+COMMENT ON COLUMN spread_statistics.spread_sum_sq IS 'Sum of squared spreads (for standard deviation)';
+COMMENT ON COLUMN spread_statistics.sketch IS 'Log-bucket quantile sketch {z: zero count, b: {bucket: count}}';
@@ -0,0 +1,23 @@
+-- Unique index that lets the tick writer use INSERT ... ON CONFLICT DO NOTHING
+-- A redelivered tick (a stream entry re-claimed after a writer crashed before
+-- XACK) has the same Redis stream entry ID and position within the entry.
+-- Quote content is NOT a key: timestamps have one-second resolution, so real
+-- ticks that repeat a quote within the same second (with their volume) must
+-- all be kept.
+--
+-- timestamp is part of the index so it stays valid once ticks is partitioned
+-- by timestamp (partition_time_series_tables.sql). Rows written directly to
+-- PostgreSQL (Redis unavailable) and existing rows have NULL stream_id and
+-- never conflict.
+
+ALTER TABLE ticks ADD COLUMN IF NOT EXISTS stream_id VARCHAR(32);
+ALTER TABLE ticks ADD COLUMN IF NOT EXISTS stream_seq INTEGER;
+
+COMMENT ON COLUMN ticks.stream_id IS 'Redis tick stream entry ID the tick was read from';
+COMMENT ON COLUMN ticks.stream_seq IS 'Position of the tick within its stream entry';
+
+-- Replaced quote-based index from an earlier version of this migration
+DROP INDEX CONCURRENTLY IF EXISTS uq_ticks_symbol_timestamp_quote;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_ticks_stream_entry
+    ON ticks (stream_id, stream_seq, timestamp);
@@ -0,0 +1,52 @@
+-- Migration: spread_statistics day_of_week to 0=Monday
+-- Purpose: Rows written by the removed database.aggregate_spread_statistics
+--          used PostgreSQL extract('dow') (0=Sunday, 6=Saturday). The
+--          streaming tracker (spread_stats.py) keys baselines by Python
+--          weekday() (0=Monday, 6=Sunday), as the column comment says.
+--          Legacy rows are the ones without spread_sum; they are moved to
+--          (day_of_week + 6) % 7 and get spread_sum/spread_sum_sq backfilled
+--          from avg_spread * sample_count, which also marks them converted.
+--          spread_stats refuses to load baselines while legacy rows exist.
+-- Requires: migrations/add_spread_statistics_sketch.sql
+-- Idempotent: a second run finds no rows without spread_sum.
+
+BEGIN;
+
+-- Shifting in place would collide on unique_spread_stat mid-statement
+CREATE TEMP TABLE legacy_spread_statistics ON COMMIT DROP AS
+SELECT * FROM spread_statistics WHERE spread_sum IS NULL;
+
+DELETE FROM spread_statistics WHERE spread_sum IS NULL;
+
+INSERT INTO spread_statistics
+    (symbol, hour_utc, day_of_week, avg_spread, min_spread, max_spread, median_spread,
+     p95_spread, sample_count, spread_sum, spread_sum_sq, sketch, first_recorded, last_updated)
+SELECT
+    symbol,
+    hour_utc,
+    (day_of_week + 6) % 7,
+    avg_spread,
+    min_spread,
+    max_spread,
+    median_spread,
+    p95_spread,
+    COALESCE(sample_count, 0),
+    COALESCE(avg_spread, 0) * COALESCE(sample_count, 0),
+    COALESCE(avg_spread, 0) * COALESCE(avg_spread, 0) * COALESCE(sample_count, 0),
+    NULL,
+    first_recorded,
+    last_updated
+FROM legacy_spread_statistics
+-- Slot already written by the tracker: add the legacy samples to it
+ON CONFLICT (symbol, hour_utc, day_of_week) DO UPDATE SET
+    sample_count = spread_statistics.sample_count + EXCLUDED.sample_count,
+    spread_sum = spread_statistics.spread_sum + EXCLUDED.spread_sum,
+    spread_sum_sq = spread_statistics.spread_sum_sq + EXCLUDED.spread_sum_sq,
+    avg_spread = (spread_statistics.spread_sum + EXCLUDED.spread_sum)
+                 / NULLIF(spread_statistics.sample_count + EXCLUDED.sample_count, 0),
+    min_spread = LEAST(spread_statistics.min_spread, EXCLUDED.min_spread),
+    max_spread = GREATEST(spread_statistics.max_spread, EXCLUDED.max_spread),
+    first_recorded = LEAST(spread_statistics.first_recorded, EXCLUDED.first_recorded),
+    last_updated = GREATEST(spread_statistics.last_updated, EXCLUDED.last_updated);
+
+COMMIT;
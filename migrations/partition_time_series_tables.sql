@@ -0,0 +1,207 @@
+-- Declarative range partitioning for time-series tables
+--
+--   ticks                 RANGE (timestamp), daily partitions     ticks_pYYYYMMDD
+--   ohlc_data             LIST (timeframe)
+--     ohlc_data_m1          'M1'    -> RANGE (timestamp), daily  ohlc_data_m1_pYYYYMMDD
+--     ohlc_data_hist        DEFAULT -> RANGE (timestamp), monthly ohlc_data_hist_pYYYYMM
+--   trade_history_events  RANGE (timestamp), monthly partitions  trade_history_events_pYYYYMM
+--   logs                  RANGE (timestamp), monthly partitions  logs_pYYYYMM
+--
+-- Every range-partitioned table also gets a <name>_default partition for rows
+-- outside the created ranges (e.g. old history imports).
+--
+-- Retention drops whole partitions (partition_manager.py), future partitions
+-- are created ahead of time by the same module. Partition names must match
+-- partition_manager.partition_name().
+--
+-- Run AFTER add_ticks_dedup_index.sql (the unique tick index is rebuilt here).
+-- Stop the server and workers while this runs - each table is rewritten once.
+
+-- ============================================================================
+-- HELPERS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION create_time_partitions(
+    parent TEXT, step TEXT, from_ts TIMESTAMP, to_ts TIMESTAMP
+) RETURNS INTEGER AS $$
+DECLARE
+    period_start TIMESTAMP;
+    period_end TIMESTAMP;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    period_start := date_trunc(CASE step WHEN 'daily' THEN 'day' ELSE 'month' END, from_ts);
+
+    WHILE period_start < to_ts LOOP
+        IF step = 'daily' THEN
+            period_end := period_start + INTERVAL '1 day';
+            part_name := parent || '_p' || to_char(period_start, 'YYYYMMDD');
+        ELSE
+            period_end := period_start + INTERVAL '1 month';
+            part_name := parent || '_p' || to_char(period_start, 'YYYYMM');
+        END IF;
+
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            part_name, parent, period_start, period_end
+        );
+        created := created + 1;
+        period_start := period_end;
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move the id sequence to the new table, then re-create the legacy table's
+-- secondary indexes on it (same names, so existing queries/plans are unchanged).
+-- Unique indexes that do not contain the partition key cannot exist on a
+-- partitioned table and are skipped with a NOTICE.
+CREATE OR REPLACE FUNCTION finish_partitioned_copy(legacy TEXT, target TEXT) RETURNS VOID AS $$
+DECLARE
+    seq TEXT;
+    idx RECORD;
+BEGIN
+    seq := pg_get_serial_sequence(legacy, 'id');
+    IF seq IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', seq, target);
+    END IF;
+
+    CREATE TEMP TABLE legacy_indexes AS
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = legacy AND indexname NOT LIKE '%_pkey';
+
+    EXECUTE format('DROP TABLE %I', legacy);
+
+    FOR idx IN SELECT * FROM legacy_indexes LOOP
+        BEGIN
+            EXECUTE replace(idx.indexdef, format(' ON public.%s ', legacy), format(' ON public.%s ', target));
+        EXCEPTION WHEN OTHERS THEN
+            RAISE NOTICE 'Skipped index % on %: %', idx.indexname, target, SQLERRM;
+        END;
+    END LOOP;
+
+    DROP TABLE legacy_indexes;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- TICKS (daily)
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE ticks RENAME TO ticks_legacy;
+
+CREATE TABLE ticks (LIKE ticks_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (timestamp);
+CREATE TABLE ticks_default PARTITION OF ticks DEFAULT;
+
+SELECT create_time_partitions(
+    'ticks', 'daily',
+    COALESCE((SELECT min(timestamp) FROM ticks_legacy), now()::timestamp),
+    now()::timestamp + INTERVAL '7 days'
+);
+
+INSERT INTO ticks SELECT * FROM ticks_legacy;
+
+SELECT finish_partitioned_copy('ticks_legacy', 'ticks');
+ALTER TABLE ticks ADD PRIMARY KEY (id, timestamp);
+
+COMMIT;
+
+-- ============================================================================
+-- OHLC_DATA (M1 daily, other timeframes monthly)
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE ohlc_data RENAME TO ohlc_data_legacy;
+
+CREATE TABLE ohlc_data (LIKE ohlc_data_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY LIST (timeframe);
+CREATE TABLE ohlc_data_m1 PARTITION OF ohlc_data FOR VALUES IN ('M1')
+    PARTITION BY RANGE (timestamp);
+CREATE TABLE ohlc_data_hist PARTITION OF ohlc_data DEFAULT
+    PARTITION BY RANGE (timestamp);
+CREATE TABLE ohlc_data_m1_default PARTITION OF ohlc_data_m1 DEFAULT;
+CREATE TABLE ohlc_data_hist_default PARTITION OF ohlc_data_hist DEFAULT;
+
+SELECT create_time_partitions(
+    'ohlc_data_m1', 'daily',
+    COALESCE((SELECT min(timestamp) FROM ohlc_data_legacy WHERE timeframe = 'M1'), now()::timestamp),
+    now()::timestamp + INTERVAL '7 days'
+);
+SELECT create_time_partitions(
+    'ohlc_data_hist', 'monthly',
+    COALESCE((SELECT min(timestamp) FROM ohlc_data_legacy WHERE timeframe <> 'M1'), now()::timestamp),
+    now()::timestamp + INTERVAL '2 months'
+);
+
+INSERT INTO ohlc_data SELECT * FROM ohlc_data_legacy;
+
+SELECT finish_partitioned_copy('ohlc_data_legacy', 'ohlc_data');
+ALTER TABLE ohlc_data ADD PRIMARY KEY (id, timeframe, timestamp);
+
+COMMIT;
+
+-- ============================================================================
+-- TRADE_HISTORY_EVENTS (monthly)
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE trade_history_events RENAME TO trade_history_events_legacy;
+
+CREATE TABLE trade_history_events (LIKE trade_history_events_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (timestamp);
+CREATE TABLE trade_history_events_default PARTITION OF trade_history_events DEFAULT;
+
+SELECT create_time_partitions(
+    'trade_history_events', 'monthly',
+    COALESCE((SELECT min(timestamp) FROM trade_history_events_legacy), now()::timestamp),
+    now()::timestamp + INTERVAL '2 months'
+);
+
+INSERT INTO trade_history_events SELECT * FROM trade_history_events_legacy;
+
+SELECT finish_partitioned_copy('trade_history_events_legacy', 'trade_history_events');
+ALTER TABLE trade_history_events ADD PRIMARY KEY (id, timestamp);
+ALTER TABLE trade_history_events
+    ADD CONSTRAINT trade_history_events_trade_id_fkey
+    FOREIGN KEY (trade_id) REFERENCES trades(id) ON DELETE CASCADE;
+
+COMMIT;
+
+-- ============================================================================
+-- LOGS (monthly)
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE logs RENAME TO logs_legacy;
+
+CREATE TABLE logs (LIKE logs_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (timestamp);
+CREATE TABLE logs_default PARTITION OF logs DEFAULT;
+
+SELECT create_time_partitions(
+    'logs', 'monthly',
+    COALESCE((SELECT min(timestamp) FROM logs_legacy), now()::timestamp),
+    now()::timestamp + INTERVAL '2 months'
+);
+
+INSERT INTO logs SELECT * FROM logs_legacy;
+
+SELECT finish_partitioned_copy('logs_legacy', 'logs');
+ALTER TABLE logs ADD PRIMARY KEY (id, timestamp);
+ALTER TABLE logs
+    ADD CONSTRAINT logs_account_id_fkey
+    FOREIGN KEY (account_id) REFERENCES accounts(id);
+
+COMMIT;
+
+ANALYZE ticks;
+ANALYZE ohlc_data;
+ANALYZE trade_history_events;
+ANALYZE logs;
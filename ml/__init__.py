@@ -8,6 +8,8 @@ Components:
 - ml_confidence_model.py: XGBoost-based confidence scoring
 - ml_model_manager.py: Model lifecycle management
 - ml_training_pipeline.py: Automated training & retraining
+- ml_prediction_writer.py: Write-behind queue for prediction logging
+- ml_dataset_store.py: Incremental Parquet training dataset (by symbol / month)
 - ml_ensemble.py: Multi-model voting (when LSTM available)
 
 CPU-Only (Phase 1):
@@ -21,11 +21,16 @@ Usage:
 
     confidence = model.predict(features)
     # Returns: float 0-1 (e.g., 0.75 = 75% confidence)
+
+    # Hyperparameter search (successive halving, parallel trials)
+    search = model.tune(symbol='EURUSD', days_back=90, n_trials=27)
+    model.train(symbol='EURUSD', days_back=90)  # uses model.params = best config
 """
 
 import logging
 import os
 import pickle
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import numpy as np
@@ -95,11 +100,24 @@ class XGBoostConfidenceModel:
         'verbosity': 1
     }
 
+    # Hyperparameter search space for tune() (sampled randomly per trial)
+    SEARCH_SPACE = {
+        'max_depth': [3, 4, 5, 6, 7, 8],
+        'learning_rate': (0.02, 0.3),        # log-uniform
+        'min_child_weight': [1, 3, 5, 10],
+        'gamma': [0, 0.1, 0.5, 1.0],
+        'subsample': (0.6, 1.0),             # uniform
+        'colsample_bytree': (0.5, 1.0),      # uniform
+        'reg_lambda': [0.5, 1.0, 2.0, 5.0],
+    }
+    LOG_UNIFORM_PARAMS = {'learning_rate'}
+
     def __init__(
         self,
         db: Session,
         account_id: int = 1,
-        model_dir: str = 'ml_models/xgboost'
+        model_dir: str = 'ml_models/xgboost',
+        params: Optional[Dict] = None
     ):
         """
         Initialize XGBoost Confidence Model
@@ -108,6 +126,7 @@ class XGBoostConfidenceModel:
             db: Database session
             account_id: Account ID
             model_dir: Directory to save/load models
+            params: Hyperparameters overriding DEFAULT_PARAMS (e.g. a tuned config)
         """
         if not ML_AVAILABLE:
             raise ImportError("XGBoost/sklearn required. Run: pip install xgboost scikit-learn")
@@ -116,6 +135,7 @@ class XGBoostConfidenceModel:
         self.account_id = account_id
         self.model_dir = model_dir
         self.feature_engineer = FeatureEngineer(db, account_id)
+        self.params = {**self.DEFAULT_PARAMS, **(params or {})}
 
         # Model components
         self.model = None
@@ -132,21 +152,97 @@ class XGBoostConfidenceModel:
         self,
         symbol: Optional[str] = None,
         days_back: int = 90,
-        min_trades: int = 100
+        min_trades: int = 100,
+        use_dataset_store: bool = True
     ) -> Tuple[pd.DataFrame, pd.Series]:
         """
         Prepare training data from historical trades
 
+        With use_dataset_store (and pyarrow installed) newly closed trades are
+        appended to the Parquet TrainingDatasetStore and the training rows are
+        read from there; otherwise features are extracted from Postgres for
+        every trade.
+
         Args:
             symbol: Optional symbol filter (None = all symbols)
             days_back: Days of history to use
             min_trades: Minimum trades required
+            use_dataset_store: Read from the incremental dataset store
 
         Returns:
             (X_features, y_labels)
         """
         logger.info(f"Preparing training data (symbol={symbol}, days={days_back})")
 
+        X = None
+        if use_dataset_store:
+            X, y = self._load_from_dataset_store(symbol, days_back)
+
+        if X is None:
+            X, y = self._extract_from_database(symbol, days_back, min_trades)
+
+        if len(X) < min_trades:
+            raise ValueError(
+                f"Insufficient training data: {len(X)} trades (minimum: {min_trades}). "
+                f"Collect more trade history before training."
+            )
+
+        # Handle missing values (fill with 0)
+        X = X.fillna(0)
+
+        # Encode categorical features (convert strings to numeric)
+        from sklearn.preprocessing import LabelEncoder
+        self.label_encoders = {}  # Reset encoders
+        for col in X.columns:
+            if X[col].dtype == 'object':  # String column
+                # Use label encoding for categorical features
+                le = LabelEncoder()
+                X[col] = le.fit_transform(X[col].astype(str))
+                self.label_encoders[col] = le  # Store encoder for prediction
+                logger.info(f"Encoded categorical feature: {col} ({len(le.classes_)} categories)")
+
+        # Store feature names
+        self.feature_names = list(X.columns)
+
+        logger.info(f"Training data prepared: {len(X)} samples, {len(X.columns)} features")
+        logger.info(f"Class distribution: {y.value_counts().to_dict()}")
+
+        return X, y
+
+    def _load_from_dataset_store(
+        self,
+        symbol: Optional[str],
+        days_back: int
+    ) -> Tuple[Optional[pd.DataFrame], Optional[pd.Series]]:
+        """
+        Append new trades to the dataset store and read training rows from it
+
+        Returns:
+            (X, y) or (None, None) if the store is unavailable
+        """
+        try:
+            from ml.ml_dataset_store import TrainingDatasetStore, PARQUET_AVAILABLE
+            if not PARQUET_AVAILABLE:
+                return None, None
+
+            store = TrainingDatasetStore(account_id=self.account_id)
+            store.append_new_trades(self.db)
+            X, y = store.load(symbol=symbol, days_back=days_back)
+
+            logger.info(f"Loaded {len(X)} rows from dataset store")
+            return X.copy(), y.reset_index(drop=True)
+
+        except Exception as e:
+            logger.warning(f"Dataset store unavailable, extracting from database: {e}")
+            return None, None
+
+    def _extract_from_database(
+        self,
+        symbol: Optional[str],
+        days_back: int,
+        min_trades: int
+    ) -> Tuple[pd.DataFrame, pd.Series]:
+        """Extract features for every closed trade from Postgres (no store)"""
         cutoff_date = datetime.utcnow() - timedelta(days=days_back)
 
         # Query closed trades
@@ -160,7 +256,8 @@ class XGBoostConfidenceModel:
         if symbol:
             query = query.filter(Trade.symbol == symbol)
 
-        trades = query.all()
+        # Time-ordered (tune() validates on the most recent trades)
+        trades = query.order_by(Trade.close_time.asc(), Trade.id.asc()).all()
 
         if len(trades) < min_trades:
             raise ValueError(
@@ -203,30 +300,7 @@ class XGBoostConfidenceModel:
             logger.warning(f"Skipped {skipped} trades due to missing data")
 
         # Convert to DataFrame
-        X = pd.DataFrame(X_data)
-        y = pd.Series(y_data)
-
-        # Handle missing values (fill with 0)
-        X = X.fillna(0)
-
-        # Encode categorical features (convert strings to numeric)
-        from sklearn.preprocessing import LabelEncoder
-        self.label_encoders = {}  # Reset encoders
-        for col in X.columns:
-            if X[col].dtype == 'object':  # String column
-                # Use label encoding for categorical features
-                le = LabelEncoder()
-                X[col] = le.fit_transform(X[col].astype(str))
-                self.label_encoders[col] = le  # Store encoder for prediction
-                logger.info(f"Encoded categorical feature: {col} ({len(le.classes_)} categories)")
-
-        # Store feature names
-        self.feature_names = list(X.columns)
-
-        logger.info(f"Training data prepared: {len(X)} samples, {len(X.columns)} features")
-        logger.info(f"Class distribution: {y.value_counts().to_dict()}")
-
-        return X, y
+        return pd.DataFrame(X_data), pd.Series(y_data)
 
     def train(
         self,
@@ -273,7 +347,7 @@ class XGBoostConfidenceModel:
 
         # Train XGBoost
         logger.info("Training XGBoost...")
-        self.model = xgb.XGBClassifier(**self.DEFAULT_PARAMS)
+        self.model = xgb.XGBClassifier(**self._classifier_params())
 
         self.model.fit(
             X_train_scaled, y_train,
@@ -369,6 +443,170 @@ class XGBoostConfidenceModel:
 
         return results
 
+    def _classifier_params(self) -> Dict:
+        """XGBClassifier kwargs from self.params (search metadata stripped)"""
+        return {k: v for k, v in self.params.items() if not k.startswith('tune_') and k != 'tuned'}
+
+    def _sample_params(self, rng: np.random.RandomState) -> Dict:
+        """Draw one random configuration from SEARCH_SPACE"""
+        params = {}
+        for name, space in self.SEARCH_SPACE.items():
+            if isinstance(space, list):
+                params[name] = space[rng.randint(len(space))]
+            elif name in self.LOG_UNIFORM_PARAMS:
+                params[name] = float(np.exp(rng.uniform(np.log(space[0]), np.log(space[1]))))
+            else:
+                params[name] = float(rng.uniform(space[0], space[1]))
+        return params
+
+    @staticmethod
+    def _native_params(params: Dict, nthread: int) -> Dict:
+        """Convert XGBClassifier-style params to xgb.train params"""
+        native = {
+            'objective': 'binary:logistic',
+            'eval_metric': 'logloss',
+            'tree_method': 'hist',
+            'nthread': nthread,
+            'verbosity': 0,
+            'seed': 42
+        }
+        native.update({k: v for k, v in params.items() if k != 'n_estimators'})
+        return native
+
+    def tune(
+        self,
+        symbol: Optional[str] = None,
+        days_back: int = 90,
+        n_trials: int = 27,
+        min_rounds: int = 50,
+        max_rounds: int = 450,
+        reduction_factor: int = 3,
+        early_stopping_rounds: int = 20,
+        validation_fraction: float = 0.2,
+        n_workers: Optional[int] = None,
+        seed: int = 42
+    ) -> Dict:
+        """
+        Successive-halving random search over SEARCH_SPACE
+
+        Trials run in parallel threads (xgboost releases the GIL) and share one
+        training and one validation DMatrix. Validation is the most recent
+        `validation_fraction` of trades (time-ordered, no shuffling), with early
+        stopping on validation logloss. Each rung keeps the best
+        1/reduction_factor configs and multiplies the boosting budget by
+        reduction_factor, up to max_rounds.
+
+        The best config (with n_estimators = best iteration) becomes self.params,
+        so a following train()/save() uses and stores it.
+
+        Args:
+            symbol: Optional symbol filter
+            days_back: Days of history
+            n_trials: Number of random configurations in the first rung
+            min_rounds: Boosting rounds per trial in the first rung
+            max_rounds: Maximum boosting rounds in the last rung
+            reduction_factor: Keep 1/reduction_factor of configs per rung
+            early_stopping_rounds: Stop a trial after N rounds without improvement
+            validation_fraction: Most recent fraction of trades used for validation
+            n_workers: Parallel trials (default: CPU count, max 8)
+            seed: Random seed for sampling
+
+        Returns:
+            Dict with best_params, best_score, best_iteration and all trials
+        """
+        logger.info(f"\n{'='*60}")
+        logger.info(f"XGBOOST HYPERPARAMETER SEARCH ({symbol or 'ALL'})")
+        logger.info(f"{'='*60}")
+
+        start_time = datetime.now()
+
+        X, y = self.prepare_training_data(symbol=symbol, days_back=days_back)
+
+        # Time-ordered split: validate on the newest trades
+        split = int(len(X) * (1 - validation_fraction))
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X.iloc[:split])
+        X_valid = scaler.transform(X.iloc[split:])
+
+        # One in-memory DMatrix pair shared by all trials
+        dtrain = xgb.DMatrix(X_train, label=y.iloc[:split].values, feature_names=self.feature_names)
+        dvalid = xgb.DMatrix(X_valid, label=y.iloc[split:].values, feature_names=self.feature_names)
+
+        cpu_count = os.cpu_count() or 1
+        n_workers = n_workers or min(cpu_count, 8)
+        nthread = max(1, cpu_count // n_workers)
+
+        rng = np.random.RandomState(seed)
+        candidates = [self._sample_params(rng) for _ in range(n_trials)]
+        trials = []
+        rounds = min_rounds
+        rung = 0
+
+        def run_trial(params: Dict, num_rounds: int) -> Dict:
+            booster = xgb.train(
+                self._native_params(params, nthread),
+                dtrain,
+                num_boost_round=num_rounds,
+                evals=[(dvalid, 'valid')],
+                early_stopping_rounds=early_stopping_rounds,
+                verbose_eval=False
+            )
+            return {
+                'params': params,
+                'rounds': num_rounds,
+                'rung': rung,
+                'score': float(booster.best_score),
+                'best_iteration': int(booster.best_iteration)
+            }
+
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            while candidates:
+                results = list(pool.map(lambda p: run_trial(p, rounds), candidates))
+                results.sort(key=lambda r: r['score'])
+                trials.extend(results)
+
+                logger.info(
+                    f"Rung {rung}: {len(results)} trials x {rounds} rounds | "
+                    f"best logloss {results[0]['score']:.4f}"
+                )
+
+                keep = len(results) // reduction_factor
+                if keep < 1 or rounds >= max_rounds:
+                    break
+
+                candidates = [r['params'] for r in results[:keep]]
+                rounds = min(rounds * reduction_factor, max_rounds)
+                rung += 1
+
+        best = min(trials, key=lambda r: (-r['rung'], r['score']))
+        duration = (datetime.now() - start_time).total_seconds()
+
+        self.params = {
+            **self.DEFAULT_PARAMS,
+            **best['params'],
+            'n_estimators': best['best_iteration'] + 1,
+            'tuned': True,
+            'tune_score': best['score'],
+            'tune_date': datetime.utcnow().isoformat(),
+            'tune_trials': len(trials)
+        }
+
+        logger.info(f"✅ Search complete in {duration:.1f}s ({len(trials)} trials)")
+        logger.info(f"   Best logloss: {best['score']:.4f} @ {best['best_iteration'] + 1} rounds")
+        for key, value in best['params'].items():
+            logger.info(f"   {key:<20} {value}")
+
+        return {
+            'symbol': symbol or 'ALL',
+            'best_params': convert_numpy_to_python(self.params),
+            'best_score': best['score'],
+            'best_iteration': best['best_iteration'],
+            'trials': convert_numpy_to_python(trials),
+            'train_samples': split,
+            'validation_samples': len(X) - split,
+            'duration_seconds': duration
+        }
+
     def predict(self, features: Dict) -> float:
         """
         Predict confidence score for given features
@@ -440,7 +678,7 @@ class XGBoostConfidenceModel:
             'validation_metrics': self.validation_metrics,
             'training_date': self.training_date,
             'symbol': symbol,
-            'hyperparameters': self.DEFAULT_PARAMS
+            'hyperparameters': self.params
         }
 
         with open(filepath, 'wb') as f:
@@ -476,6 +714,7 @@ class XGBoostConfidenceModel:
         self.label_encoders = model_data.get('label_encoders', {})  # Load encoders
         self.validation_metrics = model_data.get('validation_metrics', {})
         self.training_date = model_data.get('training_date')
+        self.params = {**self.DEFAULT_PARAMS, **model_data.get('hyperparameters', {})}
 
         logger.info(f"✅ Model loaded: {len(self.feature_names)} features")
         logger.info(f"   Categorical features: {len(self.label_encoders)}")
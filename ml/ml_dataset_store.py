@@ -0,0 +1,363 @@
+"""
+ML Training Dataset Store
+
+Incremental, columnar store of point-in-time training rows so retrains and
+hyperparameter experiments stop rebuilding the dataset from Postgres.
+
+Layout (one Parquet part per append, partitioned by symbol and close month):
+    ml_models/datasets/account_1/symbol=EURUSD/month=2025-10/part-20251027_020000.parquet
+    ml_models/datasets/account_1/_manifest.json   # watermark of exported trades
+
+Each row = features extracted at trade open time (FeatureEngineer) plus
+metadata columns prefixed with '_' (_trade_id, _symbol, _open_time,
+_close_time, _profit, _label). Only trades closed after the watermark are
+extracted, so build time depends on new trades, not on history size.
+
+Trades can reach the database after a later-closing trade was exported
+(EA sync lag, reconciliation), so every append re-scans OVERLAP_HOURS behind
+the watermark; trade IDs exported inside that window are kept in the
+manifest and skipped. Trades whose feature extraction fails are recorded and
+retried on later appends (up to MAX_EXTRACT_ATTEMPTS).
+
+Usage:
+    from ml.ml_dataset_store import TrainingDatasetStore
+
+    store = TrainingDatasetStore(account_id=1)
+    store.append_new_trades(db)                       # after trades close
+    X, y = store.load(symbol='EURUSD', days_back=90)  # memory-mapped read
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+from models import Trade
+from ml.ml_features import FeatureEngineer
+
+logger = logging.getLogger(__name__)
+
+# Feature dict keys that are metadata, not model inputs
+NON_FEATURE_KEYS = ['symbol', 'timeframe', 'timestamp', 'feature_count']
+
+
+class TrainingDatasetStore:
+    """Append-only Parquet dataset of training rows, partitioned by symbol and month"""
+
+    OVERLAP_HOURS = 24          # Re-scanned behind the watermark for late-arriving trades
+    MAX_EXTRACT_ATTEMPTS = 5    # Appends a failing trade is retried before it is given up
+
+    def __init__(
+        self,
+        account_id: int = 1,
+        root_dir: str = 'ml_models/datasets',
+        timeframe: str = 'M15'
+    ):
+        """
+        Initialize Training Dataset Store
+
+        Args:
+            account_id: Account ID (one dataset per account)
+            root_dir: Root directory for dataset files
+            timeframe: Primary timeframe for feature extraction
+        """
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow required for the dataset store. Run: pip install pyarrow")
+
+        self.account_id = account_id
+        self.root = os.path.join(root_dir, f"account_{account_id}")
+        self.timeframe = timeframe
+        self.manifest_path = os.path.join(self.root, '_manifest.json')
+
+    # ========================================================================
+    # MANIFEST (export watermark)
+    # ========================================================================
+
+    def _read_manifest(self) -> Dict:
+        manifest = {'last_close_time': None, 'last_trade_id': 0, 'rows': 0}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest.update(json.load(f))
+        # JSON object keys are strings
+        manifest['recent_ids'] = {int(k): v for k, v in manifest.get('recent_ids', {}).items()}
+        manifest['failed_ids'] = {int(k): v for k, v in manifest.get('failed_ids', {}).items()}
+        return manifest
+
+    def _write_manifest(self, manifest: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)  # Atomic swap
+
+    # ========================================================================
+    # APPEND
+    # ========================================================================
+
+    def append_new_trades(self, db: Session, batch_size: int = 500) -> int:
+        """
+        Extract features for trades closed since the last append and write them
+
+        Re-scans OVERLAP_HOURS behind the watermark (already exported trade IDs
+        are skipped) and retries trades whose extraction failed before.
+
+        Args:
+            db: Database session
+            batch_size: Trades per extraction batch
+
+        Returns:
+            Number of rows appended
+        """
+        manifest = self._read_manifest()
+        exported = manifest['recent_ids']   # trade_id -> close_time (ISO) inside the overlap window
+        failed = manifest['failed_ids']     # trade_id -> failed extraction attempts
+        feature_engineer = FeatureEngineer(db, self.account_id)
+        overlap = timedelta(hours=self.OVERLAP_HOURS)
+
+        closed_trades = db.query(Trade).filter(
+            Trade.account_id == self.account_id,
+            Trade.status == 'closed',
+            Trade.close_time != None,
+            Trade.open_time != None,
+            Trade.profit != None
+        )
+
+        appended = 0
+        skipped = 0
+
+        # Retry trades whose feature extraction failed on an earlier append
+        if failed:
+            retry = closed_trades.filter(Trade.id.in_(list(failed))).all()
+            for trade_id in set(failed) - {trade.id for trade in retry}:
+                del failed[trade_id]  # Deleted or re-opened since
+
+            appended += self._append_batch(feature_engineer, retry, manifest)
+            for trade in retry:
+                if failed.get(trade.id, 0) >= self.MAX_EXTRACT_ATTEMPTS:
+                    logger.error(f"Giving up on trade #{trade.id} after {failed[trade.id]} failed feature extractions")
+                    del failed[trade.id]
+                    exported[trade.id] = trade.close_time.isoformat()  # Not picked up again by the overlap scan
+            self._write_manifest(manifest)
+
+        watermark = (
+            datetime.fromisoformat(manifest['last_close_time']) if manifest['last_close_time'] else None
+        )
+        cursor = (watermark - overlap, 0) if watermark else None
+
+        while True:
+            query = closed_trades
+            if cursor:
+                query = query.filter(tuple_(Trade.close_time, Trade.id) > cursor)
+            trades = query.order_by(Trade.close_time.asc(), Trade.id.asc()).limit(batch_size).all()
+            if not trades:
+                break
+
+            new_trades = [t for t in trades if t.id not in exported and t.id not in failed]
+            failed_before = len(failed)
+            appended += self._append_batch(feature_engineer, new_trades, manifest)
+            skipped += len(failed) - failed_before
+
+            last = trades[-1]
+            cursor = (last.close_time, last.id)
+            if watermark is None or last.close_time > watermark:
+                watermark = last.close_time
+                manifest['last_close_time'] = last.close_time.isoformat()
+                manifest['last_trade_id'] = last.id
+
+            # IDs older than the overlap window are never scanned again
+            horizon = (watermark - overlap).isoformat()
+            for trade_id in [t for t, close_time in exported.items() if close_time < horizon]:
+                del exported[trade_id]
+            self._write_manifest(manifest)
+
+            if len(trades) < batch_size:
+                break
+
+        if appended or skipped:
+            logger.info(f"📦 Dataset append: {appended} rows written, {skipped} trades failed (retried next append)")
+
+        return appended
+
+    def _append_batch(self, feature_engineer: FeatureEngineer, trades: List[Trade], manifest: Dict) -> int:
+        """
+        Extract and write rows for trades, recording exported and failed trade IDs in the manifest
+
+        Returns:
+            Number of rows written
+        """
+        rows = []
+        for trade in trades:
+            try:
+                # Point-in-time features: extracted at trade open time
+                features = feature_engineer.extract_features(
+                    symbol=trade.symbol,
+                    timeframe=self.timeframe,
+                    timestamp=trade.open_time,
+                    include_multi_timeframe=True
+                )
+            except Exception as e:
+                manifest['failed_ids'][trade.id] = manifest['failed_ids'].get(trade.id, 0) + 1
+                logger.warning(f"Feature extraction failed for trade #{trade.id} (will retry): {e}")
+                continue
+
+            row = {k: v for k, v in features.items() if k not in NON_FEATURE_KEYS}
+            row.update({
+                '_trade_id': trade.id,
+                '_symbol': trade.symbol,
+                '_open_time': trade.open_time,
+                '_close_time': trade.close_time,
+                '_profit': float(trade.profit),
+                '_label': 1 if trade.profit > 0 else 0
+            })
+            rows.append(row)
+
+        if rows:
+            self._write_rows(rows)
+            for row in rows:
+                manifest['recent_ids'][row['_trade_id']] = row['_close_time'].isoformat()
+                manifest['failed_ids'].pop(row['_trade_id'], None)
+            manifest['rows'] = manifest.get('rows', 0) + len(rows)
+            manifest['updated_at'] = datetime.utcnow().isoformat()
+
+        return len(rows)
+
+    def _write_rows(self, rows: List[Dict]):
+        """Write rows as one part file per (symbol, month) partition"""
+        df = pd.DataFrame(rows)
+        part_name = f"part-{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.parquet"
+        months = df['_close_time'].dt.strftime('%Y-%m')
+
+        for (symbol, month), part in df.groupby([df['_symbol'], months]):
+            partition_dir = os.path.join(self.root, f"symbol={symbol}", f"month={month}")
+            os.makedirs(partition_dir, exist_ok=True)
+            table = pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False)
+            pq.write_table(table, os.path.join(partition_dir, part_name), compression='zstd')
+
+    # ========================================================================
+    # READ
+    # ========================================================================
+
+    def _partition_files(self, symbol: Optional[str], since: Optional[datetime]) -> List[str]:
+        """Part files matching symbol / month (partition pruning by directory name)"""
+        if not os.path.isdir(self.root):
+            return []
+
+        min_month = since.strftime('%Y-%m') if since else None
+        files = []
+
+        for symbol_dir in sorted(os.listdir(self.root)):
+            if not symbol_dir.startswith('symbol='):
+                continue
+            if symbol and symbol_dir != f"symbol={symbol}":
+                continue
+
+            symbol_path = os.path.join(self.root, symbol_dir)
+            for month_dir in sorted(os.listdir(symbol_path)):
+                if min_month and month_dir[len('month='):] < min_month:
+                    continue
+                month_path = os.path.join(symbol_path, month_dir)
+                files.extend(
+                    os.path.join(month_path, f) for f in sorted(os.listdir(month_path))
+                    if f.endswith('.parquet')
+                )
+
+        return files
+
+    def load_frame(self, symbol: Optional[str] = None, days_back: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read stored rows (memory-mapped), including '_' metadata columns
+
+        Args:
+            symbol: Optional symbol filter (None = all symbols)
+            days_back: Only trades closed in the last N days (None = all)
+
+        Returns:
+            DataFrame sorted by close time (empty if nothing stored)
+        """
+        since = datetime.utcnow() - timedelta(days=days_back) if days_back else None
+        files = self._partition_files(symbol, since)
+
+        if not files:
+            return pd.DataFrame()
+
+        # Part schemas may differ as features evolve - concat aligns columns
+        frames = [pq.read_table(path, memory_map=True).to_pandas() for path in files]
+        df = pd.concat(frames, ignore_index=True, sort=False)
+
+        if since is not None:
+            df = df[df['_close_time'] >= since]
+
+        return df.sort_values(['_close_time', '_trade_id']).reset_index(drop=True)
+
+    def load(self, symbol: Optional[str] = None, days_back: Optional[int] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Read features and labels for training
+
+        Returns:
+            (X_features, y_labels) - raw features, not yet encoded/filled
+        """
+        df = self.load_frame(symbol=symbol, days_back=days_back)
+
+        if df.empty:
+            return pd.DataFrame(), pd.Series(dtype=int)
+
+        y = df['_label'].astype(int)
+        X = df[[c for c in df.columns if not c.startswith('_')]]
+        return X, y
+
+    def get_stats(self) -> Dict:
+        """Dataset size and watermark"""
+        manifest = self._read_manifest()
+        files = self._partition_files(None, None)
+        return {
+            'root': self.root,
+            'rows': manifest.get('rows', 0),
+            'files': len(files),
+            'bytes': sum(os.path.getsize(f) for f in files),
+            'last_close_time': manifest.get('last_close_time'),
+            'last_trade_id': manifest.get('last_trade_id'),
+            'failed_trades': len(manifest['failed_ids'])
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+    from database import ScopedSession
+
+    parser = argparse.ArgumentParser(description='ML Training Dataset Store')
+    parser.add_argument('--account-id', type=int, default=1, help='Account ID (default: 1)')
+    parser.add_argument('--append', action='store_true', help='Append newly closed trades')
+    parser.add_argument('--stats', action='store_true', help='Show dataset statistics')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    store = TrainingDatasetStore(account_id=args.account_id)
+
+    if args.append:
+        db = ScopedSession()
+        try:
+            count = store.append_new_trades(db)
+            print(f"✅ Appended {count} rows")
+        finally:
+            db.close()
+
+    if args.stats or not args.append:
+        for key, value in store.get_stats().items():
+            print(f"{key:20s}: {value}")
@@ -16,7 +16,7 @@ Usage:
     # Get best model for symbol
     confidence = manager.predict(symbol='EURUSD', features=features)
 
-    # Log prediction outcome
+    # Log prediction outcome (queued, written by MLPredictionWriter)
     manager.log_prediction_outcome(prediction_id, actual_profit)
 
     # Evaluate and switch models if needed
@@ -33,6 +33,7 @@ from sqlalchemy import text
 
 from models import MLModel, MLPrediction, MLABTest
 from ml.ml_confidence_model import XGBoostConfidenceModel
+from ml.ml_prediction_writer import get_prediction_writer, to_json_serializable
 
 logger = logging.getLogger(__name__)
 
@@ -67,11 +68,15 @@ class MLModelManager:
     MIN_ACCURACY_THRESHOLD = 0.55  # Switch if accuracy < 55%
     EVALUATION_WINDOW_DAYS = 7     # Evaluate last 7 days
 
+    # How long the active model ID used for prediction logging is cached
+    MODEL_ID_CACHE_SECONDS = 300
+
     def __init__(
         self,
         db: Session,
         account_id: int = 1,
-        model_dir: str = 'ml_models/xgboost'
+        model_dir: str = 'ml_models/xgboost',
+        async_logging: bool = True
     ):
         """
         Initialize ML Model Manager
@@ -80,10 +85,16 @@ class MLModelManager:
             db: Database session
             account_id: Account ID
             model_dir: Directory containing models
+            async_logging: Queue prediction writes to MLPredictionWriter
+                           instead of committing on the signal path
         """
         self.db = db
         self.account_id = account_id
         self.model_dir = model_dir
+        self.async_logging = async_logging
+        if async_logging:
+            # Writer thread reserves prediction IDs before the first prediction
+            get_prediction_writer().start()
 
         # Loaded models cache (symbol -> XGBoostConfidenceModel)
         self.loaded_models: Dict[str, XGBoostConfidenceModel] = {}
@@ -91,6 +102,9 @@ class MLModelManager:
         # Track when models were loaded (for hot-reloading)
         self.model_load_times: Dict[str, datetime] = {}
 
+        # Active model ID per symbol for prediction logging (symbol -> (model_id, cached_at))
+        self.active_model_ids: Dict[str, Tuple[Optional[int], datetime]] = {}
+
     def get_active_model_path(self, symbol: Optional[str] = None) -> Optional[str]:
         """
         Get path to active model for symbol (or global)
@@ -208,18 +222,35 @@ class MLModelManager:
 
     def _convert_to_json_serializable(self, obj):
         """Recursively convert non-JSON-serializable objects (Decimal, datetime) to compatible types"""
-        from decimal import Decimal
-        from datetime import datetime, date
-
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        elif isinstance(obj, dict):
-            return {k: self._convert_to_json_serializable(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_to_json_serializable(item) for item in obj]
-        return obj
+        return to_json_serializable(obj)
+
+    def _get_active_model_id(self, symbol: str) -> Optional[int]:
+        """
+        Get active xgboost model ID for symbol (global fallback), cached
+
+        Args:
+            symbol: Symbol
+
+        Returns:
+            model_id or None if no active model
+        """
+        cached = self.active_model_ids.get(symbol)
+        if cached and datetime.utcnow() - cached[1] < timedelta(seconds=self.MODEL_ID_CACHE_SECONDS):
+            return cached[0]
+
+        model_query = self.db.query(MLModel.id).filter(
+            MLModel.is_active == True,
+            MLModel.model_type == 'xgboost'
+        )
+
+        # Try symbol-specific, fallback to global
+        model_record = model_query.filter(MLModel.symbol == symbol).first()
+        if not model_record:
+            model_record = model_query.filter(MLModel.symbol == None).first()
+
+        model_id = model_record.id if model_record else None
+        self.active_model_ids[symbol] = (model_id, datetime.utcnow())
+        return model_id
 
     def log_prediction(
         self,
@@ -234,6 +265,9 @@ class MLModelManager:
         """
         Log ML prediction for later evaluation
 
+        With async_logging the row is queued to MLPredictionWriter and the
+        pre-allocated ID is returned without waiting for the insert.
+
         Args:
             symbol: Symbol
             features: Features used
@@ -247,38 +281,35 @@ class MLModelManager:
             prediction_id or None
         """
         try:
-            # Get active model ID
-            model_query = self.db.query(MLModel).filter(
-                MLModel.is_active == True,
-                MLModel.model_type == 'xgboost'
-            )
+            model_id = self._get_active_model_id(symbol)
 
-            # Try symbol-specific, fallback to global
-            model_record = model_query.filter(MLModel.symbol == symbol).first()
-            if not model_record:
-                model_record = model_query.filter(MLModel.symbol == None).first()
-
-            if not model_record:
+            if not model_id:
                 logger.warning("No active model to log prediction against")
                 return None
 
+            row = {
+                'model_id': model_id,
+                'symbol': symbol,
+                'prediction_time': datetime.utcnow(),
+                'prediction_type': 'confidence_scoring',  # Type of prediction being made
+                'predicted_value': final_confidence,  # The final confidence value
+                'ml_confidence': ml_confidence,
+                'rules_confidence': rules_confidence,
+                'final_confidence': final_confidence,
+                'decision': decision,
+                'ab_test_group': ab_test_group,
+                'features_used': features or None
+            }
+
+            if self.async_logging:
+                # JSON conversion of features happens on the writer thread
+                return get_prediction_writer().enqueue_prediction(row)
+
             # Convert non-JSON-serializable objects (Decimal, datetime) for JSON serialization
             if features:
-                features = self._convert_to_json_serializable(features)
+                row['features_used'] = self._convert_to_json_serializable(features)
 
-            prediction = MLPrediction(
-                model_id=model_record.id,
-                symbol=symbol,
-                prediction_time=datetime.utcnow(),
-                prediction_type='confidence_scoring',  # Type of prediction being made
-                predicted_value=final_confidence,  # The final confidence value
-                ml_confidence=ml_confidence,
-                rules_confidence=rules_confidence,
-                final_confidence=final_confidence,
-                decision=decision,
-                ab_test_group=ab_test_group,
-                features_used=features
-            )
+            prediction = MLPrediction(**row)
 
             self.db.add(prediction)
             self.db.commit()
@@ -306,6 +337,16 @@ class MLModelManager:
             actual_profit: Actual profit/loss
             trade_id: Associated trade ID
         """
+        if self.async_logging:
+            get_prediction_writer().enqueue_update(
+                prediction_id,
+                actual_outcome=actual_outcome,
+                actual_profit=actual_profit,
+                trade_id=trade_id,
+                outcome_time=datetime.utcnow()
+            )
+            return
+
         try:
             prediction = self.db.query(MLPrediction).filter(
                 MLPrediction.id == prediction_id
@@ -326,6 +367,27 @@ class MLModelManager:
             logger.error(f"Error updating prediction outcome: {e}")
             self.db.rollback()
 
+    def link_prediction_to_signal(self, prediction_id: int, signal_id: int):
+        """
+        Link a logged prediction to the signal it produced
+
+        Args:
+            prediction_id: Prediction ID
+            signal_id: TradingSignal ID
+        """
+        if self.async_logging:
+            get_prediction_writer().enqueue_update(prediction_id, signal_id=signal_id)
+            return
+
+        try:
+            self.db.query(MLPrediction).filter(
+                MLPrediction.id == prediction_id
+            ).update({'signal_id': signal_id}, synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Error linking prediction to signal: {e}")
+            self.db.rollback()
+
     def get_model_performance(
         self,
         model_id: int,
@@ -558,6 +620,8 @@ class MLModelManager:
             self.db.add(model)
             self.db.commit()
 
+            self.active_model_ids.clear()
+
             logger.info(f"✅ Registered new model #{model.id} ({model_type}, {symbol or 'GLOBAL'})")
             return model.id
 
@@ -570,6 +634,8 @@ class MLModelManager:
         """Force reload all models from disk (hot-reload)"""
         logger.info("Force reloading all models...")
 
+        self.active_model_ids.clear()
+
         for cache_key in list(self.loaded_models.keys()):
             symbol = None if cache_key == 'global' else cache_key
             self.load_model(symbol=symbol, force_reload=True)
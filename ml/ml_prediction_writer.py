@@ -0,0 +1,469 @@
+"""
+ML Prediction Writer
+
+Write-behind queue for `ml_predictions` so the signal path never waits on
+prediction logging:
+- Bounded in-memory queue (overflow policy: drop_oldest / drop_newest)
+- Background thread flushes every N rows or T ms
+- Multi-row INSERT for new predictions, one executemany UPDATE for outcomes
+- Prediction IDs are pre-allocated from the table sequence in blocks by the
+  writer thread, so callers still get an ID back immediately (for
+  signal/trade linking) without touching the database
+- A failed flush is retried with the next batch (queue order kept); after
+  MAX_FLUSH_ATTEMPTS the batch is bisected and only the failing ops dropped
+
+Usage:
+    from ml.ml_prediction_writer import get_prediction_writer
+
+    writer = get_prediction_writer()
+    prediction_id = writer.enqueue_prediction({...})
+    writer.enqueue_update(prediction_id, signal_id=123)
+
+    writer.get_stats()
+"""
+
+import atexit
+import logging
+import queue
+import time
+from datetime import datetime, date
+from decimal import Decimal
+from threading import Thread, Lock
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, text
+
+from models import MLPrediction
+
+logger = logging.getLogger(__name__)
+
+
+def to_json_serializable(obj):
+    """Recursively convert Decimal, datetime and numpy types to JSON-compatible types"""
+    if isinstance(obj, dict):
+        return {k: to_json_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [to_json_serializable(item) for item in obj]
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return obj
+
+
+class MLPredictionWriter:
+    """Asynchronous, bounded, batching writer for ml_predictions"""
+
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+    MAX_FLUSH_ATTEMPTS = 3  # Flush cycles a failed batch is retried before failing ops are dropped
+    ID_REFILL_BACKOFF = 5.0  # Seconds between ID reservations after one failed
+
+    # Columns that may be updated through enqueue_update()
+    UPDATABLE_COLUMNS = (
+        'signal_id', 'trade_id', 'actual_outcome', 'actual_profit', 'outcome_time'
+    )
+
+    def __init__(
+        self,
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval_ms: int = 500,
+        overflow_policy: str = 'drop_oldest',
+        id_block_size: int = 100
+    ):
+        """
+        Initialize ML Prediction Writer
+
+        Args:
+            max_queue_size: Max pending operations before overflow policy applies
+            batch_size: Flush as soon as this many operations are pending
+            flush_interval_ms: Flush at least this often (milliseconds)
+            overflow_policy: 'drop_oldest' (keep newest) or 'drop_newest'
+            id_block_size: Number of prediction IDs reserved per sequence round-trip
+        """
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.overflow_policy = overflow_policy
+        self.id_block_size = id_block_size
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.running = False
+        self.thread = None
+
+        # Pre-allocated prediction IDs (filled and refilled by the writer thread only)
+        self._id_pool: List[int] = []
+        self._id_lock = Lock()
+        self._next_refill = 0.0  # monotonic() before which no reservation is attempted
+
+        # Metrics
+        self.enqueued = 0
+        self.dropped = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.ids_missing = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    # ========================================================================
+    # LIFECYCLE
+    # ========================================================================
+
+    def start(self):
+        """Start the background writer thread (it reserves the first block of prediction IDs)"""
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = Thread(target=self._worker_loop, daemon=True, name='MLPredictionWriter')
+        self.thread.start()
+        logger.info(
+            f"ML prediction writer started (batch_size={self.batch_size}, "
+            f"interval={self.flush_interval_ms}ms, max_queue={self.max_queue_size}, "
+            f"policy={self.overflow_policy})"
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer thread and flush everything still queued"""
+        if not self.running:
+            return
+
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=timeout)
+        logger.info(
+            f"ML prediction writer stopped (inserted={self.inserted}, updated={self.updated}, "
+            f"dropped={self.dropped}, failed={self.failed})"
+        )
+
+    # ========================================================================
+    # PRODUCER API (signal path - never blocks)
+    # ========================================================================
+
+    def enqueue_prediction(self, row: Dict) -> Optional[int]:
+        """
+        Queue a new ml_predictions row
+
+        Args:
+            row: Column values for MLPrediction (features_used may contain
+                 Decimal/datetime/numpy values, converted on the writer thread)
+
+        Returns:
+            Pre-allocated prediction ID, or None if the pool is empty (not
+            filled yet or database unavailable - the row is still queued, it
+            just cannot be linked later)
+        """
+        if not self.running:
+            self.start()
+
+        prediction_id = self._take_id()
+        row = dict(row)
+        if prediction_id is not None:
+            row['id'] = prediction_id
+        else:
+            self.ids_missing += 1
+
+        self._put(('insert', row))
+        return prediction_id
+
+    def enqueue_update(self, prediction_id: int, **values):
+        """
+        Queue an update of an existing prediction (outcome or signal/trade link)
+
+        Updates are applied after any insert queued before them.
+
+        Args:
+            prediction_id: Prediction ID
+            **values: Columns from UPDATABLE_COLUMNS
+        """
+        unknown = set(values) - set(self.UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot update columns: {sorted(unknown)}")
+
+        self._put(('update', prediction_id, values))
+
+    def _put(self, op):
+        if not self.running:
+            self.start()
+
+        try:
+            self.queue.put_nowait(op)
+            self.enqueued += 1
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == 'drop_newest':
+            self.dropped += 1
+            return
+
+        # drop_oldest: make room by discarding the oldest pending operation
+        try:
+            self.queue.get_nowait()
+            self.dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(op)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _take_id(self) -> Optional[int]:
+        """Pop a pre-allocated ID (never reserves on the caller's thread)"""
+        with self._id_lock:
+            if self._id_pool:
+                return self._id_pool.pop()
+        return None
+
+    # ========================================================================
+    # WRITER THREAD
+    # ========================================================================
+
+    def _worker_loop(self):
+        """Collect operations and flush every batch_size ops or flush_interval_ms"""
+        interval = self.flush_interval_ms / 1000.0
+        pending = []
+        retry = []      # Failed batch, flushed again ahead of newer operations
+        attempts = 0
+        deadline = time.monotonic() + interval
+
+        while self.running or not self.queue.empty():
+            self._refill_ids()
+
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                pending.append(self.queue.get(timeout=timeout if self.running else 0))
+            except queue.Empty:
+                pass
+
+            draining = not self.running and self.queue.empty()
+            if len(pending) >= self.batch_size or time.monotonic() >= deadline or draining:
+                if pending or retry:
+                    batch, pending = retry + pending, []
+                    if self._flush(batch):
+                        retry, attempts = [], 0
+                    else:
+                        attempts += 1
+                        retry = self._retry_or_drop(batch, attempts)
+                        if not retry:
+                            attempts = 0
+                deadline = time.monotonic() + interval
+
+        batch = retry + pending
+        if batch and not self._flush(batch):
+            self._retry_or_drop(batch, self.MAX_FLUSH_ATTEMPTS)
+
+    def _retry_or_drop(self, batch: List, attempts: int) -> List:
+        """
+        Keep a failed batch for the next flush; after MAX_FLUSH_ATTEMPTS write
+        what can be written and drop only the ops that fail on their own
+        """
+        if attempts < self.MAX_FLUSH_ATTEMPTS:
+            logger.warning(f"ML prediction flush failed ({len(batch)} ops), retry {attempts}/{self.MAX_FLUSH_ATTEMPTS - 1}")
+            return batch
+
+        failed = self._isolate_failures(batch)
+        logger.error(
+            f"ML prediction flush failed {attempts} times: {len(failed)} of {len(batch)} ops dropped"
+        )
+        self.failed += len(failed)
+        return []
+
+    def _isolate_failures(self, batch: List) -> List:
+        """
+        Bisect a failing batch, flushing the halves in order
+
+        Returns:
+            Ops that could not be written, not even alone
+        """
+        if len(batch) == 1:
+            return batch
+
+        middle = len(batch) // 2
+        failed = []
+        for half in (batch[:middle], batch[middle:]):
+            if not self._flush(half):
+                failed.extend(self._isolate_failures(half))
+        return failed
+
+    def _refill_ids(self):
+        """Reserve a block of IDs from the ml_predictions sequence when running low (writer thread)"""
+        with self._id_lock:
+            if len(self._id_pool) >= self.id_block_size // 2:
+                return
+        if time.monotonic() < self._next_refill:
+            return
+
+        try:
+            ids = self._reserve_ids(self.id_block_size)
+        except Exception as e:
+            logger.warning(f"Could not reserve ML prediction IDs: {e}")
+            self._next_refill = time.monotonic() + self.ID_REFILL_BACKOFF
+            return
+
+        with self._id_lock:
+            # pop() takes from the end - keep IDs ascending in insert order
+            self._id_pool = sorted(ids + self._id_pool, reverse=True)
+
+    def _reserve_ids(self, count: int) -> List[int]:
+        """Take count values from the ml_predictions id sequence"""
+        from database import ScopedSession
+
+        db = ScopedSession()
+        try:
+            result = db.execute(
+                text(
+                    "SELECT nextval(pg_get_serial_sequence('ml_predictions', 'id')) "
+                    "FROM generate_series(1, :n)"
+                ),
+                {'n': count}
+            )
+            ids = [row[0] for row in result]
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _flush(self, ops: List) -> bool:
+        """
+        Write one batch and record timing
+
+        Returns:
+            True if the batch was committed
+        """
+        start = time.perf_counter()
+        try:
+            inserted, updated = self._write(ops)
+            self.inserted += inserted
+            self.updated += updated
+            ok = True
+        except Exception as e:
+            logger.error(f"ML prediction flush error: {e}")
+            self.flush_errors += 1
+            ok = False
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        return ok
+
+    def _write(self, ops: List):
+        """
+        Write one batch in one transaction: consecutive inserts/updates are grouped, order is kept
+
+        Returns:
+            (rows inserted, rows updated)
+        """
+        from database import ScopedSession
+
+        db = ScopedSession()
+        table = MLPrediction.__table__
+        inserted = updated = 0
+
+        try:
+            for kind, group in self._group_ops(ops):
+                if kind == 'insert':
+                    # Rows with and without pre-allocated IDs need separate VALUES lists
+                    with_id = [r for r in group if 'id' in r]
+                    without_id = [r for r in group if 'id' not in r]
+                    for rows in (with_id, without_id):
+                        if rows:
+                            db.execute(table.insert().values(rows))
+                    inserted += len(group)
+                else:
+                    # One executemany per column set
+                    by_columns: Dict[tuple, List[Dict]] = {}
+                    for prediction_id, values in group:
+                        params = {f"v_{k}": v for k, v in values.items()}
+                        params['p_id'] = prediction_id
+                        by_columns.setdefault(tuple(sorted(values)), []).append(params)
+
+                    for columns, params in by_columns.items():
+                        stmt = table.update().where(
+                            table.c.id == bindparam('p_id')
+                        ).values({c: bindparam(f"v_{c}") for c in columns})
+                        db.execute(stmt, params)
+                    updated += len(group)
+
+            db.commit()
+            return inserted, updated
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _group_ops(self, ops: List):
+        """Split ops into runs of the same kind, preserving queue order"""
+        groups = []
+        for op in ops:
+            kind = op[0]
+            if kind == 'insert':
+                row = op[1]
+                if row.get('features_used'):
+                    row['features_used'] = to_json_serializable(row['features_used'])
+                item = row
+            else:
+                item = (op[1], op[2])
+
+            if groups and groups[-1][0] == kind:
+                groups[-1][1].append(item)
+            else:
+                groups.append((kind, [item]))
+        return groups
+
+    # ========================================================================
+    # METRICS
+    # ========================================================================
+
+    def get_stats(self) -> Dict:
+        """Get writer statistics"""
+        return {
+            'running': self.running,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_size': self.max_queue_size,
+            'overflow_policy': self.overflow_policy,
+            'enqueued': self.enqueued,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'flush_errors': self.flush_errors,
+            'ids_available': len(self._id_pool),
+            'ids_missing': self.ids_missing,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'max_flush_ms': round(self.max_flush_ms, 2)
+        }
+
+
+# Global instance
+_prediction_writer = None
+
+
+def get_prediction_writer() -> MLPredictionWriter:
+    """Get global ML prediction writer instance (started on first use)"""
+    global _prediction_writer
+    if _prediction_writer is None:
+        _prediction_writer = MLPredictionWriter()
+        atexit.register(_prediction_writer.stop)
+    return _prediction_writer
@@ -17,6 +17,9 @@ Usage:
     # Train all symbols
     python3 ml/ml_training_pipeline.py --all-symbols --days 90
 
+    # Hyperparameter search (best config is reused by later training runs)
+    python3 ml/ml_training_pipeline.py --symbol EURUSD --tune --trials 27
+
     # Schedule automatic retraining (via cron)
     # Run every Sunday at 2 AM:
     # 0 2 * * 0 cd /app && python3 ml/ml_training_pipeline.py --all-symbols --days 90
@@ -116,11 +119,30 @@ class MLTrainingPipeline:
         logger.info(f"Model for {symbol or 'GLOBAL'} is performing well - no retraining needed")
         return False
 
+    def get_tuned_params(self, symbol: Optional[str] = None) -> Optional[Dict]:
+        """
+        Get the most recent tuned hyperparameters stored with a model for symbol
+
+        Args:
+            symbol: Symbol (None = global)
+
+        Returns:
+            Hyperparameter dict or None if the symbol was never tuned
+        """
+        models = self.db.query(MLModel).filter(
+            MLModel.model_type == 'xgboost',
+            MLModel.symbol == symbol,
+            MLModel.hyperparameters['tuned'].astext == 'true'
+        ).order_by(MLModel.created_at.desc()).limit(1).all()
+
+        return dict(models[0].hyperparameters) if models else None
+
     def train_model(
         self,
         symbol: Optional[str] = None,
         days_back: int = DEFAULT_TRAINING_DAYS,
-        force: bool = False
+        force: bool = False,
+        params: Optional[Dict] = None
     ) -> Optional[Dict]:
         """
         Train XGBoost model for symbol
@@ -129,6 +151,7 @@ class MLTrainingPipeline:
             symbol: Symbol (None = global)
             days_back: Days of training data
             force: Force training even if not needed
+            params: Hyperparameters (default: latest tuned config for symbol, if any)
 
         Returns:
             Dict with training results or None if skipped
@@ -159,11 +182,19 @@ class MLTrainingPipeline:
         self.db.commit()
 
         try:
-            # Initialize model
+            # Initialize model (with the best tuned config, if any)
+            tuned_params = params or self.get_tuned_params(symbol)
+            if tuned_params:
+                logger.info(
+                    f"Using tuned hyperparameters from {tuned_params.get('tune_date', 'unknown date')} "
+                    f"(logloss {tuned_params.get('tune_score', 0):.4f})"
+                )
+
             model = XGBoostConfidenceModel(
                 db=self.db,
                 account_id=self.account_id,
-                model_dir=self.model_dir
+                model_dir=self.model_dir,
+                params=tuned_params
             )
 
             # Train
@@ -201,7 +232,7 @@ class MLTrainingPipeline:
                     'f1_score': results['f1_score'],
                     'auc_roc': results['auc_roc']
                 },
-                hyperparameters=model.DEFAULT_PARAMS,
+                hyperparameters=model.params,
                 feature_importance=dict(results['top_10_features']),
                 is_active=True
             )
@@ -239,6 +270,49 @@ class MLTrainingPipeline:
 
             return None
 
+    def tune_model(
+        self,
+        symbol: Optional[str] = None,
+        days_back: int = DEFAULT_TRAINING_DAYS,
+        n_trials: int = 27
+    ) -> Optional[Dict]:
+        """
+        Run a hyperparameter search for symbol, then train and register a model
+        with the best config (stored in MLModel.hyperparameters, reused by
+        train_model / train_all_symbols)
+
+        Args:
+            symbol: Symbol (None = global)
+            days_back: Days of training data
+            n_trials: Random configurations in the first successive-halving rung
+
+        Returns:
+            Search results dict or None on failure
+        """
+        symbol_name = symbol or 'GLOBAL'
+
+        try:
+            model = XGBoostConfidenceModel(
+                db=self.db,
+                account_id=self.account_id,
+                model_dir=self.model_dir
+            )
+            search = model.tune(symbol=symbol, days_back=days_back, n_trials=n_trials)
+
+        except Exception as e:
+            logger.error(f"❌ Hyperparameter search failed for {symbol_name}: {e}", exc_info=True)
+            return None
+
+        # Persist the tuned config by registering a model trained with it
+        # (later runs pick it up from MLModel.hyperparameters)
+        result = self.train_model(symbol=symbol, days_back=days_back, force=True, params=model.params)
+
+        if result is None:
+            return None
+
+        search['training_results'] = result
+        return search
+
     def train_all_symbols(
         self,
         days_back: int = DEFAULT_TRAINING_DAYS,
@@ -407,6 +481,8 @@ if __name__ == '__main__':
     parser.add_argument('--force', action='store_true', help='Force training even if not needed')
     parser.add_argument('--cleanup', action='store_true', help='Clean up old model files')
     parser.add_argument('--history', action='store_true', help='Show training history')
+    parser.add_argument('--tune', action='store_true', help='Run hyperparameter search before training')
+    parser.add_argument('--trials', type=int, default=27, help='Search trials in first rung (default: 27)')
 
     args = parser.parse_args()
 
@@ -440,6 +516,20 @@ if __name__ == '__main__':
 
             print(f"{run['id']:<5} {run['symbol']:<10} {started:<20} {duration:<10} {run['status']:<12} {accuracy:<10}")
 
+    elif args.tune:
+        symbol = args.symbol if args.symbol else None
+        search = pipeline.tune_model(symbol=symbol, days_back=args.days, n_trials=args.trials)
+
+        if search:
+            print(f"\n✅ Hyperparameter search complete!")
+            print(f"   Symbol: {search['symbol']}")
+            print(f"   Best logloss: {search['best_score']:.4f}")
+            print(f"   Trials: {len(search['trials'])} in {search['duration_seconds']:.1f}s")
+            for key, value in search['best_params'].items():
+                print(f"   {key:<20} {value}")
+        else:
+            print(f"\n⚠️ Hyperparameter search failed")
+
     elif args.all_symbols:
         stats = pipeline.train_all_symbols(
             days_back=args.days,
@@ -15,14 +15,18 @@ How it works:
 3. Updates: actual_outcome, actual_profit, outcome_time, was_correct
 4. Enables proper ML training with real-world results
 
+Labelling is set-based: one UPDATE ... FROM trades statement labels all
+pending predictions (backfills run it in close_time chunks), instead of
+one ORM round-trip per trade and prediction.
+
 Author: Claude Code
 Date: 2025-10-27
 """
 
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
-from sqlalchemy import and_
+from typing import Dict, Optional, Tuple
+from sqlalchemy import and_, text
 from database import ScopedSession
 from models import Trade, MLPrediction
 
@@ -37,9 +41,81 @@ class MLOutcomeUpdater:
     # Outcome determination thresholds
     MIN_PROFIT_FOR_WIN = 0.01  # Minimum profit to count as win (avoid rounding errors)
 
+    # Backfill chunk size (one UPDATE statement per chunk of close_time)
+    BACKFILL_CHUNK_DAYS = 7
+
+    # Set-based equivalent of _determine_outcome / _was_prediction_correct.
+    # If several closed trades share a signal, the earliest close wins (DISTINCT ON).
+    LABEL_OUTCOMES_SQL = """
+        WITH closed AS (
+            SELECT DISTINCT ON (t.signal_id)
+                   t.id, t.signal_id, t.profit, t.close_time
+            FROM trades t
+            WHERE t.status = 'closed'
+              AND t.signal_id IS NOT NULL
+              AND t.close_time IS NOT NULL
+              AND (CAST(:since AS timestamp) IS NULL OR t.close_time >= :since)
+              AND (CAST(:until AS timestamp) IS NULL OR t.close_time < :until)
+            ORDER BY t.signal_id, t.close_time ASC
+        )
+        UPDATE ml_predictions p
+        SET actual_outcome = CASE
+                WHEN c.profit IS NULL THEN 'unknown'
+                WHEN c.profit >= :min_win THEN 'win'
+                WHEN c.profit <= -:min_win THEN 'loss'
+                ELSE 'breakeven'
+            END,
+            actual_profit = COALESCE(c.profit, 0.0),
+            outcome_time = c.close_time,
+            was_correct = COALESCE(p.decision = 'trade' AND c.profit >= :min_win, FALSE),
+            prediction_error = CASE
+                WHEN p.predicted_value IS NOT NULL AND c.profit IS NOT NULL
+                THEN ABS(c.profit - p.predicted_value)
+                ELSE p.prediction_error
+            END,
+            trade_id = COALESCE(p.trade_id, c.id)
+        FROM closed c
+        WHERE p.signal_id = c.signal_id
+          AND p.actual_outcome IS NULL
+        RETURNING p.actual_outcome, p.was_correct, c.id
+    """
+
     def __init__(self):
         """Initialize ML Outcome Updater"""
         self.last_check_time = None
+        self.last_run_counts: Dict[str, int] = {}
+
+    def label_outcomes_bulk(
+        self,
+        db,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Label all pending predictions from closed trades in one statement
+
+        Args:
+            db: Database session (caller commits)
+            since: Only trades closed at/after this time (None = no limit)
+            until: Only trades closed before this time (None = no limit)
+
+        Returns:
+            Dict with updated, trades, win, loss, breakeven, unknown, correct counts
+        """
+        rows = db.execute(text(self.LABEL_OUTCOMES_SQL), {
+            'since': since,
+            'until': until,
+            'min_win': self.MIN_PROFIT_FOR_WIN
+        }).fetchall()
+
+        counts = {'updated': len(rows), 'trades': len({r[2] for r in rows}), 'correct': 0,
+                  'win': 0, 'loss': 0, 'breakeven': 0, 'unknown': 0}
+        for outcome, was_correct, _trade_id in rows:
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if was_correct:
+                counts['correct'] += 1
+
+        return counts
 
     def update_outcomes(self, db: Optional[ScopedSession] = None) -> Tuple[int, int]:
         """
@@ -57,79 +133,30 @@ class MLOutcomeUpdater:
             close_db = True
 
         try:
-            updated_count = 0
-            skipped_count = 0
-
-            # Find closed trades with signal_id that don't have outcomes yet
-            # Join with ml_predictions to find predictions without outcomes
-            closed_trades = db.query(Trade).filter(
+            # Closed trades with signal_id - the ones without pending predictions are "skipped"
+            closed_trades = db.query(Trade.id).filter(
                 Trade.status == 'closed',
                 Trade.signal_id.isnot(None),
                 Trade.close_time.isnot(None)
-            ).all()
-
-            logger.debug(f"Found {len(closed_trades)} closed trades with signal_id")
-
-            for trade in closed_trades:
-                try:
-                    # Find ML predictions for this signal
-                    predictions = db.query(MLPrediction).filter(
-                        MLPrediction.signal_id == trade.signal_id,
-                        MLPrediction.actual_outcome.is_(None)  # Only update if not already set
-                    ).all()
-
-                    if not predictions:
-                        skipped_count += 1
-                        continue
-
-                    # Determine outcome
-                    outcome = self._determine_outcome(trade)
-
-                    # Update all predictions for this signal
-                    for pred in predictions:
-                        # Calculate if prediction was correct
-                        was_correct = self._was_prediction_correct(
-                            pred.decision,
-                            trade.profit,
-                            pred.prediction_type if hasattr(pred, 'prediction_type') else None
-                        )
-
-                        # Update prediction
-                        pred.actual_outcome = outcome
-                        pred.actual_profit = float(trade.profit) if trade.profit else 0.0
-                        pred.outcome_time = trade.close_time
-                        pred.was_correct = was_correct
-
-                        # Calculate prediction error if we have predicted value
-                        if pred.predicted_value is not None and trade.profit is not None:
-                            pred.prediction_error = abs(float(trade.profit) - float(pred.predicted_value))
-
-                        # Link to trade
-                        if not pred.trade_id:
-                            pred.trade_id = trade.id
-
-                        updated_count += 1
-
-                        logger.debug(
-                            f"✅ Updated prediction {pred.id}: "
-                            f"signal={trade.signal_id}, outcome={outcome}, "
-                            f"profit={trade.profit:.2f}, correct={was_correct}"
-                        )
-
-                except Exception as e:
-                    logger.error(f"Error updating prediction for trade {trade.id}: {e}")
-                    continue
-
-            # Commit all updates
+            ).count()
+
+            counts = self.label_outcomes_bulk(db)
+
             db.commit()
 
-            if updated_count > 0 or skipped_count > 0:
+            updated_count = counts['updated']
+            skipped_count = max(closed_trades - counts['trades'], 0)
+
+            if updated_count > 0:
                 logger.info(
-                    f"📊 ML Outcome Update: {updated_count} predictions updated, "
-                    f"{skipped_count} skipped (already processed or no prediction)"
+                    f"📊 ML Outcome Update: {updated_count} predictions updated "
+                    f"({counts['win']} win / {counts['loss']} loss / {counts['breakeven']} breakeven) "
+                    f"from {counts['trades']} trades, {skipped_count} trades skipped "
+                    f"(already processed or no prediction)"
                 )
 
             self.last_check_time = datetime.utcnow()
+            self.last_run_counts = counts
 
             return (updated_count, skipped_count)
 
@@ -146,6 +173,8 @@ class MLOutcomeUpdater:
         """
         Determine trade outcome (win/loss/breakeven)
 
+        Single-trade reference for the CASE expression in LABEL_OUTCOMES_SQL.
+
         Args:
             trade: Trade object
 
@@ -217,33 +246,22 @@ class MLOutcomeUpdater:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-            # Total predictions
-            total_predictions = db.query(MLPrediction).filter(
-                MLPrediction.created_at >= cutoff_date
-            ).count()
-
-            # Predictions with outcomes
-            with_outcome = db.query(MLPrediction).filter(
-                MLPrediction.created_at >= cutoff_date,
-                MLPrediction.actual_outcome.isnot(None)
-            ).count()
-
-            # Correct predictions
-            correct = db.query(MLPrediction).filter(
-                MLPrediction.created_at >= cutoff_date,
-                MLPrediction.was_correct == True
-            ).count()
-
-            # Win/Loss breakdown
-            wins = db.query(MLPrediction).filter(
-                MLPrediction.created_at >= cutoff_date,
-                MLPrediction.actual_outcome == 'win'
-            ).count()
-
-            losses = db.query(MLPrediction).filter(
-                MLPrediction.created_at >= cutoff_date,
-                MLPrediction.actual_outcome == 'loss'
-            ).count()
+            # All counts in one aggregate query
+            row = db.execute(text("""
+                SELECT COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE actual_outcome IS NOT NULL) AS with_outcome,
+                       COUNT(*) FILTER (WHERE was_correct) AS correct,
+                       COUNT(*) FILTER (WHERE actual_outcome = 'win') AS wins,
+                       COUNT(*) FILTER (WHERE actual_outcome = 'loss') AS losses
+                FROM ml_predictions
+                WHERE created_at >= :cutoff
+            """), {'cutoff': cutoff_date}).one()
+
+            total_predictions = row.total
+            with_outcome = row.with_outcome
+            correct = row.correct
+            wins = row.wins
+            losses = row.losses
 
             # Calculate metrics
             outcome_rate = (with_outcome / total_predictions * 100) if total_predictions > 0 else 0
@@ -260,7 +278,9 @@ class MLOutcomeUpdater:
                 'losses': losses,
                 'win_rate_pct': round(win_rate, 2),
                 'days_analyzed': days,
-                'last_check': self.last_check_time.isoformat() if self.last_check_time else None
+                'last_check': self.last_check_time.isoformat() if self.last_check_time else None,
+                'last_run_updated': self.last_run_counts.get('updated', 0),
+                'last_run_trades': self.last_run_counts.get('trades', 0)
             }
 
         except Exception as e:
@@ -292,57 +312,29 @@ class MLOutcomeUpdater:
 
             logger.info(f"🔄 Starting backfill of ML outcomes for last {days} days...")
 
-            # Find all closed trades since cutoff
-            trades = db.query(Trade).filter(
-                Trade.status == 'closed',
-                Trade.signal_id.isnot(None),
-                Trade.close_time >= cutoff_date
-            ).all()
-
-            logger.info(f"Found {len(trades)} closed trades to backfill")
-
             updated_count = 0
-            batch_size = 100
-
-            for i, trade in enumerate(trades):
-                try:
-                    # Find predictions without outcomes
-                    predictions = db.query(MLPrediction).filter(
-                        MLPrediction.signal_id == trade.signal_id,
-                        MLPrediction.actual_outcome.is_(None)
-                    ).all()
-
-                    for pred in predictions:
-                        outcome = self._determine_outcome(trade)
-                        was_correct = self._was_prediction_correct(
-                            pred.decision,
-                            trade.profit,
-                            pred.prediction_type if hasattr(pred, 'prediction_type') else None
-                        )
-
-                        pred.actual_outcome = outcome
-                        pred.actual_profit = float(trade.profit) if trade.profit else 0.0
-                        pred.outcome_time = trade.close_time
-                        pred.was_correct = was_correct
-
-                        if not pred.trade_id:
-                            pred.trade_id = trade.id
-
-                        updated_count += 1
-
-                    # Commit in batches
-                    if (i + 1) % batch_size == 0:
-                        db.commit()
-                        logger.info(f"Backfilled {i + 1}/{len(trades)} trades ({updated_count} predictions)")
-
-                except Exception as e:
-                    logger.error(f"Error backfilling trade {trade.id}: {e}")
-                    continue
-
-            # Final commit
-            db.commit()
+            trade_count = 0
+            chunk = timedelta(days=self.BACKFILL_CHUNK_DAYS)
+            chunk_start = cutoff_date
+            now = datetime.utcnow()
+
+            # One UPDATE per chunk of close_time, committed per chunk
+            while chunk_start < now:
+                chunk_end = min(chunk_start + chunk, now)
+                counts = self.label_outcomes_bulk(
+                    db, since=chunk_start, until=None if chunk_end >= now else chunk_end
+                )
+                db.commit()
+
+                updated_count += counts['updated']
+                trade_count += counts['trades']
+                logger.info(
+                    f"Backfilled {chunk_start:%Y-%m-%d} → {chunk_end:%Y-%m-%d}: "
+                    f"{counts['updated']} predictions from {counts['trades']} trades"
+                )
+                chunk_start = chunk_end
 
-            logger.info(f"✅ Backfill complete: {updated_count} predictions updated from {len(trades)} trades")
+            logger.info(f"✅ Backfill complete: {updated_count} predictions updated from {trade_count} trades")
 
             return updated_count
 
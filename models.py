@@ -114,6 +114,8 @@ class Tick(Base):
     __tablename__ = 'ticks'
     __table_args__ = (
         Index('idx_symbol_timestamp', 'symbol', 'timestamp'),
+        # Redelivered stream entries are skipped by INSERT ... ON CONFLICT DO NOTHING
+        Index('uq_ticks_stream_entry', 'stream_id', 'stream_seq', 'timestamp', unique=True),
     )
 
     id = Column(Integer, primary_key=True)
@@ -125,6 +127,8 @@ class Tick(Base):
     volume = Column(BigInteger)
     timestamp = Column(DateTime, nullable=False, index=True)
     tradeable = Column(Boolean, default=True)  # Trading hours status
+    stream_id = Column(String(32))  # Redis tick stream entry ID (NULL for direct writes)
+    stream_seq = Column(Integer)  # Position of the tick within its stream entry
 
     def __repr__(self):
         return f"<Tick(symbol={self.symbol}, bid={self.bid}, ask={self.ask}, spread={self.spread}, tradeable={self.tradeable})>"
@@ -284,6 +288,10 @@ class TradeHistoryEvent(Base):
 class Command(Base):
     """Commands sent from Server to EA"""
     __tablename__ = 'commands'
+    __table_args__ = (
+        Index('idx_commands_account_ticket', 'account_id', 'ticket',
+              postgresql_where=text('ticket IS NOT NULL')),
+    )
 
     id = Column(String(64), primary_key=True)  # UUID
     account_id = Column(Integer, ForeignKey('accounts.id'), nullable=False)
@@ -291,6 +299,7 @@ class Command(Base):
     payload = Column(JSONB, nullable=False)
     status = Column(String(20), default='pending')  # pending, sent, success, failed
     response = Column(JSONB)
+    ticket = Column(BigInteger)  # response['ticket'] extracted for indexed ticket -> command lookups
     created_at = Column(DateTime, default=datetime.utcnow)
     executed_at = Column(DateTime)
 
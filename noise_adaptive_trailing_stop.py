@@ -18,6 +18,8 @@ from models import Trade, Tick
 from technical_indicators import TechnicalIndicators
 from session_volatility_analyzer import SessionVolatilityAnalyzer
 from smart_tp_sl import SymbolConfig
+from quote_book import get_quote_book
+from tick_windows import get_tick_windows
 
 logger = logging.getLogger(__name__)
 
@@ -103,6 +105,12 @@ class NoiseAdaptiveTrailingStop:
                 'tick_count': int,
             }
         """
+        # Rolling window fed from the tick stream (no ticks query)
+        tick_windows = get_tick_windows()
+        if tick_windows.covers(window_seconds):
+            stats = tick_windows.get_window_stats(symbol)
+            return self._classify_volatility(symbol, stats['avg_jump'], stats['max_jump'], stats['tick_count'])
+
         cutoff_time = datetime.utcnow() - timedelta(seconds=window_seconds)
 
         ticks = db.query(Tick).filter(
@@ -110,16 +118,6 @@ class NoiseAdaptiveTrailingStop:
             Tick.timestamp >= cutoff_time
         ).order_by(Tick.timestamp.asc()).all()
 
-        if len(ticks) < 5:
-            logger.warning(f"Insufficient tick data for {symbol}: {len(ticks)} ticks")
-            return {
-                'volatility_score': 0.5,
-                'classification': 'normal',
-                'avg_jump': 0.0,
-                'max_jump': 0.0,
-                'tick_count': len(ticks),
-            }
-
         # Calculate tick-to-tick price jumps
         jumps = []
         for i in range(1, len(ticks)):
@@ -131,6 +129,20 @@ class NoiseAdaptiveTrailingStop:
         avg_jump = sum(jumps) / len(jumps) if jumps else 0.0
         max_jump = max(jumps) if jumps else 0.0
 
+        return self._classify_volatility(symbol, avg_jump, max_jump, len(ticks))
+
+    def _classify_volatility(self, symbol: str, avg_jump: float, max_jump: float, tick_count: int) -> Dict:
+        """Classification and score from 60s jump statistics (same shape as analyze_60s_volatility)"""
+        if tick_count < 5:
+            logger.warning(f"Insufficient tick data for {symbol}: {tick_count} ticks")
+            return {
+                'volatility_score': 0.5,
+                'classification': 'normal',
+                'avg_jump': 0.0,
+                'max_jump': 0.0,
+                'tick_count': tick_count,
+            }
+
         # Get symbol-specific thresholds
         profile = self.noise_profiles.get(symbol, {
             'calm_threshold': avg_jump * 0.5,
@@ -163,7 +175,7 @@ class NoiseAdaptiveTrailingStop:
             'classification': classification,
             'avg_jump': avg_jump,
             'max_jump': max_jump,
-            'tick_count': len(ticks),
+            'tick_count': tick_count,
         }
 
     def get_base_atr(self, db, symbol: str, timeframe: str = 'M15') -> float:
@@ -183,10 +195,10 @@ class NoiseAdaptiveTrailingStop:
         for asset_class, config in SymbolConfig.ASSET_CLASSES.items():
             if symbol in config.get('symbols', []):
                 fallback_atr_pct = config.get('fallback_atr_pct', 0.001)
-                # Get approximate price from recent tick
-                tick = db.query(Tick).filter(Tick.symbol == symbol).order_by(Tick.timestamp.desc()).first()
-                if tick:
-                    mid_price = (tick.bid + tick.ask) / 2
+                # Get approximate price from the latest quote
+                quote = get_quote_book().get_quote(symbol)
+                if quote:
+                    mid_price = (quote['bid'] + quote['ask']) / 2
                     return mid_price * fallback_atr_pct
 
         # Ultimate fallback
@@ -254,10 +266,10 @@ class NoiseAdaptiveTrailingStop:
             return 1.0, 'UNKNOWN'
 
     def get_current_spread(self, db, symbol: str) -> float:
-        """Get current bid-ask spread from latest tick."""
-        tick = db.query(Tick).filter(Tick.symbol == symbol).order_by(Tick.timestamp.desc()).first()
-        if tick:
-            spread = tick.ask - tick.bid
+        """Get current bid-ask spread from the quote book."""
+        quote = get_quote_book().get_quote(symbol)
+        if quote:
+            spread = quote['ask'] - quote['bid']
             return spread
 
         # Fallback to profile
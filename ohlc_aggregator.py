@@ -173,11 +173,16 @@ def aggregate_m1_to_higher_timeframes(db, account_id, symbol):
     return total_created
 
 
-def cleanup_ticks_with_aggregation(db, account_id=None, minutes=1):
+def cleanup_ticks_with_aggregation(db, account_id=None, minutes=1, aggregate=True):
     """
     Aggregate old ticks to OHLC before deleting them
 
     NOTE: account_id kept for compatibility but not used (ticks are global now)
+
+    Args:
+        aggregate: Rebuild candles from the ticks before deleting them. The live
+                   server builds candles while ingesting (candle_builder) and
+                   passes False - this path is for scripts/backfills.
     """
     from datetime import datetime, timedelta
 
@@ -198,6 +203,9 @@ def cleanup_ticks_with_aggregation(db, account_id=None, minutes=1):
     total_aggregated = 0
     total_deleted = 0
 
+    if not aggregate:
+        symbols_with_ticks = []
+
     for (symbol,) in symbols_with_ticks:
         # Get time range of old ticks (no account_id filter)
         oldest_tick = db.query(func.min(Tick.timestamp)).filter(
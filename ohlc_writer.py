@@ -0,0 +1,95 @@
+"""
+Bulk OHLC Writer
+
+Shared insert path for OHLC candles: multi-row
+INSERT ... ON CONFLICT (symbol, timeframe, timestamp) DO NOTHING in chunks,
+instead of one existence SELECT per candle. Used by the EA history import
+(/api/ohlc/historical), the ML history importer, the candle builder and the
+historical data manager.
+
+Usage:
+    from ohlc_writer import bulk_insert_ohlc
+
+    result = bulk_insert_ohlc(db, rows)  # rows: dicts with OHLCData columns
+    db.commit()
+    # {'imported': 9870, 'skipped': 130, 'total': 10000}
+"""
+
+import logging
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import OHLCData
+
+logger = logging.getLogger(__name__)
+
+OHLC_CONFLICT_COLUMNS = ('symbol', 'timeframe', 'timestamp')
+
+# 5000 rows x 8 columns stays well below PostgreSQL's 65535 bind parameter limit
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def bulk_insert_ohlc(
+    db,
+    rows: Iterable[Dict],
+    table=None,
+    conflict_columns: Sequence[str] = OHLC_CONFLICT_COLUMNS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, int]:
+    """
+    Insert candles, skipping ones that already exist
+
+    Does not commit - the caller owns the transaction.
+
+    Args:
+        db: Session or Connection
+        rows: Dicts keyed by column name (all rows with the same keys)
+        table: Target table (default: ohlc_data)
+        conflict_columns: Unique key used for duplicate detection
+        chunk_size: Rows per INSERT statement
+
+    Returns:
+        Dict with imported, skipped and total counts
+    """
+    table = table if table is not None else OHLCData.__table__
+    rows = list(rows)
+    imported = 0
+
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        stmt = pg_insert(table).values(chunk).on_conflict_do_nothing(
+            index_elements=list(conflict_columns)
+        )
+        imported += db.execute(stmt).rowcount
+
+    return {
+        'imported': imported,
+        'skipped': len(rows) - imported,
+        'total': len(rows)
+    }
+
+
+def candle_rows(symbol: str, timeframe: str, candles: List[Dict], timestamps: List) -> List[Dict]:
+    """
+    Build ohlc_data rows from candle dicts (open/high/low/close/volume)
+
+    Args:
+        symbol: Trading symbol
+        timeframe: Timeframe
+        candles: Candle dicts
+        timestamps: Parsed timestamp for each candle (same order)
+    """
+    return [
+        {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'timestamp': timestamp,
+            'open': float(candle['open']),
+            'high': float(candle['high']),
+            'low': float(candle['low']),
+            'close': float(candle['close']),
+            'volume': int(candle.get('volume') or 0)
+        }
+        for candle, timestamp in zip(candles, timestamps)
+    ]
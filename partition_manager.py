@@ -0,0 +1,241 @@
+"""
+Partition Manager - ahead-of-time partition creation and partition-drop retention
+
+Time-series tables are range-partitioned by `timestamp`
+(see migrations/partition_time_series_tables.sql):
+- ticks                  daily    ticks_pYYYYMMDD
+- ohlc_data_m1           daily    ohlc_data_m1_pYYYYMMDD     (M1 candles)
+- ohlc_data_hist         monthly  ohlc_data_hist_pYYYYMM     (M5...W1 candles)
+- trade_history_events   monthly  trade_history_events_pYYYYMM
+- logs                   monthly  logs_pYYYYMM
+
+Retention detaches and drops whole partitions instead of running large
+DELETEs, so it costs the same no matter how many rows expire. Only the small
+<table>_default partition (rows outside the created ranges) is cleaned with
+a DELETE.
+
+Callers check is_partitioned() and keep their row-by-row DELETE fallback
+while the migration has not been applied.
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Range-partitioned table -> interval, retention (days, None = keep) and
+# number of future partitions to keep created
+PARTITIONED_TABLES = {
+    'ticks': {'interval': 'daily', 'retention_days': 7, 'premake': 7},
+    'ohlc_data_m1': {'interval': 'daily', 'retention_days': 7, 'premake': 7},
+    'ohlc_data_hist': {'interval': 'monthly', 'retention_days': 365, 'premake': 2},
+    'trade_history_events': {'interval': 'monthly', 'retention_days': None, 'premake': 2},
+    'logs': {'interval': 'monthly', 'retention_days': None, 'premake': 2},
+}
+
+PARTITION_COLUMN = 'timestamp'
+
+
+def period_bounds(day: datetime, interval: str):
+    """(start, end) of the daily/monthly partition containing day"""
+    if interval == 'daily':
+        start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        return start, start + timedelta(days=1)
+
+    start = day.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def partition_name(parent: str, start: datetime, interval: str) -> str:
+    """Partition table name (must match create_time_partitions() in the migration)"""
+    suffix = start.strftime('%Y%m%d') if interval == 'daily' else start.strftime('%Y%m')
+    return f"{parent}_p{suffix}"
+
+
+def retention_cutoff(parent: str, retention_days: int, now: Optional[datetime] = None) -> datetime:
+    """
+    Oldest timestamp kept for parent, aligned to its partition boundary
+
+    Everything before the cutoff lives in partitions that are dropped as a
+    whole.
+    """
+    now = now or datetime.utcnow()
+    start, _ = period_bounds(now - timedelta(days=retention_days), PARTITIONED_TABLES[parent]['interval'])
+    return start
+
+
+def is_partitioned(db, table: str) -> bool:
+    """True if table is a partitioned (parent) table"""
+    return db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {'t': table}
+    ).first() is not None
+
+
+def list_partitions(db, parent: str) -> List[str]:
+    """Names of the direct partitions of parent"""
+    rows = db.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:parent)
+        ORDER BY c.relname
+    """), {'parent': parent})
+    return [row[0] for row in rows]
+
+
+def ensure_partitions(db, parent: str, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the current and the next `premake` partitions of parent if missing
+
+    Returns:
+        Names of partitions created
+    """
+    spec = PARTITIONED_TABLES[parent]
+    now = now or datetime.utcnow()
+    existing = set(list_partitions(db, parent))
+    created = []
+
+    start, end = period_bounds(now, spec['interval'])
+    for _ in range(spec['premake'] + 1):
+        name = partition_name(parent, start, spec['interval'])
+        if name not in existing:
+            try:
+                with db.begin_nested():
+                    db.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{parent}" '
+                        f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                # E.g. rows for this range already landed in the default partition
+                logger.error(f"Could not create partition {name}: {e}")
+        start, end = period_bounds(end, spec['interval'])
+
+    db.commit()
+
+    if created:
+        logger.info(f"📅 Created partitions for {parent}: {', '.join(created)}")
+    return created
+
+
+def drop_expired_partitions(
+    db,
+    parent: str,
+    retention_days: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> Dict:
+    """
+    Detach and drop partitions entirely older than the retention window
+
+    Args:
+        db: Database session
+        parent: Partitioned table
+        retention_days: Override PARTITIONED_TABLES retention (None = use spec)
+
+    Returns:
+        Dict with dropped partition names and rows deleted from the default partition
+    """
+    spec = PARTITIONED_TABLES[parent]
+    retention_days = retention_days if retention_days is not None else spec['retention_days']
+    result = {'dropped': [], 'default_rows_deleted': 0}
+
+    if retention_days is None:
+        return result
+
+    cutoff = retention_cutoff(parent, retention_days, now)
+    pattern = re.compile(rf"^{re.escape(parent)}_p(\d{{8}}|\d{{6}})$")
+
+    for name in list_partitions(db, parent):
+        match = pattern.match(name)
+        if not match:
+            if name == f"{parent}_default":
+                deleted = db.execute(
+                    text(f'DELETE FROM "{name}" WHERE "{PARTITION_COLUMN}" < :cutoff'),
+                    {'cutoff': cutoff}
+                ).rowcount
+                result['default_rows_deleted'] += deleted
+            continue
+
+        suffix = match.group(1)
+        start = datetime.strptime(suffix, '%Y%m%d' if len(suffix) == 8 else '%Y%m')
+        _, end = period_bounds(start, 'daily' if len(suffix) == 8 else 'monthly')
+
+        if end <= cutoff:
+            db.execute(text(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"'))
+            db.execute(text(f'DROP TABLE "{name}"'))
+            result['dropped'].append(name)
+
+    db.commit()
+
+    if result['dropped'] or result['default_rows_deleted']:
+        logger.info(
+            f"🗑️  {parent}: dropped {len(result['dropped'])} partitions "
+            f"({', '.join(result['dropped']) or '-'}), "
+            f"{result['default_rows_deleted']} rows from default partition (>{retention_days}d)"
+        )
+    return result
+
+
+def maintain_partitions(db, retention_overrides: Optional[Dict[str, int]] = None) -> Dict[str, Dict]:
+    """
+    Create upcoming partitions and apply retention for all partitioned tables
+
+    Tables that are not partitioned (migration not applied) are skipped.
+
+    Args:
+        db: Database session
+        retention_overrides: Optional {table: retention_days}
+
+    Returns:
+        Dict table -> {'created': [...], 'dropped': [...], 'default_rows_deleted': n}
+    """
+    retention_overrides = retention_overrides or {}
+    summary = {}
+
+    for parent in PARTITIONED_TABLES:
+        try:
+            if not is_partitioned(db, parent):
+                continue
+            created = ensure_partitions(db, parent)
+            dropped = drop_expired_partitions(db, parent, retention_overrides.get(parent))
+            summary[parent] = {'created': created, **dropped}
+        except Exception as e:
+            logger.error(f"Partition maintenance failed for {parent}: {e}", exc_info=True)
+            db.rollback()
+
+    return summary
+
+
+if __name__ == '__main__':
+    import argparse
+    from database import ScopedSession
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Partition maintenance')
+    parser.add_argument('--list', action='store_true', help='List partitions per table')
+    args = parser.parse_args()
+
+    db = ScopedSession()
+    try:
+        if args.list:
+            for table in PARTITIONED_TABLES:
+                if is_partitioned(db, table):
+                    print(f"{table}: {', '.join(list_partitions(db, table))}")
+                else:
+                    print(f"{table}: not partitioned")
+        else:
+            for table, result in maintain_partitions(db).items():
+                print(f"{table}: created={len(result['created'])} dropped={len(result['dropped'])} "
+                      f"default_rows_deleted={result['default_rows_deleted']}")
+    finally:
+        db.close()
@@ -0,0 +1,292 @@
+"""
+Portfolio State - in-memory view of an account for the pre-trade risk gate
+
+AutoTrader.should_execute_signal used to run a handful of queries per signal
+(open positions, correlated positions, pending OPEN_TRADE commands, SL hits,
+today's P&L, account row). PortfolioState loads all of it with a few queries
+and answers the same questions from memory:
+- open positions by ticket, symbol, symbol+timeframe and currency leg
+- pending OPEN_TRADE commands by symbol
+- recent closes: realized P&L today, SL_HIT times, consecutive losses
+- account snapshot (balance, profit_today)
+- daily drawdown decision (DailyDrawdownProtection.check_and_update)
+
+The state is rebuilt when it is stale: the web server bumps
+portfolio:version:<account_id> after every trade sync/update and command
+response (RedisClient.publish_portfolio_event); sync() compares the version
+once per signal batch. It is also rebuilt after MAX_AGE seconds and at the UTC
+day rollover. Commands created by this process are added immediately
+(on_command_created) so later signals of the same batch see them.
+
+Usage:
+    from portfolio_state import get_portfolio_state
+
+    portfolio = get_portfolio_state(account_id)
+    portfolio.sync(db)
+    if portfolio.open_count() >= max_open_positions: ...
+"""
+
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, time as dtime
+from threading import Lock
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Account, Command, Trade
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioState:
+    MAX_AGE = 60            # Seconds before a rebuild even without events
+    CLOSED_LOOKBACK_HOURS = 24  # Closed trades kept in memory (covers today + SL-hit window)
+
+    def __init__(self, account_id: int):
+        """
+        Initialize Portfolio State
+
+        Args:
+            account_id: Account ID
+        """
+        self.account_id = account_id
+        self.lock = Lock()
+
+        self.positions: Dict[int, Dict] = {}     # ticket -> {symbol, direction, volume, timeframe}
+        self.pending_opens: Dict[str, str] = {}  # command_id -> symbol
+        self.closed: List[Dict] = []             # recent closes, newest first
+        self.account = None                      # SimpleNamespace(balance, profit_today)
+        self.dd_check: Dict = {'allowed': True}
+
+        self.loaded = False
+        self.version = None
+        self.loaded_at = 0.0
+        self.loaded_date = None
+
+        self.refreshes = 0
+        self.last_refresh_ms = 0.0
+
+    # ========================================================================
+    # LOAD
+    # ========================================================================
+
+    def sync(self, db: Session, auto_trading_enabled: bool = True) -> bool:
+        """
+        Make sure the state is current (call once per signal batch)
+
+        Returns:
+            True if the state was rebuilt
+        """
+        redis = get_redis()
+        try:
+            version = redis.get_portfolio_version(self.account_id)
+        except Exception as e:
+            logger.warning(f"Portfolio version unavailable, rebuilding state: {e}")
+            version = None
+
+        stale = (
+            not self.loaded
+            or version is None
+            or version != self.version
+            or time.monotonic() - self.loaded_at > self.MAX_AGE
+            or datetime.utcnow().date() != self.loaded_date
+        )
+        if stale:
+            self.refresh(db, auto_trading_enabled)
+            self.version = version
+
+        # EA snapshot from the tick path is newer than the accounts row
+        try:
+            snapshot = redis.get_account_state(self.account_id)
+        except Exception:
+            snapshot = None
+        if snapshot and self.account is not None:
+            for key in ('balance', 'profit_today'):
+                if snapshot.get(key) is not None:
+                    setattr(self.account, key, float(snapshot[key]))
+
+        return stale
+
+    def refresh(self, db: Session, auto_trading_enabled: bool = True):
+        """Rebuild the state from the database"""
+        start = time.perf_counter()
+        now = datetime.utcnow()
+
+        open_rows = db.query(
+            Trade.ticket, Trade.symbol, Trade.direction, Trade.volume, Trade.timeframe
+        ).filter(
+            Trade.account_id == self.account_id,
+            Trade.status == 'open'
+        ).order_by(Trade.ticket).all()
+
+        pending_rows = db.query(Command.id, Command.payload['symbol'].astext).filter(
+            Command.account_id == self.account_id,
+            Command.command_type == 'OPEN_TRADE',
+            Command.status.in_(['pending', 'processing'])
+        ).all()
+
+        closed_rows = db.query(
+            Trade.symbol, Trade.profit, Trade.close_reason, Trade.close_time
+        ).filter(
+            Trade.account_id == self.account_id,
+            Trade.status == 'closed',
+            Trade.close_time >= now - timedelta(hours=self.CLOSED_LOOKBACK_HOURS)
+        ).order_by(Trade.close_time.desc()).all()
+
+        account = db.query(Account.balance, Account.profit_today).filter(
+            Account.id == self.account_id
+        ).first()
+
+        # Same call (and side effects: day reset, limit logging) as the per-signal check
+        from daily_drawdown_protection import get_drawdown_protection
+        dd_check = get_drawdown_protection(self.account_id).check_and_update(
+            auto_trading_enabled=auto_trading_enabled
+        )
+
+        with self.lock:
+            self.positions = {
+                int(r.ticket): {
+                    'symbol': r.symbol,
+                    'direction': (r.direction or '').lower(),
+                    'volume': float(r.volume or 0),
+                    'timeframe': r.timeframe
+                }
+                for r in open_rows
+            }
+            self.pending_opens = {r[0]: r[1] for r in pending_rows}
+            self.closed = [
+                {
+                    'symbol': r.symbol,
+                    'profit': float(r.profit or 0),
+                    'close_reason': r.close_reason,
+                    'close_time': r.close_time
+                }
+                for r in closed_rows
+            ]
+            self.account = SimpleNamespace(
+                balance=float(account.balance or 0),
+                profit_today=float(account.profit_today) if account.profit_today is not None else None
+            ) if account else None
+            self.dd_check = dd_check
+
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            self.loaded_date = now.date()
+
+        self.refreshes += 1
+        self.last_refresh_ms = (time.perf_counter() - start) * 1000
+        logger.debug(
+            f"Portfolio state refreshed for account {self.account_id}: "
+            f"{len(self.positions)} open, {len(self.pending_opens)} pending, "
+            f"{len(self.closed)} recent closes ({self.last_refresh_ms:.1f}ms)"
+        )
+
+    def on_command_created(self, command_id: str, symbol: str):
+        """Count an OPEN_TRADE command created by this process right away"""
+        with self.lock:
+            self.pending_opens[command_id] = symbol
+        try:
+            get_redis().publish_portfolio_event(self.account_id, 'command_created', {
+                'command_id': command_id,
+                'symbol': symbol
+            })
+        except Exception as e:
+            logger.debug(f"Could not publish portfolio event: {e}")
+
+    # ========================================================================
+    # QUERIES (in memory)
+    # ========================================================================
+
+    def open_count(self) -> int:
+        """Open positions of the account"""
+        return len(self.positions)
+
+    def open_symbols(self, symbols=None) -> List[str]:
+        """Symbols of open positions (one entry per position, ticket order), optionally filtered"""
+        return [
+            p['symbol'] for p in self.positions.values()
+            if symbols is None or p['symbol'] in symbols
+        ]
+
+    def open_tickets(self, symbol: str, timeframe: Optional[str] = None) -> List[int]:
+        """Tickets of open positions on symbol (and timeframe)"""
+        return [
+            ticket for ticket, p in self.positions.items()
+            if p['symbol'] == symbol and (timeframe is None or p['timeframe'] == timeframe)
+        ]
+
+    def pending_count(self, symbol: str) -> int:
+        """Pending/processing OPEN_TRADE commands for symbol"""
+        return sum(1 for s in self.pending_opens.values() if s == symbol)
+
+    def sl_hits_since(self, symbol: str, cutoff: datetime) -> int:
+        """SL_HIT closes of symbol at or after cutoff"""
+        return sum(
+            1 for t in self.closed
+            if t['symbol'] == symbol and t['close_reason'] == 'SL_HIT'
+            and t['close_time'] is not None and t['close_time'] >= cutoff
+        )
+
+    def realized_pnl_today(self) -> float:
+        """Sum of profit of trades closed today (UTC)"""
+        today_start = datetime.combine(datetime.utcnow().date(), dtime.min)
+        return sum(t['profit'] for t in self.closed if t['close_time'] and t['close_time'] >= today_start)
+
+    def consecutive_losses(self, symbol: Optional[str] = None) -> int:
+        """Losing closes in a row (newest first) within the lookback, per symbol or account-wide"""
+        count = 0
+        for t in self.closed:
+            if symbol is not None and t['symbol'] != symbol:
+                continue
+            if t['profit'] >= 0:
+                break
+            count += 1
+        return count
+
+    def currency_exposure(self) -> Dict[str, float]:
+        """
+        Net lots per currency leg (buy EURUSD 0.1 -> EUR +0.1, USD -0.1)
+
+        Six-letter symbols (FX, XAUUSD) split into base/quote legs; others
+        (indices, crypto suffixes) count as one leg.
+        """
+        exposure = defaultdict(float)
+        for p in self.positions.values():
+            sign = 1.0 if p['direction'] in ('buy', '0') else -1.0
+            symbol = p['symbol']
+            if len(symbol) == 6 and symbol.isalpha():
+                exposure[symbol[:3]] += sign * p['volume']
+                exposure[symbol[3:]] -= sign * p['volume']
+            else:
+                exposure[symbol] += sign * p['volume']
+        return {leg: round(lots, 2) for leg, lots in exposure.items()}
+
+    def get_stats(self) -> Dict:
+        """State summary"""
+        return {
+            'account_id': self.account_id,
+            'loaded': self.loaded,
+            'version': self.version,
+            'open_positions': self.open_count(),
+            'pending_opens': len(self.pending_opens),
+            'recent_closes': len(self.closed),
+            'realized_pnl_today': round(self.realized_pnl_today(), 2),
+            'consecutive_losses': self.consecutive_losses(),
+            'currency_exposure': self.currency_exposure(),
+            'refreshes': self.refreshes,
+            'last_refresh_ms': round(self.last_refresh_ms, 2)
+        }
+
+
+# Global instances (one per account)
+_portfolio_states: Dict[int, PortfolioState] = {}
+
+def get_portfolio_state(account_id: int) -> PortfolioState:
+    """Get portfolio state instance for account"""
+    if account_id not in _portfolio_states:
+        _portfolio_states[account_id] = PortfolioState(account_id)
+    return _portfolio_states[account_id]
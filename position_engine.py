@@ -0,0 +1,809 @@
+"""
+Position Engine - one in-memory pass over all open positions per quote tick
+
+Position management used to be spread over separate pollers (TradeMonitor
+trailing, SmartTrailingStopV2.process_all, partial_close_worker,
+time_exit_worker, tpsl_monitor_worker, mfe_mae_tracker, ...). Each re-queried
+the open trades and the latest quotes on its own interval (10 s - 5 min) and
+committed its own commands and updates.
+
+The engine loads the open positions once and keeps them in memory:
+- reloaded (one query) on portfolio events (trade opened/closed/synced, see
+  RedisClient.publish_portfolio_event) and every REFRESH_SECONDS, because the
+  EA updates profit/SL/TP without events
+- every TICK_INTERVAL the quote book is read for the position symbols (one
+  Redis round-trip); positions whose symbol ticked run through the rule
+  pipeline (positions without ticks at least every IDLE_EVAL_SECONDS)
+
+Rules (PositionRule subclasses) only look at the in-memory position and the
+quote and act through the TickContext. The engine then:
+- coalesces commands per ticket: CLOSE wins over everything else, the most
+  protective SL wins among MODIFY proposals; all commands of a tick are
+  created with one commit (command_helper.create_commands) and pushed to the
+  Redis queue, which coalesces MODIFY_TRADE per ticket until delivery
+- batches trade updates (MFE/MAE, trailing counters) and new rows (SL history,
+  alerts) into one bulk UPDATE + commit every FLUSH_INTERVAL seconds
+
+DB load no longer grows with the number of rules, and reaction time drops
+from the poller intervals to one tick.
+
+Rules are selected with POSITION_ENGINE_RULES (comma-separated, default
+DEFAULT_RULES). Rule modules keep their own switches (TIME_EXIT_ENABLED,
+PARTIAL_CLOSE_ENABLED, ...).
+
+Usage:
+    from position_engine import start_position_engine
+
+    engine = start_position_engine()
+    engine.get_stats()
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from threading import Event, Thread
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from database import ScopedSession
+from models import Trade, TradeHistoryEvent, TradingSignal
+from quote_book import get_quote_book
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES = 'mfe_mae,tpsl_guard,time_exit,partial_close,trailing'
+
+# Trade columns mirrored into memory (rules read them like Trade attributes)
+POSITION_COLUMNS = (
+    'id', 'account_id', 'ticket', 'symbol', 'direction', 'volume', 'open_price',
+    'open_time', 'sl', 'tp', 'profit', 'source', 'signal_id', 'timeframe',
+    'max_favorable_excursion', 'max_adverse_excursion',
+    'trailing_stop_active', 'trailing_stop_moves'
+)
+
+
+def is_buy(position) -> bool:
+    """True for BUY positions (direction 'buy'/'BUY'/'0')"""
+    return str(position.direction).upper() in ('BUY', '0')
+
+
+def close_price(position, quote: Dict) -> float:
+    """Price the position would close at (bid for BUY, ask for SELL)"""
+    return quote['bid'] if is_buy(position) else quote['ask']
+
+
+def more_protective(position, sl: float, other: Optional[float]) -> bool:
+    """True if sl locks in more than other (higher for BUY, lower for SELL)"""
+    if other is None:
+        return True
+    return sl > other if is_buy(position) else sl < other
+
+
+# ============================================================================
+# RULE PIPELINE
+# ============================================================================
+
+class PositionRule:
+    """
+    Base class for engine rules
+
+    evaluate() is called per position per tick. Rules don't query, commit or
+    create commands themselves - they use the TickContext (ctx.close,
+    ctx.partial_close, ctx.modify_sl, ctx.update, ctx.add). ctx.db is
+    available for cached lookups (ATR, tick windows), not per-tick queries.
+    """
+    name = ''
+    interval = 0  # Minimum seconds between evaluations of the same position (0 = every tick)
+
+    def on_load(self, db, positions: Dict[int, SimpleNamespace]):
+        """Called after every (re)load of the open positions"""
+
+    def evaluate(self, position: SimpleNamespace, quote: Optional[Dict], ctx: 'TickContext'):
+        """Evaluate one position (quote is None if the symbol has no quote)"""
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict:
+        return {}
+
+
+RULES: Dict[str, type] = {}
+
+def register_rule(cls):
+    """Class decorator - make a rule selectable by name (POSITION_ENGINE_RULES)"""
+    RULES[cls.name] = cls
+    return cls
+
+
+class TickContext:
+    """Actions proposed by the rules during one engine cycle"""
+
+    def __init__(self, engine: 'PositionEngine', db, symbols):
+        self.engine = engine
+        self.db = db
+        self.symbols = symbols  # Symbols of all open positions
+        self.now = datetime.utcnow()
+
+        self.closes: Dict[int, tuple] = {}    # ticket -> (position, payload)
+        self.partials: Dict[int, tuple] = {}  # ticket -> (position, payload, on_sent)
+        self.modifies: Dict[int, Dict] = {}   # ticket -> most protective MODIFY proposal
+
+    def close(self, position, payload: Dict, reason: str):
+        """Close the position (first CLOSE of a tick wins, drops partial/modify)"""
+        if position.ticket not in self.closes:
+            self.closes[position.ticket] = (position, payload)
+            logger.info(f"🚪 Engine: CLOSE #{position.ticket} {position.symbol} - {reason}")
+
+    def partial_close(self, position, payload: Dict, on_sent: Optional[Callable] = None):
+        """Partially close the position (one partial close per ticket per tick)"""
+        if position.ticket not in self.partials:
+            self.partials[position.ticket] = (position, payload, on_sent)
+
+    def modify_sl(
+        self,
+        position,
+        sl: float,
+        price: float,
+        source: str,
+        reason: str,
+        on_sent: Optional[Callable] = None,
+        **extra
+    ):
+        """
+        Propose a new SL (the most protective proposal of a tick is sent)
+
+        Args:
+            position: Position
+            sl: New stop loss
+            price: Close-side price the proposal is based on
+            source: Proposing system (TradeHistoryEvent.source)
+            reason: Human readable reason (TradeHistoryEvent.reason)
+            on_sent: Called once the MODIFY command was created
+            **extra: Additional payload fields (e.g. trailing_version)
+        """
+        current = self.modifies.get(position.ticket)
+        if current is not None and not more_protective(position, sl, current['sl']):
+            return
+        self.modifies[position.ticket] = {
+            'position': position,
+            'sl': float(sl),
+            'price': price,
+            'source': source,
+            'reason': reason,
+            'on_sent': on_sent,
+            'extra': extra
+        }
+
+    def update(self, position, **fields):
+        """Set trade fields in memory and queue them for the next batched UPDATE"""
+        self.engine.mark_dirty(position, fields)
+
+    def add(self, row):
+        """Queue a new row (Log, TradeHistoryEvent, ...) for the next batched commit"""
+        self.engine.pending_rows.append(row)
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+class PositionEngine:
+    TICK_INTERVAL = 0.25      # Seconds between quote book reads
+    REFRESH_SECONDS = 5       # Reload positions without events (EA updates profit/SL/TP silently)
+    IDLE_EVAL_SECONDS = 10    # Evaluate positions whose symbol stopped ticking
+    FLUSH_INTERVAL = 5        # Seconds between batched trade updates
+    CLOSE_RETRY_SECONDS = 60  # Re-evaluate a position whose CLOSE was not executed
+    SENT_SL_TTL = 30          # Seconds a sent SL overrides the (not yet confirmed) DB value
+
+    def __init__(self, rules: Optional[List[str]] = None):
+        """
+        Initialize Position Engine
+
+        Args:
+            rules: Rule names in evaluation order (default: POSITION_ENGINE_RULES)
+        """
+        if rules is None:
+            rules = os.getenv('POSITION_ENGINE_RULES', DEFAULT_RULES).split(',')
+
+        self.rules: List[PositionRule] = []
+        for name in (r.strip() for r in rules):
+            if not name:
+                continue
+            if name not in RULES:
+                logger.warning(f"⚠️  Unknown position engine rule '{name}' - skipped")
+                continue
+            self.rules.append(RULES[name]())
+
+        self.positions: Dict[int, SimpleNamespace] = {}  # ticket -> position
+        self.reload_requested = Event()
+        self.loaded_at = 0.0
+
+        self.last_quote_ts: Dict[str, datetime] = {}  # symbol -> timestamp of the last evaluated quote
+        self.last_eval: Dict[tuple, float] = {}       # (rule name, ticket) -> monotonic time
+        self.closing: Dict[int, float] = {}           # ticket -> CLOSE sent at (monotonic)
+        self.sent_sl: Dict[int, tuple] = {}           # ticket -> (sl, sent at)
+
+        self.dirty: Dict[int, Dict] = {}  # ticket -> unflushed trade fields (incl. 'id')
+        self.pending_rows: List = []
+        self.last_flush = time.monotonic()
+
+        self.running = False
+        self.thread = None
+        self.listener_thread = None
+
+        self.cycles = 0
+        self.ticks = 0
+        self.evaluations = 0
+        self.rule_errors = 0
+        self.loads = 0
+        self.commands_sent = 0
+        self.rows_flushed = 0
+        self.last_cycle_ms = 0.0
+
+    # ========================================================================
+    # LIFECYCLE
+    # ========================================================================
+
+    def start(self):
+        """Start the engine loop and the portfolio event listener"""
+        if self.running:
+            logger.warning("Position engine already running")
+            return
+
+        self.running = True
+        self.thread = Thread(target=self._worker_loop, daemon=True, name='PositionEngine')
+        self.thread.start()
+        self.listener_thread = Thread(
+            target=self._event_listener_loop, daemon=True, name='PositionEngineEvents'
+        )
+        self.listener_thread.start()
+        logger.info(
+            f"⚙️  Position engine started (tick {self.TICK_INTERVAL}s, "
+            f"rules: {', '.join(r.name for r in self.rules) or 'none'})"
+        )
+
+    def stop(self):
+        """Stop the engine loop and write pending updates"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=10)
+        db = ScopedSession()
+        try:
+            self.flush(db)
+        finally:
+            db.close()
+        logger.info(f"Position engine stopped ({self.commands_sent} commands sent)")
+
+    def _worker_loop(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Position engine cycle error: {e}", exc_info=True)
+                time.sleep(1)
+            time.sleep(max(0.0, self.TICK_INTERVAL - (time.monotonic() - started)))
+
+    def _event_listener_loop(self):
+        """Reload positions as soon as the web server reports a portfolio change"""
+        while self.running:
+            pubsub = None
+            try:
+                pubsub = get_redis().client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe('portfolio:events:*')
+                logger.info("📡 Position engine subscribed to portfolio:events:*")
+
+                while self.running:
+                    if pubsub.get_message(timeout=1.0):
+                        self.reload_requested.set()
+
+            except Exception as e:
+                logger.error(f"Position engine event listener error (reconnecting in 5s): {e}")
+                time.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    # ========================================================================
+    # POSITIONS
+    # ========================================================================
+
+    def load(self, db):
+        """(Re)load all open positions with one query"""
+        rows = db.query(
+            *[getattr(Trade, column) for column in POSITION_COLUMNS],
+            TradingSignal.timeframe.label('signal_timeframe')
+        ).outerjoin(
+            TradingSignal, Trade.signal_id == TradingSignal.id
+        ).filter(
+            Trade.status == 'open'
+        ).all()
+
+        now = time.monotonic()
+        positions = {}
+        for row in rows:
+            position = SimpleNamespace(**row._asdict())
+            ticket = position.ticket = int(position.ticket)
+
+            # Unflushed values computed here are newer than the row
+            for key, value in self.dirty.get(ticket, {}).items():
+                setattr(position, key, value)
+
+            # The EA has not confirmed a sent SL yet - keep evaluating against it
+            sent = self.sent_sl.get(ticket)
+            if sent:
+                sl, sent_at = sent
+                db_sl = float(position.sl) if position.sl else None
+                if now - sent_at < self.SENT_SL_TTL and more_protective(position, sl, db_sl):
+                    position.sl = sl
+                else:
+                    del self.sent_sl[ticket]
+
+            positions[ticket] = position
+
+        for ticket in list(self.closing):
+            if ticket not in positions or now - self.closing[ticket] >= self.CLOSE_RETRY_SECONDS:
+                del self.closing[ticket]
+        for ticket in [t for t in self.sent_sl if t not in positions]:
+            del self.sent_sl[ticket]
+        self.last_eval = {key: at for key, at in self.last_eval.items() if key[1] in positions}
+
+        opened = len(positions.keys() - self.positions.keys())
+        closed = len(self.positions.keys() - positions.keys())
+        self.positions = positions
+        self.loaded_at = now
+        self.loads += 1
+
+        for rule in self.rules:
+            try:
+                rule.on_load(db, positions)
+            except Exception as e:
+                logger.error(f"Rule {rule.name} failed on load: {e}", exc_info=True)
+
+        if opened or closed:
+            logger.info(f"⚙️  Position engine: {len(positions)} open (+{opened} / -{closed})")
+
+    def mark_dirty(self, position, fields: Dict):
+        """Apply fields to the in-memory position and queue them for the batched UPDATE"""
+        for key, value in fields.items():
+            setattr(position, key, value)
+        self.dirty.setdefault(position.ticket, {'id': position.id}).update(fields)
+
+    # ========================================================================
+    # CYCLE
+    # ========================================================================
+
+    def run_once(self) -> int:
+        """
+        One engine cycle: reload if needed, evaluate ticked positions, send commands
+
+        Returns:
+            Number of positions evaluated
+        """
+        start = time.perf_counter()
+        db = ScopedSession()
+        try:
+            now = time.monotonic()
+            if self.reload_requested.is_set() or now - self.loaded_at >= self.REFRESH_SECONDS:
+                self.reload_requested.clear()
+                self.load(db)
+
+            evaluated = 0
+            if self.positions:
+                evaluated = self._evaluate(db, now)
+
+            if (self.dirty or self.pending_rows) and now - self.last_flush >= self.FLUSH_INTERVAL:
+                self.flush(db)
+        finally:
+            db.close()
+
+        self.cycles += 1
+        self.last_cycle_ms = (time.perf_counter() - start) * 1000
+        return evaluated
+
+    def _evaluate(self, db, now: float) -> int:
+        symbols = {p.symbol for p in self.positions.values()}
+        quotes = get_quote_book().get_quotes(symbols)
+
+        ticked = {
+            symbol for symbol, quote in quotes.items()
+            if quote['timestamp'] != self.last_quote_ts.get(symbol)
+        }
+        for symbol in ticked:
+            self.last_quote_ts[symbol] = quotes[symbol]['timestamp']
+        if ticked:
+            self.ticks += 1
+
+        ctx = TickContext(self, db, symbols)
+        evaluated = 0
+
+        for ticket, position in self.positions.items():
+            if ticket in self.closing:
+                continue
+
+            quote = quotes.get(position.symbol)
+            idle = position.symbol not in ticked
+            ran = False
+
+            for rule in self.rules:
+                key = (rule.name, ticket)
+                last = self.last_eval.get(key)
+                min_gap = max(rule.interval, self.IDLE_EVAL_SECONDS if idle else 0)
+                if last is not None and now - last < min_gap:
+                    continue
+
+                self.last_eval[key] = now
+                ran = True
+                try:
+                    rule.evaluate(position, quote, ctx)
+                except Exception as e:
+                    self.rule_errors += 1
+                    logger.error(f"Rule {rule.name} failed for #{ticket}: {e}", exc_info=True)
+
+            if ran:
+                evaluated += 1
+
+        self.evaluations += evaluated
+        self._send_commands(db, ctx)
+        return evaluated
+
+    def _send_commands(self, db, ctx: TickContext):
+        """Create the coalesced commands of one cycle with one commit"""
+        from command_helper import create_commands
+
+        commands = []
+        sent = []  # (position, command_type, proposal) in command order
+
+        for ticket, (position, payload) in ctx.closes.items():
+            commands.append((position.account_id, 'CLOSE_TRADE', payload))
+            sent.append((position, 'CLOSE_TRADE', None))
+
+        for ticket, (position, payload, on_sent) in ctx.partials.items():
+            if ticket in ctx.closes:
+                continue
+            commands.append((position.account_id, 'PARTIAL_CLOSE_TRADE', payload))
+            sent.append((position, 'PARTIAL_CLOSE_TRADE', on_sent))
+
+        for ticket, proposal in ctx.modifies.items():
+            if ticket in ctx.closes:
+                continue
+            position = proposal['position']
+            payload = {
+                'ticket': ticket,
+                'symbol': position.symbol,
+                'sl': proposal['sl'],
+                'tp': float(position.tp) if position.tp else 0.0,
+                **proposal['extra']
+            }
+            commands.append((position.account_id, 'MODIFY_TRADE', payload))
+            sent.append((position, 'MODIFY_TRADE', proposal))
+
+        if not commands:
+            return
+
+        try:
+            create_commands(db, commands)
+        except Exception as e:
+            logger.error(f"Position engine could not create {len(commands)} command(s): {e}")
+            db.rollback()
+            return
+
+        self.commands_sent += len(commands)
+        now = time.monotonic()
+
+        for position, command_type, extra in sent:
+            if command_type == 'CLOSE_TRADE':
+                self.closing[position.ticket] = now
+            elif command_type == 'PARTIAL_CLOSE_TRADE':
+                if extra:
+                    extra()
+            else:
+                self._on_modify_sent(position, extra, now)
+
+    def _on_modify_sent(self, position, proposal: Dict, now: float):
+        old_sl = float(position.sl) if position.sl else None
+        new_sl = proposal['sl']
+
+        if old_sl and old_sl != new_sl:
+            self.pending_rows.append(TradeHistoryEvent(
+                trade_id=position.id,
+                ticket=position.ticket,
+                event_type='SL_MODIFIED',
+                timestamp=datetime.utcnow(),
+                old_value=old_sl,
+                new_value=new_sl,
+                reason=proposal['reason'],
+                source=proposal['source'],
+                price_at_change=proposal['price']
+            ))
+            self.mark_dirty(position, {
+                'trailing_stop_active': True,
+                'trailing_stop_moves': int(position.trailing_stop_moves or 0) + 1
+            })
+
+        position.sl = new_sl
+        self.sent_sl[position.ticket] = (new_sl, now)
+
+        if proposal['on_sent']:
+            proposal['on_sent']()
+
+    # ========================================================================
+    # BATCHED WRITES
+    # ========================================================================
+
+    def flush(self, db) -> int:
+        """Write queued trade updates and rows with one commit"""
+        dirty, self.dirty = self.dirty, {}
+        rows, self.pending_rows = self.pending_rows, []
+        self.last_flush = time.monotonic()
+
+        if not dirty and not rows:
+            return 0
+
+        try:
+            if dirty:
+                db.bulk_update_mappings(Trade, list(dirty.values()))
+            if rows:
+                db.add_all(rows)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Position engine flush failed, {len(dirty)} updates re-queued: {e}")
+            db.rollback()
+            # Newer values that arrived meanwhile win
+            for ticket, fields in dirty.items():
+                self.dirty[ticket] = {**fields, **self.dirty.get(ticket, {})}
+            self.pending_rows = rows + self.pending_rows
+            return 0
+
+        self.rows_flushed += len(dirty) + len(rows)
+        logger.debug(f"Position engine flush: {len(dirty)} trade updates, {len(rows)} new rows")
+        return len(dirty) + len(rows)
+
+    def get_stats(self) -> Dict:
+        """Engine statistics"""
+        return {
+            'running': self.running,
+            'rules': [rule.name for rule in self.rules],
+            'open_positions': len(self.positions),
+            'closing': len(self.closing),
+            'cycles': self.cycles,
+            'ticks': self.ticks,
+            'evaluations': self.evaluations,
+            'rule_errors': self.rule_errors,
+            'loads': self.loads,
+            'commands_sent': self.commands_sent,
+            'pending_updates': len(self.dirty),
+            'pending_rows': len(self.pending_rows),
+            'rows_flushed': self.rows_flushed,
+            'last_cycle_ms': round(self.last_cycle_ms, 2),
+            'rule_stats': {rule.name: rule.get_stats() for rule in self.rules}
+        }
+
+
+# ============================================================================
+# BUILT-IN RULES
+# ============================================================================
+
+@register_rule
+class MFEMAERule(PositionRule):
+    """Maximum favorable/adverse excursion in pips (replaces mfe_mae_tracker)"""
+    name = 'mfe_mae'
+
+    def __init__(self):
+        from workers.mfe_mae_tracker import MFEMAETracker
+        self.tracker = MFEMAETracker()
+
+    def evaluate(self, position, quote, ctx):
+        if quote is None:
+            return
+        if self.tracker.update_trade_mfe_mae(ctx.db, position, current_quote=quote):
+            ctx.update(
+                position,
+                max_favorable_excursion=position.max_favorable_excursion,
+                max_adverse_excursion=position.max_adverse_excursion
+            )
+
+
+@register_rule
+class TPSLGuardRule(PositionRule):
+    """Alert once per position opened without TP/SL (replaces tpsl_monitor_worker)"""
+    name = 'tpsl_guard'
+
+    def __init__(self):
+        from workers.tpsl_monitor_worker import TPSLMonitor
+        self.monitor = TPSLMonitor
+        self.alerted_tickets = set()
+
+    def on_load(self, db, positions):
+        self.alerted_tickets &= positions.keys()
+
+    def evaluate(self, position, quote, ctx):
+        if position.ticket in self.alerted_tickets or (position.tp and position.sl):
+            return
+        ctx.add(self.monitor.missing_tpsl_log(position))
+        self.alerted_tickets.add(position.ticket)
+
+    def get_stats(self):
+        return {'alerted': len(self.alerted_tickets)}
+
+
+@register_rule
+class TimeExitRule(PositionRule):
+    """Close positions past their timeframe's max duration (replaces time_exit_worker)"""
+    name = 'time_exit'
+    interval = 10  # Durations are hours - no need to re-check every tick
+
+    def __init__(self):
+        import workers.time_exit_worker as tew
+        self.tew = tew
+        self.enabled = os.getenv('TIME_EXIT_ENABLED', 'false').lower() == 'true'
+
+    def evaluate(self, position, quote, ctx):
+        if not self.enabled or not position.open_time:
+            return
+        # Same default as time_exit_worker.get_trade_timeframe
+        timeframe = position.signal_timeframe or 'H4'
+        should_close, reason = self.tew.should_close_trade(ctx.db, position, timeframe=timeframe)
+        if should_close:
+            ctx.close(position, self.tew.close_command_payload(position, reason), reason)
+
+
+@register_rule
+class PartialCloseRule(PositionRule):
+    """Staged profit taking at % of TP distance (replaces partial_close_worker)"""
+    name = 'partial_close'
+
+    def __init__(self):
+        import workers.partial_close_worker as pcw
+        self.pcw = pcw
+        self.done_stages: Dict[int, set] = {}  # ticket -> executed stages
+
+    def on_load(self, db, positions):
+        self.done_stages = {t: s for t, s in self.done_stages.items() if t in positions}
+
+        # Stages sent before a restart (one query, only for positions not seen yet)
+        new_tickets = [t for t in positions if t not in self.done_stages]
+        if not new_tickets:
+            return
+
+        self.done_stages.update(self.pcw.get_done_stages(db, new_tickets))
+
+    def evaluate(self, position, quote, ctx):
+        pcw = self.pcw
+        if not pcw.PARTIAL_CLOSE_ENABLED or quote is None:
+            return
+        if not position.tp or not position.sl or float(position.volume) < pcw.MIN_LOT_FOR_PARTIAL:
+            return
+
+        done = self.done_stages.setdefault(position.ticket, set())
+        progress = pcw.calculate_tp_progress(position, close_price(position, quote))
+        should_close, close_percent, reason = pcw.should_partial_close(ctx.db, position, progress, done)
+        if not should_close or not close_percent:
+            return
+
+        stage = reason.split('_')[0]
+        payload = pcw.partial_close_payload(position, close_percent, reason)
+        if payload is None:
+            done.add(stage)  # Volume too small for this stage - don't retry every tick
+            return
+
+        logger.info(
+            f"💰 Trade {position.ticket} ({position.symbol} {position.direction}): "
+            f"Progress {progress:.1f}% → Partial close {close_percent*100:.0f}% ({reason})"
+        )
+        ctx.partial_close(position, payload, on_sent=lambda: done.add(stage))
+
+
+@register_rule
+class SmartTrailingRule(PositionRule):
+    """
+    Hybrid adaptive trailing stop (replaces SmartTrailingStopV2.process_all)
+
+    SmartTrailingStopV2 keeps its per-ticket, volatility-dependent rate limit
+    (5-30 s); volatility and ATR are refreshed for all position symbols at once.
+    """
+    name = 'trailing'
+    VOLATILITY_REFRESH_SECONDS = 5
+
+    def __init__(self):
+        from smart_trailing_stop_v2 import get_smart_trailing_v2
+        self.trailing = get_smart_trailing_v2()
+        self.windows: Dict[str, np.ndarray] = {}
+        self.volatility: Dict[str, Dict] = {}
+        self.atr: Dict[str, float] = {}
+        self.refreshed_at = 0.0
+        self.trailed = 0
+
+    def _refresh(self, db, symbols):
+        symbols = sorted(symbols)
+        _, self.windows = self.trailing._load_tick_windows(db, symbols, window_seconds=60)
+        self.volatility = {
+            symbol: self.trailing.volatility_analyzer.analyze_prices(
+                symbol, self.windows.get(symbol, np.zeros(0)).tolist()
+            )
+            for symbol in symbols
+        }
+        self.atr = self.trailing._get_atr(db, symbols)
+        self.refreshed_at = time.monotonic()
+
+    def evaluate(self, position, quote, ctx):
+        if quote is None or not position.sl:
+            return
+
+        if (time.monotonic() - self.refreshed_at >= self.VOLATILITY_REFRESH_SECONDS
+                or position.symbol not in self.volatility):
+            self._refresh(ctx.db, ctx.symbols)
+
+        price = close_price(position, quote)
+        predictor = self.trailing.reversal_predictor
+        features = predictor.build_feature_matrix([position], np.asarray([price]), self.windows, self.atr)
+        reversal_prob = float(predictor.predict_reversal_probabilities(features)[0])
+
+        result = self.trailing.calculate_new_sl(
+            ctx.db, position, price,
+            volatility=self.volatility[position.symbol],
+            reversal_prob=reversal_prob
+        )
+        if result is None:
+            return
+
+        def on_sent(ticket=position.ticket):
+            self.trailing.last_update[ticket] = datetime.utcnow()
+            self.trailed += 1
+
+        ctx.modify_sl(
+            position, result['new_sl'], price,
+            source='smart_trailing_stop_v2',
+            reason='Hybrid Adaptive Trailing Stop V2',
+            on_sent=on_sent,
+            trailing_stop=True,
+            trailing_version='v2_hybrid'
+        )
+
+    def get_stats(self):
+        return {'trailed': self.trailed, 'symbols': len(self.volatility)}
+
+
+@register_rule
+class MicroTrailingRule(PositionRule):
+    """Fixed-step micro trailing (micro_trailing_manager) - opt-in via POSITION_ENGINE_RULES"""
+    name = 'micro_trailing'
+
+    def __init__(self):
+        from micro_trailing_manager import get_micro_trailing_manager
+        self.manager = get_micro_trailing_manager()
+
+    def evaluate(self, position, quote, ctx):
+        if quote is None:
+            return
+        price = close_price(position, quote)
+        result = self.manager.calculate_micro_trailing_stop(position, price, ctx.db)
+        if result:
+            ctx.modify_sl(
+                position, result['new_sl'], price,
+                source='micro_trailing_manager',
+                reason=result['reason']
+            )
+
+
+# Global instance
+_position_engine = None
+
+def get_position_engine() -> PositionEngine:
+    """Get global position engine instance"""
+    global _position_engine
+    if _position_engine is None:
+        _position_engine = PositionEngine()
+    return _position_engine
+
+def start_position_engine() -> PositionEngine:
+    """Start the global position engine"""
+    engine = get_position_engine()
+    engine.start()
+    return engine
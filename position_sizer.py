@@ -15,7 +15,8 @@ import logging
 from typing import Dict, Optional
 from decimal import Decimal
 from sqlalchemy.orm import Session
-from models import Account, BrokerSymbol
+from models import BrokerSymbol
+from account_state import get_account_snapshot
 from sqlalchemy import text
 
 logger = logging.getLogger(__name__)
@@ -162,14 +163,12 @@ class PositionSizer:
             Lot size (rounded to symbol's lot step)
         """
         try:
-            # Get account balance
-            account = db.query(Account).filter_by(id=account_id).first()
-            if not account or not account.balance:
+            # Get account balance (Redis account snapshot, accounts row as fallback)
+            balance = get_account_snapshot(account_id, db, fields=('balance',)).get('balance')
+            if not balance:
                 logger.warning(f"Account {account_id} not found or no balance, using min lot")
                 return self.min_lot_size
 
-            balance = float(account.balance)
-
             # 🎯 DYNAMIC RISK: Get balance-appropriate risk percentage
             # Small accounts (1000€) → 1.5% max, Large accounts (10k€) → 3.5% max
             dynamic_risk_percent = self.get_dynamic_risk_percent(balance)
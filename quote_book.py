@@ -0,0 +1,209 @@
+"""
+Quote Book - latest bid/ask per symbol, shared by all processes
+
+The web server writes the newest tick of every /api/ticks batch into one Redis
+hash per symbol; workers read it instead of querying the `ticks` table with
+ORDER BY timestamp DESC LIMIT 1. A short-lived in-process cache in front of
+Redis absorbs repeated lookups inside one worker cycle.
+
+Quotes are GLOBAL (no account_id) - a EURUSD quote is the same for everyone.
+
+Usage:
+    from quote_book import get_quote_book
+
+    quote = get_quote_book().get_quote('EURUSD')
+    # {'symbol': 'EURUSD', 'bid': 1.0851, 'ask': 1.0852, 'spread': 0.0001,
+    #  'timestamp': datetime(...), 'tradeable': True}
+
+    quotes = get_quote_book().get_quotes(['EURUSD', 'GBPUSD'])  # one round-trip
+"""
+
+import logging
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteBook:
+    KEY_PREFIX = 'quote:'
+    QUOTE_TTL = 86400  # Drop quotes of symbols that stopped ticking (1 day)
+
+    def __init__(self, local_ttl: float = 0.5):
+        """
+        Initialize Quote Book
+
+        Args:
+            local_ttl: Seconds a quote is served from the in-process cache
+                       before Redis is asked again
+        """
+        self.local_ttl = local_ttl
+        self._cache: Dict[str, tuple] = {}  # symbol -> (quote, fetched_at)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ========================================================================
+    # WRITE (web server, /api/ticks)
+    # ========================================================================
+
+    def update_quotes(self, ticks: List[Dict]):
+        """
+        Store the newest tick per symbol from a tick batch
+
+        Args:
+            ticks: Tick dicts with symbol, bid, ask, spread, timestamp (UTC epoch)
+                   and optional tradeable flag
+        """
+        latest: Dict[str, Dict] = {}
+        for tick in ticks:
+            symbol = tick.get('symbol')
+            if not symbol or tick.get('bid') is None or tick.get('ask') is None:
+                continue
+            current = latest.get(symbol)
+            if current is None or (tick.get('timestamp') or 0) >= (current.get('timestamp') or 0):
+                latest[symbol] = tick
+
+        if not latest:
+            return
+
+        pipe = get_redis().client.pipeline(transaction=False)
+        now = time.monotonic()
+
+        for symbol, tick in latest.items():
+            bid = float(tick['bid'])
+            ask = float(tick['ask'])
+            spread = tick.get('spread')
+            fields = {
+                'bid': bid,
+                'ask': ask,
+                'spread': float(spread) if spread is not None else ask - bid,
+                'timestamp': float(tick.get('timestamp') or time.time()),
+                'tradeable': 1 if tick.get('tradeable', True) else 0
+            }
+            key = f"{self.KEY_PREFIX}{symbol}"
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, self.QUOTE_TTL)
+
+            with self._lock:
+                self._cache[symbol] = (self._to_quote(symbol, fields), now)
+
+        pipe.execute()
+
+    def update_block(self, block):
+        """Store the newest tick per symbol from a TickBlock (see update_quotes)"""
+        latest = block.latest_per_symbol()
+        if not latest:
+            return
+
+        pipe = get_redis().client.pipeline(transaction=False)
+        now = time.monotonic()
+
+        for symbol, i in latest.items():
+            fields = {
+                'bid': float(block.bid[i]),
+                'ask': float(block.ask[i]),
+                'spread': float(block.spread[i]),
+                'timestamp': float(block.timestamp[i]),
+                'tradeable': 1 if block.tradeable[i] else 0
+            }
+            key = f"{self.KEY_PREFIX}{symbol}"
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, self.QUOTE_TTL)
+
+            with self._lock:
+                self._cache[symbol] = (self._to_quote(symbol, fields), now)
+
+        pipe.execute()
+
+    # ========================================================================
+    # READ (workers)
+    # ========================================================================
+
+    def get_quote(self, symbol: str) -> Optional[Dict]:
+        """Latest quote for one symbol (None if the symbol never ticked)"""
+        return self.get_quotes([symbol]).get(symbol)
+
+    def get_quotes(self, symbols: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Latest quotes for several symbols in one Redis round-trip
+
+        Returns:
+            Dict symbol -> quote (symbols without a quote are omitted)
+        """
+        now = time.monotonic()
+        result = {}
+        missing = []
+
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                cached = self._cache.get(symbol)
+                if cached and now - cached[1] < self.local_ttl:
+                    result[symbol] = cached[0]
+                else:
+                    missing.append(symbol)
+
+        self.hits += len(result)
+        if not missing:
+            return result
+
+        self.misses += len(missing)
+        pipe = get_redis().client.pipeline(transaction=False)
+        for symbol in missing:
+            pipe.hgetall(f"{self.KEY_PREFIX}{symbol}")
+
+        with self._lock:
+            for symbol, fields in zip(missing, pipe.execute()):
+                if not fields:
+                    continue
+                quote = self._to_quote(symbol, fields)
+                self._cache[symbol] = (quote, now)
+                result[symbol] = quote
+
+        return result
+
+    def get_all_quotes(self) -> Dict[str, Dict]:
+        """Quotes for every symbol in the book (SCAN - for dashboards, not hot paths)"""
+        symbols = [
+            key[len(self.KEY_PREFIX):]
+            for key in get_redis().client.scan_iter(match=f"{self.KEY_PREFIX}*", count=500)
+        ]
+        return self.get_quotes(symbols)
+
+    @staticmethod
+    def _to_quote(symbol: str, fields: Dict) -> Dict:
+        # Same naive-datetime convention as the ticks table (TickBatchWriter)
+        return {
+            'symbol': symbol,
+            'bid': float(fields['bid']),
+            'ask': float(fields['ask']),
+            'spread': float(fields['spread']),
+            'timestamp': datetime.fromtimestamp(float(fields['timestamp'])),
+            'tradeable': str(fields.get('tradeable', 1)) not in ('0', 'False', 'false')
+        }
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        total = self.hits + self.misses
+        return {
+            'cached_symbols': len(self._cache),
+            'local_ttl': self.local_ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 1) if total > 0 else 0
+        }
+
+
+# Global instance
+_quote_book = None
+
+def get_quote_book() -> QuoteBook:
+    """Get global quote book instance"""
+    global _quote_book
+    if _quote_book is None:
+        _quote_book = QuoteBook()
+    return _quote_book
@@ -7,6 +7,7 @@ import redis
 import json
 import logging
 import os
+import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,7 @@ class RedisClient:
             raise ValueError("REDIS_URL environment variable is required")
         self.client = None
         self.pubsub = None
+        self._scripts = {}
         self.connect()
 
     def connect(self):
@@ -43,49 +45,211 @@ class RedisClient:
             logger.info("Disconnected from Redis")
 
     # ========================================================================
-    # COMMAND QUEUE
+    # COMMAND QUEUE (priority lanes)
     # ========================================================================
+    #
+    # Each account has one list per lane, served in COMMAND_LANES order:
+    #   close   CLOSE_TRADE / PARTIAL_CLOSE_TRADE / CRITICAL commands
+    #   open    OPEN_TRADE
+    #   modify  MODIFY_TRADE with sl/tp - coalesced per ticket: the lane holds
+    #           tickets, commands:account:<id>:modify:latest holds the newest
+    #           command per ticket, so only the latest pending SL/TP of a ticket
+    #           is delivered
+    #   other   history/info requests, other MODIFY_TRADEs (e.g. trailing_stop)
+    #           and anything else
+    # The pre-lane list commands:account:<id> is still drained (last).
+
+    COMMAND_LANES = ('close', 'open', 'modify', 'other')
+    COMMAND_QUEUE_TTL = 3600  # Seconds - prevents buildup if the EA is gone
+
+    COMMAND_TYPE_LANES = {
+        'CLOSE_TRADE': 'close',
+        'PARTIAL_CLOSE_TRADE': 'close',
+        'OPEN_TRADE': 'open',
+        'MODIFY_TRADE': 'modify',
+    }
+
+    # KEYS: modify lane, latest hash | ARGV: ticket, command json, ttl
+    # Returns the superseded command json (nil if the ticket had none pending)
+    _PUSH_MODIFY_LUA = """
+        local old = redis.call('HGET', KEYS[2], ARGV[1])
+        redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+        if not old then redis.call('RPUSH', KEYS[1], ARGV[1]) end
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        redis.call('EXPIRE', KEYS[2], ARGV[3])
+        return old
+    """
+
+    # KEYS: lane lists in priority order..., latest hash | ARGV: max count, modify lane index
+    _POP_BATCH_LUA = """
+        local out = {}
+        local max_count = tonumber(ARGV[1])
+        local modify_lane = tonumber(ARGV[2])
+        local latest = KEYS[#KEYS]
+        for i = 1, #KEYS - 1 do
+            while #out < max_count do
+                local item = redis.call('LPOP', KEYS[i])
+                if not item then break end
+                if i == modify_lane then
+                    local cmd = redis.call('HGET', latest, item)
+                    if cmd then
+                        redis.call('HDEL', latest, item)
+                        table.insert(out, cmd)
+                    end
+                else
+                    table.insert(out, item)
+                end
+            end
+        end
+        return out
+    """
+
+    # KEYS: latest hash | ARGV: ticket
+    _TAKE_MODIFY_LUA = """
+        local cmd = redis.call('HGET', KEYS[1], ARGV[1])
+        if cmd then redis.call('HDEL', KEYS[1], ARGV[1]) end
+        return cmd
+    """
+
+    def _script(self, name, source):
+        """Registered Lua script (cached per client)"""
+        if name not in self._scripts:
+            self._scripts[name] = self.client.register_script(source)
+        return self._scripts[name]
+
+    @staticmethod
+    def _command_keys(account_id):
+        """Lane list keys in delivery order (legacy FIFO list last) and the modify hash"""
+        base = f"commands:account:{account_id}"
+        lanes = [f"{base}:{lane}" for lane in RedisClient.COMMAND_LANES] + [base]
+        return lanes, f"{base}:modify:latest"
+
+    @classmethod
+    def command_lane(cls, command_data, lane=None):
+        """
+        Lane of a command
 
-    def push_command(self, account_id, command_data):
+        Only a MODIFY with ticket and sl/tp is coalesced; any other MODIFY
+        (e.g. trailing_stop only) must not replace or be replaced by an SL/TP
+        move -> 'other'.
         """
-        Push command to account's command queue
-        RPUSH for FIFO queue
+        lane = lane or cls.COMMAND_TYPE_LANES.get(command_data.get('type'), 'other')
+        if lane == 'modify' and (
+            command_data.get('ticket') is None or not ('sl' in command_data or 'tp' in command_data)
+        ):
+            return 'other'
+        return lane
+
+    def push_command(self, account_id, command_data, lane=None):
         """
-        queue_key = f"commands:account:{account_id}"
-        command_json = json.dumps(command_data)
-        self.client.rpush(queue_key, command_json)
+        Push command to account's command queue (RPUSH into its priority lane)
+
+        Args:
+            account_id: Account ID
+            command_data: Flat command dict ('id', 'type', payload fields)
+            lane: Override the lane derived from the type (e.g. 'close' for CRITICAL)
 
-        # Set expiry on queue to prevent buildup
-        self.client.expire(queue_key, 3600)  # 1 hour
+        Returns:
+            ID of the MODIFY command this one superseded (same ticket, not yet
+            delivered), else None
+        """
+        lanes, latest_key = self._command_keys(account_id)
+        lane = self.command_lane(command_data, lane)
+        # queued_at (epoch ms) lets /api/get_commands report queue latency
+        command_json = json.dumps({**command_data, 'queued_at': int(time.time() * 1000)})
+        superseded_id = None
+
+        if lane == 'modify':
+            old = self._script('push_modify', self._PUSH_MODIFY_LUA)(
+                keys=[lanes[self.COMMAND_LANES.index('modify')], latest_key],
+                args=[str(command_data['ticket']), command_json, self.COMMAND_QUEUE_TTL]
+            )
+            if old:
+                superseded_id = json.loads(old).get('id')
+        else:
+            queue_key = lanes[self.COMMAND_LANES.index(lane)]
+            pipe = self.client.pipeline(transaction=False)
+            pipe.rpush(queue_key, command_json)
+            pipe.expire(queue_key, self.COMMAND_QUEUE_TTL)
+            pipe.execute()
 
         # Publish notification for instant delivery
         self.client.publish(f"commands:notify:{account_id}", "new_command")
 
-        logger.info(f"Pushed command {command_data.get('id')} to queue for account {account_id}")
+        if superseded_id:
+            logger.info(
+                f"Pushed command {command_data.get('id')} ({lane}) for account {account_id}, "
+                f"superseding {superseded_id} for ticket #{command_data.get('ticket')}"
+            )
+        else:
+            logger.info(f"Pushed command {command_data.get('id')} ({lane}) to queue for account {account_id}")
+        return superseded_id
 
     def pop_command(self, account_id):
         """
-        Pop command from account's command queue
-        LPOP for FIFO
+        Pop the most urgent command from account's command queue
         Returns dict or None
         """
-        queue_key = f"commands:account:{account_id}"
-        command_json = self.client.lpop(queue_key)
+        commands = self.pop_commands(account_id, 1)
+        return commands[0] if commands else None
 
-        if command_json:
-            return json.loads(command_json)
-        return None
+    def pop_commands(self, account_id, max_count=10, timeout=0):
+        """
+        Pop up to max_count commands, most urgent lane first, in one round-trip
+
+        Args:
+            account_id: Account ID
+            max_count: Maximum commands to return
+            timeout: Seconds to block (BLPOP over all lanes) for the first command; 0 = don't block
+
+        Returns:
+            List of command dicts (lane priority, FIFO within a lane; empty if none arrived)
+        """
+        lanes, latest_key = self._command_keys(account_id)
+        modify_key = lanes[self.COMMAND_LANES.index('modify')]
+        raw = []
+
+        if timeout > 0:
+            # BLPOP serves the first non-empty key -> lane priority
+            first = self.client.blpop(lanes, timeout=timeout)
+            if not first:
+                return []
+            key, value = first
+            if key == modify_key:
+                value = self._script('take_modify', self._TAKE_MODIFY_LUA)(keys=[latest_key], args=[value])
+            if value:
+                raw.append(value)
+
+        if len(raw) < max_count:
+            raw.extend(self._script('pop_batch', self._POP_BATCH_LUA)(
+                keys=lanes + [latest_key],
+                args=[max_count - len(raw), self.COMMAND_LANES.index('modify') + 1]
+            ))
+
+        return [json.loads(item) for item in raw]
 
     def get_pending_commands(self, account_id):
-        """Get all pending commands without removing them"""
-        queue_key = f"commands:account:{account_id}"
-        commands_json = self.client.lrange(queue_key, 0, -1)
-        return [json.loads(cmd) for cmd in commands_json]
+        """Get all pending commands without removing them (delivery order)"""
+        lanes, latest_key = self._command_keys(account_id)
+        pipe = self.client.pipeline(transaction=False)
+        for key in lanes:
+            pipe.lrange(key, 0, -1)
+        pipe.hgetall(latest_key)
+        *lane_items, latest = pipe.execute()
+
+        modify_index = self.COMMAND_LANES.index('modify')
+        commands = []
+        for i, items in enumerate(lane_items):
+            if i == modify_index:
+                commands.extend(json.loads(latest[t]) for t in items if t in latest)
+            else:
+                commands.extend(json.loads(item) for item in items)
+        return commands
 
     def clear_command_queue(self, account_id):
         """Clear all commands for an account"""
-        queue_key = f"commands:account:{account_id}"
-        self.client.delete(queue_key)
+        lanes, latest_key = self._command_keys(account_id)
+        self.client.delete(*lanes, latest_key)
 
     # ========================================================================
     # ACCOUNT STATE CACHING
@@ -127,122 +291,287 @@ class RedisClient:
         self.cache_account_state(account_id, state)
 
     # ========================================================================
-    # TICK DATA BUFFERING
+    # TICK STREAM (Redis Streams + consumer groups)
     # ========================================================================
+    #
+    # All ticks go to one stream (ticks are global - no account_id).
+    # TickBatchWriter processes read it with XREADGROUP in the TICK_STREAM_GROUP
+    # consumer group and XACK only after the PostgreSQL commit, so a crashed
+    # writer's entries stay pending and are re-claimed by another writer.
+    #
+    # /api/ticks appends a whole EA batch as one block entry (TickBlock,
+    # base64-packed columns); readers expand blocks back to single ticks, so
+    # every tick of a block carries the block's entry_id. Per-tick entries
+    # (buffer_ticks_batch, legacy list buffers) share the stream.
+    #
+    # XADD does not trim: a MAXLEN cap would count block and per-tick entries
+    # alike and could cut entries that were never written. The writer trims
+    # with trim_tick_stream() (MINID), never past the oldest pending or not
+    # yet delivered entry, so only ticks already in PostgreSQL are removed.
+    #
+    # The stream holds the only copy of ticks not yet in PostgreSQL, so it has
+    # no TTL and Redis must run with a volatile-* maxmemory policy (see
+    # docker-compose.yml): only keys with a TTL are evicted. Sizing: a block
+    # entry is ~75 bytes per tick (7 base64 columns), so a backlog of 500k
+    # ticks needs ~40 MB of the 256 MB limit. If writers stay down until the
+    # limit is reached, XADD fails with OOM and /api/ticks falls back to
+    # writing PostgreSQL directly - nothing is dropped silently.
+    #
+    # An entry re-claimed more than TICK_MAX_DELIVERIES times (a batch that can
+    # never commit) is moved to the TICK_DEAD_LETTER_KEY stream and acknowledged.
+
+    TICK_STREAM_KEY = 'ticks:stream'
+    TICK_STREAM_GROUP = 'tick_writers'
+    TICK_MAX_DELIVERIES = 5
+    TICK_DEAD_LETTER_KEY = 'ticks:dead'
+    TICK_DEAD_LETTER_MAXLEN = 10000
+
+    TICK_FIELDS = ('symbol', 'bid', 'ask', 'spread', 'volume', 'timestamp', 'tradeable')
 
     def buffer_tick(self, account_id, symbol, tick_data):
         """
-        Buffer tick data for batch processing
-        Uses Redis list with TTL (5 minutes)
+        Buffer one tick for batch processing (appends to the tick stream)
         """
-        buffer_key = f"ticks:buffer:{account_id}:{symbol}"
-        tick_json = json.dumps(tick_data)
-
-        # Add to buffer
-        self.client.rpush(buffer_key, tick_json)
-
-        # Set TTL (5 minutes - prevents unbounded growth)
-        self.client.expire(buffer_key, 300)
+        self.buffer_ticks_batch(account_id, [dict(tick_data, symbol=symbol)])
 
-    def get_tick_buffer(self, account_id, symbol, clear=True):
+    def buffer_ticks_batch(self, account_id, ticks):
         """
-        Get all buffered ticks for symbol
-        Optionally clear buffer after reading
+        Buffer multiple ticks at once (one pipelined XADD per tick)
+
+        Args:
+            account_id: Account ID (unused - ticks are global, kept for callers)
+            ticks: List of tick dicts with 'symbol' field
         """
-        buffer_key = f"ticks:buffer:{account_id}:{symbol}"
+        if not ticks:
+            return
 
-        if clear:
-            # Atomic get and delete
-            pipe = self.client.pipeline()
-            pipe.lrange(buffer_key, 0, -1)
-            pipe.delete(buffer_key)
-            results = pipe.execute()
-            ticks_json = results[0]
-        else:
-            ticks_json = self.client.lrange(buffer_key, 0, -1)
+        pipe = self.client.pipeline(transaction=False)
 
-        return [json.loads(tick) for tick in ticks_json]
+        for tick in ticks:
+            if not tick.get('symbol'):
+                continue
+            fields = {
+                k: ('' if tick.get(k) is None else (int(tick[k]) if isinstance(tick[k], bool) else tick[k]))
+                for k in self.TICK_FIELDS if k in tick
+            }
+            pipe.xadd(self.TICK_STREAM_KEY, fields)
 
-    def get_buffer_size(self, account_id, symbol):
-        """Get number of ticks in buffer"""
-        buffer_key = f"ticks:buffer:{account_id}:{symbol}"
-        return self.client.llen(buffer_key)
+        pipe.execute()
 
-    def buffer_ticks_batch(self, account_id, ticks):
+    def buffer_tick_block(self, block):
         """
-        Buffer multiple ticks at once (more efficient)
+        Append a TickBlock to the tick stream as a single entry (one XADD)
 
         Args:
-            account_id: Account ID
-            ticks: List of tick dicts with 'symbol' field
+            block: TickBlock (see tick_block.py)
+
+        Returns:
+            Stream entry ID (None for an empty block)
         """
-        if not ticks:
-            return
+        if not len(block):
+            return None
 
-        # Group ticks by symbol
-        by_symbol = {}
-        for tick in ticks:
-            symbol = tick.get('symbol')
-            if symbol:
-                if symbol not in by_symbol:
-                    by_symbol[symbol] = []
-                by_symbol[symbol].append(tick)
+        return self.client.xadd(self.TICK_STREAM_KEY, block.to_stream_fields())
 
-        # Use pipeline for efficiency
-        pipe = self.client.pipeline()
+    def expand_stream_entries(self, stream_entries):
+        """
+        Turn stream entries into (entry_id, tick_dict) pairs
 
-        for symbol, symbol_ticks in by_symbol.items():
-            buffer_key = f"ticks:buffer:{account_id}:{symbol}"
+        Block entries expand to one pair per tick, all with the block's entry_id.
+        """
+        from tick_block import TickBlock
+
+        entries = []
+        for entry_id, fields in stream_entries:
+            block = TickBlock.from_stream_fields(fields)
+            if block is None:
+                entries.append((entry_id, self.parse_stream_tick(fields)))
+            else:
+                entries.extend((entry_id, tick) for tick in block.to_dicts())
+        return entries
+
+    @staticmethod
+    def parse_stream_tick(fields):
+        """Convert stream entry fields (strings) back to a tick dict"""
+        def to_float(value):
+            return float(value) if value not in (None, '') else None
+
+        return {
+            'symbol': fields.get('symbol'),
+            'bid': to_float(fields.get('bid')),
+            'ask': to_float(fields.get('ask')),
+            'spread': to_float(fields.get('spread')),
+            'volume': int(float(fields['volume'])) if fields.get('volume') not in (None, '') else 0,
+            'timestamp': to_float(fields.get('timestamp')),
+            'tradeable': fields.get('tradeable', '1') not in ('0', 'False', 'false')
+        }
+
+    def ensure_tick_consumer_group(self, group=None):
+        """Create the writer consumer group (and the stream) if missing"""
+        group = group or self.TICK_STREAM_GROUP
+        try:
+            self.client.xgroup_create(self.TICK_STREAM_KEY, group, id='0', mkstream=True)
+            logger.info(f"Created consumer group '{group}' on {self.TICK_STREAM_KEY}")
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
 
-            # Add all ticks for this symbol
-            for tick in symbol_ticks:
-                pipe.rpush(buffer_key, json.dumps(tick))
+    def read_tick_stream(self, consumer, count=1000, block_ms=5000, group=None):
+        """
+        Read new ticks for this consumer (XREADGROUP)
 
-            # Set TTL (5 minutes)
-            pipe.expire(buffer_key, 300)
+        count limits stream entries - a block entry holds a whole EA batch.
 
-        # Execute all commands at once
-        pipe.execute()
+        Returns:
+            List of (entry_id, tick_dict)
+        """
+        group = group or self.TICK_STREAM_GROUP
+        response = self.client.xreadgroup(
+            group, consumer, {self.TICK_STREAM_KEY: '>'},
+            count=count, block=block_ms
+        )
 
-    def get_all_buffered_symbols(self, account_id):
-        """Get list of symbols that have buffered ticks"""
-        pattern = f"ticks:buffer:{account_id}:*"
-        keys = self.client.keys(pattern)
+        entries = []
+        for _stream, stream_entries in response or []:
+            entries.extend(self.expand_stream_entries(stream_entries))
+        return entries
 
-        # Extract symbol names
-        symbols = []
-        prefix = f"ticks:buffer:{account_id}:"
-        for key in keys:
-            if key.startswith(prefix):
-                symbol = key[len(prefix):]
-                symbols.append(symbol)
+    def claim_stale_ticks(self, consumer, min_idle_ms=60000, count=1000, group=None, start_id='0-0'):
+        """
+        Take over ticks left pending by a crashed/stalled writer (XAUTOCLAIM)
 
-        return symbols
+        Entries delivered more than TICK_MAX_DELIVERIES times are moved to the
+        dead-letter stream instead of being retried again.
 
-    def get_all_buffers(self, account_id, clear=True):
+        Args:
+            start_id: Scan cursor (next_start_id of the previous call)
+
+        Returns:
+            (next_start_id, list of (entry_id, tick_dict)) - next_start_id is
+            '0-0' once the whole pending list was scanned
         """
-        Get all buffered ticks for all symbols
-        Returns dict: {symbol: [ticks]}
+        group = group or self.TICK_STREAM_GROUP
+        result = self.client.xautoclaim(
+            self.TICK_STREAM_KEY, group, consumer,
+            min_idle_time=min_idle_ms, start_id=start_id, count=count
+        )
+        next_start_id = result[0] if result else '0-0'
+        claimed = result[1] if result and len(result) > 1 else []
+
+        # Entries deleted from the stream while pending come back without fields - nothing left to write
+        trimmed = [entry_id for entry_id, fields in claimed if not fields]
+        live = [(entry_id, fields) for entry_id, fields in claimed if fields]
+
+        dead = []
+        if live:
+            # Delivery count per claimed ID (a range query could return other pending entries)
+            pipe = self.client.pipeline(transaction=False)
+            for entry_id, _ in live:
+                pipe.xpending_range(self.TICK_STREAM_KEY, group, min=entry_id, max=entry_id, count=1)
+            deliveries = {p['message_id']: p['times_delivered'] for result in pipe.execute() for p in result}
+            dead = [(e, f) for e, f in live if deliveries.get(e, 0) > self.TICK_MAX_DELIVERIES]
+
+        if dead:
+            pipe = self.client.pipeline(transaction=True)
+            for entry_id, fields in dead:
+                pipe.xadd(
+                    self.TICK_DEAD_LETTER_KEY, dict(fields, source_id=entry_id),
+                    maxlen=self.TICK_DEAD_LETTER_MAXLEN, approximate=True
+                )
+            pipe.xack(self.TICK_STREAM_KEY, group, *[entry_id for entry_id, _ in dead])
+            pipe.execute()
+            logger.error(
+                f"Moved {len(dead)} tick stream entries to {self.TICK_DEAD_LETTER_KEY} "
+                f"after {self.TICK_MAX_DELIVERIES} failed deliveries"
+            )
+            dead_ids = {entry_id for entry_id, _ in dead}
+            live = [(e, f) for e, f in live if e not in dead_ids]
+
+        if trimmed:
+            self.client.xack(self.TICK_STREAM_KEY, group, *trimmed)
+
+        return next_start_id, self.expand_stream_entries(live)
+
+    def trim_tick_stream(self, group=None, approximate=True):
         """
-        symbols = self.get_all_buffered_symbols(account_id)
+        Remove entries that are already written (XTRIM MINID)
 
-        result = {}
-        for symbol in symbols:
-            ticks = self.get_tick_buffer(account_id, symbol, clear=clear)
-            if ticks:
-                result[symbol] = ticks
+        Trims no further than the oldest pending entry and the group's
+        last-delivered ID, so unacknowledged and undelivered ticks are kept.
 
-        return result
+        Args:
+            approximate: Trim whole stream nodes only (~MINID, cheap)
 
-    def get_total_buffer_size(self, account_id):
-        """Get total number of buffered ticks across all symbols"""
-        symbols = self.get_all_buffered_symbols(account_id)
-        total = 0
+        Returns:
+            Number of entries removed
+        """
+        group = group or self.TICK_STREAM_GROUP
+        try:
+            info = next((g for g in self.client.xinfo_groups(self.TICK_STREAM_KEY) if g.get('name') == group), None)
+        except redis.ResponseError:
+            return 0  # Stream not created yet
+        if info is None:
+            return 0  # No writer group - nothing is known to be written
+
+        bounds = [info['last-delivered-id']]
+        if info.get('pending'):
+            bounds.append(self.client.xpending(self.TICK_STREAM_KEY, group)['min'])
+        min_id = min(bounds, key=lambda entry_id: tuple(int(part) for part in entry_id.split('-')))
+        if min_id == '0-0':
+            return 0
+        return self.client.xtrim(self.TICK_STREAM_KEY, minid=min_id, approximate=approximate)
+
+    def ack_ticks(self, entry_ids, group=None):
+        """Acknowledge ticks after they are committed to PostgreSQL"""
+        if not entry_ids:
+            return 0
+        group = group or self.TICK_STREAM_GROUP
+        return self.client.xack(self.TICK_STREAM_KEY, group, *entry_ids)
+
+    def get_tick_stream_stats(self, group=None):
+        """Stream length, pending (unacked) ticks and consumer lag"""
+        group = group or self.TICK_STREAM_GROUP
+        stats = {
+            'stream_length': self.client.xlen(self.TICK_STREAM_KEY),
+            'pending': 0,
+            'lag': None,
+            'consumers': 0,
+            'dead_letter': self.client.xlen(self.TICK_DEAD_LETTER_KEY)
+        }
+        try:
+            for info in self.client.xinfo_groups(self.TICK_STREAM_KEY):
+                if info.get('name') == group:
+                    stats['pending'] = info.get('pending', 0)
+                    stats['lag'] = info.get('lag')
+                    stats['consumers'] = info.get('consumers', 0)
+        except redis.ResponseError:
+            pass  # Stream/group not created yet
+        return stats
+
+    def get_total_buffer_size(self, account_id=None):
+        """Get number of ticks not yet written (pending + not yet delivered)"""
+        stats = self.get_tick_stream_stats()
+        return stats['pending'] + (stats['lag'] or 0)
+
+    def drain_legacy_tick_buffers(self):
+        """
+        Move ticks left in pre-stream list buffers (ticks:buffer:*) to the stream
 
-        for symbol in symbols:
-            total += self.get_buffer_size(account_id, symbol)
+        Uses SCAN (non-blocking) - run once at writer startup after an upgrade.
+        """
+        moved = 0
+        for key in self.client.scan_iter(match='ticks:buffer:*', count=500):
+            pipe = self.client.pipeline()
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            ticks_json, _ = pipe.execute()
+            ticks = [json.loads(t) for t in ticks_json]
+            self.buffer_ticks_batch(None, ticks)
+            moved += len(ticks)
 
-        return total
+        if moved:
+            logger.info(f"Moved {moved} ticks from legacy list buffers to {self.TICK_STREAM_KEY}")
+        return moved
 
     # ========================================================================
     # PUB/SUB
@@ -258,6 +587,54 @@ class RedisClient:
         channel = f"account:updates:{account_id}"
         self.client.publish(channel, json.dumps(update_data))
 
+    def publish_bars_closed(self, channel, bars):
+        """Publish closed OHLC bars (one message per bar, pipelined)"""
+        pipe = self.client.pipeline(transaction=False)
+        for bar in bars:
+            pipe.publish(channel, json.dumps(bar, default=str))
+        pipe.execute()
+
+    SIGNAL_EVENTS_CHANNEL = 'signals:events'
+
+    def publish_signal_event(self, signal_id, event, symbol=None, timeframe=None):
+        """Announce a created/updated trading signal (GLOBAL - no account_id)"""
+        self.client.publish(self.SIGNAL_EVENTS_CHANNEL, json.dumps({
+            'signal_id': signal_id,
+            'event': event,
+            'symbol': symbol,
+            'timeframe': timeframe
+        }))
+
+    def publish_portfolio_event(self, account_id, event, data=None):
+        """
+        Signal a change of open positions / closed trades / pending opens
+
+        Bumps portfolio:version:<account_id> (read by PortfolioState before each
+        signal batch) and publishes the event on portfolio:events:<account_id>.
+        """
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(f"portfolio:version:{account_id}")
+        pipe.publish(f"portfolio:events:{account_id}", json.dumps({'event': event, **(data or {})}, default=str))
+        pipe.execute()
+
+    def publish_portfolio_events(self, account_id, events):
+        """
+        Publish several portfolio events (e.g. trade_opened/trade_closed of one
+        trade sync) with a single version bump and one round-trip
+        """
+        if not events:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(f"portfolio:version:{account_id}")
+        for event in events:
+            pipe.publish(f"portfolio:events:{account_id}", json.dumps(event, default=str))
+        pipe.execute()
+
+    def get_portfolio_version(self, account_id):
+        """Current portfolio version counter (0 if never bumped)"""
+        val = self.client.get(f"portfolio:version:{account_id}")
+        return int(val) if val else 0
+
     def subscribe_to_channel(self, channel):
         """Subscribe to a pub/sub channel"""
         if not self.pubsub:
@@ -265,6 +642,81 @@ class RedisClient:
         self.pubsub.subscribe(channel)
         return self.pubsub
 
+    # ========================================================================
+    # PROCESSED SIGNAL REGISTRY (AutoTrader)
+    # ========================================================================
+    #
+    # One sorted set shared by all auto-trader processes: member
+    # "<account_id>:<signal_hash>", score = epoch ms of the last evaluation.
+    # claim_signal() is a compare-and-set on that score, so exactly one
+    # process evaluates a signal version per sweep; old entries are removed
+    # with a single ZREMRANGEBYSCORE.
+
+    PROCESSED_SIGNALS_KEY = 'autotrader:processed_signals'
+
+    # KEYS: registry | ARGV: member, now_ms, expected score ('' = not registered yet)
+    _CLAIM_SIGNAL_LUA = """
+        local cur = redis.call('ZSCORE', KEYS[1], ARGV[1])
+        if (not cur and ARGV[3] == '') or (cur and tonumber(cur) == tonumber(ARGV[3])) then
+            redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+            return 1
+        end
+        return 0
+    """
+
+    def get_processed_signals(self, account_id, signal_hashes):
+        """
+        Last evaluation time of several signal versions (one ZMSCORE)
+
+        Returns:
+            Dict signal_hash -> score (epoch ms) for registered hashes
+        """
+        if not signal_hashes:
+            return {}
+        scores = self.client.zmscore(
+            self.PROCESSED_SIGNALS_KEY, [f"{account_id}:{h}" for h in signal_hashes]
+        )
+        return {h: int(score) for h, score in zip(signal_hashes, scores) if score is not None}
+
+    def claim_signal(self, account_id, signal_hash, previous=None):
+        """
+        Atomically claim a signal version for evaluation
+
+        Args:
+            account_id: Account ID
+            signal_hash: Signal version hash
+            previous: Score read by get_processed_signals (None = expect unregistered)
+
+        Returns:
+            True if this caller owns the evaluation (registry entry updated)
+        """
+        now_ms = int(time.time() * 1000)
+        claimed = self._script('claim_signal', self._CLAIM_SIGNAL_LUA)(
+            keys=[self.PROCESSED_SIGNALS_KEY],
+            args=[f"{account_id}:{signal_hash}", now_ms, '' if previous is None else previous]
+        )
+        return bool(claimed)
+
+    def mark_signals_processed(self, account_id, signal_hashes):
+        """Register signal versions that need no evaluation (ZADD NX - keeps existing scores)"""
+        if not signal_hashes:
+            return 0
+        now_ms = int(time.time() * 1000)
+        return self.client.zadd(
+            self.PROCESSED_SIGNALS_KEY,
+            {f"{account_id}:{h}": now_ms for h in signal_hashes},
+            nx=True
+        )
+
+    def cleanup_processed_signals(self, max_age_seconds):
+        """Drop registry entries not evaluated within max_age_seconds (one range delete)"""
+        cutoff_ms = int((time.time() - max_age_seconds) * 1000)
+        return self.client.zremrangebyscore(self.PROCESSED_SIGNALS_KEY, '-inf', cutoff_ms)
+
+    def count_processed_signals(self):
+        """Number of registered signal versions"""
+        return self.client.zcard(self.PROCESSED_SIGNALS_KEY)
+
     # ========================================================================
     # STATISTICS & MONITORING
     # ========================================================================
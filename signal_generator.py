@@ -637,29 +637,18 @@ class SignalGenerator:
 
     def _get_average_spread(self, db) -> float:
         """
-        Calculate average spread from recent ticks
+        Average spread over the recent ticks (~last 100, streaming EWMA)
 
         Args:
-            db: Database session
+            db: Database session (unused, spread statistics are kept in memory)
 
         Returns:
             Average spread (float)
         """
-        from models import Tick
+        from spread_stats import get_spread_tracker
         try:
-            # Get last 100 ticks for this symbol (ticks are global - no account_id)
-            recent_ticks = db.query(Tick).filter_by(
-                symbol=self.symbol
-            ).order_by(Tick.timestamp.desc()).limit(100).all()
-
-            if not recent_ticks:
-                return 0
-
-            # Calculate spreads
-            spreads = [abs(float(tick.ask) - float(tick.bid)) for tick in recent_ticks]
-
-            # Return average
-            return sum(spreads) / len(spreads)
+            recent = get_spread_tracker().get_recent(self.symbol)
+            return recent['recent_avg'] if recent else 0
 
         except Exception as e:
             logger.error(f"Error calculating average spread: {e}")
@@ -736,6 +725,7 @@ class SignalGenerator:
                     f"{signal['signal_type']} | Confidence: {old_confidence:.1f}% → {new_confidence:.1f}% "
                     f"{change_emoji} ({confidence_change:+.1f}%)"
                 )
+                self._publish_signal_event(existing_signal.id, 'updated')
                 return
 
             # Case 2: Signal exists with DIFFERENT direction → EXPIRE old + CREATE new
@@ -773,14 +763,11 @@ class SignalGenerator:
             db.commit()
 
             # Link ML prediction to this signal if prediction was logged
-            if hasattr(self, 'ml_prediction_id') and self.ml_prediction_id:
+            if hasattr(self, 'ml_prediction_id') and self.ml_prediction_id and self.ml_manager:
                 try:
-                    from models import MLPrediction
-                    ml_pred = db.query(MLPrediction).filter(MLPrediction.id == self.ml_prediction_id).first()
-                    if ml_pred:
-                        ml_pred.signal_id = new_signal.id
-                        db.commit()
-                        logger.debug(f"✅ Linked ML prediction {self.ml_prediction_id} to signal {new_signal.id}")
+                    # Queued behind the prediction insert (write-behind, no commit here)
+                    self.ml_manager.link_prediction_to_signal(self.ml_prediction_id, new_signal.id)
+                    logger.debug(f"✅ Linked ML prediction {self.ml_prediction_id} to signal {new_signal.id}")
                 except Exception as link_error:
                     logger.warning(f"Could not link ML prediction to signal: {link_error}")
 
@@ -790,6 +777,7 @@ class SignalGenerator:
                 f"(confidence: {signal['confidence']:.1f}%, entry: {signal.get('entry_price', 0):.5f}) "
                 f"with {len(indicator_snapshot.get('indicators', {}))} indicators snapshot"
             )
+            self._publish_signal_event(new_signal.id, 'created')
 
         except Exception as e:
             logger.error(f"Error saving/updating signal: {e}", exc_info=True)
@@ -797,6 +785,14 @@ class SignalGenerator:
         finally:
             db.close()
 
+    def _publish_signal_event(self, signal_id: int, event: str):
+        """Wake the auto-trader for a committed signal (the periodic sweep still catches missed events)"""
+        try:
+            from redis_client import get_redis
+            get_redis().publish_signal_event(signal_id, event, self.symbol, self.timeframe)
+        except Exception as e:
+            logger.debug(f"Could not publish signal event for #{signal_id}: {e}")
+
     def _capture_indicator_snapshot(self, signal: Dict) -> Dict:
         """
         Capture current state of all indicators and patterns for validation
@@ -9,6 +9,8 @@ from datetime import datetime
 from database import ScopedSession
 from models import Account, SubscribedSymbol
 from signal_generator import SignalGenerator
+from quote_book import get_quote_book
+from account_state import get_account_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -133,8 +135,10 @@ class SignalWorker:
             risk_profile = settings.autotrade_risk_profile or 'normal'
 
             # Check drawdown protection - pause signals if drawdown too high
-            account_equity = float(account.equity) if account.equity else 0
-            account_balance = float(account.balance) if account.balance else 0
+            # (live values from the Redis account snapshot, accounts row as fallback)
+            live = get_account_snapshot(account_id, db, fields=('balance', 'equity'))
+            account_equity = live.get('equity') or 0
+            account_balance = live.get('balance') or 0
 
             if account_balance > 0:
                 drawdown_pct = ((account_balance - account_equity) / account_balance) * 100
@@ -167,25 +171,23 @@ class SignalWorker:
             # Note: M1/M5/M15 removed due to noise, D1 removed due to low frequency
             timeframes = ['H1', 'H4']
 
+            # Latest quotes for all subscribed symbols in one round-trip
+            # NOTE: Quotes are GLOBAL (no account_id) - a EURUSD quote is the same for everyone
+            from datetime import datetime, timedelta
+            latest_quotes = get_quote_book().get_quotes(symbol_names)
+
             # Generate signals for each symbol and timeframe
             for symbol_name in symbol_names:
                 # Check if symbol is tradeable (within trading hours)
-                from models import Tick
-                from datetime import datetime, timedelta
-
-                # NOTE: Ticks are now GLOBAL (no account_id) - a EURUSD tick is the same for everyone
-                latest_tick = db.query(Tick).filter_by(
-                    symbol=symbol_name
-                ).order_by(Tick.timestamp.desc()).first()
+                latest_quote = latest_quotes.get(symbol_name)
 
                 # Skip if no tick data available
-                if not latest_tick:
+                if not latest_quote:
                     logger.debug(f"Skipping signal generation for {symbol_name} (no tick data)")
                     continue
 
-                # ✅ FIX: Extract tick data immediately to avoid detached instance errors
-                tick_tradeable = latest_tick.tradeable
-                tick_timestamp = latest_tick.timestamp
+                tick_tradeable = latest_quote['tradeable']
+                tick_timestamp = latest_quote['timestamp']
 
                 # Skip signal generation for non-tradeable symbols
                 if not tick_tradeable:
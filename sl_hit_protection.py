@@ -35,6 +35,40 @@ class SLHitProtection:
             max_hits: Maximale SL-Hits bevor Pause (default: 2)
             timeframe_hours: Zeitfenster in Stunden (default: 4)
 
+        Returns:
+            Dict mit 'should_pause', 'sl_hits_count', 'cooldown_until'
+        """
+        # Bereits in Cooldown - keine Abfrage nötig
+        if symbol in self.symbol_cooldowns and datetime.utcnow() < self.symbol_cooldowns[symbol]:
+            return self.evaluate(symbol, 0, max_hits, timeframe_hours)
+
+        # Zähle SL-Hits im Zeitfenster
+        cutoff_time = datetime.utcnow() - timedelta(hours=timeframe_hours)
+
+        sl_hits = db.query(Trade).filter(
+            and_(
+                Trade.account_id == account_id,
+                Trade.symbol == symbol,
+                Trade.status == 'closed',
+                Trade.close_reason == 'SL_HIT',
+                Trade.close_time >= cutoff_time
+            )
+        ).count()
+
+        return self.evaluate(symbol, sl_hits, max_hits, timeframe_hours)
+
+    def evaluate(self, symbol: str, sl_hits: int, max_hits: int = 2, timeframe_hours: int = 4) -> Dict:
+        """
+        Cooldown-/Pause-Entscheidung für bereits gezählte SL-Hits
+
+        (AutoTrader zählt die SL-Hits aus dem In-Memory PortfolioState)
+
+        Args:
+            symbol: Symbol (z.B. 'XAUUSD')
+            sl_hits: SL-Hits im Zeitfenster
+            max_hits: Maximale SL-Hits bevor Pause (default: 2)
+            timeframe_hours: Zeitfenster in Stunden (default: 4)
+
         Returns:
             Dict mit 'should_pause', 'sl_hits_count', 'cooldown_until'
         """
@@ -58,19 +92,6 @@ class SLHitProtection:
                 del self.symbol_cooldowns[symbol]
                 logger.info(f"✅ {symbol} Cooldown beendet - Trading wieder aktiv")
 
-        # Zähle SL-Hits im Zeitfenster
-        cutoff_time = datetime.utcnow() - timedelta(hours=timeframe_hours)
-
-        sl_hits = db.query(Trade).filter(
-            and_(
-                Trade.account_id == account_id,
-                Trade.symbol == symbol,
-                Trade.status == 'closed',
-                Trade.close_reason == 'SL_HIT',
-                Trade.close_time >= cutoff_time
-            )
-        ).count()
-
         logger.debug(f"📊 {symbol}: {sl_hits} SL-Hits in den letzten {timeframe_hours}h")
 
         if sl_hits >= max_hits:
@@ -28,6 +28,8 @@ import numpy as np
 
 from models import Trade, Command, Tick, OHLCData, BrokerSymbol
 from database import ScopedSession
+from quote_book import get_quote_book
+from tick_windows import get_tick_windows
 
 logger = logging.getLogger(__name__)
 
@@ -142,81 +144,108 @@ class VolatilityAnalyzer:
             'volatility_score': float       # 0.0 - 1.0 (0=calm, 1=very volatile)
         }
         """
+        profile = self.noise_profiles.get(symbol, self.default_profile)
+
         try:
-            profile = self.noise_profiles.get(symbol, self.default_profile)
+            # Rolling window fed from the tick stream (no ticks query)
+            tick_windows = get_tick_windows()
+            if tick_windows.covers(window_seconds):
+                stats = tick_windows.get_window_stats(symbol)
+                return self.classify(
+                    symbol, stats['price_range'], stats['avg_jump'], stats['max_jump'], stats['tick_count']
+                )
 
             # Get ticks from last X seconds
             cutoff = datetime.utcnow() - timedelta(seconds=window_seconds)
-            ticks = db.query(Tick).filter(
+            ticks = db.query(Tick.bid, Tick.ask).filter(
                 and_(
                     Tick.symbol == symbol,
                     Tick.timestamp >= cutoff
                 )
             ).order_by(Tick.timestamp.asc()).all()
 
-            if len(ticks) < 5:
-                logger.warning(f"{symbol}: Not enough ticks for volatility analysis ({len(ticks)} ticks)")
-                return {
-                    'volatility_level': 'normal',
-                    'price_range': profile['noise_threshold'],
-                    'avg_jump_size': profile['noise_threshold'] / 2,
-                    'max_jump_size': profile['noise_threshold'],
-                    'tick_count': len(ticks),
-                    'volatility_score': 0.5
-                }
-
             # Extract mid prices (bid + ask) / 2
             prices = [(float(t.bid) + float(t.ask)) / 2 for t in ticks]
 
-            # Calculate metrics
-            price_range = max(prices) - min(prices)
-
-            # Calculate tick-to-tick jumps
-            jumps = [abs(prices[i] - prices[i-1]) for i in range(1, len(prices))]
-            avg_jump = np.mean(jumps) if jumps else 0
-            max_jump = max(jumps) if jumps else 0
-
-            # Determine volatility level
-            if price_range <= profile['calm_threshold']:
-                volatility_level = 'calm'
-                volatility_score = price_range / profile['calm_threshold'] * 0.33  # 0.0 - 0.33
-            elif price_range >= profile['volatile_threshold']:
-                volatility_level = 'volatile'
-                # Scale from 0.67 to 1.0
-                excess = min(price_range - profile['volatile_threshold'], profile['volatile_threshold'])
-                volatility_score = 0.67 + (excess / profile['volatile_threshold']) * 0.33
-            else:
-                volatility_level = 'normal'
-                # Scale from 0.33 to 0.67
-                range_ratio = (price_range - profile['calm_threshold']) / (profile['volatile_threshold'] - profile['calm_threshold'])
-                volatility_score = 0.33 + range_ratio * 0.34
-
-            logger.info(
-                f"📊 {symbol} Volatility (60s): {volatility_level.upper()} | "
-                f"Range: {price_range:.5f} | Avg Jump: {avg_jump:.5f} | "
-                f"Max Jump: {max_jump:.5f} | Score: {volatility_score:.2f} | Ticks: {len(ticks)}"
-            )
-
-            return {
-                'volatility_level': volatility_level,
-                'price_range': price_range,
-                'avg_jump_size': avg_jump,
-                'max_jump_size': max_jump,
-                'tick_count': len(ticks),
-                'volatility_score': volatility_score
-            }
+            return self.analyze_prices(symbol, prices)
 
         except Exception as e:
             logger.error(f"Error analyzing volatility for {symbol}: {e}")
             # Return conservative defaults on error
-            return {
-                'volatility_level': 'normal',
-                'price_range': profile['noise_threshold'],
-                'avg_jump_size': profile['noise_threshold'] / 2,
-                'max_jump_size': profile['noise_threshold'],
-                'tick_count': 0,
-                'volatility_score': 0.5
-            }
+            return self._default_analysis(profile, tick_count=0)
+
+    def analyze_prices(self, symbol: str, prices: List[float]) -> Dict:
+        """
+        Volatility metrics from an already loaded window of mid prices
+
+        Same result shape as analyze_recent_volatility().
+        """
+        if len(prices) < 5:
+            return self.classify(symbol, 0.0, 0.0, 0.0, len(prices))
+
+        # Calculate metrics
+        price_range = max(prices) - min(prices)
+
+        # Calculate tick-to-tick jumps
+        jumps = np.abs(np.diff(np.asarray(prices, dtype=float)))
+        avg_jump = float(jumps.mean()) if len(jumps) else 0
+        max_jump = float(jumps.max()) if len(jumps) else 0
+
+        return self.classify(symbol, price_range, avg_jump, max_jump, len(prices))
+
+    def classify(self, symbol: str, price_range: float, avg_jump: float, max_jump: float, tick_count: int) -> Dict:
+        """
+        Volatility level and score from window statistics (tick_windows or analyze_prices)
+
+        Same result shape as analyze_recent_volatility().
+        """
+        profile = self.noise_profiles.get(symbol, self.default_profile)
+
+        if tick_count < 5:
+            logger.warning(f"{symbol}: Not enough ticks for volatility analysis ({tick_count} ticks)")
+            return self._default_analysis(profile, tick_count=tick_count)
+
+        # Determine volatility level
+        if price_range <= profile['calm_threshold']:
+            volatility_level = 'calm'
+            volatility_score = price_range / profile['calm_threshold'] * 0.33  # 0.0 - 0.33
+        elif price_range >= profile['volatile_threshold']:
+            volatility_level = 'volatile'
+            # Scale from 0.67 to 1.0
+            excess = min(price_range - profile['volatile_threshold'], profile['volatile_threshold'])
+            volatility_score = 0.67 + (excess / profile['volatile_threshold']) * 0.33
+        else:
+            volatility_level = 'normal'
+            # Scale from 0.33 to 0.67
+            range_ratio = (price_range - profile['calm_threshold']) / (profile['volatile_threshold'] - profile['calm_threshold'])
+            volatility_score = 0.33 + range_ratio * 0.34
+
+        logger.info(
+            f"📊 {symbol} Volatility (60s): {volatility_level.upper()} | "
+            f"Range: {price_range:.5f} | Avg Jump: {avg_jump:.5f} | "
+            f"Max Jump: {max_jump:.5f} | Score: {volatility_score:.2f} | Ticks: {tick_count}"
+        )
+
+        return {
+            'volatility_level': volatility_level,
+            'price_range': price_range,
+            'avg_jump_size': avg_jump,
+            'max_jump_size': max_jump,
+            'tick_count': tick_count,
+            'volatility_score': volatility_score
+        }
+
+    @staticmethod
+    def _default_analysis(profile: Dict, tick_count: int) -> Dict:
+        """Conservative 'normal' volatility when there is not enough data"""
+        return {
+            'volatility_level': 'normal',
+            'price_range': profile['noise_threshold'],
+            'avg_jump_size': profile['noise_threshold'] / 2,
+            'max_jump_size': profile['noise_threshold'],
+            'tick_count': tick_count,
+            'volatility_score': 0.5
+        }
 
 
 class MLReversalPredictor:
@@ -272,6 +301,124 @@ class MLReversalPredictor:
             logger.error(f"Error predicting reversal: {e}")
             return 0.5  # Conservative default
 
+    # Columns of the batch feature matrix (see build_feature_matrix)
+    FEATURE_COLUMNS = [
+        'pct_to_tp',        # Progress to TP in % (0 if no TP)
+        'minutes_open',     # Time in trade
+        'has_tp',           # 1.0 if TP set
+        'momentum_atr',     # Window move in trade direction / ATR
+        'range_atr',        # Window high-low range / ATR
+        'atr_pct',          # ATR / entry price
+    ]
+
+    def build_feature_matrix(
+        self,
+        trades: List[Trade],
+        current_prices: np.ndarray,
+        price_windows: Dict[str, np.ndarray],
+        atr_by_symbol: Dict[str, float]
+    ) -> np.ndarray:
+        """
+        Build one feature matrix (n_trades x len(FEATURE_COLUMNS)) for all open trades
+
+        Args:
+            trades: Open trades
+            current_prices: Close-side price per trade (bid for BUY, ask for SELL)
+            price_windows: symbol -> recent mid prices (oldest first)
+            atr_by_symbol: symbol -> ATR (missing/0 = no ATR normalisation)
+        """
+        n = len(trades)
+        now = datetime.utcnow()
+
+        direction = np.array(
+            [1.0 if t.direction.upper() in ['BUY', '0'] else -1.0 for t in trades]
+        )
+        entry = np.array([float(t.open_price) for t in trades])
+        tp = np.array([float(t.tp) if t.tp else np.nan for t in trades])
+        minutes_open = np.array([
+            (now - t.open_time).total_seconds() / 60 if t.open_time else 0.0 for t in trades
+        ])
+
+        # Per-symbol window stats, broadcast to trades
+        window_move = np.zeros(n)
+        window_range = np.zeros(n)
+        atr = np.zeros(n)
+        for i, t in enumerate(trades):
+            window = price_windows.get(t.symbol)
+            if window is not None and len(window) >= 2:
+                window_move[i] = window[-1] - window[0]
+                window_range[i] = window.max() - window.min()
+            atr[i] = atr_by_symbol.get(t.symbol) or 0.0
+
+        has_tp = ~np.isnan(tp)
+        profit_dist = (current_prices - entry) * direction
+        tp_dist = np.where(has_tp, (tp - entry) * direction, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct_to_tp = np.where(tp_dist > 0, profit_dist / tp_dist * 100, 0.0)
+            safe_atr = np.where(atr > 0, atr, np.nan)
+            momentum_atr = np.nan_to_num(window_move * direction / safe_atr)
+            range_atr = np.nan_to_num(window_range / safe_atr)
+            atr_pct = np.nan_to_num(atr / entry)
+
+        return np.column_stack([
+            pct_to_tp, minutes_open, has_tp.astype(float), momentum_atr, range_atr, atr_pct
+        ])
+
+    def predict_reversal_probabilities(self, features: np.ndarray) -> np.ndarray:
+        """
+        Score all open trades in one vectorized call
+
+        Args:
+            features: Matrix from build_feature_matrix()
+
+        Returns:
+            Reversal probability per row (0.0 - 0.95)
+        """
+        if len(features) == 0:
+            return np.zeros(0)
+
+        try:
+            if self._model_matches_features():
+                return np.clip(self.model.predict_proba(features)[:, 1], 0.0, 0.95)
+
+            return self._heuristic_reversal_probabilities(features)
+
+        except Exception as e:
+            logger.error(f"Error predicting reversal (batch): {e}")
+            return np.full(len(features), 0.5)  # Conservative default
+
+    def _model_matches_features(self) -> bool:
+        """
+        True if the loaded model was trained on FEATURE_COLUMNS
+
+        The global confidence model is trained on signal features, not on this
+        matrix - until a reversal model with this schema exists the heuristic
+        is used (as predict_reversal_probability does).
+        """
+        if self.model is None or not hasattr(self.model, 'predict_proba'):
+            return False
+        feature_names = getattr(self.model, 'feature_names', None)
+        return feature_names is not None and list(feature_names) == self.FEATURE_COLUMNS
+
+    def _heuristic_reversal_probabilities(self, features: np.ndarray) -> np.ndarray:
+        """Vectorized _heuristic_reversal_probability (identical thresholds)"""
+        pct_to_tp = features[:, 0]
+        minutes_open = features[:, 1]
+        has_tp = features[:, 2] > 0
+
+        base_risk = np.select(
+            [pct_to_tp >= 80, pct_to_tp >= 60, pct_to_tp >= 40, pct_to_tp >= 20],
+            [0.80, 0.60, 0.45, 0.35],
+            default=0.25
+        )
+        base_risk = base_risk + np.select(
+            [minutes_open > 120, minutes_open > 60, minutes_open > 30],
+            [0.15, 0.10, 0.05],
+            default=0.0
+        )
+
+        return np.where(has_tp, np.minimum(base_risk, 0.95), 0.5)
+
     def _heuristic_reversal_probability(self, trade: Trade, current_price: float) -> float:
         """
         Simple heuristic-based reversal probability
@@ -341,6 +488,8 @@ class SmartTrailingStopV2:
     4. ATR-based base distance
     """
 
+    ATR_CACHE_SECONDS = 300
+
     def __init__(self):
         self.volatility_analyzer = VolatilityAnalyzer()
         self.reversal_predictor = MLReversalPredictor()
@@ -354,6 +503,7 @@ class SmartTrailingStopV2:
 
         self.last_update = {}
         self.tp_extensions = {}
+        self._atr_cache: Dict[str, Tuple[float, datetime]] = {}
 
     def calculate_adaptive_trail_distance(
         self,
@@ -460,15 +610,57 @@ class SmartTrailingStopV2:
             # Conservative fallback
             return entry * 0.01, {}
 
-    def process_trade(self, db: Session, trade: Trade, current_price: float) -> Optional[Dict]:
+    def process_trade(
+        self,
+        db: Session,
+        trade: Trade,
+        current_price: float,
+        volatility: Optional[Dict] = None,
+        reversal_prob: Optional[float] = None
+    ) -> Optional[Dict]:
         """
         Process trade with hybrid adaptive trailing stop
+
+        volatility / reversal_prob may be precomputed by process_all() for all
+        open trades at once; otherwise they are computed for this trade.
+        """
+        try:
+            result = self.calculate_new_sl(db, trade, current_price, volatility, reversal_prob)
+            if result is None:
+                return None
+
+            self._send_modify_command(db, trade, result['new_sl'], current_price=current_price)
+            self.last_update[trade.ticket] = datetime.utcnow()
+
+            return result
+
+        except Exception as e:
+            logger.error(f"Error processing trade {trade.ticket}: {e}", exc_info=True)
+            return None
+
+    def calculate_new_sl(
+        self,
+        db: Session,
+        trade: Trade,
+        current_price: float,
+        volatility: Optional[Dict] = None,
+        reversal_prob: Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        New trailing SL for a trade without sending it (rate limit included)
+
+        The caller sends the MODIFY and records last_update[ticket]
+        (process_trade, or the position engine's trailing rule).
+
+        Returns:
+            {'new_sl', 'debug'} or None if the SL should stay
         """
         try:
             # === STEP 1: Analyze Recent Volatility (60 seconds) ===
-            volatility = self.volatility_analyzer.analyze_recent_volatility(
-                db, trade.symbol, window_seconds=60
-            )
+            if volatility is None:
+                volatility = self.volatility_analyzer.analyze_recent_volatility(
+                    db, trade.symbol, window_seconds=60
+                )
 
             # === STEP 2: Determine Update Interval (adaptive) ===
             update_interval = self.update_intervals[volatility['volatility_level']]
@@ -481,9 +673,10 @@ class SmartTrailingStopV2:
                     return None
 
             # === STEP 3: ML Reversal Prediction ===
-            reversal_prob = self.reversal_predictor.predict_reversal_probability(
-                db, trade, current_price
-            )
+            if reversal_prob is None:
+                reversal_prob = self.reversal_predictor.predict_reversal_probability(
+                    db, trade, current_price
+                )
 
             # === STEP 4: Calculate Adaptive Trail Distance ===
             trail_dist, debug_info = self.calculate_adaptive_trail_distance(
@@ -539,7 +732,7 @@ class SmartTrailingStopV2:
             if sl_move_pts < min_move_pts:
                 return None
 
-            # === STEP 7: Log and Execute ===
+            # === STEP 7: Log ===
             logger.info(
                 f"🎯 HYBRID TS: {trade.symbol} #{trade.ticket} - "
                 f"SL {sl:.5f} → {new_sl:.5f} | "
@@ -549,32 +742,35 @@ class SmartTrailingStopV2:
                 f"{debug_info['pct_to_tp']:.0f}% to TP"
             )
 
-            self._send_modify_command(db, trade, new_sl)
-            self.last_update[trade.ticket] = now
-
             return {'new_sl': new_sl, 'debug': debug_info}
 
         except Exception as e:
-            logger.error(f"Error processing trade {trade.ticket}: {e}", exc_info=True)
+            logger.error(f"Error calculating trailing SL for trade {trade.ticket}: {e}", exc_info=True)
             return None
 
-    def _send_modify_command(self, db: Session, trade: Trade, new_sl: float) -> bool:
+    def _send_modify_command(
+        self,
+        db: Session,
+        trade: Trade,
+        new_sl: float,
+        current_price: Optional[float] = None
+    ) -> bool:
         """Send MODIFY_TRADE command to EA"""
         try:
             import uuid
             from models import TradeHistoryEvent, Tick
 
-            # Get current price for logging
-            current_tick = db.query(Tick).filter_by(
-                symbol=trade.symbol
-            ).order_by(Tick.timestamp.desc()).first()
+            # Get current price for logging (if the caller did not pass it)
+            if current_price is None:
+                current_tick = db.query(Tick).filter_by(
+                    symbol=trade.symbol
+                ).order_by(Tick.timestamp.desc()).first()
 
-            current_price = None
-            if current_tick:
-                if trade.direction.upper() == 'BUY':
-                    current_price = float(current_tick.bid)
-                else:
-                    current_price = float(current_tick.ask)
+                if current_tick:
+                    if trade.direction.upper() == 'BUY':
+                        current_price = float(current_tick.bid)
+                    else:
+                        current_price = float(current_tick.ask)
 
             payload = {
                 'ticket': trade.ticket,
@@ -627,8 +823,96 @@ class SmartTrailingStopV2:
             db.rollback()
             return False
 
+    def _load_tick_windows(
+        self,
+        db: Session,
+        symbols: List[str],
+        window_seconds: int = 60
+    ) -> Tuple[Dict[str, Dict], Dict[str, np.ndarray]]:
+        """
+        Load latest quote and recent mid-price window for all symbols at once
+
+        Returns:
+            (latest quote per symbol from the quote book, mid prices per symbol oldest first)
+            Windows come from tick_windows when it runs in this process, else from the ticks table
+        """
+        latest = get_quote_book().get_quotes(symbols)
+
+        tick_windows = get_tick_windows()
+        if tick_windows.covers(window_seconds):
+            return latest, tick_windows.get_windows(symbols)
+
+        cutoff = datetime.utcnow() - timedelta(seconds=window_seconds)
+        rows = db.query(Tick.symbol, Tick.bid, Tick.ask).filter(
+            and_(
+                Tick.symbol.in_(symbols),
+                Tick.timestamp >= cutoff
+            )
+        ).order_by(Tick.symbol, Tick.timestamp.asc()).all()
+
+        grouped: Dict[str, List[float]] = {}
+        for symbol, bid, ask in rows:
+            grouped.setdefault(symbol, []).append((float(bid) + float(ask)) / 2)
+
+        windows = {symbol: np.asarray(prices) for symbol, prices in grouped.items()}
+        return latest, windows
+
+    def _get_atr(self, db: Session, symbols: List[str], period: int = 14) -> Dict[str, float]:
+        """H1 ATR per symbol (cached for ATR_CACHE_SECONDS - H1 ATR moves slowly)"""
+        now = datetime.utcnow()
+        missing = [
+            s for s in symbols
+            if s not in self._atr_cache
+            or (now - self._atr_cache[s][1]).total_seconds() > self.ATR_CACHE_SECONDS
+        ]
+
+        if missing:
+            try:
+                from sqlalchemy import func
+
+                ranked = db.query(
+                    OHLCData.symbol, OHLCData.high, OHLCData.low, OHLCData.close,
+                    func.row_number().over(
+                        partition_by=OHLCData.symbol,
+                        order_by=OHLCData.timestamp.desc()
+                    ).label('rn')
+                ).filter(
+                    OHLCData.symbol.in_(missing),
+                    OHLCData.timeframe == 'H1'
+                ).subquery()
+
+                rows = db.query(ranked).filter(ranked.c.rn <= period + 1).order_by(
+                    ranked.c.symbol, ranked.c.rn.desc()
+                ).all()
+
+                bars: Dict[str, List] = {}
+                for row in rows:
+                    bars.setdefault(row.symbol, []).append(
+                        (float(row.high), float(row.low), float(row.close))
+                    )
+
+                for symbol in missing:
+                    symbol_bars = np.asarray(bars.get(symbol, []))
+                    atr = 0.0
+                    if len(symbol_bars) >= 2:
+                        high, low, close = symbol_bars[1:, 0], symbol_bars[1:, 1], symbol_bars[:-1, 2]
+                        true_range = np.maximum(high - low, np.maximum(abs(high - close), abs(low - close)))
+                        atr = float(true_range.mean())
+                    self._atr_cache[symbol] = (atr, now)
+
+            except Exception as e:
+                logger.warning(f"Could not load ATR for reversal features: {e}")
+
+        return {s: self._atr_cache[s][0] for s in symbols if s in self._atr_cache}
+
     def process_all(self, db: Session) -> Dict:
-        """Process all open trades"""
+        """
+        Process all open trades
+
+        Ticks, volatility and reversal probabilities are computed once for all
+        open trades (one tick query, one vectorized scoring call) instead of
+        per trade.
+        """
         stats = {'total': 0, 'trailed': 0, 'errors': 0}
 
         try:
@@ -641,20 +925,46 @@ class SmartTrailingStopV2:
 
             logger.info(f"🔄 Processing {len(open_trades)} trades with Hybrid Adaptive TS V2")
 
+            symbols = sorted({t.symbol for t in open_trades})
+            latest_quotes, price_windows = self._load_tick_windows(db, symbols, window_seconds=60)
+
+            # Trades without a current price are skipped (as before)
+            priced_trades = []
+            current_prices = []
             for trade in open_trades:
-                try:
-                    # Get current price
-                    tick = db.query(Tick).filter_by(symbol=trade.symbol).order_by(
-                        Tick.timestamp.desc()
-                    ).first()
+                quote = latest_quotes.get(trade.symbol)
+                if not quote:
+                    continue
+                is_buy = trade.direction.upper() in ['BUY', '0']
+                priced_trades.append(trade)
+                current_prices.append(quote['bid'] if is_buy else quote['ask'])
+
+            if not priced_trades:
+                return stats
 
-                    if not tick:
-                        continue
+            # One volatility analysis per symbol, one scoring call for all trades
+            volatility_by_symbol = {
+                symbol: self.volatility_analyzer.analyze_prices(
+                    symbol, price_windows.get(symbol, np.zeros(0)).tolist()
+                )
+                for symbol in {t.symbol for t in priced_trades}
+            }
 
-                    is_buy = trade.direction.upper() in ['BUY', '0']
-                    current_price = float(tick.bid) if is_buy else float(tick.ask)
+            features = self.reversal_predictor.build_feature_matrix(
+                priced_trades,
+                np.asarray(current_prices),
+                price_windows,
+                self._get_atr(db, symbols)
+            )
+            reversal_probs = self.reversal_predictor.predict_reversal_probabilities(features)
 
-                    result = self.process_trade(db, trade, current_price)
+            for trade, current_price, reversal_prob in zip(priced_trades, current_prices, reversal_probs):
+                try:
+                    result = self.process_trade(
+                        db, trade, current_price,
+                        volatility=volatility_by_symbol[trade.symbol],
+                        reversal_prob=float(reversal_prob)
+                    )
 
                     if result and 'new_sl' in result:
                         stats['trailed'] += 1
@@ -0,0 +1,695 @@
+"""
+Spread Statistics - streaming spread accumulators fed by the tick ingest path
+
+Replaces GROUP BY queries over raw ticks (aggregation-at-delete, 24h spread
+averages, last-100-ticks spread checks) with in-memory accumulators that the
+web server updates for every /api/ticks batch:
+
+- Hour-of-week baseline per (symbol, day_of_week, hour): count, sum, sum of
+  squares, min, max and a small quantile sketch. Persisted to the
+  spread_statistics table every few minutes (day_of_week 0=Monday).
+- Rolling hourly buckets (last 48h) per symbol for "average spread over the
+  last N hours".
+- Recent average per symbol (EWMA over ~100 ticks) for spike checks.
+
+The server publishes per-symbol summaries to Redis every few seconds, so
+workers (AutoTrader, signal generator) compare a spread against them without
+touching PostgreSQL. Spread statistics are GLOBAL (no account_id).
+
+Usage:
+    from spread_stats import get_spread_tracker
+
+    tracker = get_spread_tracker()
+    tracker.on_block(block)                   # server, /api/ticks (TickBlock)
+    tracker.get_recent('EURUSD')              # {'recent_avg': ..., 'recent_ticks': ...}
+    tracker.get_window('EURUSD', hours=24)    # avg/min/max over the last 24h
+    tracker.get_baseline('EURUSD')            # current hour-of-week: avg, std, p50, p95
+"""
+
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from threading import Thread, Lock
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+
+from database import ScopedSession
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class QuantileSketch:
+    """
+    Log-bucket quantile sketch (relative accuracy ~1%)
+
+    Bucket i holds values in (GAMMA^(i-1), GAMMA^i]. Mergeable and bounded:
+    above MAX_BINS the lowest buckets are collapsed, which only affects low
+    quantiles.
+    """
+    GAMMA = 1.02
+    LOG_GAMMA = math.log(GAMMA)
+    MAX_BINS = 128
+
+    __slots__ = ('bins', 'zero', 'count')
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value: float, weight: int = 1):
+        self.count += weight
+        if value <= 0:
+            self.zero += weight
+            return
+        index = math.ceil(math.log(value) / self.LOG_GAMMA)
+        self.bins[index] = self.bins.get(index, 0) + weight
+        if len(self.bins) > self.MAX_BINS:
+            self._collapse()
+
+    def add_indexes(self, indexes, weights, zero: int = 0):
+        """Add pre-bucketed values (bucket indexes as computed by add())"""
+        self.count += zero + sum(weights)
+        self.zero += zero
+        for index, weight in zip(indexes, weights):
+            self.bins[index] = self.bins.get(index, 0) + weight
+        if len(self.bins) > self.MAX_BINS:
+            self._collapse()
+
+    def merge(self, other: 'QuantileSketch'):
+        self.count += other.count
+        self.zero += other.zero
+        for index, weight in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + weight
+        if len(self.bins) > self.MAX_BINS:
+            self._collapse()
+
+    def _collapse(self):
+        indexes = sorted(self.bins)
+        excess = indexes[:len(indexes) - self.MAX_BINS + 1]
+        target = excess[-1]
+        for index in excess[:-1]:
+            self.bins[target] += self.bins.pop(index)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return 2 * self.GAMMA ** index / (self.GAMMA + 1)
+        return 2 * self.GAMMA ** max(self.bins) / (self.GAMMA + 1)
+
+    def to_dict(self) -> Dict:
+        return {'z': self.zero, 'b': {str(k): v for k, v in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> 'QuantileSketch':
+        sketch = cls()
+        if data:
+            sketch.zero = int(data.get('z', 0))
+            sketch.bins = {int(k): int(v) for k, v in data.get('b', {}).items()}
+            sketch.count = sketch.zero + sum(sketch.bins.values())
+        return sketch
+
+
+class SpreadAccumulator:
+    """count / sum / sum² / min / max (+ optional quantile sketch) of spreads"""
+
+    __slots__ = ('count', 'total', 'total_sq', 'min', 'max', 'first', 'last', 'sketch')
+
+    def __init__(self, with_sketch: bool = False):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.first = None  # Epoch seconds of first/last sample
+        self.last = None
+        self.sketch = QuantileSketch() if with_sketch else None
+
+    def add(self, spread: float, timestamp: float):
+        self.count += 1
+        self.total += spread
+        self.total_sq += spread * spread
+        if spread < self.min:
+            self.min = spread
+        if spread > self.max:
+            self.max = spread
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+        if self.sketch is not None:
+            self.sketch.add(spread)
+
+    def add_run(self, count: int, total: float, total_sq: float, low: float, high: float,
+                first: float, last: float):
+        """Add pre-aggregated samples (the sketch is filled separately)"""
+        self.count += count
+        self.total += total
+        self.total_sq += total_sq
+        if low < self.min:
+            self.min = low
+        if high > self.max:
+            self.max = high
+        if self.first is None:
+            self.first = first
+        self.last = last
+
+    def summary(self) -> Dict:
+        if self.count == 0:
+            return {'count': 0}
+        avg = self.total / self.count
+        variance = max(self.total_sq / self.count - avg * avg, 0.0)
+        summary = {
+            'count': self.count,
+            'avg': avg,
+            'std': math.sqrt(variance),
+            'min': self.min,
+            'max': self.max
+        }
+        if self.sketch is not None and self.sketch.count:
+            summary['p50'] = self.sketch.quantile(0.5)
+            summary['p95'] = self.sketch.quantile(0.95)
+        return summary
+
+
+class SpreadStatsTracker:
+    RECENT_KEY = 'spread:recent:'      # JSON per symbol: recent average + hourly buckets
+    BASELINE_KEY = 'spread:how:'       # Hash per symbol: 'dow:hour' -> summary JSON
+    RECENT_TICKS = 100                 # EWMA span, same window the spread checks used
+    HOURLY_WINDOW = 48                 # Rolling hourly buckets kept per symbol
+
+    def __init__(self, flush_interval=5, persist_interval=300, local_ttl: float = 1.0):
+        """
+        Initialize Spread Statistics Tracker
+
+        Args:
+            flush_interval: Seconds between Redis publishes (default: 5)
+            persist_interval: Seconds between spread_statistics upserts (default: 300)
+            local_ttl: Seconds a Redis summary is cached in reader processes
+        """
+        self.flush_interval = flush_interval
+        self.persist_interval = persist_interval
+        self.local_ttl = local_ttl
+        self.alpha = 2.0 / (self.RECENT_TICKS + 1)
+
+        # (symbol, day_of_week, hour) -> SpreadAccumulator (with sketch)
+        self.baselines: Dict[tuple, SpreadAccumulator] = {}
+        # symbol -> {epoch_hour: SpreadAccumulator}
+        self.hourly: Dict[str, Dict[int, SpreadAccumulator]] = {}
+        # symbol -> {'ewma', 'ticks', 'last_spread', 'last_timestamp'}
+        self.recent: Dict[str, Dict] = {}
+
+        self.dirty_symbols = set()
+        self.dirty_baselines = set()
+        self.lock = Lock()
+
+        # Reader cache (processes without a running tracker)
+        self._cache: Dict[str, tuple] = {}
+        self._cache_lock = Lock()
+
+        self.running = False
+        self.loaded = False
+        self.thread = None
+        self.ticks_processed = 0
+        self.rows_persisted = 0
+        self.last_persist = 0.0
+
+    # ========================================================================
+    # LIFECYCLE (server)
+    # ========================================================================
+
+    def start(self):
+        """Load persisted baselines and start the publish/persist thread"""
+        if self.running:
+            logger.warning("Spread stats tracker already running")
+            return
+
+        self._load()
+        self.running = True
+        self.last_persist = time.monotonic()
+        self.thread = Thread(target=self._worker_loop, daemon=True, name='SpreadStats')
+        self.thread.start()
+        logger.info(f"Spread stats tracker started (publish every {self.flush_interval}s, persist every {self.persist_interval}s)")
+
+    def stop(self):
+        """Stop the background thread and persist pending baselines"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=10)
+        self.publish()
+        self.persist()
+        logger.info("Spread stats tracker stopped")
+
+    # ========================================================================
+    # INGEST (hot path - memory only)
+    # ========================================================================
+
+    def on_ticks(self, ticks: List[Dict]):
+        """
+        Add a batch of ticks to the accumulators
+
+        Args:
+            ticks: Tick dicts with symbol, bid, ask, optional spread and
+                   timestamp (UTC epoch seconds, same convention as the tick writer)
+        """
+        with self.lock:
+            for tick in ticks:
+                symbol = tick.get('symbol')
+                timestamp = tick.get('timestamp')
+                if not symbol or timestamp is None:
+                    continue
+
+                spread = tick.get('spread')
+                if spread is None:
+                    bid, ask = tick.get('bid'), tick.get('ask')
+                    if not bid or not ask:
+                        continue
+                    spread = float(ask) - float(bid)
+                spread = abs(float(spread))
+
+                # Hour/day like datetime.fromtimestamp() in the ticks table (0=Monday)
+                local = time.localtime(timestamp)
+                key = (symbol, local.tm_wday, local.tm_hour)
+                baseline = self.baselines.get(key)
+                if baseline is None:
+                    baseline = self.baselines[key] = SpreadAccumulator(with_sketch=True)
+                baseline.add(spread, timestamp)
+                self.dirty_baselines.add(key)
+
+                hours = self.hourly.setdefault(symbol, {})
+                hour = int(timestamp // 3600)
+                bucket = hours.get(hour)
+                if bucket is None:
+                    bucket = hours[hour] = SpreadAccumulator()
+                    for old in [h for h in hours if h <= hour - self.HOURLY_WINDOW]:
+                        del hours[old]
+                bucket.add(spread, timestamp)
+
+                recent = self.recent.get(symbol)
+                if recent is None:
+                    self.recent[symbol] = {'ewma': spread, 'ticks': 1, 'last_spread': spread, 'last_timestamp': timestamp}
+                else:
+                    recent['ewma'] += self.alpha * (spread - recent['ewma'])
+                    recent['ticks'] += 1
+                    recent['last_spread'] = spread
+                    recent['last_timestamp'] = timestamp
+
+                self.dirty_symbols.add(symbol)
+                self.ticks_processed += 1
+
+    def on_block(self, block):
+        """
+        Add a TickBlock to the accumulators
+
+        Sums, extremes, sketch buckets and the EWMA are computed with numpy
+        per (symbol, hour) run; the accumulators are touched once per run.
+        """
+        if not len(block):
+            return
+
+        order, starts, codes, hours = block.runs(3600)
+        ends = np.append(starts[1:], len(order))
+        spreads = np.abs(block.spread[order])
+        timestamps = block.timestamp[order]
+
+        counts = (ends - starts).tolist()
+        totals = np.add.reduceat(spreads, starts).tolist()
+        totals_sq = np.add.reduceat(spreads * spreads, starts).tolist()
+        lows = np.minimum.reduceat(spreads, starts).tolist()
+        highs = np.maximum.reduceat(spreads, starts).tolist()
+        firsts = timestamps[starts].tolist()
+        lasts = timestamps[ends - 1].tolist()
+
+        # Sketch buckets per run: (run, bucket index) -> count
+        run_ids = np.repeat(np.arange(len(starts)), ends - starts)
+        positive = spreads > 0
+        zeros = np.bincount(run_ids[~positive], minlength=len(starts)).tolist()
+        indexes = np.ceil(np.log(spreads[positive]) / QuantileSketch.LOG_GAMMA).astype(np.int64)
+        keys, pair_counts = np.unique((run_ids[positive] << 32) + (indexes + (1 << 31)), return_counts=True)
+        pair_runs = keys >> 32
+        pair_indexes = ((keys & 0xFFFFFFFF) - (1 << 31)).tolist()
+        pair_counts = pair_counts.tolist()
+        pair_bounds = np.searchsorted(pair_runs, np.arange(len(starts) + 1)).tolist()
+
+        # EWMA over each symbol's ticks: e_n = (1-a)^n * e_0 + sum a * (1-a)^(n-k) * s_k
+        sorted_codes = block.codes[order]
+        symbol_starts = np.flatnonzero(np.append(True, sorted_codes[1:] != sorted_codes[:-1]))
+        symbol_ends = np.append(symbol_starts[1:], len(order))
+
+        with self.lock:
+            for i, code in enumerate(codes.tolist()):
+                symbol = block.symbols[code]
+
+                # Hour/day like datetime.fromtimestamp() in the ticks table (0=Monday)
+                local = time.localtime(firsts[i])
+                key = (symbol, local.tm_wday, local.tm_hour)
+                baseline = self.baselines.get(key)
+                if baseline is None:
+                    baseline = self.baselines[key] = SpreadAccumulator(with_sketch=True)
+                baseline.add_run(counts[i], totals[i], totals_sq[i], lows[i], highs[i], firsts[i], lasts[i])
+                lo, hi = pair_bounds[i], pair_bounds[i + 1]
+                baseline.sketch.add_indexes(pair_indexes[lo:hi], pair_counts[lo:hi], zeros[i])
+                self.dirty_baselines.add(key)
+
+                symbol_hours = self.hourly.setdefault(symbol, {})
+                hour = int(hours[i])
+                bucket = symbol_hours.get(hour)
+                if bucket is None:
+                    bucket = symbol_hours[hour] = SpreadAccumulator()
+                    for old in [h for h in symbol_hours if h <= hour - self.HOURLY_WINDOW]:
+                        del symbol_hours[old]
+                bucket.add_run(counts[i], totals[i], totals_sq[i], lows[i], highs[i], firsts[i], lasts[i])
+
+            for start, end in zip(symbol_starts.tolist(), symbol_ends.tolist()):
+                symbol = block.symbols[int(sorted_codes[start])]
+                values = spreads[start:end]
+                recent = self.recent.get(symbol)
+                if recent is None:
+                    # First tick seeds the average
+                    recent = self.recent[symbol] = {'ewma': float(values[0]), 'ticks': 1}
+                    values = values[1:]
+                decay = (1 - self.alpha) ** np.arange(len(values) - 1, -1, -1)
+                recent['ewma'] = float(
+                    (1 - self.alpha) ** len(values) * recent['ewma'] + self.alpha * np.dot(decay, values)
+                )
+                recent['ticks'] += len(values)
+                recent['last_spread'] = float(spreads[end - 1])
+                recent['last_timestamp'] = float(timestamps[end - 1])
+                self.dirty_symbols.add(symbol)
+
+            self.ticks_processed += len(block)
+
+    # ========================================================================
+    # PUBLISH / PERSIST (background)
+    # ========================================================================
+
+    def _worker_loop(self):
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self.publish()
+                if time.monotonic() - self.last_persist >= self.persist_interval:
+                    self.persist()
+            except Exception as e:
+                logger.error(f"Spread stats error: {e}", exc_info=True)
+
+    def publish(self):
+        """Write summaries of symbols that received ticks to Redis"""
+        with self.lock:
+            symbols, self.dirty_symbols = self.dirty_symbols, set()
+            payload = {}
+            for symbol in symbols:
+                now_local = time.localtime(self.recent[symbol]['last_timestamp'])
+                key = (symbol, now_local.tm_wday, now_local.tm_hour)
+                payload[symbol] = (
+                    self._recent_payload(symbol),
+                    f"{key[1]}:{key[2]}",
+                    self.baselines[key].summary()
+                )
+
+        if not payload:
+            return 0
+
+        pipe = get_redis().client.pipeline(transaction=False)
+        for symbol, (recent, field, baseline) in payload.items():
+            pipe.set(f"{self.RECENT_KEY}{symbol}", json.dumps(recent), ex=86400)
+            pipe.hset(f"{self.BASELINE_KEY}{symbol}", field, json.dumps(baseline))
+        pipe.execute()
+        return len(payload)
+
+    def _recent_payload(self, symbol: str) -> Dict:
+        recent = self.recent[symbol]
+        return {
+            'recent_avg': recent['ewma'],
+            'recent_ticks': recent['ticks'],
+            'last_spread': recent['last_spread'],
+            'last_timestamp': recent['last_timestamp'],
+            'hourly': [
+                [hour, b.count, b.total, b.min, b.max, b.first, b.last]
+                for hour, b in sorted(self.hourly.get(symbol, {}).items())
+            ]
+        }
+
+    def _load(self):
+        """Load persisted hour-of-week baselines (spread_statistics)"""
+        db = ScopedSession()
+        try:
+            rows = db.execute(text("""
+                SELECT symbol, day_of_week, hour_utc, sample_count, avg_spread, min_spread, max_spread,
+                       spread_sum, spread_sum_sq, sketch, first_recorded, last_updated
+                FROM spread_statistics
+            """)).fetchall()
+
+            # Rows of the old GROUP BY aggregation use extract('dow') (0=Sunday) and
+            # have no sums - loading (and later persisting) them would shift every
+            # baseline by one weekday
+            legacy = sum(1 for row in rows if row.spread_sum is None)
+            if legacy:
+                logger.error(
+                    f"{legacy} spread_statistics rows still use day_of_week 0=Sunday - "
+                    f"run migrations/convert_spread_statistics_day_of_week.sql"
+                )
+                return
+
+            with self.lock:
+                for row in rows:
+                    key = (row.symbol, int(row.day_of_week), int(row.hour_utc))
+                    acc = SpreadAccumulator(with_sketch=True)
+                    acc.count = int(row.sample_count or 0)
+                    acc.total = float(row.spread_sum)
+                    acc.total_sq = float(row.spread_sum_sq or 0)
+                    acc.min = float(row.min_spread) if row.min_spread is not None else math.inf
+                    acc.max = float(row.max_spread) if row.max_spread is not None else -math.inf
+                    acc.first = row.first_recorded.timestamp() if row.first_recorded else None
+                    acc.last = row.last_updated.timestamp() if row.last_updated else None
+                    acc.sketch = QuantileSketch.from_dict(row.sketch)
+
+                    # Ticks seen before the load are added on top
+                    pending = self.baselines.get(key)
+                    if pending is not None:
+                        acc.count += pending.count
+                        acc.total += pending.total
+                        acc.total_sq += pending.total_sq
+                        acc.min = min(acc.min, pending.min)
+                        acc.max = max(acc.max, pending.max)
+                        acc.first = acc.first or pending.first
+                        acc.last = pending.last
+                        acc.sketch.merge(pending.sketch)
+                    self.baselines[key] = acc
+
+            self.loaded = True
+            logger.info(f"Loaded {len(rows)} spread baselines")
+        except Exception as e:
+            # Without the persisted totals an upsert would overwrite history - retry on next persist
+            logger.error(f"Could not load spread statistics (run migrations/add_spread_statistics_sketch.sql?): {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def persist(self):
+        """Upsert changed hour-of-week baselines into spread_statistics"""
+        self.last_persist = time.monotonic()
+        if not self.loaded:
+            self._load()
+            if not self.loaded:
+                return 0
+
+        with self.lock:
+            keys, self.dirty_baselines = self.dirty_baselines, set()
+            rows = []
+            for key in keys:
+                acc = self.baselines[key]
+                summary = acc.summary()
+                rows.append({
+                    'symbol': key[0],
+                    'day_of_week': key[1],
+                    'hour_utc': key[2],
+                    'avg_spread': summary['avg'],
+                    'min_spread': acc.min,
+                    'max_spread': acc.max,
+                    'median_spread': summary.get('p50'),
+                    'p95_spread': summary.get('p95'),
+                    'sample_count': acc.count,
+                    'spread_sum': acc.total,
+                    'spread_sum_sq': acc.total_sq,
+                    'sketch': json.dumps(acc.sketch.to_dict()),
+                    'first_recorded': datetime.fromtimestamp(acc.first),
+                    'last_updated': datetime.fromtimestamp(acc.last)
+                })
+
+        if not rows:
+            return 0
+
+        db = ScopedSession()
+        try:
+            db.execute(text("""
+                INSERT INTO spread_statistics
+                    (symbol, hour_utc, day_of_week, avg_spread, min_spread, max_spread, median_spread,
+                     p95_spread, sample_count, spread_sum, spread_sum_sq, sketch, first_recorded, last_updated)
+                VALUES
+                    (:symbol, :hour_utc, :day_of_week, :avg_spread, :min_spread, :max_spread, :median_spread,
+                     :p95_spread, :sample_count, :spread_sum, :spread_sum_sq, CAST(:sketch AS JSONB),
+                     :first_recorded, :last_updated)
+                ON CONFLICT (symbol, hour_utc, day_of_week)
+                DO UPDATE SET
+                    avg_spread = EXCLUDED.avg_spread,
+                    min_spread = EXCLUDED.min_spread,
+                    max_spread = EXCLUDED.max_spread,
+                    median_spread = EXCLUDED.median_spread,
+                    p95_spread = EXCLUDED.p95_spread,
+                    sample_count = EXCLUDED.sample_count,
+                    spread_sum = EXCLUDED.spread_sum,
+                    spread_sum_sq = EXCLUDED.spread_sum_sq,
+                    sketch = EXCLUDED.sketch,
+                    last_updated = EXCLUDED.last_updated
+            """), rows)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Spread statistics persist failed, {len(rows)} rows re-queued: {e}")
+            db.rollback()
+            with self.lock:
+                self.dirty_baselines |= keys
+            return 0
+        finally:
+            db.close()
+
+        self.rows_persisted += len(rows)
+        logger.debug(f"Persisted {len(rows)} spread baselines")
+        return len(rows)
+
+    # ========================================================================
+    # READ (any process)
+    # ========================================================================
+
+    def _cached(self, key: str, loader, ttl: float):
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached and now - cached[1] < ttl:
+                return cached[0]
+        value = loader()
+        with self._cache_lock:
+            self._cache[key] = (value, now)
+        return value
+
+    def _recent_data(self, symbol: str) -> Optional[Dict]:
+        if self.running:
+            with self.lock:
+                return self._recent_payload(symbol) if symbol in self.recent else None
+
+        def load():
+            raw = get_redis().client.get(f"{self.RECENT_KEY}{symbol}")
+            return json.loads(raw) if raw else None
+        return self._cached(f"recent:{symbol}", load, self.local_ttl)
+
+    def get_recent(self, symbol: str) -> Optional[Dict]:
+        """
+        Recent spread of a symbol
+
+        Returns:
+            Dict with recent_avg (EWMA over ~100 ticks), recent_ticks,
+            last_spread and last_timestamp - None if no ticks were seen
+        """
+        data = self._recent_data(symbol)
+        if not data:
+            return None
+        return {k: data[k] for k in ('recent_avg', 'recent_ticks', 'last_spread', 'last_timestamp')}
+
+    def get_window(self, symbol: str, hours: int = 24) -> Optional[Dict]:
+        """
+        Spread statistics over the last N hours (max HOURLY_WINDOW)
+
+        Returns:
+            Dict with avg_spread, min_spread, max_spread, sample_count,
+            first_tick and last_tick (datetimes) - None if no ticks in the window
+        """
+        data = self._recent_data(symbol)
+        if not data:
+            return None
+
+        since = int(time.time() // 3600) - hours + 1
+        buckets = [b for b in data['hourly'] if b[0] >= since]
+        count = sum(b[1] for b in buckets)
+        if count == 0:
+            return None
+
+        return {
+            'avg_spread': sum(b[2] for b in buckets) / count,
+            'min_spread': min(b[3] for b in buckets),
+            'max_spread': max(b[4] for b in buckets),
+            'sample_count': count,
+            'first_tick': datetime.fromtimestamp(min(b[5] for b in buckets)),
+            'last_tick': datetime.fromtimestamp(max(b[6] for b in buckets))
+        }
+
+    def get_baseline(self, symbol: str, when: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        Hour-of-week spread baseline (count, avg, std, min, max, p50, p95)
+
+        Args:
+            symbol: Trading symbol
+            when: Naive datetime (tick table convention), default now
+        """
+        when = when or datetime.now()
+        key = (symbol, when.weekday(), when.hour)
+
+        if self.running:
+            with self.lock:
+                acc = self.baselines.get(key)
+                return acc.summary() if acc else None
+
+        def load():
+            raw = get_redis().client.hget(f"{self.BASELINE_KEY}{symbol}", f"{key[1]}:{key[2]}")
+            return json.loads(raw) if raw else None
+        return self._cached(f"baseline:{symbol}:{key[1]}:{key[2]}", load, 60)
+
+    def symbols(self) -> List[str]:
+        """Symbols with spread statistics"""
+        if self.running:
+            with self.lock:
+                return sorted(self.recent)
+        return sorted(
+            key[len(self.RECENT_KEY):]
+            for key in get_redis().client.scan_iter(match=f"{self.RECENT_KEY}*", count=500)
+        )
+
+    def get_stats(self) -> Dict:
+        """Tracker statistics"""
+        return {
+            'running': self.running,
+            'loaded': self.loaded,
+            'symbols': len(self.recent),
+            'baselines': len(self.baselines),
+            'ticks_processed': self.ticks_processed,
+            'rows_persisted': self.rows_persisted
+        }
+
+
+# Global instance
+_spread_tracker = None
+
+def get_spread_tracker() -> SpreadStatsTracker:
+    """Get global spread statistics tracker instance"""
+    global _spread_tracker
+    if _spread_tracker is None:
+        _spread_tracker = SpreadStatsTracker()
+    return _spread_tracker
+
+def start_spread_tracker(flush_interval=5, persist_interval=300):
+    """Start the global spread statistics tracker (web server only)"""
+    tracker = get_spread_tracker()
+    tracker.flush_interval = flush_interval
+    tracker.persist_interval = persist_interval
+    tracker.start()
+    return tracker
@@ -6,6 +6,9 @@ from datetime import datetime
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from models import Tick
+from quote_book import get_quote_book
+from tick_archive import get_tick_archive
+from spread_stats import get_spread_tracker
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +28,13 @@ def get_spread_at_time(db: Session, symbol: str, timestamp: datetime, fallback_s
         Spread in price units (e.g., 0.00020 for EURUSD = 2 pips)
     """
     try:
-        # Query tick closest to timestamp
+        # The latest quote is the answer whenever it is not newer than the
+        # requested time (the common "spread right now" case) - no DB query
+        quote = get_quote_book().get_quote(symbol)
+        if quote and timestamp.tzinfo is None and quote['timestamp'] <= timestamp:
+            return quote['spread'] if quote['spread'] else quote['ask'] - quote['bid']
+
+        # Historical timestamp - query tick closest to timestamp
         tick = db.query(Tick).filter(
             Tick.symbol == symbol,
             Tick.timestamp <= timestamp
@@ -38,6 +47,12 @@ def get_spread_at_time(db: Session, symbol: str, timestamp: datetime, fallback_s
         if tick and tick.bid and tick.ask:
             return float(tick.ask - tick.bid)
 
+        # Older than the ticks table retention - look it up in the tick archive
+        if tick is None and timestamp.tzinfo is None:
+            archived_spread = get_tick_archive().spread_at(symbol, timestamp)
+            if archived_spread:
+                return archived_spread
+
         # No tick data available - use fallback
         if fallback_spread is not None:
             return fallback_spread
@@ -219,21 +234,16 @@ def get_average_spread(db: Session, symbol: str, hours: int = 24) -> dict:
     """
     Get average spread statistics for a symbol over the last N hours.
 
+    Served from the streaming spread accumulators (spread_stats), no tick
+    query. db is kept for compatibility.
+
     Returns:
         dict with avg_spread, min_spread, max_spread, sample_count
     """
-    from datetime import timedelta
-
     try:
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        window = get_spread_tracker().get_window(symbol, hours=hours)
 
-        ticks = db.query(Tick).filter(
-            Tick.symbol == symbol,
-            Tick.timestamp >= cutoff_time,
-            Tick.spread.isnot(None)
-        ).all()
-
-        if not ticks:
+        if not window:
             return {
                 'avg_spread': get_default_spread(symbol),
                 'min_spread': None,
@@ -241,13 +251,11 @@ def get_average_spread(db: Session, symbol: str, hours: int = 24) -> dict:
                 'sample_count': 0
             }
 
-        spreads = [float(t.spread) for t in ticks]
-
         return {
-            'avg_spread': sum(spreads) / len(spreads),
-            'min_spread': min(spreads),
-            'max_spread': max(spreads),
-            'sample_count': len(spreads)
+            'avg_spread': window['avg_spread'],
+            'min_spread': window['min_spread'],
+            'max_spread': window['max_spread'],
+            'sample_count': window['sample_count']
         }
 
     except Exception as e:
@@ -271,7 +279,7 @@ def detect_spread_spike(current_spread: float, symbol: str, db: Session = None,
     Args:
         current_spread: Current spread to check
         symbol: Trading symbol
-        db: Database session (optional, for historical comparison)
+        db: Database session (unused, kept for compatibility)
         threshold_multiplier: Multiplier of average spread to trigger alert (default: 2.5x)
 
     Returns:
@@ -290,12 +298,8 @@ def detect_spread_spike(current_spread: float, symbol: str, db: Session = None,
         'severity': 'normal'
     }
 
-    # Get historical average if DB available
-    if db:
-        stats = get_average_spread(db, symbol, hours=24)
-        avg_spread = stats['avg_spread']
-    else:
-        avg_spread = get_default_spread(symbol)
+    # 24h average from the streaming spread statistics (default spread if none)
+    avg_spread = get_average_spread(db, symbol, hours=24)['avg_spread']
 
     result['avg_spread'] = avg_spread
 
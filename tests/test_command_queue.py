@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Command Queue Tests
+Covers priority lanes and MODIFY coalescing in RedisClient (redis_client.py)
+
+Requires fakeredis with Lua support (pip install "fakeredis[lua]").
+
+Usage:
+    python -m pytest tests/test_command_queue.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')
+
+from redis_client import RedisClient
+
+ACCOUNT_ID = 1
+
+
+@pytest.fixture
+def queue():
+    client = RedisClient.__new__(RedisClient)
+    client._scripts = {}
+    client.pubsub = None
+    client.client = fakeredis.FakeRedis(decode_responses=True)
+    return client
+
+
+def ids(commands):
+    return [c['id'] for c in commands]
+
+
+def test_lanes_are_served_close_open_modify_other(queue):
+    queue.push_command(ACCOUNT_ID, {'id': 'hist', 'type': 'FETCH_HISTORY'})
+    queue.push_command(ACCOUNT_ID, {'id': 'mod', 'type': 'MODIFY_TRADE', 'ticket': 1, 'sl': 1.1})
+    queue.push_command(ACCOUNT_ID, {'id': 'open', 'type': 'OPEN_TRADE', 'symbol': 'EURUSD'})
+    queue.push_command(ACCOUNT_ID, {'id': 'close', 'type': 'CLOSE_TRADE', 'ticket': 2})
+
+    assert ids(queue.pop_commands(ACCOUNT_ID, 10)) == ['close', 'open', 'mod', 'hist']
+
+
+def test_fifo_within_lane(queue):
+    for i in range(3):
+        queue.push_command(ACCOUNT_ID, {'id': f'open{i}', 'type': 'OPEN_TRADE'})
+    assert ids(queue.pop_commands(ACCOUNT_ID, 2)) == ['open0', 'open1']
+    assert ids(queue.pop_commands(ACCOUNT_ID, 2)) == ['open2']
+
+
+def test_modify_is_coalesced_per_ticket(queue):
+    assert queue.push_command(ACCOUNT_ID, {'id': 'm1', 'type': 'MODIFY_TRADE', 'ticket': 7, 'sl': 1.0}) is None
+    queue.push_command(ACCOUNT_ID, {'id': 'other', 'type': 'MODIFY_TRADE', 'ticket': 8, 'sl': 2.0})
+    assert queue.push_command(ACCOUNT_ID, {'id': 'm2', 'type': 'MODIFY_TRADE', 'ticket': 7, 'sl': 1.2}) == 'm1'
+
+    commands = queue.pop_commands(ACCOUNT_ID, 10)
+    assert ids(commands) == ['m2', 'other']  # ticket 7 keeps its place, newest payload
+    assert commands[0]['sl'] == 1.2
+
+
+def test_modify_after_delivery_is_queued_again(queue):
+    queue.push_command(ACCOUNT_ID, {'id': 'm1', 'type': 'MODIFY_TRADE', 'ticket': 7, 'sl': 1.0})
+    assert ids(queue.pop_commands(ACCOUNT_ID, 10)) == ['m1']
+    assert queue.push_command(ACCOUNT_ID, {'id': 'm2', 'type': 'MODIFY_TRADE', 'ticket': 7, 'sl': 1.0}) is None
+    assert ids(queue.pop_commands(ACCOUNT_ID, 10)) == ['m2']
+
+
+def test_modify_without_ticket_goes_to_other_lane(queue):
+    queue.push_command(ACCOUNT_ID, {'id': 'a', 'type': 'MODIFY_TRADE'})
+    queue.push_command(ACCOUNT_ID, {'id': 'b', 'type': 'MODIFY_TRADE'})
+    assert ids(queue.pop_commands(ACCOUNT_ID, 10)) == ['a', 'b']
+
+
+def test_trailing_stop_modify_is_not_coalesced_with_sl(queue):
+    queue.push_command(ACCOUNT_ID, {'id': 'sl1', 'type': 'MODIFY_TRADE', 'ticket': 5, 'sl': 1.0, 'tp': 1.5})
+    assert queue.push_command(ACCOUNT_ID, {'id': 'ts', 'type': 'MODIFY_TRADE', 'ticket': 5, 'trailing_stop': 20.0}) is None
+    assert queue.push_command(ACCOUNT_ID, {'id': 'sl2', 'type': 'MODIFY_TRADE', 'ticket': 5, 'sl': 1.1, 'tp': 1.5}) == 'sl1'
+    assert queue.push_command(ACCOUNT_ID, {'id': 'ts2', 'type': 'MODIFY_TRADE', 'ticket': 5, 'trailing_stop': 25.0}) is None
+
+    commands = queue.pop_commands(ACCOUNT_ID, 10)
+    assert ids(commands) == ['sl2', 'ts', 'ts2']  # latest SL/TP, every trailing stop command
+    assert commands[0]['sl'] == 1.1
+
+
+def test_lane_override(queue):
+    queue.push_command(ACCOUNT_ID, {'id': 'open', 'type': 'OPEN_TRADE'})
+    queue.push_command(ACCOUNT_ID, {'id': 'panic', 'type': 'CLOSE_ALL'}, lane='close')
+    assert ids(queue.pop_commands(ACCOUNT_ID, 10)) == ['panic', 'open']
+
+
+def test_blocking_pop_respects_priority_and_coalescing(queue):
+    queue.push_command(ACCOUNT_ID, {'id': 'm1', 'type': 'MODIFY_TRADE', 'ticket': 3, 'sl': 1.0})
+    queue.push_command(ACCOUNT_ID, {'id': 'm2', 'type': 'MODIFY_TRADE', 'ticket': 3, 'sl': 1.0})
+    queue.push_command(ACCOUNT_ID, {'id': 'close', 'type': 'CLOSE_TRADE', 'ticket': 3})
+
+    assert ids(queue.pop_commands(ACCOUNT_ID, 10, timeout=0.1)) == ['close', 'm2']
+    assert queue.pop_commands(ACCOUNT_ID, 10, timeout=0.1) == []
+
+
+def test_legacy_queue_is_drained(queue):
+    queue.client.rpush(f"commands:account:{ACCOUNT_ID}", '{"id": "old", "type": "OPEN_TRADE"}')
+    queue.push_command(ACCOUNT_ID, {'id': 'new', 'type': 'FETCH_HISTORY'})
+    assert ids(queue.pop_commands(ACCOUNT_ID, 10)) == ['new', 'old']  # legacy list drains last
+
+
+def test_pending_view_and_clear(queue):
+    queue.push_command(ACCOUNT_ID, {'id': 'm1', 'type': 'MODIFY_TRADE', 'ticket': 1, 'sl': 1.0})
+    queue.push_command(ACCOUNT_ID, {'id': 'm2', 'type': 'MODIFY_TRADE', 'ticket': 1, 'sl': 1.0})
+    queue.push_command(ACCOUNT_ID, {'id': 'close', 'type': 'CLOSE_TRADE', 'ticket': 1})
+
+    assert ids(queue.get_pending_commands(ACCOUNT_ID)) == ['close', 'm2']
+    assert len(queue.get_pending_commands(ACCOUNT_ID)) == 2  # non-destructive
+
+    queue.clear_command_queue(ACCOUNT_ID)
+    assert queue.pop_command(ACCOUNT_ID) is None
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+EA Payload Decoder Tests
+Covers compressed, MessagePack and columnar request bodies (ea_payload.py)
+
+Usage:
+    python -m pytest tests/test_ea_payload.py
+"""
+
+import gzip
+import json
+import os
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ea_payload import (
+    PayloadError,
+    TICK_COLUMNS_TYPE,
+    compress_body,
+    decode_payload,
+    decode_tick_columns,
+    decompress_body,
+    encode_tick_columns,
+    msgpack,
+    negotiate,
+)
+from tick_block import TickBlock
+
+TZ_OFFSET = -7200
+
+TICKS = [
+    {'symbol': 'EURUSD', 'bid': 1.08512, 'ask': 1.08515, 'spread': 0.00003, 'volume': 3,
+     'timestamp': 1760000000, 'tradeable': True},
+    {'symbol': 'XAUUSD', 'bid': 2401.15, 'ask': 2401.45, 'spread': None, 'volume': 1,
+     'timestamp': 1760000000, 'tradeable': True},
+    {'symbol': 'EURUSD', 'bid': 1.08513, 'ask': 1.08516, 'spread': 0.00003, 'volume': 0,
+     'timestamp': 1760000001, 'tradeable': False},
+]
+
+META = {
+    'account': 12345678,
+    'api_key': 'secret',
+    'balance': 1000.0,
+    'positions': [{'ticket': 42, 'profit': 1.5, 'swap': 0.0}],
+}
+
+
+def json_payload():
+    return dict(META, ticks=[dict(t, tz_offset=TZ_OFFSET) for t in TICKS])
+
+
+# ============================================================================
+# COMPRESSION
+# ============================================================================
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate'])
+def test_compressed_json_roundtrip(encoding):
+    body = compress_body(json.dumps(json_payload()).encode(), encoding)
+    assert decode_payload(body, 'application/json', encoding) == json_payload()
+
+
+def test_raw_deflate_is_accepted():
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    body = compressor.compress(json.dumps(META).encode()) + compressor.flush()
+    assert decode_payload(body, 'application/json; charset=utf-8', 'deflate') == META
+
+
+def test_identity_passthrough():
+    assert decompress_body(b'{}', None) == b'{}'
+    assert decompress_body(b'{}', 'identity') == b'{}'
+
+
+def test_decompressed_size_is_limited():
+    body = gzip.compress(b' ' * 10000)
+    with pytest.raises(PayloadError):
+        decompress_body(body, 'gzip', max_size=1000)
+
+
+def test_invalid_compressed_body():
+    with pytest.raises(PayloadError):
+        decompress_body(b'not compressed', 'gzip')
+    with pytest.raises(PayloadError):
+        decompress_body(gzip.compress(b'{}')[:-6], 'gzip')
+
+
+def test_unsupported_encoding():
+    with pytest.raises(PayloadError):
+        decompress_body(b'{}', 'br')
+
+
+def test_invalid_json():
+    with pytest.raises(PayloadError):
+        decode_payload(b'{"ticks": [', 'application/json')
+
+
+# ============================================================================
+# COLUMNAR TICKS
+# ============================================================================
+
+def test_columnar_matches_json_ticks():
+    body = encode_tick_columns(TICKS, tz_offset=TZ_OFFSET, meta=META)
+    payload = decode_tick_columns(body)
+
+    block = payload.pop('ticks')
+    assert payload == META
+    assert isinstance(block, TickBlock)
+
+    expected = TickBlock.from_ea_ticks(json_payload()['ticks'])
+    assert block.to_dicts() == expected.to_dicts()
+
+
+def test_columnar_applies_timezone_and_spread_fallback():
+    block = decode_tick_columns(encode_tick_columns(TICKS, tz_offset=TZ_OFFSET))['ticks']
+    ticks = block.to_dicts()
+
+    assert ticks[0]['timestamp'] == 1760000000 + TZ_OFFSET - 3600
+    assert ticks[1]['spread'] == pytest.approx(2401.45 - 2401.15)
+    assert ticks[2]['tradeable'] is False
+
+
+def test_columnar_compressed_via_dispatch():
+    body = compress_body(encode_tick_columns(TICKS, TZ_OFFSET, META), 'gzip')
+    payload = decode_payload(body, TICK_COLUMNS_TYPE, 'gzip')
+    assert len(payload['ticks']) == len(TICKS)
+    assert payload['balance'] == META['balance']
+
+
+def test_columnar_drops_invalid_ticks():
+    ticks = TICKS + [{'symbol': 'GBPUSD', 'bid': 0.0, 'ask': 0.0, 'timestamp': 1760000002}]
+    block = decode_tick_columns(encode_tick_columns(ticks, TZ_OFFSET))['ticks']
+    assert len(block) == len(TICKS)
+
+
+def test_columnar_empty_batch():
+    payload = decode_tick_columns(encode_tick_columns([], TZ_OFFSET, META))
+    assert len(payload['ticks']) == 0
+
+
+def test_columnar_rejects_bad_magic():
+    body = b'XXXX' + encode_tick_columns(TICKS, TZ_OFFSET)[4:]
+    with pytest.raises(PayloadError):
+        decode_tick_columns(body)
+
+
+def test_columnar_rejects_truncated_body():
+    body = encode_tick_columns(TICKS, TZ_OFFSET, META)
+    for cut in (8, 40, len(body) - 10):
+        with pytest.raises(PayloadError):
+            decode_tick_columns(body[:cut])
+
+
+def test_columnar_is_smaller_than_json():
+    ticks = [
+        {'symbol': 'EURUSD', 'bid': 1.08 + i * 1e-5, 'ask': 1.08003 + i * 1e-5, 'spread': 0.00003,
+         'volume': 1, 'timestamp': 1760000000 + i // 10, 'tradeable': True}
+        for i in range(500)
+    ]
+    as_json = json.dumps(dict(META, ticks=[dict(t, tz_offset=TZ_OFFSET) for t in ticks])).encode()
+    as_columns = encode_tick_columns(ticks, TZ_OFFSET, META)
+
+    assert len(zlib.compress(as_columns)) * 3 < len(as_json)
+
+
+# ============================================================================
+# MESSAGEPACK / NEGOTIATION
+# ============================================================================
+
+@pytest.mark.skipif(msgpack is None, reason='msgpack not installed')
+def test_msgpack_roundtrip():
+    body = compress_body(msgpack.packb(json_payload()), 'deflate')
+    assert decode_payload(body, 'application/msgpack', 'deflate') == json_payload()
+
+
+def test_negotiate_prefers_ea_order():
+    result = negotiate(['columnar', 'json'], ['deflate'])
+    assert result['format'] == 'columnar'
+    assert result['content_type'] == TICK_COLUMNS_TYPE
+    assert result['content_encoding'] == 'deflate'
+
+
+def test_negotiate_falls_back_to_plain_json():
+    result = negotiate(None, None)
+    assert result['format'] == 'json'
+    assert result['content_encoding'] == 'identity'
+
+    result = negotiate(['protobuf'], ['br'])
+    assert result['format'] == 'json'
+    assert result['content_encoding'] == 'identity'
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
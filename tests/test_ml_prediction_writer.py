@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+ML Prediction Writer Tests
+Covers ID allocation, write order, flush retries, bad-row isolation and
+overflow policies of MLPredictionWriter (ml/ml_prediction_writer.py)
+
+No database needed: the sequence and the batch write are replaced by stubs.
+
+Usage:
+    python -m pytest tests/test_ml_prediction_writer.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# ml/__init__.py imports the feature pipeline and the XGBoost model
+pytest.importorskip('talib')
+pytest.importorskip('pandas')
+pytest.importorskip('xgboost')
+
+from ml.ml_prediction_writer import MLPredictionWriter
+
+
+class StubSequence:
+    def __init__(self):
+        self.next_id = 1
+        self.calls = 0
+        self.threads = set()
+
+    def __call__(self, count):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        ids = list(range(self.next_id, self.next_id + count))
+        self.next_id += count
+        return ids
+
+
+class StubWrite:
+    """Records committed ops; fails the first `failures` calls and any batch with a 'bad' row"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, ops):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError('database unavailable')
+            if any(op[0] == 'insert' and op[1].get('symbol') == 'bad' for op in ops):
+                raise RuntimeError('value out of range')
+            self.batches.append(list(ops))
+        inserts = sum(1 for op in ops if op[0] == 'insert')
+        return inserts, len(ops) - inserts
+
+    @property
+    def ops(self):
+        return [op for batch in self.batches for op in batch]
+
+
+def make_writer(write=None, **kwargs):
+    writer = MLPredictionWriter(**kwargs)
+    writer._reserve_ids = StubSequence()
+    writer._write = write or StubWrite()
+    return writer
+
+
+def start_with_ids(writer):
+    """Start the writer and wait until its thread reserved the first ID block"""
+    writer.start()
+    deadline = time.monotonic() + 2
+    while not writer.get_stats()['ids_available'] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_ids_are_reserved_on_the_writer_thread():
+    writer = make_writer(flush_interval_ms=10)
+    start_with_ids(writer)
+    try:
+        assert writer.enqueue_prediction({'symbol': 'EURUSD'}) == 1
+    finally:
+        writer.stop()
+    assert writer.ids_missing == 0
+    assert writer._reserve_ids.threads == {'MLPredictionWriter'}
+
+
+def test_burst_beyond_id_pool_does_not_touch_database():
+    writer = make_writer(id_block_size=10, flush_interval_ms=60000)
+    start_with_ids(writer)
+    with writer._id_lock:
+        writer._id_pool = []  # Burst emptied the pool before the writer refilled it
+    try:
+        assert writer.enqueue_prediction({'symbol': 'EURUSD'}) is None
+        assert writer.ids_missing == 1
+
+        start_with_ids(writer)  # Refilled in the background
+        ids = [writer.enqueue_prediction({'symbol': 'EURUSD'}) for _ in range(5)]
+    finally:
+        writer.stop()
+
+    assert None not in ids and ids == sorted(ids)
+    assert writer._reserve_ids.threads == {'MLPredictionWriter'}
+
+
+def test_no_id_when_sequence_is_unavailable():
+    writer = make_writer(flush_interval_ms=10)
+
+    def unavailable(count):
+        raise RuntimeError('database unavailable')
+    writer._reserve_ids = unavailable
+    try:
+        assert writer.enqueue_prediction({'symbol': 'EURUSD'}) is None
+    finally:
+        writer.stop()
+    assert writer.ids_missing == 1
+    assert writer._write.ops[0][1] == {'symbol': 'EURUSD'}  # Row is still written
+
+
+def test_updates_are_written_after_their_insert():
+    write = StubWrite()
+    writer = make_writer(write, flush_interval_ms=60000, batch_size=1000)
+    try:
+        first = writer.enqueue_prediction({'symbol': 'EURUSD'})
+        writer.enqueue_update(first, signal_id=7)
+        second = writer.enqueue_prediction({'symbol': 'GBPUSD'})
+        writer.enqueue_update(first, trade_id=9)
+    finally:
+        writer.stop()
+
+    assert [(op[0], op[1]['id'] if op[0] == 'insert' else op[1]) for op in write.ops] == [
+        ('insert', first), ('update', first), ('insert', second), ('update', first)
+    ]
+
+
+def test_failed_flush_is_retried_in_order():
+    write = StubWrite(failures=1)
+    writer = make_writer(write, flush_interval_ms=60000, batch_size=1)
+    writer.MAX_FLUSH_ATTEMPTS = 3
+    try:
+        first = writer.enqueue_prediction({'symbol': 'EURUSD'})
+        second = writer.enqueue_prediction({'symbol': 'GBPUSD'})
+    finally:
+        writer.stop()
+
+    assert [op[1]['id'] for op in write.ops] == [first, second]
+    assert writer.flush_errors == 1
+    assert writer.failed == 0
+    assert writer.inserted == 2
+
+
+def test_batch_is_dropped_after_max_attempts():
+    write = StubWrite(failures=100)
+    writer = make_writer(write, flush_interval_ms=60000, batch_size=1)
+    writer.MAX_FLUSH_ATTEMPTS = 2
+    try:
+        writer.enqueue_prediction({'symbol': 'EURUSD'})
+    finally:
+        writer.stop()
+
+    assert writer.failed == 1
+    assert write.ops == []
+
+
+def test_bad_row_is_isolated_before_dropping():
+    write = StubWrite()
+    writer = make_writer(write, flush_interval_ms=60000, batch_size=1000)
+    writer.MAX_FLUSH_ATTEMPTS = 1
+    try:
+        for symbol in ('EURUSD', 'GBPUSD', 'bad', 'USDJPY', 'AUDUSD'):
+            writer.enqueue_prediction({'symbol': symbol})
+    finally:
+        writer.stop()
+
+    assert [op[1]['symbol'] for op in write.ops] == ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD']
+    assert writer.failed == 1
+    assert writer.inserted == 4
+
+
+@pytest.mark.parametrize('policy, kept', [
+    ('drop_oldest', ['c', 'd']),
+    ('drop_newest', ['a', 'b']),
+])
+def test_overflow_policies(policy, kept):
+    writer = make_writer(max_queue_size=2, overflow_policy=policy)
+    writer.running = True  # Queue only - no writer thread draining it
+
+    for symbol in 'abcd':
+        writer._put(('insert', {'symbol': symbol}))
+
+    queued = [writer.queue.get_nowait()[1]['symbol'] for _ in range(writer.queue.qsize())]
+    assert queued == kept
+    assert writer.dropped == 2
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        MLPredictionWriter(overflow_policy='block')
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Processed-Signal Registry Tests
+Covers the AutoTrader signal registry in RedisClient (redis_client.py)
+
+Requires fakeredis with Lua support (pip install "fakeredis[lua]").
+
+Usage:
+    python -m pytest tests/test_signal_registry.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')
+
+from redis_client import RedisClient
+
+ACCOUNT_ID = 1
+
+
+@pytest.fixture
+def registry():
+    client = RedisClient.__new__(RedisClient)
+    client._scripts = {}
+    client.pubsub = None
+    client.client = fakeredis.FakeRedis(decode_responses=True)
+    return client
+
+
+def test_first_claim_wins(registry):
+    assert registry.claim_signal(ACCOUNT_ID, 'h1') is True
+    assert registry.claim_signal(ACCOUNT_ID, 'h1') is False  # second process, same sweep
+
+
+def test_reclaim_requires_current_score(registry):
+    registry.claim_signal(ACCOUNT_ID, 'h1')
+    previous = registry.get_processed_signals(ACCOUNT_ID, ['h1', 'h2'])
+    assert list(previous) == ['h1']
+
+    assert registry.claim_signal(ACCOUNT_ID, 'h1', previous['h1'] - 1) is False
+    assert registry.claim_signal(ACCOUNT_ID, 'h1', previous['h1']) is True
+
+
+def test_registry_is_per_account(registry):
+    assert registry.claim_signal(1, 'h1') is True
+    assert registry.claim_signal(2, 'h1') is True
+    assert registry.count_processed_signals() == 2
+
+
+def test_mark_processed_keeps_existing_score(registry):
+    registry.client.zadd(RedisClient.PROCESSED_SIGNALS_KEY, {f"{ACCOUNT_ID}:h1": 5})
+    registry.mark_signals_processed(ACCOUNT_ID, ['h1', 'h2'])
+    scores = registry.get_processed_signals(ACCOUNT_ID, ['h1', 'h2'])
+    assert scores['h1'] == 5
+    assert scores['h2'] > 5
+
+
+def test_cleanup_is_a_range_delete(registry):
+    registry.client.zadd(RedisClient.PROCESSED_SIGNALS_KEY, {f"{ACCOUNT_ID}:old": 1000})
+    registry.claim_signal(ACCOUNT_ID, 'new')
+
+    assert registry.cleanup_processed_signals(3600) == 1
+    assert list(registry.get_processed_signals(ACCOUNT_ID, ['old', 'new'])) == ['new']
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
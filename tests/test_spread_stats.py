@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Spread Statistics Tests
+Covers loading persisted hour-of-week baselines in SpreadStatsTracker
+(spread_stats.py) - day_of_week convention and legacy rows
+
+No database needed: the session is replaced by a stub returning rows.
+
+Usage:
+    python -m pytest tests/test_spread_stats.py
+"""
+
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('redis')
+pytest.importorskip('psycopg2')
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/test')  # Engine is never connected
+
+import spread_stats
+from spread_stats import SpreadStatsTracker
+
+
+class StubSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return SimpleNamespace(fetchall=lambda: self.rows)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def row(day_of_week, spread_sum, sample_count=10, avg=0.0002, hour=14):
+    return SimpleNamespace(
+        symbol='EURUSD', day_of_week=day_of_week, hour_utc=hour, sample_count=sample_count,
+        avg_spread=avg, min_spread=0.0001, max_spread=0.0004, spread_sum=spread_sum,
+        spread_sum_sq=None if spread_sum is None else spread_sum * avg, sketch=None,
+        first_recorded=datetime(2026, 1, 4, 14), last_updated=datetime(2026, 1, 4, 14, 30)
+    )
+
+
+@pytest.fixture
+def session(monkeypatch):
+    stub = StubSession([])
+    monkeypatch.setattr(spread_stats, 'ScopedSession', lambda: stub)
+    return stub
+
+
+def test_baselines_load_with_monday_zero(session):
+    session.rows = [row(6, 0.002)]  # Sunday (converted / written by the tracker)
+    tracker = SpreadStatsTracker()
+    tracker._load()
+
+    assert tracker.loaded
+    tracker.running = True  # Serve get_baseline() from memory
+    sunday = datetime(2026, 1, 4, 14, 5)
+    assert tracker.get_baseline('EURUSD', when=sunday)['avg'] == pytest.approx(0.0002)
+    assert tracker.get_baseline('EURUSD', when=datetime(2026, 1, 5, 14, 5)) is None  # Monday
+
+
+def test_legacy_rows_block_load_and_persist(session):
+    session.rows = [row(0, None), row(6, 0.002)]  # 0 = Sunday in the old extract('dow') rows
+    tracker = SpreadStatsTracker()
+    tracker.on_ticks([{'symbol': 'EURUSD', 'bid': 1.1, 'ask': 1.1002, 'timestamp': 1767535500.0}])
+
+    tracker._load()
+    assert not tracker.loaded
+    assert sum(acc.count for acc in tracker.baselines.values()) == 1  # only the live tick
+
+    session.statements.clear()
+    assert tracker.persist() == 0
+    assert not any('INSERT' in statement for statement, _ in session.statements)
+    assert tracker.dirty_baselines  # kept until the migration ran
+
+
+def test_pending_ticks_are_merged_after_migration(session):
+    session.rows = []
+    tracker = SpreadStatsTracker()
+    tracker.on_ticks([{'symbol': 'EURUSD', 'bid': 1.1, 'ask': 1.1002, 'timestamp': 1767535500.0}])
+    key = next(iter(tracker.baselines))
+
+    session.rows = [row(key[1], 0.002, hour=key[2])]
+    tracker._load()
+
+    assert tracker.loaded
+    assert tracker.baselines[key].count == 11
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tick Batch Writer Tests
+Covers the dedup key of TickBatchWriter rows (tick_batch_writer.py): stream
+entry ID + position within the entry, not quote content - and recovery of the
+whole pending backlog of a crashed writer
+
+Usage:
+    python -m pytest tests/test_tick_batch_writer.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('redis')
+pytest.importorskip('psycopg2')
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/test')  # Engine is never connected
+
+from tick_batch_writer import TICK_COLUMNS, TickBatchWriter
+
+
+def tick(bid=1.1, ask=1.1002, volume=1, timestamp=1767535500.0, symbol='EURUSD'):
+    return {'symbol': symbol, 'bid': bid, 'ask': ask, 'spread': ask - bid,
+            'volume': volume, 'timestamp': timestamp, 'tradeable': True}
+
+
+def keys(rows):
+    stream_id, stream_seq = TICK_COLUMNS.index('stream_id'), TICK_COLUMNS.index('stream_seq')
+    return [(row[stream_id], row[stream_seq]) for row in rows]
+
+
+def test_repeated_quote_in_same_second_gets_distinct_keys():
+    rows = TickBatchWriter._tick_rows([
+        ('100-0', tick(volume=1)),
+        ('100-0', tick(volume=2)),   # same symbol, second and quote
+        ('101-0', tick(volume=3)),
+    ])
+    assert keys(rows) == [('100-0', 0), ('100-0', 1), ('101-0', 0)]
+    assert len(set(keys(rows))) == 3
+
+
+def test_redelivered_entry_has_same_keys():
+    entry = [('100-0', tick()), ('100-0', tick(bid=1.2, ask=1.2002))]
+    assert keys(TickBatchWriter._tick_rows(entry)) == keys(TickBatchWriter._tick_rows(list(entry)))
+
+
+def test_position_counts_skipped_ticks():
+    rows = TickBatchWriter._tick_rows([
+        ('100-0', tick()),
+        ('100-0', tick(symbol=None)),  # invalid, skipped
+        ('100-0', tick()),
+    ])
+    assert keys(rows) == [('100-0', 0), ('100-0', 2)]
+
+
+class StubStream:
+    """claim_stale_ticks() serving pages of one entry each until the cursor wraps"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.starts = []
+        self.acked = []
+
+    def claim_stale_ticks(self, consumer, min_idle_ms, count, start_id):
+        self.starts.append(start_id)
+        index = len(self.starts) - 1
+        cursor = '0-0' if index == len(self.pages) - 1 else f'{index + 1}-0'
+        return cursor, self.pages[index]
+
+    def ack_ticks(self, entry_ids):
+        self.acked.extend(entry_ids)
+
+
+def test_pending_backlog_is_claimed_in_one_pass():
+    pages = [[(f'{i}-0', tick())] for i in range(50)]
+    writer = TickBatchWriter()
+    writer.redis = StubStream(pages)
+    writer.running = True
+    writer._write_batch = lambda entries: True
+
+    writer._claim_stale_entries()
+
+    assert writer.redis.starts[:3] == ['0-0', '1-0', '2-0']
+    assert writer.redis.acked == [f'{i}-0' for i in range(50)]
+    assert writer.total_claimed == 50
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
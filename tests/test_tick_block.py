@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tick Block Tests
+Covers the vectorized on_block() of CandleBuilder (candle_builder.py) and
+SpreadStatsTracker (spread_stats.py) against on_ticks(block.to_dicts()) on
+random blocks with out-of-order and duplicate-timestamp ticks
+
+No database needed: only the in-memory state is compared.
+
+Usage:
+    python -m pytest tests/test_tick_block.py
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('redis')
+pytest.importorskip('psycopg2')
+os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg2://localhost/test')  # Engine is never connected
+
+from candle_builder import CandleBuilder
+from spread_stats import SpreadStatsTracker
+from tick_block import TickBlock
+
+SEEDS = range(25)
+
+
+def random_ticks(seed, count=400):
+    """Ticks in arrival order: mostly forward in time, with repeats and late ticks"""
+    rng = random.Random(seed)
+    timestamp = 1767535500.0 + rng.randrange(3600)
+    mids = {'EURUSD': 1.1, 'GBPUSD': 1.27, 'USDJPY': 157.0}
+    ticks = []
+    for _ in range(count):
+        step = rng.random()
+        if step < 0.2:
+            tick_time = timestamp                                   # Same timestamp as previous tick
+        elif step < 0.3:
+            tick_time = timestamp - rng.choice([1, 30, 90, 4000])   # Late tick (same/previous minute or hour)
+        elif step < 0.32:
+            tick_time = timestamp - 30 * 3600                       # Behind the hourly window
+        else:
+            timestamp = tick_time = timestamp + rng.choice([0.5, 1, 7, 45, 600])
+
+        symbol = rng.choice(list(mids))
+        mids[symbol] *= 1 + rng.uniform(-0.0005, 0.0005)
+        half_spread = mids[symbol] * rng.choice([0, 0.00001, 0.00005])
+        ticks.append({
+            'symbol': symbol,
+            'bid': mids[symbol] - half_spread,
+            'ask': mids[symbol] + half_spread,
+            'volume': rng.randrange(5),
+            'timestamp': tick_time
+        })
+    return ticks
+
+
+def blocks(seed):
+    """Random ticks split into a few blocks, as /api/ticks receives them"""
+    ticks = random_ticks(seed)
+    cuts = sorted(random.Random(seed).sample(range(1, len(ticks)), 3))
+    return [TickBlock.from_dicts(ticks[a:b]) for a, b in zip([0] + cuts, cuts + [len(ticks)])]
+
+
+def accumulator_state(acc):
+    state = {
+        'count': acc.count, 'total': pytest.approx(acc.total), 'total_sq': pytest.approx(acc.total_sq),
+        'min': acc.min, 'max': acc.max, 'first': acc.first, 'last': acc.last
+    }
+    if acc.sketch is not None:
+        state['sketch'] = (acc.sketch.zero, acc.sketch.count, acc.sketch.bins)
+    return state
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_candle_builder_block_matches_ticks(seed):
+    by_tick, by_block = CandleBuilder(), CandleBuilder()
+    for block in blocks(seed):
+        by_tick.on_ticks(block.to_dicts())
+        by_block.on_block(block)
+
+    def closed(builder):
+        return sorted(builder.closed_bars, key=lambda bar: (bar['symbol'], bar['timeframe'], bar['timestamp']))
+
+    assert by_block.open_bars == by_tick.open_bars
+    assert closed(by_block) == closed(by_tick)
+    assert by_block.late_ticks == by_tick.late_ticks > 0
+    assert by_block.ticks_processed == by_tick.ticks_processed
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_spread_tracker_block_matches_ticks(seed):
+    by_tick, by_block = SpreadStatsTracker(), SpreadStatsTracker()
+    for block in blocks(seed):
+        by_tick.on_ticks(block.to_dicts())
+        by_block.on_block(block)
+
+    assert by_block.baselines.keys() == by_tick.baselines.keys()
+    for key, acc in by_tick.baselines.items():
+        assert accumulator_state(by_block.baselines[key]) == accumulator_state(acc), key
+
+    assert by_block.hourly.keys() == by_tick.hourly.keys()
+    for symbol, hours in by_tick.hourly.items():
+        assert by_block.hourly[symbol].keys() == hours.keys(), symbol
+        for hour, acc in hours.items():
+            assert accumulator_state(by_block.hourly[symbol][hour]) == accumulator_state(acc), (symbol, hour)
+
+    for symbol, recent in by_tick.recent.items():
+        assert by_block.recent[symbol] == dict(recent, ewma=pytest.approx(recent['ewma'])), symbol
+    assert by_block.dirty_baselines == by_tick.dirty_baselines
+    assert by_block.ticks_processed == by_tick.ticks_processed
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
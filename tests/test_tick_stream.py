@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tick Stream Tests
+Covers re-claiming and trimming the tick stream in RedisClient
+(redis_client.py): cursor, dead-letter path, entries deleted while pending and
+trimming that never drops unwritten ticks
+
+Requires fakeredis (pip install fakeredis).
+
+Usage:
+    python -m pytest tests/test_tick_stream.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from redis_client import RedisClient
+from tick_block import TickBlock
+
+
+@pytest.fixture
+def stream():
+    client = RedisClient.__new__(RedisClient)
+    client._scripts = {}
+    client.pubsub = None
+    client.client = fakeredis.FakeRedis(decode_responses=True)
+    client.ensure_tick_consumer_group()
+    return client
+
+
+def add_block(stream, bid=1.1):
+    return stream.buffer_tick_block(TickBlock.from_dicts([
+        {'symbol': 'EURUSD', 'bid': bid, 'ask': bid + 0.0002, 'timestamp': 1767535500.0},
+        {'symbol': 'EURUSD', 'bid': bid, 'ask': bid + 0.0002, 'timestamp': 1767535500.0},
+    ]))
+
+
+def test_stale_entry_is_claimed_by_another_writer(stream):
+    entry_id = add_block(stream)
+    assert len(stream.read_tick_stream('crashed', block_ms=None)) == 2
+
+    cursor, claimed = stream.claim_stale_ticks('alive', min_idle_ms=0)
+    assert cursor == '0-0'
+    assert [e for e, _ in claimed] == [entry_id, entry_id]
+
+
+def test_entry_is_dead_lettered_after_max_deliveries(stream):
+    entry_id = add_block(stream)
+    stream.read_tick_stream('writer', block_ms=None)  # Delivery 1
+
+    for _ in range(stream.TICK_MAX_DELIVERIES - 1):
+        _, claimed = stream.claim_stale_ticks('writer', min_idle_ms=0)
+        assert claimed  # Retried while under the limit
+
+    _, claimed = stream.claim_stale_ticks('writer', min_idle_ms=0)
+    assert claimed == []
+    assert stream.get_tick_stream_stats()['pending'] == 0
+
+    dead = stream.client.xrange(stream.TICK_DEAD_LETTER_KEY)
+    assert len(dead) == 1
+    assert dead[0][1]['source_id'] == entry_id
+    assert TickBlock.from_stream_fields(dead[0][1]).bid.tolist() == [1.1, 1.1]  # Payload kept
+
+
+def test_claim_cursor_advances_through_pending_list(stream):
+    ids = [add_block(stream, bid=1.1 + i / 100) for i in range(3)]
+    stream.read_tick_stream('crashed', count=10, block_ms=None)
+
+    cursor, claimed = stream.claim_stale_ticks('alive', min_idle_ms=0, count=2)
+    assert cursor == ids[2]
+    assert list(dict.fromkeys(e for e, _ in claimed)) == ids[:2]
+
+    cursor, claimed = stream.claim_stale_ticks('alive', min_idle_ms=0, count=2, start_id=cursor)
+    assert cursor == '0-0'
+    assert list(dict.fromkeys(e for e, _ in claimed)) == ids[2:]
+
+
+def test_entry_trimmed_while_pending_is_acked(stream):
+    add_block(stream)
+    stream.read_tick_stream('crashed', block_ms=None)
+    stream.client.xtrim(stream.TICK_STREAM_KEY, maxlen=0)
+
+    _, claimed = stream.claim_stale_ticks('alive', min_idle_ms=0)
+    assert claimed == []
+    assert stream.get_tick_stream_stats()['pending'] == 0
+
+
+def test_trim_keeps_pending_and_undelivered_entries(stream):
+    stream.buffer_ticks_batch(None, [
+        {'symbol': 'EURUSD', 'bid': 1.1, 'ask': 1.1002, 'timestamp': 1767535500.0 + i} for i in range(20)
+    ])
+    written = stream.read_tick_stream('writer', count=5, block_ms=None)
+    stream.ack_ticks([entry_id for entry_id, _ in written])
+    pending = stream.read_tick_stream('writer', count=5, block_ms=None)
+    block_id = add_block(stream)  # Not delivered yet
+
+    assert stream.trim_tick_stream(approximate=False) == 5
+
+    remaining = [entry_id for entry_id, _ in stream.client.xrange(stream.TICK_STREAM_KEY)]
+    assert remaining[0] == pending[0][0]  # Acked entries removed, oldest pending kept
+    assert len(remaining) == 16 and remaining[-1] == block_id
+
+
+def test_trim_without_writer_group_keeps_everything(stream):
+    stream.client.delete(stream.TICK_STREAM_KEY)
+    add_block(stream)
+    assert stream.trim_tick_stream() == 0
+    assert stream.client.xlen(stream.TICK_STREAM_KEY) == 1
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
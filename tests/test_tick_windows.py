@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tick Windows Tests
+Covers the rolling range/jump statistics of tick_windows.py against a
+brute-force recomputation and the tick stream tail
+
+Requires fakeredis (pip install fakeredis).
+
+Usage:
+    python -m pytest tests/test_tick_windows.py
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fakeredis = pytest.importorskip('fakeredis')
+
+import redis_client
+import tick_windows
+from redis_client import RedisClient
+from tick_block import TickBlock
+from tick_windows import SymbolWindow, TickWindows
+
+
+def brute_force(ticks, now, window_seconds):
+    mids = [mid for ts, mid in ticks if ts >= now - window_seconds]
+    jumps = np.abs(np.diff(mids)) if len(mids) > 1 else np.zeros(0)
+    return {
+        'price_range': max(mids) - min(mids) if mids else 0.0,
+        'avg_jump': float(jumps.mean()) if len(jumps) else 0.0,
+        'max_jump': float(jumps.max()) if len(jumps) else 0.0,
+        'tick_count': len(mids)
+    }
+
+
+def test_rolling_stats_match_brute_force():
+    rng = random.Random(7)
+    window = SymbolWindow(window_seconds=10, max_ticks=10000)
+    ticks = []
+    ts, mid = 1000.0, 1.1000
+    for _ in range(2000):
+        ts += rng.choice([0.0, 0.05, 0.3, 1.5])
+        mid += rng.uniform(-0.0005, 0.0005)
+        ticks.append((ts, mid))
+        window.add(ts, mid)
+
+        stats = window.stats()
+        expected = brute_force(ticks, ts, 10)
+        assert stats['tick_count'] == expected['tick_count']
+        for key in ('price_range', 'avg_jump', 'max_jump'):
+            assert stats[key] == pytest.approx(expected[key], abs=1e-12)
+
+
+def test_max_ticks_caps_window():
+    window = SymbolWindow(window_seconds=60, max_ticks=3)
+    for i, mid in enumerate([1.0, 5.0, 2.0, 3.0, 2.5]):
+        window.add(100.0 + i * 0.1, mid)
+
+    assert window.prices().tolist() == [2.0, 3.0, 2.5]
+    stats = window.stats()
+    assert stats['price_range'] == pytest.approx(1.0)
+    assert stats['max_jump'] == pytest.approx(1.0)
+    assert stats['avg_jump'] == pytest.approx(0.75)
+
+
+def test_gap_resets_window():
+    window = SymbolWindow(window_seconds=60)
+    window.add(100.0, 1.0)
+    window.add(101.0, 2.0)
+    window.add(500.0, 1.5)  # Previous ticks expired - no jump into this one
+
+    assert window.stats() == {'price_range': 0.0, 'avg_jump': 0.0, 'max_jump': 0.0, 'tick_count': 1}
+
+
+def test_on_block_groups_symbols_in_arrival_order():
+    now = time.time()
+    windows = TickWindows()
+    windows.on_block(TickBlock.from_dicts([
+        {'symbol': 'EURUSD', 'bid': 1.0, 'ask': 1.2, 'timestamp': now - 2},
+        {'symbol': 'XAUUSD', 'bid': 2000.0, 'ask': 2000.4, 'timestamp': now - 2},
+        {'symbol': 'EURUSD', 'bid': 1.3, 'ask': 1.5, 'timestamp': now - 1},
+        {'symbol': 'EURUSD', 'bid': 1.1, 'ask': 1.3, 'timestamp': now},
+    ]))
+
+    assert windows.get_prices('EURUSD') == pytest.approx([1.1, 1.4, 1.2])
+    assert windows.get_windows(['EURUSD', 'XAUUSD', 'GBPUSD']).keys() == {'EURUSD', 'XAUUSD'}
+    stats = windows.get_window_stats('EURUSD')
+    assert stats['tick_count'] == 3
+    assert stats['max_jump'] == pytest.approx(0.3)
+    assert stats['avg_jump'] == pytest.approx(0.25)
+    assert windows.get_window_stats('GBPUSD')['tick_count'] == 0
+
+
+def test_stale_ticks_are_dropped_on_read():
+    windows = TickWindows(window_seconds=60)
+    windows.on_block(TickBlock.from_dicts([
+        {'symbol': 'EURUSD', 'bid': 1.0, 'ask': 1.0, 'timestamp': time.time() - 120},
+    ]))
+    assert windows.get_window_stats('EURUSD')['tick_count'] == 0
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = RedisClient.__new__(RedisClient)
+    client._scripts = {}
+    client.pubsub = None
+    client.client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(tick_windows, 'get_redis', lambda: client)
+    monkeypatch.setattr(redis_client, 'get_redis', lambda: client)
+    return client
+
+
+def test_poll_tails_tick_stream(redis):
+    now = time.time()
+    redis.buffer_tick_block(TickBlock.from_dicts([
+        {'symbol': 'EURUSD', 'bid': 1.0, 'ask': 1.0, 'timestamp': now - 1},
+        {'symbol': 'EURUSD', 'bid': 1.1, 'ask': 1.1, 'timestamp': now},
+    ]))
+
+    windows = TickWindows(block_ms=None)
+    windows.last_id = '0-0'
+    assert windows.poll() == 2
+    assert windows.poll() == 0  # Entries are read once
+    assert windows.get_prices('EURUSD') == pytest.approx([1.0, 1.1])
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,528 @@
+"""
+Tick Archive - compressed columnar tick files with point-in-time lookups
+
+Closed tick days are moved out of PostgreSQL into one file per symbol per day
+before retention drops the partition (see partition_manager). Years of ticks
+stay available for spread lookups, post-close tracking and tick-accurate
+backtests at a fraction of the table size.
+
+Layout:
+    data/tick_archive/EURUSD/2025-10-27.tck
+    data/tick_archive/_manifest.json      # archived days + per-day tick count / max id
+
+File format (little endian):
+    header   magic 'TCKA', version, tick count, first timestamp (ms since epoch)
+    columns  offset + length of each zlib-compressed column:
+             timestamp deltas (uint32 ms), bid/ask/spread (float32),
+             volume (int32), tradeable (uint8)
+
+Timestamps are naive datetimes like the ticks table. The reader memory-maps
+a day, decodes it once (LRU cache of recent days) and answers lookups with
+binary search on the timestamp column.
+
+Usage:
+    from tick_archive import get_tick_archive
+
+    archive = get_tick_archive()
+    archive.spread_at('EURUSD', datetime(2025, 10, 27, 14, 30))
+    path = archive.path('EURUSD', start, end)   # dict of numpy arrays
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv('TICK_ARCHIVE_DIR', '/app/data/tick_archive')
+
+MAGIC = b'TCKA'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIq')
+COLUMN_ENTRY = struct.Struct('<QI')
+
+# Column name -> stored dtype (order is the on-disk order)
+COLUMNS = OrderedDict([
+    ('ts_delta', np.dtype('<u4')),
+    ('bid', np.dtype('<f4')),
+    ('ask', np.dtype('<f4')),
+    ('spread', np.dtype('<f4')),
+    ('volume', np.dtype('<i4')),
+    ('tradeable', np.dtype('u1')),
+])
+
+EPOCH = datetime(1970, 1, 1)
+
+# Same attribute names as models.Tick, for code that iterates over ticks
+ArchivedTick = namedtuple('ArchivedTick', ['symbol', 'timestamp', 'bid', 'ask', 'spread', 'volume', 'tradeable'])
+
+
+def to_ms(timestamp: datetime) -> int:
+    """Naive datetime -> milliseconds since epoch"""
+    return int((timestamp - EPOCH).total_seconds() * 1000)
+
+
+def from_ms(ms: int) -> datetime:
+    """Milliseconds since epoch -> naive datetime"""
+    return EPOCH + timedelta(milliseconds=int(ms))
+
+
+# ============================================================================
+# FILE FORMAT
+# ============================================================================
+
+def encode_day(timestamps_ms: np.ndarray, bid, ask, spread, volume, tradeable) -> bytes:
+    """
+    Encode one symbol-day of ticks (sorted by timestamp)
+
+    Args:
+        timestamps_ms: int64 milliseconds since epoch, ascending
+        bid, ask, spread, volume, tradeable: Column values, same length
+
+    Returns:
+        File contents
+    """
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+    count = len(timestamps_ms)
+    first_ts = int(timestamps_ms[0]) if count else 0
+
+    # Deltas to the previous tick (first one is 0), a day fits into uint32 ms
+    deltas = np.diff(timestamps_ms, prepend=first_ts)
+    if count and (deltas.min() < 0 or deltas.max() > np.iinfo(np.uint32).max):
+        raise ValueError("Timestamps must be ascending and within one day")
+
+    values = {
+        'ts_delta': deltas,
+        'bid': bid,
+        'ask': ask,
+        'spread': spread,
+        'volume': volume,
+        'tradeable': tradeable,
+    }
+    blocks = [
+        zlib.compress(np.asarray(values[name], dtype=dtype).tobytes(), 6)
+        for name, dtype in COLUMNS.items()
+    ]
+
+    offset = HEADER.size + COLUMN_ENTRY.size * len(COLUMNS)
+    directory = b''
+    for block in blocks:
+        directory += COLUMN_ENTRY.pack(offset, len(block))
+        offset += len(block)
+
+    return HEADER.pack(MAGIC, VERSION, 0, count, first_ts) + directory + b''.join(blocks)
+
+
+def decode_day(buffer) -> Dict[str, np.ndarray]:
+    """
+    Decode a day file (bytes or memory map) into column arrays
+
+    Returns:
+        Dict with 'timestamp' (int64 ms), bid, ask, spread (float32),
+        volume (int32) and tradeable (bool)
+    """
+    magic, version, _, count, first_ts = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a tick archive file (magic={magic!r}, version={version})")
+
+    columns = {}
+    with memoryview(buffer) as view:
+        for i, (name, dtype) in enumerate(COLUMNS.items()):
+            offset, length = COLUMN_ENTRY.unpack_from(buffer, HEADER.size + i * COLUMN_ENTRY.size)
+            columns[name] = np.frombuffer(zlib.decompress(view[offset:offset + length]), dtype=dtype)
+
+    if len(columns['ts_delta']) != count:
+        raise ValueError(f"Corrupt tick archive file: expected {count} ticks, got {len(columns['ts_delta'])}")
+
+    timestamps = first_ts + np.cumsum(columns.pop('ts_delta'), dtype=np.int64)
+    columns['timestamp'] = timestamps
+    columns['tradeable'] = columns['tradeable'].astype(bool)
+    return columns
+
+
+# ============================================================================
+# ARCHIVE
+# ============================================================================
+
+class TickArchive:
+    MANIFEST = '_manifest.json'
+
+    def __init__(self, root_dir: str = ARCHIVE_DIR, cache_days: int = 32, lookback_days: int = 4):
+        """
+        Initialize Tick Archive
+
+        Args:
+            root_dir: Archive directory
+            cache_days: Decoded symbol-days kept in memory (LRU)
+            lookback_days: Days searched backwards for the last tick before a
+                           timestamp (covers weekends and holidays)
+        """
+        self.root = root_dir
+        self.cache_days = cache_days
+        self.lookback_days = lookback_days
+        self._cache: 'OrderedDict[tuple, Optional[Dict]]' = OrderedDict()
+        self._lock = Lock()
+
+    def _day_path(self, symbol: str, day) -> str:
+        return os.path.join(self.root, symbol, f"{day.strftime('%Y-%m-%d')}.tck")
+
+    # ========================================================================
+    # WRITE (archiver)
+    # ========================================================================
+
+    def _read_manifest(self) -> Dict:
+        path = os.path.join(self.root, self.MANIFEST)
+        if not os.path.exists(path):
+            return {'days': [], 'day_stats': {}}
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest.setdefault('day_stats', {})  # Manifests written before per-day stats
+        return manifest
+
+    def _write_manifest(self, manifest: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, self.MANIFEST)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)  # Atomic swap
+
+    def archived_days(self) -> List[str]:
+        """Archived days as 'YYYY-MM-DD' strings"""
+        return self._read_manifest()['days']
+
+    def write_day(self, symbol: str, day, columns: Dict) -> int:
+        """
+        Write one symbol-day file (atomic replace)
+
+        Args:
+            symbol: Trading symbol
+            day: Date of the ticks
+            columns: Dict with timestamp (ms), bid, ask, spread, volume, tradeable
+
+        Returns:
+            File size in bytes
+        """
+        data = encode_day(
+            columns['timestamp'], columns['bid'], columns['ask'],
+            columns['spread'], columns['volume'], columns['tradeable']
+        )
+        path = self._day_path(symbol, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._cache.pop((symbol, day.strftime('%Y-%m-%d')), None)
+        return len(data)
+
+    def archived_tick_count(self, day) -> int:
+        """Ticks of one day in the archive files (header counts of all symbols)"""
+        count = 0
+        name = f"{day.strftime('%Y-%m-%d')}.tck"
+        if not os.path.isdir(self.root):
+            return 0
+        for symbol in os.listdir(self.root):
+            path = os.path.join(self.root, symbol, name)
+            if os.path.isfile(path) and os.path.getsize(path) >= HEADER.size:
+                with open(path, 'rb') as f:
+                    count += HEADER.unpack(f.read(HEADER.size))[3]
+        return count
+
+    def archive_day(self, db, day, after_id: Optional[int] = None) -> Dict:
+        """
+        Copy ticks of one day from the ticks table into archive files
+
+        Args:
+            db: Database session
+            day: Date to archive
+            after_id: Only ticks with a larger id (late/backfilled rows), merged
+                      into the existing files; None = rewrite the whole day
+
+        Returns:
+            Dict with symbols, ticks and bytes written and the largest tick id
+        """
+        start = datetime(day.year, day.month, day.day)
+        end = start + timedelta(days=1)
+        result = {'day': start.strftime('%Y-%m-%d'), 'symbols': 0, 'ticks': 0, 'bytes': 0, 'max_id': after_id}
+        params = {'start': start, 'end': end, 'after_id': after_id if after_id is not None else -1}
+
+        symbols = [row[0] for row in db.execute(
+            text("SELECT DISTINCT symbol FROM ticks WHERE timestamp >= :start AND timestamp < :end AND id > :after_id"),
+            params
+        )]
+
+        for symbol in symbols:
+            rows = db.execute(text("""
+                SELECT id, timestamp, bid, ask, spread, volume, tradeable
+                FROM ticks
+                WHERE symbol = :symbol AND timestamp >= :start AND timestamp < :end AND id > :after_id
+                ORDER BY timestamp, id
+            """), dict(params, symbol=symbol)).fetchall()
+            if not rows:
+                continue
+
+            bid = np.array([float(r.bid) for r in rows], dtype=np.float64)
+            ask = np.array([float(r.ask) for r in rows], dtype=np.float64)
+            columns = {
+                'timestamp': np.array([to_ms(r.timestamp) for r in rows], dtype=np.int64),
+                'bid': bid,
+                'ask': ask,
+                'spread': np.array(
+                    [float(r.spread) if r.spread is not None else a - b for r, b, a in zip(rows, bid, ask)],
+                    dtype=np.float64
+                ),
+                'volume': np.array([int(r.volume or 0) for r in rows], dtype=np.int64),
+                'tradeable': np.array([r.tradeable is not False for r in rows], dtype=bool),
+            }
+
+            archived = self.load_day(symbol, start) if after_id is not None else None
+            if archived is not None:
+                # Late ticks go after archived ticks with the same timestamp
+                order = np.argsort(np.concatenate([archived['timestamp'], columns['timestamp']]), kind='stable')
+                columns = {
+                    name: np.concatenate([archived[name], values])[order] for name, values in columns.items()
+                }
+
+            result['bytes'] += self.write_day(symbol, start, columns)
+            result['symbols'] += 1
+            result['ticks'] += len(rows)
+            result['max_id'] = max(result['max_id'] or 0, max(r.id for r in rows))
+
+        return result
+
+    def archive_closed_days(self, db, grace_hours: int = 1) -> List[Dict]:
+        """
+        Archive every day in the ticks table that has ended and is not archived
+        yet, or that received ticks after it was archived
+
+        Run before partition retention (retention_cleanup_job) so ticks are
+        only dropped from PostgreSQL once they are on disk. The manifest keeps
+        the largest tick id and the row count per day: rows with a larger id
+        (late or backfilled ticks) are merged into the day's files; a grown
+        count without new ids (insert committed late) rewrites the day if it
+        is still complete in the table.
+
+        Args:
+            db: Database session
+            grace_hours: Wait this long after midnight for late ticks
+
+        Returns:
+            One result dict per archived day
+        """
+        last_closed = (datetime.utcnow() - timedelta(hours=grace_hours)).date() - timedelta(days=1)
+        end = datetime(last_closed.year, last_closed.month, last_closed.day) + timedelta(days=1)
+
+        days = db.execute(text("""
+            SELECT CAST(timestamp AS DATE) AS day, count(*) AS ticks, max(id) AS max_id
+            FROM ticks
+            WHERE timestamp < :end
+            GROUP BY 1
+            ORDER BY 1
+        """), {'end': end}).fetchall()
+
+        manifest = self._read_manifest()
+        archived = set(manifest['days'])
+
+        results = []
+        for row in days:
+            key = row.day.strftime('%Y-%m-%d')
+            stats = manifest['day_stats'].get(key)
+
+            if key not in archived:
+                result = self.archive_day(db, row.day)
+                action = 'Archived'
+            elif stats is None:
+                # Archived before per-day stats: rewrite if the table holds more ticks
+                archived_ticks = self.archived_tick_count(row.day)
+                if row.ticks > archived_ticks:
+                    result = self.archive_day(db, row.day)
+                    action = 'Re-archived'
+                else:
+                    result = None
+                    stats = {'ticks': archived_ticks}
+            elif row.max_id > stats['max_id']:
+                result = self.archive_day(db, row.day, after_id=stats['max_id'])
+                result['ticks'] += stats['ticks']
+                action = 'Merged late ticks into'
+            elif row.ticks > stats['db_ticks']:
+                if row.ticks >= stats['ticks']:
+                    result = self.archive_day(db, row.day)
+                    action = 'Re-archived'
+                else:
+                    result = None
+                    logger.warning(
+                        f"Tick archive {key}: {row.ticks - stats['db_ticks']} ticks without new ids "
+                        f"appeared after part of the day was removed - not archived"
+                    )
+            else:
+                result = None
+
+            if result is not None:
+                results.append(result)
+                logger.info(
+                    f"📦 {action} ticks {key}: {result['ticks']:,} ticks, "
+                    f"{result['symbols']} symbols, {result['bytes'] / 1024:.0f} KB"
+                )
+                stats = {'ticks': result['ticks']}
+
+            new_stats = {'ticks': stats['ticks'], 'db_ticks': row.ticks, 'max_id': row.max_id}
+            if key not in archived or manifest['day_stats'].get(key) != new_stats:
+                archived.add(key)
+                manifest['days'] = sorted(archived)
+                manifest['day_stats'][key] = new_stats
+                manifest['updated_at'] = datetime.utcnow().isoformat()
+                self._write_manifest(manifest)
+
+        return results
+
+    # ========================================================================
+    # READ
+    # ========================================================================
+
+    def load_day(self, symbol: str, day) -> Optional[Dict[str, np.ndarray]]:
+        """Decoded columns of one symbol-day (None if not archived)"""
+        key = (symbol, day.strftime('%Y-%m-%d'))
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        path = self._day_path(symbol, day)
+        columns = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                columns = decode_day(mapped)
+
+        with self._lock:
+            self._cache[key] = columns
+            while len(self._cache) > self.cache_days:
+                self._cache.popitem(last=False)
+
+        return columns
+
+    def tick_at(self, symbol: str, timestamp: datetime) -> Optional[ArchivedTick]:
+        """
+        Last archived tick at or before timestamp
+
+        Returns:
+            ArchivedTick or None if nothing is archived in the lookback window
+        """
+        target = to_ms(timestamp)
+        day = timestamp.date()
+
+        for _ in range(self.lookback_days + 1):
+            columns = self.load_day(symbol, day)
+            if columns is not None and len(columns['timestamp']):
+                index = int(np.searchsorted(columns['timestamp'], target, side='right')) - 1
+                if index >= 0:
+                    return self._tick(symbol, columns, index)
+            day -= timedelta(days=1)
+
+        return None
+
+    def spread_at(self, symbol: str, timestamp: datetime) -> Optional[float]:
+        """Spread of the last archived tick at or before timestamp"""
+        tick = self.tick_at(symbol, timestamp)
+        return tick.spread if tick else None
+
+    def path(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        """
+        All archived ticks with start <= timestamp <= end
+
+        Returns:
+            Dict of column arrays ('timestamp' in ms since epoch, see from_ms)
+        """
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        parts = []
+
+        day = start.date()
+        while day <= end.date():
+            columns = self.load_day(symbol, day)
+            if columns is not None:
+                lo = int(np.searchsorted(columns['timestamp'], start_ms, side='left'))
+                hi = int(np.searchsorted(columns['timestamp'], end_ms, side='right'))
+                if hi > lo:
+                    parts.append({name: values[lo:hi] for name, values in columns.items()})
+            day += timedelta(days=1)
+
+        names = ['timestamp', 'bid', 'ask', 'spread', 'volume', 'tradeable']
+        if not parts:
+            return {name: np.array([], dtype=np.int64 if name == 'timestamp' else np.float32) for name in names}
+        return {name: np.concatenate([part[name] for part in parts]) for name in names}
+
+    def iter_ticks(self, symbol: str, start: datetime, end: datetime) -> Iterator[ArchivedTick]:
+        """Archived ticks between start and end as ArchivedTick rows (Tick-like attributes)"""
+        columns = self.path(symbol, start, end)
+        for index in range(len(columns['timestamp'])):
+            yield self._tick(symbol, columns, index)
+
+    @staticmethod
+    def _tick(symbol: str, columns: Dict[str, np.ndarray], index: int) -> ArchivedTick:
+        return ArchivedTick(
+            symbol=symbol,
+            timestamp=from_ms(columns['timestamp'][index]),
+            bid=float(columns['bid'][index]),
+            ask=float(columns['ask'][index]),
+            spread=float(columns['spread'][index]),
+            volume=int(columns['volume'][index]),
+            tradeable=bool(columns['tradeable'][index])
+        )
+
+    def get_stats(self) -> Dict:
+        """Archive size and cache statistics"""
+        files = 0
+        size = 0
+        if os.path.isdir(self.root):
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if name.endswith('.tck'):
+                        files += 1
+                        size += os.path.getsize(os.path.join(dirpath, name))
+        return {
+            'root': self.root,
+            'archived_days': len(self.archived_days()),
+            'files': files,
+            'size_mb': round(size / 1024 / 1024, 2),
+            'cached_days': len(self._cache)
+        }
+
+
+# Global instance
+_tick_archive = None
+
+def get_tick_archive() -> TickArchive:
+    """Get global tick archive instance"""
+    global _tick_archive
+    if _tick_archive is None:
+        _tick_archive = TickArchive()
+    return _tick_archive
+
+
+if __name__ == '__main__':
+    from database import ScopedSession
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    db = ScopedSession()
+    try:
+        results = get_tick_archive().archive_closed_days(db)
+        print(f"Archived {len(results)} days: {get_tick_archive().get_stats()}")
+    finally:
+        db.close()
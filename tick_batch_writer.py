@@ -1,33 +1,67 @@
 """
 Tick Batch Writer - Background worker that writes buffered ticks from Redis to PostgreSQL
+
+Ticks are read from the Redis tick stream with XREADGROUP as part of a
+consumer group, so several writer processes can share the load. Entries are
+acknowledged (XACK) only after the PostgreSQL commit - if a writer dies
+mid-batch, its pending entries are re-claimed (XAUTOCLAIM) by a live writer.
+
+Most entries are block entries (one EA batch each, see tick_block.py); the
+XREADGROUP count is sized so a read holds roughly batch_size ticks.
 """
 
+import csv
+import io
+import os
+import socket
 import time
 import logging
 from datetime import datetime
 from threading import Thread
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from redis_client import get_redis
 from database import ScopedSession
 from models import Tick
 
 logger = logging.getLogger(__name__)
 
+TICK_COLUMNS = ('symbol', 'bid', 'ask', 'spread', 'volume', 'timestamp', 'tradeable', 'stream_id', 'stream_seq')
+STAGING_TABLE = 'ticks_staging'
+
 class TickBatchWriter:
-    def __init__(self, interval=5, batch_size=1000):
+    # Pending entries idle longer than this are taken over from other consumers
+    CLAIM_IDLE_MS = 60000
+    CLAIM_INTERVAL = 30  # seconds between XAUTOCLAIM runs
+    # Typical ticks per block entry - converts batch_size (ticks) to a stream read count
+    TICKS_PER_ENTRY = 100
+
+    def __init__(self, interval=5, batch_size=1000, consumer_name=None, use_copy=True):
         """
         Initialize Tick Batch Writer
 
         Args:
-            interval: Write interval in seconds (default: 5)
+            interval: Max seconds to block waiting for new ticks (default: 5)
             batch_size: Max ticks per write batch (default: 1000)
+            consumer_name: Consumer name in the group (default: hostname:pid)
+            use_copy: Write via COPY + staging table (default: True),
+                      otherwise multi-row INSERT ... ON CONFLICT DO NOTHING
         """
         self.interval = interval
         self.batch_size = batch_size
+        self.consumer_name = consumer_name or f"{socket.gethostname()}:{os.getpid()}"
+        self.use_copy = use_copy
         self.running = False
         self.thread = None
         self.redis = None
         self.total_written = 0
         self.total_batches = 0
+        self.total_claimed = 0
+        self.total_duplicates = 0
+        self.last_claim_time = 0
+        self.last_batch_ms = 0.0
+        self.last_throughput = 0.0
+        self.peak_throughput = 0.0
 
     def start(self):
         """Start the background worker"""
@@ -37,9 +71,19 @@ class TickBatchWriter:
 
         self.running = True
         self.redis = get_redis()
+        self.redis.ensure_tick_consumer_group()
+
+        try:
+            self.redis.drain_legacy_tick_buffers()
+        except Exception as e:
+            logger.warning(f"Could not drain legacy tick buffers: {e}")
+
         self.thread = Thread(target=self._worker_loop, daemon=True)
         self.thread.start()
-        logger.info(f"Tick batch writer started (interval={self.interval}s, batch_size={self.batch_size})")
+        logger.info(
+            f"Tick batch writer started (consumer={self.consumer_name}, "
+            f"interval={self.interval}s, batch_size={self.batch_size})"
+        )
 
     def stop(self):
         """Stop the background worker"""
@@ -48,142 +92,224 @@ class TickBatchWriter:
             self.thread.join(timeout=10)
         logger.info(f"Tick batch writer stopped (wrote {self.total_written} ticks in {self.total_batches} batches)")
 
+    def enqueue_ticks(self, ticks, account_id=None):
+        """Append ticks to the Redis tick stream (for callers without a RedisClient)"""
+        (self.redis or get_redis()).buffer_ticks_batch(account_id, ticks)
+
     def _worker_loop(self):
         """Main worker loop"""
         while self.running:
             try:
-                self._write_batch()
+                # Recover entries left pending by crashed writers, drop written ones
+                if time.time() - self.last_claim_time >= self.CLAIM_INTERVAL:
+                    self.last_claim_time = time.time()
+                    self._claim_stale_entries()
+                    self.redis.trim_tick_stream()
+
+                # Blocks up to `interval` seconds when the stream is idle
+                entries = self.redis.read_tick_stream(
+                    self.consumer_name,
+                    count=self._read_count(),
+                    block_ms=int(self.interval * 1000)
+                )
+                if entries:
+                    self._process_entries(entries)
+
             except Exception as e:
                 logger.error(f"Tick batch writer error: {e}", exc_info=True)
+                time.sleep(self.interval)
+
+    def _claim_stale_entries(self):
+        """Re-claim and write the whole pending backlog (XAUTOCLAIM pages until the cursor wraps)"""
+        cursor, total = '0-0', 0
+        while self.running:
+            cursor, claimed = self.redis.claim_stale_ticks(
+                self.consumer_name, min_idle_ms=self.CLAIM_IDLE_MS, count=self._read_count(),
+                start_id=cursor
+            )
+            if claimed:
+                total += len(claimed)
+                self._process_entries(claimed)
+            if cursor == '0-0':
+                break
+
+        if total:
+            self.total_claimed += total
+            logger.warning(f"Re-claimed {total} pending ticks from stalled writers")
+
+    def _read_count(self):
+        """Stream entries per read (block entries hold many ticks)"""
+        return max(1, self.batch_size // self.TICKS_PER_ENTRY)
+
+    def _process_entries(self, entries):
+        """Write entries to PostgreSQL, acknowledge them only if the commit succeeded"""
+        # Ticks expanded from one block entry share its entry_id
+        entry_ids = list(dict.fromkeys(entry_id for entry_id, _ in entries))
+
+        if self._write_batch(entries):
+            self.redis.ack_ticks(entry_ids)
+
+    def _write_batch(self, entries):
+        """
+        Write one batch of ticks to PostgreSQL in a single transaction
 
-            # Sleep for interval
-            time.sleep(self.interval)
+        COPY streams the batch into a session-local staging table, then one
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING moves it into `ticks`.
+        Ticks are unique by (stream entry ID, position in the entry), so a
+        redelivered entry is skipped without per-row retries while real ticks
+        that repeat a quote within the same second are kept.
+
+        Args:
+            entries: (stream entry ID, tick dict) pairs, ticks of one block entry in order
+
+        Returns:
+            True if committed (entries may be acknowledged)
+        """
+        rows = self._tick_rows(entries)
+        if not rows:
+            return True
 
-    def _write_batch(self):
-        """Write one batch of ticks from Redis to PostgreSQL"""
         db = ScopedSession()
+        start = time.perf_counter()
 
         try:
-            # Get all accounts with buffered ticks
-            all_accounts = self._get_accounts_with_buffers()
-
-            if not all_accounts:
-                return
-
-            total_ticks = 0
-
-            for account_id in all_accounts:
-                # Get all buffered ticks for this account
-                buffers = self.redis.get_all_buffers(account_id, clear=True)
-
-                if not buffers:
-                    continue
-
-                tick_objects = []
-
-                # Convert buffered ticks to Tick objects
-                for symbol, ticks in buffers.items():
-                    for tick_data in ticks:
-                        # Convert timestamp
-                        timestamp = tick_data.get('timestamp')
-                        if isinstance(timestamp, (int, float)):
-                            timestamp = datetime.fromtimestamp(timestamp)
-                        elif timestamp is None:
-                            timestamp = datetime.utcnow()
-
-                        # NOTE: Ticks are now GLOBAL (no account_id)
-                        tick = Tick(
-                            symbol=tick_data.get('symbol'),
-                            bid=tick_data.get('bid'),
-                            ask=tick_data.get('ask'),
-                            spread=tick_data.get('spread'),
-                            volume=tick_data.get('volume', 0),
-                            timestamp=timestamp,
-                            tradeable=tick_data.get('tradeable', True)
-                        )
-                        tick_objects.append(tick)
-
-                        # Batch size limit
-                        if len(tick_objects) >= self.batch_size:
-                            try:
-                                db.bulk_save_objects(tick_objects)
-                                db.commit()
-                                total_ticks += len(tick_objects)
-                            except Exception as batch_error:
-                                # Handle duplicates gracefully - insert one by one
-                                db.rollback()
-                                for tick in tick_objects:
-                                    try:
-                                        db.merge(tick)  # Updates if exists, inserts if new
-                                        db.commit()
-                                        total_ticks += 1
-                                    except:
-                                        db.rollback()  # Skip duplicates silently
-                            tick_objects = []
-
-                # Write remaining ticks
-                if tick_objects:
-                    try:
-                        db.bulk_save_objects(tick_objects)
-                        db.commit()
-                        total_ticks += len(tick_objects)
-                    except Exception as batch_error:
-                        # Handle duplicates gracefully - insert one by one
-                        db.rollback()
-                        for tick in tick_objects:
-                            try:
-                                db.merge(tick)  # Updates if exists, inserts if new
-                                db.commit()
-                                total_ticks += 1
-                            except:
-                                db.rollback()  # Skip duplicates silently
-
-            if total_ticks > 0:
-                self.total_written += total_ticks
-                self.total_batches += 1
-                logger.info(f"Batch write: {total_ticks} ticks written to PostgreSQL (total: {self.total_written})")
+            if self.use_copy:
+                inserted = self._copy_rows(db, rows)
+            else:
+                inserted = self._insert_rows(db, rows)
+            db.commit()
 
         except Exception as e:
             logger.error(f"Batch write failed: {e}", exc_info=True)
             db.rollback()
+            return False
         finally:
             db.close()
 
-    def _get_accounts_with_buffers(self):
-        """Get list of account IDs that have buffered ticks"""
+        elapsed = time.perf_counter() - start
+        duplicates = len(rows) - inserted
+        throughput = len(rows) / elapsed if elapsed > 0 else 0
+
+        self.total_written += inserted
+        self.total_duplicates += duplicates
+        self.total_batches += 1
+        self.last_batch_ms = elapsed * 1000
+        self.last_throughput = throughput
+        self.peak_throughput = max(self.peak_throughput, throughput)
+
+        logger.info(
+            f"Batch write: {inserted} ticks written to PostgreSQL in {self.last_batch_ms:.1f}ms "
+            f"({throughput:,.0f} ticks/s, {duplicates} duplicates skipped, total: {self.total_written})"
+        )
+        return True
+
+    @staticmethod
+    def _tick_rows(entries):
+        """Convert (entry ID, tick) pairs to `ticks` column tuples (in TICK_COLUMNS order)"""
+        rows = []
+        previous_id, seq = None, 0
+        for entry_id, tick_data in entries:
+            # Position within the entry, counted before invalid ticks are skipped
+            seq = seq + 1 if entry_id == previous_id else 0
+            previous_id = entry_id
+
+            if not tick_data.get('symbol') or tick_data.get('bid') is None or tick_data.get('ask') is None:
+                continue
+
+            # Convert timestamp
+            timestamp = tick_data.get('timestamp')
+            if isinstance(timestamp, (int, float)):
+                timestamp = datetime.fromtimestamp(timestamp)
+            elif timestamp is None:
+                timestamp = datetime.utcnow()
+
+            # NOTE: Ticks are now GLOBAL (no account_id)
+            rows.append((
+                tick_data['symbol'],
+                tick_data['bid'],
+                tick_data['ask'],
+                tick_data.get('spread'),
+                tick_data.get('volume', 0),
+                timestamp,
+                tick_data.get('tradeable', True),
+                entry_id,
+                seq
+            ))
+        return rows
+
+    def _copy_rows(self, db, rows):
+        """COPY rows into the staging table and merge them into `ticks`; returns rows inserted"""
+        columns = ', '.join(TICK_COLUMNS)
+
+        # Temp tables are never WAL-logged and are private to the connection,
+        # so concurrent writers do not see each other's staging rows.
+        # ON COMMIT DELETE ROWS empties it for the next batch on this connection.
+        db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ON COMMIT DELETE ROWS "
+            f"AS SELECT {columns} FROM ticks WITH NO DATA"
+        ))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for symbol, bid, ask, spread, volume, timestamp, tradeable, stream_id, stream_seq in rows:
+            writer.writerow((
+                symbol, bid, ask,
+                '' if spread is None else spread,
+                '' if volume is None else volume,
+                timestamp.isoformat(sep=' '),
+                't' if tradeable else 'f',
+                stream_id,
+                stream_seq
+            ))
+        buffer.seek(0)
+
+        # Same DBAPI connection (and transaction) as the session
+        cursor = db.connection().connection.cursor()
         try:
-            # Get all buffer keys
-            pattern = "ticks:buffer:*"
-            keys = self.redis.client.keys(pattern)
-
-            # Extract unique account IDs
-            accounts = set()
-            for key in keys:
-                # Key format: ticks:buffer:{account_id}:{symbol}
-                parts = key.split(':')
-                if len(parts) >= 3:
-                    try:
-                        account_id = int(parts[2])
-                        accounts.add(account_id)
-                    except ValueError:
-                        continue
-
-            return list(accounts)
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
 
-        except Exception as e:
-            logger.error(f"Failed to get accounts with buffers: {e}")
-            return []
+        result = db.execute(text(
+            f"INSERT INTO ticks ({columns}) "
+            f"SELECT {columns} FROM {STAGING_TABLE} "
+            f"ON CONFLICT DO NOTHING"
+        ))
+        return result.rowcount
+
+    def _insert_rows(self, db, rows):
+        """Multi-row INSERT ... ON CONFLICT DO NOTHING (fallback when COPY is disabled)"""
+        stmt = pg_insert(Tick.__table__).values(
+            [dict(zip(TICK_COLUMNS, row)) for row in rows]
+        ).on_conflict_do_nothing()
+        return db.execute(stmt).rowcount
 
     def get_stats(self):
         """Get batch writer statistics"""
-        return {
+        stats = {
             'running': self.running,
+            'consumer': self.consumer_name,
             'interval': self.interval,
             'batch_size': self.batch_size,
             'total_written': self.total_written,
             'total_batches': self.total_batches,
+            'total_claimed': self.total_claimed,
+            'total_duplicates': self.total_duplicates,
+            'write_path': 'copy' if self.use_copy else 'insert',
+            'last_batch_ms': round(self.last_batch_ms, 2),
+            'last_throughput': round(self.last_throughput, 1),
+            'peak_throughput': round(self.peak_throughput, 1),
             'avg_per_batch': self.total_written / self.total_batches if self.total_batches > 0 else 0
         }
+        if self.redis:
+            try:
+                stats.update(self.redis.get_tick_stream_stats())
+            except Exception as e:
+                logger.debug(f"Tick stream stats unavailable: {e}")
+        return stats
 
 
 # Global instance
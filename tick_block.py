@@ -0,0 +1,224 @@
+"""
+Tick Block - columnar tick batch for the /api/ticks fast path
+
+An EA tick batch is parsed into numpy columns once; the broker timezone
+offset and spread fallback are applied vectorized. The block is handed to
+every consumer as a whole:
+- Redis tick stream: one XADD per block (base64-packed columns)
+- Quote book: newest tick per symbol
+- Candle builder / spread statistics: per-(symbol, period) runs via runs()
+
+Blocks read back from the stream expand to tick dicts (to_dicts) for the
+tick batch writer.
+
+Usage:
+    from tick_block import TickBlock
+
+    block = TickBlock.from_ea_ticks(data['ticks'])
+    get_redis().buffer_tick_block(block)
+"""
+
+import base64
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Broker reports TimeGMTOffset() for GMT+1 while it runs on GMT+2 - one hour
+# correction on top of the reported offset (see TIMEZONE_OFFSET_FIX_2025-11-03.md)
+BROKER_OFFSET_CORRECTION = -3600
+
+STREAM_FORMAT = 'block1'
+
+# Column -> stream dtype
+STREAM_COLUMNS = (
+    ('codes', '<u2'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('spread', '<f8'),
+    ('volume', '<i8'),
+    ('timestamp', '<f8'),
+    ('tradeable', 'u1'),
+)
+
+
+class TickBlock:
+    """Columnar tick batch: symbol codes + numpy columns, sorted as received"""
+
+    __slots__ = ('symbols', 'codes', 'bid', 'ask', 'spread', 'volume', 'timestamp', 'tradeable')
+
+    def __init__(self, symbols: List[str], codes, bid, ask, spread, volume, timestamp, tradeable):
+        self.symbols = symbols              # code -> symbol name (first-seen order)
+        self.codes = codes                  # per tick index into symbols
+        self.bid = bid
+        self.ask = ask
+        self.spread = spread
+        self.volume = volume
+        self.timestamp = timestamp          # UTC epoch seconds (float)
+        self.tradeable = tradeable
+
+    def __len__(self):
+        return len(self.codes)
+
+    # ========================================================================
+    # CONSTRUCTION
+    # ========================================================================
+
+    @classmethod
+    def from_ea_ticks(cls, ticks: List[Dict], offset_correction: int = BROKER_OFFSET_CORRECTION) -> 'TickBlock':
+        """
+        Parse an EA tick list into a block
+
+        EA timestamps are broker local time plus TimeGMTOffset() (negative for
+        zones east of UTC): UTC = timestamp + tz_offset + offset_correction.
+        Ticks without symbol, bid or ask are dropped.
+        """
+        # Symbol codes in first-seen order ('' = missing symbol)
+        symbol_codes = {'': 0}
+        codes = np.array(
+            [symbol_codes.setdefault(t.get('symbol') or '', len(symbol_codes)) for t in ticks], dtype=np.int64
+        )
+        bid = np.array([t.get('bid') or 0 for t in ticks], dtype=np.float64)
+        ask = np.array([t.get('ask') or 0 for t in ticks], dtype=np.float64)
+        spread = np.array([t.get('spread') for t in ticks], dtype=np.float64)  # None -> nan
+        volume = np.array([t.get('volume') or 0 for t in ticks], dtype=np.int64)
+        local_ts = np.array([t.get('timestamp') or 0 for t in ticks], dtype=np.float64)
+        tz_offset = np.array([t.get('tz_offset') or 0 for t in ticks], dtype=np.float64)
+        tradeable = np.array([t.get('tradeable', True) is not False for t in ticks], dtype=bool)
+
+        valid = (bid > 0) & (ask > 0) & (local_ts > 0) & (codes > 0)
+        if not valid.all():
+            codes, bid, ask, spread = codes[valid], bid[valid], ask[valid], spread[valid]
+            volume, local_ts, tz_offset, tradeable = volume[valid], local_ts[valid], tz_offset[valid], tradeable[valid]
+
+        if not len(codes):
+            return cls.empty()
+
+        timestamp = local_ts + tz_offset + offset_correction
+        spread = np.where(np.isnan(spread), ask - bid, spread)
+
+        # Drop the '' placeholder (code 0); symbols that only had invalid ticks stay in the table
+        return cls(list(symbol_codes)[1:], codes - 1, bid, ask, spread, volume, timestamp, tradeable)
+
+    @classmethod
+    def empty(cls) -> 'TickBlock':
+        """Block without ticks"""
+        f8 = np.empty(0, dtype=np.float64)
+        return cls([], np.empty(0, dtype=np.int64), f8, f8, f8,
+                   np.empty(0, dtype=np.int64), f8, np.empty(0, dtype=bool))
+
+    @classmethod
+    def from_dicts(cls, ticks: List[Dict]) -> 'TickBlock':
+        """Build a block from tick dicts that already carry UTC epoch timestamps"""
+        return cls.from_ea_ticks(
+            [dict(t, tz_offset=0) for t in ticks], offset_correction=0
+        )
+
+    def take(self, index) -> 'TickBlock':
+        """Block with the ticks at index (symbol table is kept)"""
+        return TickBlock(
+            self.symbols, self.codes[index], self.bid[index], self.ask[index], self.spread[index],
+            self.volume[index], self.timestamp[index], self.tradeable[index]
+        )
+
+    # ========================================================================
+    # GROUPING
+    # ========================================================================
+
+    def latest_per_symbol(self) -> Dict[str, int]:
+        """Index of the newest tick per symbol (last received wins on equal timestamps)"""
+        if not len(self):
+            return {}
+        order = np.lexsort((np.arange(len(self)), self.timestamp, self.codes))
+        last = np.flatnonzero(np.append(self.codes[order][1:] != self.codes[order][:-1], True))
+        return {self.symbols[self.codes[order[i]]]: int(order[i]) for i in last}
+
+    def extremes_per_symbol(self, column: str = 'bid') -> Dict[str, List[int]]:
+        """Indexes of the lowest and highest value of column per symbol, in time order"""
+        values = getattr(self, column)
+        result = {}
+        for code, symbol in enumerate(self.symbols):
+            index = np.flatnonzero(self.codes == code)
+            if not len(index):
+                continue
+            low = int(index[np.argmin(values[index])])
+            high = int(index[np.argmax(values[index])])
+            result[symbol] = sorted({low, high}, key=lambda i: (self.timestamp[i], i))
+        return result
+
+    def runs(self, period_seconds: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Split the block into runs of one symbol within one period
+
+        Ticks are grouped by symbol and keep arrival order within a symbol; a
+        run ends where the period changes. An out-of-order tick therefore forms
+        its own run, and applying the runs in order gives the same result as
+        applying the ticks one by one. Periods are aligned to the epoch
+        (minutes/hours match local time on UTC hosts).
+
+        Returns:
+            (order, starts, codes, periods): order groups the block, starts are
+            run start offsets into order (use with np.*.reduceat), codes and
+            periods identify each run
+        """
+        periods = (self.timestamp // period_seconds).astype(np.int64)
+        order = np.argsort(self.codes, kind='stable')
+        sorted_codes = self.codes[order]
+        sorted_periods = periods[order]
+        boundary = np.ones(len(order), dtype=bool)
+        boundary[1:] = (sorted_codes[1:] != sorted_codes[:-1]) | (sorted_periods[1:] != sorted_periods[:-1])
+        starts = np.flatnonzero(boundary)
+        return order, starts, sorted_codes[starts], sorted_periods[starts]
+
+    # ========================================================================
+    # CONVERSION
+    # ========================================================================
+
+    def to_dicts(self) -> List[Dict]:
+        """Tick dicts (symbol, bid, ask, spread, volume, timestamp, tradeable)"""
+        symbols = self.symbols
+        return [
+            {
+                'symbol': symbols[code],
+                'bid': bid,
+                'ask': ask,
+                'spread': spread,
+                'volume': volume,
+                'timestamp': timestamp,
+                'tradeable': tradeable
+            }
+            for code, bid, ask, spread, volume, timestamp, tradeable in zip(
+                self.codes.tolist(), self.bid.tolist(), self.ask.tolist(), self.spread.tolist(),
+                self.volume.tolist(), self.timestamp.tolist(), self.tradeable.tolist()
+            )
+        ]
+
+    def to_stream_fields(self) -> Dict[str, str]:
+        """One Redis stream entry for the whole block (columns as base64)"""
+        fields = {
+            'format': STREAM_FORMAT,
+            'count': str(len(self)),
+            'symbols': ','.join(self.symbols)
+        }
+        for name, dtype in STREAM_COLUMNS:
+            fields[name] = base64.b64encode(getattr(self, name).astype(dtype).tobytes()).decode('ascii')
+        return fields
+
+    @classmethod
+    def from_stream_fields(cls, fields: Dict[str, str]) -> Optional['TickBlock']:
+        """Decode a stream entry written by to_stream_fields (None for single-tick entries)"""
+        if fields.get('format') != STREAM_FORMAT:
+            return None
+        columns = {
+            name: np.frombuffer(base64.b64decode(fields[name]), dtype=dtype)
+            for name, dtype in STREAM_COLUMNS
+        }
+        return cls(
+            fields['symbols'].split(',') if fields.get('symbols') else [],
+            columns['codes'].astype(np.int64),
+            columns['bid'],
+            columns['ask'],
+            columns['spread'],
+            columns['volume'],
+            columns['timestamp'],
+            columns['tradeable'].astype(bool)
+        )
@@ -0,0 +1,334 @@
+"""
+Tick Windows - rolling per-symbol mid-price windows for volatility analysis
+
+Replaces the per-trade "ticks of the last 60 seconds" queries of the trailing
+systems (smart_trailing_stop_v2, noise_adaptive_trailing_stop, position
+engine) with one in-memory ring buffer per symbol. Range, mean absolute
+tick-to-tick jump and max jump are maintained in O(1) amortized per tick:
+
+- min / max price: monotonic deques (front = extreme of the window)
+- max jump: monotonic deque over the jumps inside the window
+- mean jump: running sum of the jumps inside the window
+
+The service is fed from the tick path: a background thread tails the Redis
+tick stream (plain XREAD - the tick_writers consumer group is not touched)
+and adds every TickBlock, so all trailing systems in the worker process read
+the same windows. Ticks are GLOBAL (no account_id).
+
+Usage:
+    from tick_windows import get_tick_windows
+
+    windows = get_tick_windows()
+    windows.on_block(block)                   # TickBlock (stream tail or /api/ticks)
+    windows.get_prices('EURUSD')              # np.ndarray of mids, oldest first
+    windows.get_window_stats('EURUSD')        # price_range, avg_jump, max_jump, tick_count
+"""
+
+import logging
+import time
+from collections import deque
+from threading import Thread, Lock
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolWindow:
+    """
+    Ring buffer of (timestamp, mid) for one symbol with rolling statistics
+
+    Every tick gets a sequence number; the jump of tick n is |mid_n - mid_n-1|
+    and belongs to the window while tick n-1 is still in it.
+    """
+    RESUM_EVERY = 4096  # Evictions between exact re-sums of the jump total (float drift)
+
+    __slots__ = ('window_seconds', 'max_ticks', 'ticks', 'mins', 'maxs', 'max_jumps',
+                 'jumps', 'jump_sum', 'next_seq', 'last_mid', 'newest', 'evictions')
+
+    def __init__(self, window_seconds: float = 60, max_ticks: int = 5000):
+        self.window_seconds = window_seconds
+        self.max_ticks = max_ticks
+        self.ticks = deque()       # (seq, timestamp, mid)
+        self.mins = deque()        # (seq, mid) increasing mids
+        self.maxs = deque()        # (seq, mid) decreasing mids
+        self.jumps = deque()       # (seq, jump) all jumps in the window
+        self.max_jumps = deque()   # (seq, jump) decreasing jumps
+        self.jump_sum = 0.0
+        self.next_seq = 0
+        self.last_mid = None
+        self.newest = 0.0          # Newest tick timestamp seen
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def add(self, timestamp: float, mid: float):
+        """Append a tick and evict ticks older than window_seconds (or above max_ticks)"""
+        seq = self.next_seq
+        self.next_seq += 1
+
+        self.ticks.append((seq, timestamp, mid))
+        while self.mins and self.mins[-1][1] >= mid:
+            self.mins.pop()
+        self.mins.append((seq, mid))
+        while self.maxs and self.maxs[-1][1] <= mid:
+            self.maxs.pop()
+        self.maxs.append((seq, mid))
+
+        if self.last_mid is not None and len(self.ticks) > 1:
+            jump = abs(mid - self.last_mid)
+            self.jumps.append((seq, jump))
+            self.jump_sum += jump
+            while self.max_jumps and self.max_jumps[-1][1] <= jump:
+                self.max_jumps.pop()
+            self.max_jumps.append((seq, jump))
+        self.last_mid = mid
+
+        if timestamp > self.newest:
+            self.newest = timestamp
+        self.evict(self.newest - self.window_seconds)
+        while len(self.ticks) > self.max_ticks:
+            self._pop_oldest()
+
+    def evict(self, cutoff: float):
+        """Drop ticks with timestamp < cutoff"""
+        while self.ticks and self.ticks[0][1] < cutoff:
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        self.ticks.popleft()
+        if not self.ticks:
+            self.mins.clear()
+            self.maxs.clear()
+            self.jumps.clear()
+            self.max_jumps.clear()
+            self.jump_sum = 0.0
+            return
+
+        first = self.ticks[0][0]
+        while self.mins[0][0] < first:
+            self.mins.popleft()
+        while self.maxs[0][0] < first:
+            self.maxs.popleft()
+        # The jump into the new oldest tick started outside the window
+        while self.jumps and self.jumps[0][0] <= first:
+            self.jump_sum -= self.jumps.popleft()[1]
+        while self.max_jumps and self.max_jumps[0][0] <= first:
+            self.max_jumps.popleft()
+
+        self.evictions += 1
+        if self.evictions % self.RESUM_EVERY == 0:
+            self.jump_sum = sum(jump for _seq, jump in self.jumps)
+
+    def stats(self) -> Dict:
+        """price_range, avg_jump, max_jump and tick_count of the current window"""
+        count = len(self.ticks)
+        if not count:
+            return {'price_range': 0.0, 'avg_jump': 0.0, 'max_jump': 0.0, 'tick_count': 0}
+        return {
+            'price_range': self.maxs[0][1] - self.mins[0][1],
+            'avg_jump': max(self.jump_sum, 0.0) / len(self.jumps) if self.jumps else 0.0,
+            'max_jump': self.max_jumps[0][1] if self.max_jumps else 0.0,
+            'tick_count': count
+        }
+
+    def prices(self) -> np.ndarray:
+        """Mid prices in the window, oldest first"""
+        return np.fromiter((mid for _seq, _ts, mid in self.ticks), dtype=np.float64, count=len(self.ticks))
+
+
+class TickWindows:
+    WINDOW_SECONDS = 60    # Window of the trailing systems' volatility analysis
+    MAX_TICKS = 5000       # Per symbol cap (bursts)
+
+    def __init__(self, window_seconds: float = WINDOW_SECONDS, max_ticks: int = MAX_TICKS, block_ms: int = 1000):
+        """
+        Initialize Tick Windows
+
+        Args:
+            window_seconds: Rolling window length in seconds (default: 60)
+            max_ticks: Maximum ticks kept per symbol
+            block_ms: XREAD block time of the stream tail
+        """
+        self.window_seconds = window_seconds
+        self.max_ticks = max_ticks
+        self.block_ms = block_ms
+
+        self.windows: Dict[str, SymbolWindow] = {}
+        self.lock = Lock()
+
+        self.running = False
+        self.thread = None
+        self.last_id = None
+        self.ticks_processed = 0
+        self.blocks_processed = 0
+        self.errors = 0
+
+    # ========================================================================
+    # LIFECYCLE
+    # ========================================================================
+
+    def start(self):
+        """Start tailing the tick stream (backfills the last window_seconds)"""
+        if self.running:
+            logger.warning("Tick windows already running")
+            return
+
+        # Stream IDs are millisecond timestamps - start one window back
+        self.last_id = f"{int((time.time() - self.window_seconds) * 1000)}-0"
+        self.running = True
+        self.thread = Thread(target=self._worker_loop, daemon=True, name='TickWindows')
+        self.thread.start()
+        logger.info(f"📈 Tick windows started ({self.window_seconds}s per symbol, tailing {get_redis().TICK_STREAM_KEY})")
+
+    def stop(self):
+        """Stop the stream tail"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Tick windows stopped")
+
+    def _worker_loop(self):
+        while self.running:
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Tick windows stream error: {e}")
+                time.sleep(1)
+
+    def poll(self, count: int = 500) -> int:
+        """
+        Read new tick stream entries and add them to the windows
+
+        Returns:
+            Number of ticks added
+        """
+        from tick_block import TickBlock
+
+        redis = get_redis()
+        response = redis.client.xread(
+            {redis.TICK_STREAM_KEY: self.last_id}, count=count, block=self.block_ms
+        )
+
+        added = 0
+        for _stream, entries in response or []:
+            for entry_id, fields in entries:
+                self.last_id = entry_id
+                block = TickBlock.from_stream_fields(fields)
+                if block is None:
+                    block = TickBlock.from_dicts([redis.parse_stream_tick(fields)])
+                self.on_block(block)
+                added += len(block)
+        return added
+
+    # ========================================================================
+    # INGEST
+    # ========================================================================
+
+    def on_block(self, block):
+        """
+        Add a TickBlock to the windows
+
+        Mids are computed vectorized; ticks are added per symbol in the
+        order they were received.
+        """
+        if not len(block):
+            return
+
+        order = np.argsort(block.codes, kind='stable')
+        sorted_codes = block.codes[order]
+        mids = ((block.bid + block.ask) / 2)[order].tolist()
+        timestamps = block.timestamp[order].tolist()
+        starts = np.flatnonzero(np.append(True, sorted_codes[1:] != sorted_codes[:-1])).tolist()
+        ends = starts[1:] + [len(order)]
+
+        with self.lock:
+            for start, end in zip(starts, ends):
+                symbol = block.symbols[int(sorted_codes[start])]
+                window = self.windows.get(symbol)
+                if window is None:
+                    window = self.windows[symbol] = SymbolWindow(self.window_seconds, self.max_ticks)
+                for i in range(start, end):
+                    window.add(timestamps[i], mids[i])
+
+            self.ticks_processed += len(block)
+            self.blocks_processed += 1
+
+    # ========================================================================
+    # READ
+    # ========================================================================
+
+    def _window(self, symbol: str) -> Optional[SymbolWindow]:
+        """Window of a symbol with ticks older than window_seconds (wall clock) dropped"""
+        window = self.windows.get(symbol)
+        if window is not None:
+            window.evict(time.time() - self.window_seconds)
+        return window
+
+    def get_window_stats(self, symbol: str) -> Dict:
+        """
+        Rolling statistics of a symbol's window
+
+        Returns:
+            Dict with price_range, avg_jump, max_jump and tick_count
+            (all zero if no ticks were seen in the window)
+        """
+        with self.lock:
+            window = self._window(symbol)
+            if window is None:
+                return SymbolWindow().stats()
+            return window.stats()
+
+    def get_prices(self, symbol: str) -> np.ndarray:
+        """Mid prices of a symbol's window, oldest first"""
+        with self.lock:
+            window = self._window(symbol)
+            return window.prices() if window is not None else np.zeros(0)
+
+    def get_windows(self, symbols: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Mid prices per symbol (symbols without ticks in the window are omitted)"""
+        result = {}
+        with self.lock:
+            for symbol in symbols:
+                window = self._window(symbol)
+                if window is not None and len(window):
+                    result[symbol] = window.prices()
+        return result
+
+    def covers(self, window_seconds: float) -> bool:
+        """True if reads for window_seconds can be served from memory"""
+        return self.running and window_seconds == self.window_seconds
+
+    def get_stats(self) -> Dict:
+        """Service statistics"""
+        return {
+            'running': self.running,
+            'symbols': len(self.windows),
+            'ticks_in_windows': sum(len(w) for w in self.windows.values()),
+            'ticks_processed': self.ticks_processed,
+            'blocks_processed': self.blocks_processed,
+            'errors': self.errors,
+            'last_id': self.last_id
+        }
+
+
+# Global instance
+_tick_windows = None
+
+def get_tick_windows() -> TickWindows:
+    """Get global tick windows instance"""
+    global _tick_windows
+    if _tick_windows is None:
+        _tick_windows = TickWindows()
+    return _tick_windows
+
+def start_tick_windows():
+    """Start the global tick windows (tails the tick stream)"""
+    windows = get_tick_windows()
+    windows.start()
+    return windows
@@ -11,8 +11,9 @@ from threading import Thread
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from database import ScopedSession
-from models import Trade, Account, Tick, GlobalSettings
+from models import Trade, Account, GlobalSettings
 from redis_client import get_redis
+from quote_book import get_quote_book
 from trailing_stop_manager import get_trailing_stop_manager
 # ✅ NEW: Import Smart Trailing Stop System with ATR-based noise compensation
 from smart_trailing_stop import get_smart_trailing
@@ -39,20 +40,21 @@ class TradeMonitor:
         self.trailing_stops_processed = 0
         self.last_trailing_check = None
         self.trailing_check_interval = 10  # Run smart trailing every 10 seconds
+        # False when the position engine owns SL management (position_engine.py) -
+        # the monitor then only tracks P&L, reconciles and feeds the dashboard
+        self.manage_stops = True
 
     def get_current_price(self, db: Session, account_id: int, symbol: str) -> Optional[Dict]:
         """Get current bid/ask prices for symbol (account_id kept for compatibility but not used)"""
         try:
-            # Ticks are now global - no account_id filter needed
-            latest_tick = db.query(Tick).filter_by(
-                symbol=symbol
-            ).order_by(Tick.timestamp.desc()).first()
+            # Quotes are global - served from the quote book, not the ticks table
+            quote = get_quote_book().get_quote(symbol)
 
-            if latest_tick:
+            if quote:
                 return {
-                    'bid': latest_tick.bid,
-                    'ask': latest_tick.ask,
-                    'timestamp': latest_tick.timestamp
+                    'bid': quote['bid'],
+                    'ask': quote['ask'],
+                    'timestamp': quote['timestamp']
                 }
             return None
         except Exception as e:
@@ -62,14 +64,12 @@ class TradeMonitor:
     def get_eurusd_rate(self, db: Session, account_id: int = None) -> float:
         """Get current EUR/USD exchange rate for currency conversion (account_id kept for compatibility but not used)"""
         try:
-            # Ticks are now global - no account_id filter needed
-            eurusd_tick = db.query(Tick).filter_by(
-                symbol='EURUSD'
-            ).order_by(Tick.timestamp.desc()).first()
+            # Quotes are global - no account_id filter needed
+            eurusd_quote = get_quote_book().get_quote('EURUSD')
 
-            if eurusd_tick:
+            if eurusd_quote:
                 # Use mid price for conversion
-                return float((eurusd_tick.bid + eurusd_tick.ask) / 2)
+                return (eurusd_quote['bid'] + eurusd_quote['ask']) / 2
             else:
                 # Fallback rate if no EURUSD data available
                 logger.warning("No EURUSD rate available, using fallback rate 1.17")
@@ -495,7 +495,7 @@ class TradeMonitor:
                 positions_data.append(position_info)
 
                 # Process trailing stop for profitable trades
-                if mt5_profit > 0 and trade.tp and trade.sl:
+                if self.manage_stops and mt5_profit > 0 and trade.tp and trade.sl:
                     try:
                         trailing_result = self.trailing_stop_manager.process_trade(
                             db=db,
@@ -580,7 +580,7 @@ class TradeMonitor:
             if self.last_trailing_check is None:
                 self.last_trailing_check = now
             
-            if (now - self.last_trailing_check).total_seconds() >= self.trailing_check_interval:
+            if self.manage_stops and (now - self.last_trailing_check).total_seconds() >= self.trailing_check_interval:
                 logger.debug("🔄 Running Smart Trailing Stop check with market noise compensation...")
                 try:
                     stats = self.smart_trailing.process_all(db)
@@ -680,7 +680,7 @@ class TradeMonitor:
 
                 # ✅ NEW: Run Smart Trailing Stop periodically with ATR-based noise compensation
                 now = datetime.utcnow()
-                if (now - self.last_trailing_check).total_seconds() >= self.trailing_check_interval:
+                if self.manage_stops and (now - self.last_trailing_check).total_seconds() >= self.trailing_check_interval:
                     logger.debug("🔄 Running Smart Trailing Stop check with market noise compensation...")
                     try:
                         stats = self.smart_trailing.process_all(db)
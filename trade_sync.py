@@ -0,0 +1,362 @@
+"""
+Trade Sync - set-based reconciliation for /api/trades/sync
+
+The EA posts its full position list (plus recently closed deals) every few
+seconds. Instead of one lookup per ticket, a sync runs a fixed number of
+statements regardless of how many positions are open:
+- 1 SELECT for all referenced tickets (Trade.ticket IN (...))
+- 1 SELECT for the OPEN_TRADE commands of new/incomplete tickets (indexed
+  commands.ticket, see migrations/add_command_ticket_column.sql)
+- 1 SELECT for the signals of new trades
+- 1 executemany UPDATE for all plain position updates (profit/swap/SL/TP)
+- 1 INSERT for new trades
+- 1 SELECT for open trades that MT5 no longer reports
+Entry/exit price snapshots come from the QuoteBook instead of the ticks table.
+
+Trades are GLOBAL (ticket lookup not filtered by account_id - ML learning
+across all accounts); reconciliation only closes trades of the syncing account.
+
+Usage:
+    from trade_sync import reconcile_trades
+
+    result = reconcile_trades(db, account, trades)
+    db.commit()
+    # result['events'] -> [{'event': 'trade_opened', 'ticket': ...}, ...]
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from market_context_helper import calculate_pips, calculate_risk_reward, get_current_trading_session
+from models import Command, Trade, TradingSignal
+from quote_book import get_quote_book
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value) -> Optional[datetime]:
+    """ISO timestamp from the EA (None if missing)"""
+    return datetime.fromisoformat(value) if value else None
+
+
+def _initial_sl_tp(command: Optional[Command]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    ORIGINAL SL/TP of the OPEN_TRADE command
+
+    The EA sends back the actual SL/TP in its response ({"sl", "tp", "ticket"});
+    falls back to the payload (what we SENT to the EA).
+    """
+    if command is None:
+        return None, None
+    response = command.response or {}
+    payload = command.payload or {}
+    return (
+        response.get('sl') or payload.get('sl'),
+        response.get('tp') or payload.get('tp')
+    )
+
+
+def _entry_reason(signal: Optional[TradingSignal], source: str) -> str:
+    """Entry reason from the linked signal (patterns, confidence, timeframe)"""
+    if signal is not None:
+        patterns = []
+        if isinstance(signal.pattern_data, list):
+            patterns = [p.get('name', 'Pattern') for p in signal.pattern_data][:2]
+
+        reason_parts = []
+        if patterns:
+            reason_parts.append(f"Patterns: {', '.join(patterns)}")
+        if signal.confidence:
+            reason_parts.append(f"{float(signal.confidence)*100:.0f}% confidence")
+        if signal.timeframe:
+            reason_parts.append(f"{signal.timeframe} timeframe")
+        if reason_parts:
+            return " | ".join(reason_parts)
+        return "Auto-traded signal"
+
+    if source == 'autotrade':
+        return "Auto-trade (signal details unavailable)"
+    if source == 'MT5':
+        return "Manual trade (MT5)"
+    return f"Trade from {source}"
+
+
+def _apply_exit_metrics(trade: Trade, quote: Optional[Dict] = None):
+    """PHASE 7 exit metrics for a trade that just closed (pips, R:R, duration, session)"""
+    trade.pips_captured = calculate_pips(
+        trade.open_price,
+        trade.close_price,
+        trade.direction,
+        trade.symbol
+    )
+
+    if trade.initial_sl:
+        trade.risk_reward_realized = calculate_risk_reward(
+            trade.open_price,
+            trade.close_price,
+            trade.initial_sl,
+            trade.direction
+        )
+
+    if trade.open_time and trade.close_time:
+        duration = trade.close_time - trade.open_time
+        trade.hold_duration_minutes = int(duration.total_seconds() / 60)
+
+    # Exit price action snapshot
+    if quote:
+        trade.exit_bid = quote['bid']
+        trade.exit_ask = quote['ask']
+        trade.exit_spread = quote['spread'] or None
+
+    trade.session = get_current_trading_session()
+
+
+def _latest_quotes(symbols) -> Dict[str, Dict]:
+    """Latest quotes for entry/exit snapshots (empty if Redis is unavailable)"""
+    symbols = [s for s in symbols if s]
+    if not symbols:
+        return {}
+    try:
+        return get_quote_book().get_quotes(symbols)
+    except Exception as e:
+        logger.warning(f"Quote book unavailable for trade sync snapshots: {e}")
+        return {}
+
+
+def reconcile_trades(db: Session, account, trades: List[Dict]) -> Dict:
+    """
+    Apply an EA trade list to the trades table (does not commit)
+
+    Args:
+        db: Database session
+        account: Syncing Account
+        trades: Trade dicts from the EA (ticket, symbol, status, profit, sl, tp, ...)
+
+    Returns:
+        Dict with 'synced' (new), 'updated', 'reconciled', 'status_changes'
+        and 'events' (trade_opened / trade_closed per ticket)
+    """
+    now = datetime.utcnow()
+    incoming: Dict[int, Dict] = {}
+    for trade_data in trades:
+        if trade_data.get('ticket'):
+            incoming[int(trade_data['ticket'])] = trade_data
+
+    # Check which trades exist - GLOBAL (not filtered by account_id for ML learning across all accounts)
+    existing: Dict[int, Trade] = {
+        trade.ticket: trade
+        for trade in db.query(Trade).filter(Trade.ticket.in_(list(incoming))).all()
+    } if incoming else {}
+
+    # Tickets whose OPEN_TRADE command is needed: new trades (command_id, signal,
+    # initial SL/TP) and trades created before initial SL/TP was tracked
+    lookup = [
+        ticket for ticket in incoming
+        if ticket not in existing
+        or not existing[ticket].initial_sl or not existing[ticket].initial_tp
+    ]
+    commands: Dict[int, Command] = {}
+    if lookup:
+        rows = db.query(Command).filter(
+            Command.account_id == account.id,
+            Command.command_type == 'OPEN_TRADE',
+            Command.status == 'completed',
+            Command.ticket.in_(lookup)
+        ).order_by(Command.created_at.desc()).all()
+        for command in rows:
+            commands.setdefault(command.ticket, command)  # newest per ticket
+
+    signal_ids = {
+        commands[ticket].payload.get('signal_id')
+        for ticket in incoming
+        if ticket not in existing and ticket in commands and commands[ticket].payload
+    }
+    signal_ids.discard(None)
+    signals: Dict[int, TradingSignal] = {
+        signal.id: signal
+        for signal in db.query(TradingSignal).filter(TradingSignal.id.in_(signal_ids)).all()
+    } if signal_ids else {}
+
+    closing = {
+        ticket for ticket, trade in existing.items()
+        if trade.status == 'open' and incoming[ticket].get('status', 'open') == 'closed'
+        and incoming[ticket].get('close_price')
+    }
+    quotes = _latest_quotes({
+        incoming[ticket].get('symbol') for ticket in incoming if ticket not in existing
+    } | {existing[ticket].symbol for ticket in closing})
+
+    events = []
+    mappings = []
+    new_trades = []
+    status_changes = 0
+    session = get_current_trading_session()
+
+    # ------------------------------------------------------------------------
+    # Existing trades
+    # ------------------------------------------------------------------------
+    for ticket, trade in existing.items():
+        trade_data = incoming[ticket]
+        old_status = trade.status
+        new_status = trade_data.get('status', 'open')
+
+        values = {
+            'status': new_status,
+            'close_price': trade_data.get('close_price'),
+            'close_time': _parse_time(trade_data.get('close_time')),
+            'profit': trade_data.get('profit'),
+            'commission': trade_data.get('commission'),
+            'swap': trade_data.get('swap'),
+            'updated_at': now
+        }
+
+        # Only update SL/TP while the trade is OPEN - on close the EA sends
+        # sl=0/tp=0 (position is gone), keep the last known values for analysis
+        if new_status == 'open':
+            if trade_data.get('sl') is not None:
+                values['sl'] = trade_data['sl']
+            if trade_data.get('tp') is not None:
+                values['tp'] = trade_data['tp']
+
+        # Set initial_sl/initial_tp from the Command if not set
+        cmd_sl, cmd_tp = _initial_sl_tp(commands.get(ticket))
+        if cmd_sl and not trade.initial_sl:
+            values['initial_sl'] = cmd_sl
+            logger.info(f"🔧 Fixed initial_sl for trade #{ticket}: {cmd_sl}")
+        if cmd_tp and not trade.initial_tp:
+            values['initial_tp'] = cmd_tp
+            logger.info(f"🔧 Fixed initial_tp for trade #{ticket}: {cmd_tp}")
+
+        if ticket in closing:
+            # Exit metrics need the ORM object - few rows per sync
+            for key, value in values.items():
+                setattr(trade, key, value)
+            _apply_exit_metrics(trade, quotes.get(trade.symbol))
+            logger.info(
+                f"📊 Exit Metrics for #{ticket}: Pips={trade.pips_captured or 0:.2f}, "
+                f"R:R={trade.risk_reward_realized or 0:.2f}, "
+                f"Duration={trade.hold_duration_minutes}min, Session={trade.session}"
+            )
+        else:
+            mappings.append({'id': trade.id, **values})
+
+        if old_status != new_status:
+            status_changes += 1
+            if old_status == 'open':
+                events.append({'event': 'trade_closed', 'ticket': ticket, 'symbol': trade.symbol,
+                               'profit': trade_data.get('profit'), 'close_reason': trade.close_reason})
+
+    if mappings:
+        db.bulk_update_mappings(Trade, mappings)
+
+    # ------------------------------------------------------------------------
+    # New trades
+    # ------------------------------------------------------------------------
+    for ticket, trade_data in incoming.items():
+        if ticket in existing:
+            continue
+
+        command = commands.get(ticket)
+        command_id = trade_data.get('command_id') or (command.id if command else None)
+        signal_id = command.payload.get('signal_id') if command and command.payload else None
+        signal = signals.get(signal_id)
+
+        if command:
+            source = 'autotrade' if signal_id else 'ea_command'
+            logger.info(f"🔗 Linked trade #{ticket} to command {command.id[:12]}... (signal #{signal_id})")
+        else:
+            source = 'MT5'
+            if not command_id:
+                logger.warning(f"⚠️ No command found for trade #{ticket} - marking as MT5 manual trade")
+
+        initial_sl, initial_tp = _initial_sl_tp(command)
+        quote = quotes.get(trade_data.get('symbol'))
+
+        new_trades.append(Trade(
+            account_id=account.id,
+            ticket=ticket,
+            symbol=trade_data.get('symbol'),
+            type=trade_data.get('type', 'MARKET'),
+            direction=trade_data.get('direction'),
+            volume=trade_data.get('volume'),
+            open_price=trade_data.get('open_price'),
+            open_time=_parse_time(trade_data.get('open_time')) or now,
+            close_price=trade_data.get('close_price'),
+            close_time=_parse_time(trade_data.get('close_time')),
+            sl=trade_data.get('sl'),  # Current SL (may be modified by trailing stop)
+            tp=trade_data.get('tp'),  # Current TP (may be modified)
+            original_tp=initial_tp if initial_tp is not None else trade_data.get('tp'),
+            tp_extended_count=0,
+
+            # Initial TP/SL snapshot (ORIGINAL values before any modifications)
+            initial_tp=initial_tp if initial_tp is not None else trade_data.get('tp'),
+            initial_sl=initial_sl if initial_sl is not None else trade_data.get('sl'),
+
+            # Entry price action
+            entry_bid=quote['bid'] if quote else None,
+            entry_ask=quote['ask'] if quote else None,
+            entry_spread=(quote['spread'] or quote['ask'] - quote['bid']) if quote else None,
+
+            max_favorable_excursion=0,
+            max_adverse_excursion=0,
+            trailing_stop_active=False,
+            trailing_stop_moves=0,
+            session=session,
+
+            profit=trade_data.get('profit'),
+            commission=trade_data.get('commission'),
+            swap=trade_data.get('swap'),
+            source=source,
+            command_id=command_id,
+            signal_id=signal_id,
+            timeframe=signal.timeframe if signal else None,
+            entry_confidence=float(signal.confidence) if signal and signal.confidence else None,
+            entry_reason=_entry_reason(signal, source),
+            response_data=trade_data.get('response_data'),
+            status=trade_data.get('status', 'open'),
+            created_at=now,
+            updated_at=now
+        ))
+
+        if trade_data.get('status', 'open') == 'open':
+            events.append({'event': 'trade_opened', 'ticket': ticket, 'symbol': trade_data.get('symbol'),
+                           'direction': trade_data.get('direction'), 'volume': trade_data.get('volume')})
+
+    if new_trades:
+        db.add_all(new_trades)
+
+    # ------------------------------------------------------------------------
+    # Close trades that are open in DB but not in MT5's list (MT5 is source of truth!)
+    # ------------------------------------------------------------------------
+    reconciled = 0
+    if trades:  # Only reconcile if MT5 sent a trade list
+        missing = db.query(Trade).filter(
+            Trade.account_id == account.id,
+            Trade.status == 'open',
+            Trade.ticket.notin_(list(incoming))
+        ).all()
+
+        for trade in missing:
+            trade.status = 'closed'
+            trade.close_time = now
+            trade.close_reason = 'SYNC_RECONCILIATION'
+            trade.updated_at = now  # Keep the last known profit/swap/commission
+
+            if trade.close_price and trade.open_price:
+                _apply_exit_metrics(trade)
+
+            reconciled += 1
+            events.append({'event': 'trade_closed', 'ticket': trade.ticket, 'symbol': trade.symbol,
+                           'profit': trade.profit, 'close_reason': 'SYNC_RECONCILIATION'})
+            logger.warning(f"🔄 Reconciliation: Closed trade #{trade.ticket} (not in MT5 position list)")
+
+    return {
+        'synced': len(new_trades),
+        'updated': len(existing),
+        'reconciled': reconciled,
+        'status_changes': status_changes,
+        'events': events
+    }
@@ -9,8 +9,9 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Dict, Optional, Tuple
 from sqlalchemy.orm import Session
-from models import Trade, Command, GlobalSettings, Tick, BrokerSymbol
+from models import Trade, Command, GlobalSettings, BrokerSymbol
 from database import ScopedSession
+from quote_book import get_quote_book
 
 logger = logging.getLogger(__name__)
 
@@ -173,14 +174,12 @@ class TrailingStopManager:
             return {'digits': 5, 'point': 0.00001, 'stops_level': 10}
 
     def get_current_spread(self, db: Session, symbol: str, account_id: int) -> float:
-        """Get current spread from latest tick (ticks are global - no account_id)"""
+        """Get current spread from the quote book (quotes are global - no account_id)"""
         try:
-            latest_tick = db.query(Tick).filter_by(
-                symbol=symbol
-            ).order_by(Tick.timestamp.desc()).first()
+            quote = get_quote_book().get_quote(symbol)
 
-            if latest_tick:
-                spread = float(latest_tick.ask) - float(latest_tick.bid)
+            if quote:
+                spread = quote['ask'] - quote['bid']
                 return spread
             else:
                 logger.warning(f"No tick data for {symbol}, using default spread")
@@ -890,19 +889,15 @@ class TrailingStopManager:
             # Calculate EUR value for SL distance using MT5-accurate conversion
             volume = float(trade.volume) if trade.volume else 0.0
 
-            # Get EUR/USD rate for accurate conversion from latest tick data
-            from models import Tick
-            from sqlalchemy import desc
+            # Get EUR/USD rate for accurate conversion from the quote book
             eurusd_rate = 1.0  # Fallback
             try:
-                # Ticks are global - no account_id
-                eurusd_tick_bid = db.query(Tick.bid).filter(
-                    Tick.symbol == 'EURUSD'
-                ).order_by(desc(Tick.timestamp)).first()
-                if eurusd_tick_bid and eurusd_tick_bid[0]:
-                    eurusd_rate = float(eurusd_tick_bid[0])
+                # Quotes are global - no account_id
+                eurusd_quote = get_quote_book().get_quote('EURUSD')
+                if eurusd_quote and eurusd_quote['bid']:
+                    eurusd_rate = eurusd_quote['bid']
             except Exception as e:
-                logger.debug(f"Could not get EURUSD rate from ticks: {e}")
+                logger.debug(f"Could not get EURUSD rate from quote book: {e}")
 
             if sl_distance_price > 0:
                 sl_distance_eur = self._calculate_price_to_eur(
@@ -10,6 +10,8 @@ Consolidates:
 - strategy_validation_worker
 - drawdown_protection_worker
 - partial_close_worker
+- position_engine (replaces the position pollers, see POSITION_ENGINE_REPLACES)
+- tick_windows (rolling 60s mid-price windows for the trailing systems)
 
 Benefits:
 - Single container instead of 6 (saves ~250 MB RAM)
@@ -38,6 +40,12 @@ logger = logging.getLogger(__name__)
 # Global shutdown flag
 shutdown_event = threading.Event()
 
+# Position pollers covered by the per-tick position engine (position_engine.py)
+POSITION_ENGINE_REPLACES = (
+    'partial_close', 'mfe_mae_tracker', 'time_exit', 'tpsl_monitor',
+    'smart_trailing_v2', 'noise_adaptive_ts'
+)
+
 # Redis connection for metrics export
 redis_client = None
 
@@ -314,6 +322,11 @@ def import_worker_functions():
 
         workers['auto_trader'] = run_auto_trader
 
+        # Event-driven: process signals the moment they are saved; the
+        # interval run above stays as a safety-net sweep
+        if os.getenv('AUTO_TRADER_SIGNAL_EVENTS', 'true').lower() == 'true':
+            get_auto_trader().start_signal_listener()
+
     except Exception as e:
         logger.error(f"Failed to import auto_trader_worker: {e}")
 
@@ -678,6 +691,29 @@ def main():
         sys.exit(1)
     
     logger.info(f"✅ Loaded {len(worker_functions)} workers")
+
+    # Rolling tick windows for volatility analysis (tails the tick stream;
+    # trailing systems fall back to the ticks table if it fails to start)
+    tick_windows = None
+    if os.getenv('TICK_WINDOWS_ENABLED', 'true').lower() == 'true':
+        try:
+            from tick_windows import start_tick_windows
+            tick_windows = start_tick_windows()
+        except Exception as e:
+            logger.error(f"Failed to start tick_windows: {e}")
+
+    # Position engine: one in-memory pass per quote tick instead of the
+    # separate position pollers (which keep running if it fails to start)
+    position_engine = None
+    if os.getenv('POSITION_ENGINE_ENABLED', 'true').lower() == 'true':
+        try:
+            from position_engine import start_position_engine
+            import trade_monitor as tm
+
+            position_engine = start_position_engine()
+            tm.get_monitor().manage_stops = False  # Monitor keeps P&L/dashboard/reconciliation
+        except Exception as e:
+            logger.error(f"Failed to start position_engine: {e}")
     
     # Worker configurations (intervals in seconds)
     worker_configs = {
@@ -771,6 +807,9 @@ def main():
         if config['function'] is None:
             logger.warning(f"⚠️  Skipping {name}: Function not loaded")
             continue
+        if position_engine is not None and name in POSITION_ENGINE_REPLACES:
+            logger.info(f"⏭️  Skipping {name}: handled by position engine")
+            continue
             
         thread = WorkerThread(
             name=name,
@@ -808,6 +847,10 @@ def main():
             # Print status periodically
             if time.time() - last_status >= status_interval:
                 print_status(threads)
+                if position_engine is not None:
+                    logger.info(f"⚙️  Position engine: {position_engine.get_stats()}")
+                if tick_windows is not None:
+                    logger.info(f"📈 Tick windows: {tick_windows.get_stats()}")
                 last_status = time.time()
             
             time.sleep(10)  # Check every 10 seconds
@@ -818,6 +861,10 @@ def main():
     
     # Wait for all threads to finish
     logger.info("\n⏳ Waiting for workers to finish...")
+    if position_engine is not None:
+        position_engine.stop()
+    if tick_windows is not None:
+        tick_windows.stop()
     for name, thread in threads.items():
         thread.join(timeout=30)
         if thread.is_alive():
@@ -8,7 +8,8 @@ import logging
 import time
 from datetime import datetime
 from database import ScopedSession
-from models import Trade, Tick
+from models import Trade
+from quote_book import get_quote_book
 from market_context_helper import calculate_pips
 
 logging.basicConfig(
@@ -51,6 +52,9 @@ class MFEMAETracker:
             if not open_trades:
                 return
             
+            # One quote book round-trip for all symbols (per-trade reads hit the local cache)
+            get_quote_book().get_quotes({trade.symbol for trade in open_trades})
+            
             updated_count = 0
             
             for trade in open_trades:
@@ -71,30 +75,30 @@ class MFEMAETracker:
         finally:
             db.close()
     
-    def update_trade_mfe_mae(self, db, trade):
+    def update_trade_mfe_mae(self, db, trade, current_quote=None):
         """
         Update MFE/MAE for a single trade
         
         Args:
             db: Database session
             trade: Trade object
+            current_quote: Latest quote if the caller already has it
         
         Returns:
             bool: True if updated, False otherwise
         """
         # Get current price for this symbol
-        current_tick = db.query(Tick).filter_by(
-            symbol=trade.symbol
-        ).order_by(Tick.timestamp.desc()).first()
+        if current_quote is None:
+            current_quote = get_quote_book().get_quote(trade.symbol)
         
-        if not current_tick:
+        if not current_quote:
             return False
         
         # Use appropriate price (bid for BUY close, ask for SELL close)
         if trade.direction.upper() == 'BUY':
-            current_price = float(current_tick.bid)
+            current_price = current_quote['bid']
         else:  # SELL
-            current_price = float(current_tick.ask)
+            current_price = current_quote['ask']
         
         # Calculate current P&L in pips
         entry_price = float(trade.open_price)
@@ -24,7 +24,7 @@ import sys
 import time
 import logging
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Set
 import uuid
 
 # Add parent directory to path
@@ -33,6 +33,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from models import Trade, Command
+from quote_book import get_quote_book
 
 # Logging
 logging.basicConfig(
@@ -102,37 +103,92 @@ def calculate_tp_progress(trade: Trade, current_price: float) -> float:
 def get_current_price(trade: Trade) -> Optional[float]:
     """Get current price for closing (bid for BUY, ask for SELL)"""
     try:
-        # Use trade.profit to infer current price is available
-        # In reality, you'd want to query Tick table or get from MT5
-        # For now, return None if profit not available (will be handled by caller)
-        if trade.profit is None:
+        # Latest quote from the shared quote book (None if the symbol has no quote)
+        quote = get_quote_book().get_quote(trade.symbol)
+        if not quote:
             return None
 
-        # Approximate current price from profit
-        # This is simplified - in production, fetch from Tick table
-        if trade.direction.lower() == 'buy':
-            # For BUY: profit = (current_price - entry) * volume * contract_size
-            # Simplified: return entry + some estimate
-            return float(trade.open_price)  # Placeholder
-        else:
-            return float(trade.open_price)  # Placeholder
+        return quote['bid'] if trade.direction.lower() == 'buy' else quote['ask']
 
     except Exception as e:
         logger.error(f"Error getting current price for trade {trade.ticket}: {e}")
         return None
 
 
-def has_partial_close_tag(trade: Trade, stage: str) -> bool:
-    """Check if trade already has partial close marker for this stage"""
+def get_done_stages(db: Session, tickets: Iterable[int]) -> Dict[int, Set[str]]:
+    """
+    Partial close stages already sent per ticket (one query)
+
+    A stage counts as done once a PARTIAL_CLOSE_TRADE command for it exists
+    that did not fail and was not cancelled. Shared by this worker and the
+    position engine (PartialCloseRule).
+
+    Args:
+        db: Database session
+        tickets: Trade tickets
+
+    Returns:
+        ticket -> set of stages ('stage1', 'stage2'); every ticket is present
+    """
+    tickets = [int(t) for t in tickets]
+    done = {ticket: set() for ticket in tickets}
+    if not tickets:
+        return done
+
+    rows = db.query(Command.payload['ticket'].astext, Command.payload['reason'].astext).filter(
+        Command.command_type == 'PARTIAL_CLOSE_TRADE',
+        Command.payload['ticket'].astext.in_([str(t) for t in tickets]),
+        Command.status.notin_(['failed', 'cancelled'])
+    ).all()
+
+    for ticket, reason in rows:
+        # 'partial_close_stage1_50.0pct' -> 'stage1'
+        parts = (reason or '').split('_')
+        if len(parts) > 2:
+            done[int(ticket)].add(parts[2])
+    return done
+
+
+def has_partial_close_tag(db: Session, trade: Trade, stage: str) -> bool:
+    """Check if a partial close command was already sent for this stage of the trade"""
     try:
-        # Check if comment/metadata contains partial close marker
-        # This would be stored in a trade_metadata table or in comment field
-        # For now, simplified check
-        return False  # Placeholder - implement metadata check
+        return stage in get_done_stages(db, [trade.ticket])[int(trade.ticket)]
 
     except Exception as e:
         logger.error(f"Error checking partial close tag: {e}")
-        return False
+        return True  # Unknown - don't risk closing the same stage twice
+
+
+def partial_close_payload(trade: Trade, close_percent: float, reason: str) -> Optional[Dict]:
+    """
+    PARTIAL_CLOSE_TRADE payload
+
+    Args:
+        trade: Trade to partially close
+        close_percent: Percentage of position to close (0.0-1.0)
+        reason: Reason for partial close
+
+    Returns:
+        Payload dict, or None if the close volume rounds below one lot step
+    """
+    # Calculate close volume
+    current_volume = float(trade.volume)
+    close_volume = current_volume * close_percent
+
+    # Round to lot step (assume 0.01)
+    close_volume = round(close_volume / 0.01) * 0.01
+
+    # Minimum close volume
+    if close_volume < 0.01:
+        logger.debug(f"Trade {trade.ticket}: Close volume {close_volume} too small, skipping")
+        return None
+
+    return {
+        'ticket': int(trade.ticket),
+        'volume': close_volume,
+        'reason': f'partial_close_{reason}',
+        'worker': 'partial_close_worker'
+    }
 
 
 def create_partial_close_command(
@@ -154,27 +210,13 @@ def create_partial_close_command(
         True if command created successfully
     """
     try:
-        # Calculate close volume
-        current_volume = float(trade.volume)
-        close_volume = current_volume * close_percent
-
-        # Round to lot step (assume 0.01)
-        close_volume = round(close_volume / 0.01) * 0.01
-
-        # Minimum close volume
-        if close_volume < 0.01:
-            logger.debug(f"Trade {trade.ticket}: Close volume {close_volume} too small, skipping")
+        payload_data = partial_close_payload(trade, close_percent, reason)
+        if payload_data is None:
             return False
 
+        close_volume = payload_data['volume']
         command_id = str(uuid.uuid4())
 
-        payload_data = {
-            'ticket': int(trade.ticket),
-            'volume': close_volume,
-            'reason': f'partial_close_{reason}',
-            'worker': 'partial_close_worker'
-        }
-
         command = Command(
             id=command_id,
             account_id=trade.account_id,
@@ -203,11 +245,19 @@ def create_partial_close_command(
 def should_partial_close(
     db: Session,
     trade: Trade,
-    progress: float
+    progress: float,
+    done_stages=None
 ) -> tuple[bool, Optional[float], Optional[str]]:
     """
     Determine if trade should be partially closed
 
+    Args:
+        db: Database session
+        trade: Trade object
+        progress: Progress toward TP (0-100)
+        done_stages: Stages already executed for this trade ('stage1', 'stage2');
+                     None = look them up (has_partial_close_tag)
+
     Returns:
         (should_close, close_percent, reason)
     """
@@ -220,12 +270,17 @@ def should_partial_close(
         if not trade.tp or not trade.sl:
             return False, None, "no_tp_sl"
 
+        def done(stage):
+            if done_stages is None:
+                return has_partial_close_tag(db, trade, stage)
+            return stage in done_stages
+
         # Stage 1: First partial close at 50% TP
-        if progress >= FIRST_PARTIAL_PERCENT and not has_partial_close_tag(trade, 'stage1'):
+        if progress >= FIRST_PARTIAL_PERCENT and not done('stage1'):
             return True, FIRST_PARTIAL_CLOSE, f'stage1_{FIRST_PARTIAL_PERCENT}pct'
 
         # Stage 2: Second partial close at 75% TP
-        if progress >= SECOND_PARTIAL_PERCENT and not has_partial_close_tag(trade, 'stage2'):
+        if progress >= SECOND_PARTIAL_PERCENT and not done('stage2'):
             # Only close if stage 1 already done (or would have been too small)
             return True, SECOND_PARTIAL_CLOSE, f'stage2_{SECOND_PARTIAL_PERCENT}pct'
 
@@ -259,6 +314,12 @@ def process_open_trades(db: Session) -> Dict[str, int]:
 
         logger.info(f"Processing {len(open_trades)} open trade(s) for partial close")
 
+        # One quote book round-trip for all symbols (per-trade reads hit the local cache)
+        get_quote_book().get_quotes({trade.symbol for trade in open_trades})
+
+        # Stages already sent (one query) - without this every run re-sends them
+        done_stages = get_done_stages(db, [trade.ticket for trade in open_trades])
+
         for trade in open_trades:
             try:
                 stats['checked'] += 1
@@ -273,32 +334,33 @@ def process_open_trades(db: Session) -> Dict[str, int]:
                     stats['skipped_too_small'] += 1
                     continue
 
-                # Calculate progress toward TP
-                # Get current price from trade profit (EA updates continuously)
-                if trade.profit is None:
-                    continue
-
-                # Approximate current price from entry and profit
-                # In production, fetch from Tick table
-                entry = float(trade.open_price)
-                tp = float(trade.tp)
+                # Calculate progress toward TP from the current quote
+                current_price = get_current_price(trade)
 
-                # Estimate progress from profit
-                # This is simplified - should calculate from actual price
-                if trade.direction.lower() == 'buy':
-                    # Rough estimate
-                    max_profit = (tp - entry) * float(trade.volume) * 100000  # Simplified
-                    current_profit = float(trade.profit) if trade.profit else 0
-                    progress = (current_profit / max_profit * 100) if max_profit > 0 else 0
+                if current_price is not None:
+                    progress = calculate_tp_progress(trade, current_price)
                 else:
-                    max_profit = (entry - tp) * float(trade.volume) * 100000
+                    # No quote available - estimate progress from trade profit (EA updates continuously)
+                    if trade.profit is None:
+                        continue
+
+                    entry = float(trade.open_price)
+                    tp = float(trade.tp)
+
+                    if trade.direction.lower() == 'buy':
+                        # Rough estimate
+                        max_profit = (tp - entry) * float(trade.volume) * 100000  # Simplified
+                    else:
+                        max_profit = (entry - tp) * float(trade.volume) * 100000
                     current_profit = float(trade.profit) if trade.profit else 0
                     progress = (current_profit / max_profit * 100) if max_profit > 0 else 0
 
-                progress = max(0, min(100, progress))
+                    progress = max(0, min(100, progress))
 
                 # Check if should partial close
-                should_close, close_percent, reason = should_partial_close(db, trade, progress)
+                should_close, close_percent, reason = should_partial_close(
+                    db, trade, progress, done_stages[int(trade.ticket)]
+                )
 
                 if should_close and close_percent:
                     logger.info(
@@ -308,6 +370,7 @@ def process_open_trades(db: Session) -> Dict[str, int]:
 
                     if create_partial_close_command(db, trade, close_percent, reason):
                         stats['partial_closed'] += 1
+                        done_stages[int(trade.ticket)].add(reason.split('_')[0])
                     else:
                         stats['errors'] += 1
 
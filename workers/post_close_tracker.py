@@ -16,6 +16,7 @@ from decimal import Decimal
 
 from database import ScopedSession
 from models import Trade, Tick
+from tick_archive import get_tick_archive
 
 logger = logging.getLogger(__name__)
 
@@ -83,7 +84,7 @@ class PostCloseTracker:
         Get relevant price based on trade direction
 
         Args:
-            tick: Tick object
+            tick: Tick object (or ArchivedTick)
             direction: 'BUY' or 'SELL'
 
         Returns:
@@ -123,6 +124,10 @@ class PostCloseTracker:
             Tick.timestamp <= now
         ).order_by(Tick.timestamp.asc()).all()
 
+        if not ticks:
+            # Ticks already moved out of the ticks table (e.g. re-tracking old trades)
+            ticks = list(get_tick_archive().iter_ticks(trade.symbol, trade.close_time, now))
+
         if not ticks:
             logger.debug(f"No ticks available yet for {trade.symbol} after close")
             return False
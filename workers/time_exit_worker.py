@@ -99,10 +99,15 @@ def get_current_trade_profit(db: Session, trade: Trade) -> Optional[float]:
         return None
 
 
-def should_close_trade(db: Session, trade: Trade) -> tuple[bool, str]:
+def should_close_trade(db: Session, trade: Trade, timeframe: Optional[str] = None) -> tuple[bool, str]:
     """
     Determine if trade should be closed based on time rules
 
+    Args:
+        db: Database session
+        trade: Trade object
+        timeframe: Signal timeframe if already known (skips the signal lookup)
+
     Returns:
         (should_close, reason)
     """
@@ -111,7 +116,8 @@ def should_close_trade(db: Session, trade: Trade) -> tuple[bool, str]:
     duration_hours = trade_duration.total_seconds() / 3600
 
     # Get timeframe and rules
-    timeframe = get_trade_timeframe(db, trade)
+    if timeframe is None:
+        timeframe = get_trade_timeframe(db, trade)
     rules = TIME_EXIT_RULES.get(timeframe, TIME_EXIT_RULES['DEFAULT'])
 
     max_hours = rules['max_duration_hours']
@@ -146,29 +152,33 @@ def should_close_trade(db: Session, trade: Trade) -> tuple[bool, str]:
     return False, "within_time_limits"
 
 
+def close_command_payload(trade: Trade, reason: str) -> Dict:
+    """CLOSE_TRADE payload for a time-based exit"""
+    # Normalize close reason for consistent display
+    # Map worker reasons to standard close reasons
+    close_reason_map = {
+        'max_duration': 'TIME_EXIT',
+        'force_loss': 'TIME_EXIT',
+        'grace_period': 'TIME_EXIT'
+    }
+
+    # Extract base reason (remove hours/details)
+    base_reason = reason.split('_')[0] if '_' in reason else reason
+    normalized_reason = close_reason_map.get(base_reason, 'TIME_EXIT')
+
+    return {
+        'ticket': int(trade.ticket),
+        'reason': normalized_reason,  # Use normalized reason
+        'worker': 'time_exit_worker',
+        'details': reason  # Keep original for logging
+    }
+
+
 def create_close_command(db: Session, trade: Trade, reason: str) -> bool:
     """Create CLOSE_TRADE command for EA to execute"""
     try:
         command_id = str(uuid.uuid4())
-
-        # Normalize close reason for consistent display
-        # Map worker reasons to standard close reasons
-        close_reason_map = {
-            'max_duration': 'TIME_EXIT',
-            'force_loss': 'TIME_EXIT',
-            'grace_period': 'TIME_EXIT'
-        }
-        
-        # Extract base reason (remove hours/details)
-        base_reason = reason.split('_')[0] if '_' in reason else reason
-        normalized_reason = close_reason_map.get(base_reason, 'TIME_EXIT')
-
-        payload_data = {
-            'ticket': int(trade.ticket),
-            'reason': normalized_reason,  # Use normalized reason
-            'worker': 'time_exit_worker',
-            'details': reason  # Keep original for logging
-        }
+        payload_data = close_command_payload(trade, reason)
 
         command = Command(
             id=command_id,
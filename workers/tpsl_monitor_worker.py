@@ -41,13 +41,20 @@ class TPSLMonitor:
 
     def alert_missing_tpsl(self, db, trade: Trade):
         """Create alert for trade without TP/SL"""
+        db.add(self.missing_tpsl_log(trade))
+        db.commit()
+
+        logger.warning(f"  💡 Run: python3 fix_missing_tpsl.py --execute")
+
+    @staticmethod
+    def missing_tpsl_log(trade: Trade) -> Log:
+        """Log the alert and build its Log row (not added to a session)"""
         logger.error(
             f"⚠️  ALERT: Trade #{trade.ticket} ({trade.symbol} {trade.direction}) "
             f"is MISSING TP/SL! Entry: {trade.open_price}"
         )
 
-        # Log to database
-        log_entry = Log(
+        return Log(
             account_id=trade.account_id,
             level='ERROR',
             message='Trade opened without TP/SL',
@@ -63,10 +70,6 @@ class TPSLMonitor:
             },
             timestamp=datetime.utcnow()
         )
-        db.add(log_entry)
-        db.commit()
-
-        logger.warning(f"  💡 Run: python3 fix_missing_tpsl.py --execute")
 
     def run(self):
         """Main monitoring loop"""